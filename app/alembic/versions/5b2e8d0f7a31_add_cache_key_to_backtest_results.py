@@ -0,0 +1,30 @@
+"""add_cache_key_to_backtest_results
+
+Revision ID: 5b2e8d0f7a31
+Revises: c41f7a9e2d10
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e8d0f7a31'
+down_revision: Union[str, Sequence[str], None] = 'c41f7a9e2d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add cache_key column (hash of run inputs) to backtest_results."""
+    op.add_column('backtest_results', sa.Column('cache_key', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_backtest_results_cache_key'), 'backtest_results', ['cache_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Remove cache_key column from backtest_results."""
+    op.drop_index(op.f('ix_backtest_results_cache_key'), table_name='backtest_results')
+    op.drop_column('backtest_results', 'cache_key')
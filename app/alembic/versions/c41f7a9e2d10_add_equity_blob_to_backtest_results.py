@@ -0,0 +1,29 @@
+"""add_equity_blob_to_backtest_results
+
+Revision ID: c41f7a9e2d10
+Revises: 80c36321a8e6
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f7a9e2d10'
+down_revision: Union[str, Sequence[str], None] = '80c36321a8e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add equity_blob column (full-resolution equity curve) to backtest_results."""
+    op.add_column('backtest_results', sa.Column('equity_blob', sa.LargeBinary(), nullable=True))
+    op.execute("COMMENT ON COLUMN backtest_results.equity_blob IS 'Полная кривая эквити, сжатая (equity_store)'")
+
+
+def downgrade() -> None:
+    """Remove equity_blob column from backtest_results."""
+    op.drop_column('backtest_results', 'equity_blob')
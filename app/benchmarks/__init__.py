@@ -0,0 +1,7 @@
+"""Performance benchmarks for the backtest stack (run as ``python -m benchmarks.<name>`` from ``app/``)."""
+import os
+
+if "FERNET_KEY" not in os.environ:
+    # Сервисные модули требуют ключ шифрования при импорте; для бенчмарков достаточно фиктивного
+    from cryptography.fernet import Fernet
+    os.environ["FERNET_KEY"] = Fernet.generate_key().decode()
@@ -0,0 +1,67 @@
+"""
+500-point Novichok grid: BatchSignalEvaluator vs one VectorizedBacktestEngine run per point.
+
+    cd app && python -m benchmarks.bench_batch_evaluator --bars 100000
+
+The per-point baseline runs --sample grid points and is extrapolated to the grid.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from types import SimpleNamespace
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_ohlcv
+from services.backtest.batch_evaluator import BatchSignalEvaluator
+from services.backtest.parameter_sweep import expand_grid, template_with_parameters
+from services.backtest.universal_backtest_engine import BacktestContext
+from services.backtest.vectorized_backtest_engine import VectorizedBacktestEngine
+from strategies.strategy_factory import make_strategy
+
+GRID = {
+    'ema_fast': [5, 8, 10, 12, 15],
+    'ema_slow': [20, 30, 40, 50, 60],
+    'trend_threshold': [0.0005, 0.001, 0.002, 0.003],
+    'stop_loss_pct': [0.003, 0.004, 0.006, 0.008, 0.01],
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bars', type=int, default=100_000)
+    parser.add_argument('--sample', type=int, default=25)
+    args = parser.parse_args()
+
+    df = make_ohlcv(args.bars, seed=1, volatility=0.002)
+    template = SimpleNamespace(
+        id=1, template_name='bench', leverage=3, interval='1m', symbol='BTCUSDT',
+        parameters={'ema_fast': 10, 'ema_slow': 30, 'trend_threshold': 0.001,
+                    'stop_loss_pct': 0.004, 'take_profit_pct': 0.006},
+    )
+    config = {'fee_rate': 0.0004}
+    candidates = expand_grid(GRID)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        BatchSignalEvaluator(df, template, config=config, leverage=3).evaluate(GRID)
+        batch = time.perf_counter() - started
+
+        step = max(1, len(candidates) // args.sample)
+        sample = candidates[::step][:args.sample]
+        started = time.perf_counter()
+        for parameters in sample:
+            candidate = template_with_parameters(template, parameters)
+            context = BacktestContext(make_strategy('novichok', candidate), candidate, 10000.0,
+                                      {'BTCUSDT': df}, config=dict(config), leverage=3)
+            asyncio.run(VectorizedBacktestEngine(context).run())
+        per_point = (time.perf_counter() - started) / len(sample)
+
+    print(f"{len(candidates)} grid points on {args.bars} bars")
+    print(f"one engine run per point: {per_point * len(candidates):7.1f}s (extrapolated from {len(sample)} runs)")
+    print(f"batch evaluator:          {batch:7.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Loading a year of 1m candles: temp CSV + CSVDataService.load_csv_data vs CandleStore.
+
+    cd app && python -m benchmarks.bench_candle_store --bars 525600
+
+Both paths start from rows already fetched, so the numbers exclude the network.
+The store is filled once (the first backtest for a range); later loads map the
+column files and slice them. Higher intervals are resampled from the stored 1m
+candles once and then served from their own cache.
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+import numpy as np
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_ohlcv
+from services.backtest.candle_store import CandleStore
+from services.backtest.csv_data_service import CSVDataService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bars', type=int, default=525_600)
+    args = parser.parse_args()
+
+    df = make_ohlcv(args.bars, seed=1)
+    rows = np.column_stack([df.index.asi8 // 1_000_000, df.to_numpy()])
+    start, end = df.index[0], df.index[-1] + (df.index[1] - df.index[0])
+
+    with tempfile.TemporaryDirectory() as root, contextlib.redirect_stdout(io.StringIO()):
+        csv_path = f"{root}/candles.csv"
+        np.savetxt(csv_path, rows, delimiter=',', header='timestamp,open,high,low,close,volume',
+                   comments='', fmt=['%d'] + ['%.8f'] * 5)
+        started = time.perf_counter()
+        CSVDataService().load_csv_data(csv_path)
+        csv_load = time.perf_counter() - started
+
+        store = CandleStore(root, fetcher=lambda symbol, interval, first, last: rows)
+        started = time.perf_counter()
+        store.load('BTCUSDT', '1m', start, end)
+        first_load = time.perf_counter() - started
+        started = time.perf_counter()
+        loaded = store.load('BTCUSDT', '1m', start, end)
+        float(loaded['close'].sum())
+        cached_load = time.perf_counter() - started
+
+        derived = {}
+        for interval in ('5m', '1h', '4h'):
+            started = time.perf_counter()
+            store.load('BTCUSDT', interval, start, end)
+            first = time.perf_counter() - started
+            started = time.perf_counter()
+            store.load('BTCUSDT', interval, start, end)
+            derived[interval] = (first, time.perf_counter() - started)
+
+    print(f"{args.bars} candles")
+    print(f"CSV parse             : {csv_load:7.3f}s")
+    print(f"CandleStore first load: {first_load:7.3f}s (write + map)")
+    print(f"CandleStore cached    : {cached_load:7.3f}s")
+    for interval, (first, cached) in derived.items():
+        print(f"derived {interval:3s} from 1m   : {first:7.3f}s resample, {cached:7.3f}s cached")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+OHLCV CSV loading: the old read_csv + to_numeric + dropna + sort path vs read_ohlcv_csv.
+
+    cd app && python -m benchmarks.bench_csv_ingest --rows 2000000
+
+Reports wall time and the resident size of the loaded columns for the first
+(parsing) load and the cached (memory-mapped) load, in float64 and float32.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_ohlcv
+from services.backtest.csv_ingest import PYARROW_AVAILABLE, read_ohlcv_csv
+
+
+def legacy_load(path):
+    df = pd.read_csv(path)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df.set_index('timestamp', inplace=True)
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df.dropna().sort_index()
+
+
+def timed(label, load):
+    started = time.perf_counter()
+    df = load()
+    float(df['close'].sum())
+    elapsed = time.perf_counter() - started
+    print(f"{label:28s}: {elapsed:7.3f}s, {df.memory_usage(index=False).sum() / 2**20:6.1f} MiB columns")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        path = Path(root) / 'candles.csv'
+        df = make_ohlcv(args.rows, seed=1)
+        df.insert(0, 'timestamp', df.index.asi8 // 1_000_000)
+        df.to_csv(path, index=False, float_format='%.8f')
+        print(f"{args.rows} rows, {path.stat().st_size / 2**20:.0f} MiB CSV, pyarrow: {PYARROW_AVAILABLE}")
+
+        cache = Path(root) / 'cache'
+        timed("legacy read_csv path", lambda: legacy_load(path))
+        timed("typed parse (no cache)", lambda: read_ohlcv_csv(path, use_cache=False))
+        for dtype in ('float64', 'float32'):
+            timed(f"first load {dtype}", lambda: read_ohlcv_csv(path, dtype=dtype, cache_dir=cache))
+            timed(f"cached load {dtype}", lambda: read_ohlcv_csv(path, dtype=dtype, cache_dir=cache))
+
+
+if __name__ == '__main__':
+    main()
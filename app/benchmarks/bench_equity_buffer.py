@@ -0,0 +1,87 @@
+"""
+Equity curve storage: one BacktestEquityPoint per bar vs EquityBuffer.
+
+    cd app && python -m benchmarks.bench_equity_buffer --bars 200000
+
+"per point" is retained memory of the curve while the backtest runs, and of the
+models built from the buffer for the result. The engine run reports wall time and
+the process max RSS.
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import resource
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_ohlcv
+from schemas.backtest import BacktestEquityPoint
+from services.backtest.ledger import EquityBuffer
+from services.backtest.universal_backtest_engine import UniversalBacktestEngine, BacktestContext
+from strategies.strategy_factory import make_strategy
+
+
+def retained(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return current
+
+
+def model_points(times, balances):
+    return [BacktestEquityPoint(timestamp=ts, balance=b) for ts, b in zip(times, balances)]
+
+
+def buffer_points(times, balances):
+    buffer = EquityBuffer()
+    for ts, b in zip(times, balances):
+        buffer.append(ts, b)
+    return buffer
+
+
+def run_engine(df):
+    template = SimpleNamespace(
+        id=1, template_name='bench', leverage=3, interval='1m', symbol='BTCUSDT',
+        parameters={'ema_fast': 10, 'ema_slow': 30, 'trend_threshold': 0.001,
+                    'stop_loss_pct': 0.004, 'take_profit_pct': 0.006},
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        context = BacktestContext(make_strategy('novichok', template), template, 10000.0,
+                                  {'BTCUSDT': df}, config={'fee_rate': 0.0004})
+        started = time.perf_counter()
+        result = asyncio.run(UniversalBacktestEngine(context).run())
+    return time.perf_counter() - started, len(result.equity_curve)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bars', type=int, default=200_000)
+    parser.add_argument('--points', type=int, default=200_000)
+    args = parser.parse_args()
+
+    # Engine first, so max RSS belongs to the run and not to the measurements below
+    elapsed, points = run_engine(make_ohlcv(args.bars, seed=1, volatility=0.002))
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    times = make_ohlcv(args.points, seed=1).index.tolist()
+    balances = (10000.0 + np.random.default_rng(1).normal(0, 10, args.points)).tolist()
+    per_model = retained(lambda: model_points(times, balances)) / args.points
+    per_buffer = retained(lambda: buffer_points(times, balances)) / args.points
+    per_built = retained(lambda: buffer_points(times, balances).to_points(times)) / args.points
+
+    print(f"per point:   BacktestEquityPoint {per_model:6.0f} B   EquityBuffer {per_buffer:6.0f} B   "
+          f"points built from the buffer {per_built:6.0f} B")
+    print(f"engine run:  {elapsed:.1f}s, max RSS {max_rss_mb:.0f} MiB ({args.bars} bars, {points} points)")
+
+
+if __name__ == '__main__':
+    main()
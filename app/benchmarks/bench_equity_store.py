@@ -0,0 +1,60 @@
+"""
+Stored backtest result size and results-page payload for a year of 1m equity points.
+
+    cd app && python -m benchmarks.bench_equity_store --points 525600
+
+"json" is the former results column: the whole BacktestResult.model_dump with
+every equity point, also what the results page embedded. "stored" is the JSON with
+the LTTB display series plus the compressed full-resolution blob, and "window" one
+zoomed range served by /api/backtest/results/{task_id}/equity.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import benchmarks  # noqa: F401
+from schemas.backtest import BacktestEquityPoint
+from services.backtest.equity_store import decode_equity_curve, equity_window, pack_equity_curve
+
+MINUTE_NS = 60 * 1_000_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, default=525_600)
+    parser.add_argument('--exposure', type=float, default=0.3, help="доля точек с открытой позицией")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    times = pd.Timestamp('2024-01-01').value + np.arange(args.points, dtype=np.int64) * MINUTE_NS
+    in_position = rng.random(args.points) < args.exposure
+    balances = 10000.0 + np.cumsum(np.where(in_position, rng.normal(0, 2.0, args.points), 0.0))
+    curve = [BacktestEquityPoint(timestamp=pd.Timestamp(t, tz='UTC'), balance=b)
+             for t, b in zip(times.tolist(), balances.tolist())]
+
+    started = time.perf_counter()
+    full_json = json.dumps([p.model_dump(mode='json') for p in curve])
+    json_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    blob, display = pack_equity_curve(curve)
+    display_json = json.dumps(display)
+    pack_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    full_times, full_balances = decode_equity_curve(blob)
+    window = equity_window(full_times, full_balances, times[len(times) // 2], times[len(times) // 2 + 7 * 1440], 1000)
+    window_json = json.dumps({'timestamps': (window[0] // 1_000_000).tolist(), 'balances': window[1].tolist()})
+    window_seconds = time.perf_counter() - started
+
+    print(f"{args.points} equity points, exposure {args.exposure:.0%}")
+    print(f"json   : {len(full_json) / 1e6:8.2f} MB  {json_seconds:6.3f}s")
+    print(f"stored : {len(display_json) / 1e3:8.1f} KB display + {len(blob) / 1e6:.2f} MB blob  {pack_seconds:6.3f}s")
+    print(f"window : {len(window_json) / 1e3:8.1f} KB for one week ({window[2]} points)  {window_seconds:6.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Hot-path logging: a compensation backtest with the trade/stop/signal categories silent vs at DEBUG.
+
+    cd app && python -m benchmarks.bench_hot_log --bars 100000 --orchestrator-bars 20000
+
+DEBUG reproduces the old behaviour (one formatted line per trade, SL/TP update and
+signal written to stdout); the default levels skip them before formatting. Output
+goes to a StringIO sink so the terminal does not dominate the timing. The same
+comparison runs through the legacy DualBacktestOrchestrator on --orchestrator-bars.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+from types import SimpleNamespace
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_ohlcv
+from services.backtest.backtest_trade_executor import BacktestTradeExecutor
+from services.backtest.data_feed import DataFeed
+from services.backtest.orchestrator_dual import DualBacktestOrchestrator
+from services.backtest.position_manager import PositionManager
+from services.backtest.statistics_service import BacktestStatisticsService
+from services.backtest.universal_backtest_engine import UniversalBacktestEngine, BacktestContext
+from strategies.strategy_factory import make_strategy
+from utils import hot_log
+
+HOT_CATEGORIES = ('backtest', 'strategy')
+
+
+def make_template() -> SimpleNamespace:
+    return SimpleNamespace(
+        id=2, template_name='bench', leverage=10, interval='1m', symbol='BTCUSDT',
+        parameters={'ema_fast': 10, 'ema_slow': 30, 'trend_threshold': 0.001,
+                    'btc_deposit_prct': 0.05, 'btc_stop_loss_pct': 0.012, 'btc_take_profit_pct': 0.03,
+                    'eth_deposit_prct': 0.1, 'eth_stop_loss_pct': 0.01, 'eth_take_profit_pct': 0.015,
+                    'compensation_threshold': 0.005, 'compensation_delay_candles': 3,
+                    'trailing_stop_pct': 0.003},
+    )
+
+
+def run_engine(market_data, sink) -> tuple:
+    template = make_template()
+    with contextlib.redirect_stdout(sink):
+        context = BacktestContext(make_strategy('compensation', template), template, 10000.0,
+                                  market_data, config={'fee_rate': 0.0004})
+        started = time.perf_counter()
+        result = asyncio.run(UniversalBacktestEngine(context).run())
+    return time.perf_counter() - started, len(result.trades)
+
+
+def run_orchestrator(market_data, sink) -> tuple:
+    template = make_template()
+    orchestrator = DualBacktestOrchestrator(
+        PositionManager(fee_rate=0.0004), BacktestTradeExecutor(fee_rate=0.0004),
+        BacktestStatisticsService(), DataFeed(),
+    )
+    with contextlib.redirect_stdout(sink):
+        strategy = make_strategy('compensation', template)
+        started = time.perf_counter()
+        result = asyncio.run(orchestrator.execute(
+            market_data['BTCUSDT'], market_data['ETHUSDT'], 10000.0, strategy, 'compensation',
+            'BTCUSDT', 'ETHUSDT', template.parameters, template,
+        ))
+    return time.perf_counter() - started, len(result.trades)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bars', type=int, default=100_000)
+    parser.add_argument('--orchestrator-bars', type=int, default=20_000)
+    args = parser.parse_args()
+
+    market_data = {
+        'BTCUSDT': make_ohlcv(args.bars, seed=1, volatility=0.002),
+        'ETHUSDT': make_ohlcv(args.bars, seed=2, start_price=3000.0, volatility=0.002),
+    }
+    orchestrator_data = {symbol: df.iloc[:args.orchestrator_bars] for symbol, df in market_data.items()}
+    runs = (('engine', run_engine, market_data), ('dual orchestrator', run_orchestrator, orchestrator_data))
+    for name, run, data in runs:
+        for label, level in (('default levels', None), ('DEBUG (old prints)', 'DEBUG')):
+            sink = io.StringIO()
+            hot_log.configure({category: level for category in HOT_CATEGORIES} if level else None, stream=sink)
+            elapsed, trades = run(data, sink)
+            lines = sink.getvalue().count('\n')
+            print(f"{name:17s} {label:20s}: {elapsed:6.2f}s, {trades} trades, {lines} log lines")
+    hot_log.configure(stream=sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
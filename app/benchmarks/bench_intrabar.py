@@ -0,0 +1,75 @@
+"""
+Intrabar SL/TP resolution: 'stopfirst' heuristic vs replaying 1m sub-bars ('subbar').
+
+    cd app && python -m benchmarks.bench_intrabar --minutes 525600 --parent 15min
+
+The parent series is resampled from the 1m candles. Reports the sub-bar index build,
+both loop-engine runs, how many candles needed a drill-down and how many exits the
+replay changed. The replay cost follows the ambiguous candles, not the 1m row count.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from types import SimpleNamespace
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_ohlcv
+from services.backtest.intrabar import SubBarIndex
+from services.backtest.universal_backtest_engine import UniversalBacktestEngine, BacktestContext
+from strategies.strategy_factory import make_strategy
+
+
+def run(df, intrabar_mode: str, sub_bars=None):
+    template = SimpleNamespace(
+        id=1, template_name='bench', leverage=3, interval='15m', symbol='BTCUSDT',
+        parameters={'ema_fast': 10, 'ema_slow': 30, 'trend_threshold': 0.001,
+                    'stop_loss_pct': 0.004, 'take_profit_pct': 0.004},
+    )
+    context = BacktestContext(make_strategy('novichok', template), template, 10000.0, {'BTCUSDT': df},
+                              config={'fee_rate': 0.0004, 'intrabar_mode': intrabar_mode}, sub_bars=sub_bars)
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        result = asyncio.run(UniversalBacktestEngine(context).run())
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--minutes', type=int, default=525_600)
+    parser.add_argument('--parent', default='15min')
+    args = parser.parse_args()
+
+    minutes = make_ohlcv(args.minutes, seed=1, volatility=0.002)
+    parent = minutes.resample(args.parent).agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+
+    started = time.perf_counter()
+    SubBarIndex(parent.index, minutes)
+    index_build = time.perf_counter() - started
+
+    resolved = []
+    original = SubBarIndex.resolve
+
+    def counting(self, bar, *args):
+        resolved.append(bar)
+        return original(self, bar, *args)
+
+    stopfirst_s, stopfirst = run(parent, 'stopfirst')
+    SubBarIndex.resolve = counting
+    try:
+        subbar_s, subbar = run(parent, 'subbar', {'BTCUSDT': minutes})
+    finally:
+        SubBarIndex.resolve = original
+
+    changed = sum(a.reason != b.reason for a, b in zip(stopfirst.trades, subbar.trades))
+    print(f"{args.minutes} 1m candles -> {len(parent)} {args.parent} candles")
+    print(f"sub-bar index build : {index_build:7.3f}s")
+    print(f"loop stopfirst      : {stopfirst_s:7.3f}s, {len(stopfirst.trades)} trades, PnL {stopfirst.total_pnl:10.2f}")
+    print(f"loop subbar         : {subbar_s:7.3f}s, {len(subbar.trades)} trades, PnL {subbar.total_pnl:10.2f}")
+    print(f"ambiguous candles   : {len(resolved)} drilled down, exit reason differs in {changed} aligned trades")
+
+
+if __name__ == '__main__':
+    main()
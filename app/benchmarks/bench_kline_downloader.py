@@ -0,0 +1,88 @@
+"""
+Kline download: sequential blocking pages (old CSVLoaderService loop) vs AsyncKlineDownloader.
+
+    cd app && python -m benchmarks.bench_kline_downloader --days 30 --latency 0.05
+
+Both run against a local stub of /api/v3/klines that answers after --latency
+seconds, which stands in for the round trip to Binance.
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+import numpy as np
+import requests
+from aiohttp import web
+
+import benchmarks  # noqa: F401
+from services.backtest.kline_downloader import AsyncKlineDownloader
+
+MINUTE = 60_000
+START = 1_704_067_200_000
+
+
+def serve(latency: float, ready: threading.Event, box: dict) -> None:
+    async def klines(request):
+        await asyncio.sleep(latency)
+        first, last = int(request.query['startTime']), int(request.query['endTime'])
+        aligned = -(-first // MINUTE) * MINUTE
+        times = np.arange(aligned, last + 1, MINUTE)[:int(request.query['limit'])]
+        return web.json_response([[int(t), "1.0", "1.0", "1.0", "1.0", "1.0"] for t in times.tolist()])
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/api/v3/klines', klines)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        box['url'] = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def sequential(url: str, start_ms: int, end_ms: int) -> int:
+    total, cursor = 0, start_ms
+    while cursor <= end_ms:
+        data = requests.get(f"{url}/api/v3/klines", params={
+            'symbol': 'BTCUSDT', 'interval': '1m', 'startTime': cursor, 'endTime': end_ms, 'limit': 1000,
+        }, timeout=30).json()
+        if not data:
+            break
+        total += len(data)
+        cursor = int(data[-1][0]) + 1
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    ready, box = threading.Event(), {}
+    threading.Thread(target=serve, args=(args.latency, ready, box), daemon=True).start()
+    ready.wait()
+    end_ms = START + args.days * 1440 * MINUTE - 1
+
+    started = time.perf_counter()
+    candles = sequential(box['url'], START, end_ms)
+    print(f"{candles} candles, {args.latency * 1000:.0f} ms per request")
+    print(f"sequential requests.get       : {time.perf_counter() - started:6.2f}s")
+
+    downloader = AsyncKlineDownloader(box['url'], concurrency=args.concurrency, progress=lambda *a: None)
+    started = time.perf_counter()
+    downloader('BTCUSDT', '1m', START, end_ms)
+    print(f"AsyncKlineDownloader x{args.concurrency:<2d}      : {time.perf_counter() - started:6.2f}s")
+
+    started = time.perf_counter()
+    asyncio.run(downloader.fetch_many([('BTCUSDT', '1m', START, end_ms), ('ETHUSDT', '1m', START, end_ms)]))
+    print(f"AsyncKlineDownloader BTC + ETH: {time.perf_counter() - started:6.2f}s")
+
+
+if __name__ == '__main__':
+    main()
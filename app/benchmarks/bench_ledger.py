@@ -0,0 +1,144 @@
+"""
+Memory of backtest state: dict positions / list of trade dicts vs Position / TradeLedger.
+
+    cd app && python -m benchmarks.bench_ledger --trades 100000 --bars 20000
+
+"per trade" and "per position" are retained bytes of the stored records. "per bar" is
+the transient peak of one PositionManager step with an open position (trailing stop
+path included) and the peak of a whole UniversalBacktestEngine run divided by bars.
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import tracemalloc
+from types import SimpleNamespace
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_ohlcv
+from services.backtest.ledger import Position, TradeLedger
+from services.backtest.position_manager import PositionManager
+from services.backtest.universal_backtest_engine import UniversalBacktestEngine, BacktestContext
+from strategies.strategy_factory import make_strategy
+
+
+def retained(build) -> int:
+    """Bytes still allocated by the object build() returns"""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return current
+
+
+def trade_dicts(times, n: int):
+    trades = []
+    for i in range(n):
+        trades.append({
+            'symbol': 'BTCUSDT', 'side': 'long', 'entry_price': 50000.0 + i, 'exit_price': 50100.0 + i,
+            'entry_time': times[i], 'exit_time': times[i + 1], 'size': 0.01, 'leverage': 3,
+            'pnl': 1.0 * i, 'pnl_pct': 0.001, 'fee_close': 0.2, 'reason': 'take_profit', 'status': 'closed',
+        })
+    return trades
+
+
+def trade_ledger(times, n: int):
+    trades = TradeLedger()
+    for i in range(n):
+        trades.add('BTCUSDT', 'long', 50000.0 + i, times[i], 0.01, exit_price=50100.0 + i,
+                   exit_time=times[i + 1], leverage=3, pnl=1.0 * i, pnl_pct=0.001, fee_close=0.2,
+                   reason='take_profit', status='closed')
+    return trades
+
+
+def position_dicts(times, n: int):
+    return [{
+        'deal_id': i, 'entry_price': 50000.0 + i, 'entry_time': times[i], 'side': 'BUY', 'size': 0.01,
+        'size_usd': 500.0, 'symbol': 'BTCUSDT', 'leverage': 3, 'open_fee': 0.2,
+        'stop_loss': 49000.0, 'take_profit': 51000.0, 'max_price': 50000.0 + i, 'min_price': 50000.0 + i,
+    } for i in range(n)]
+
+
+def position_objects(times, n: int):
+    return [Position('BTCUSDT', 'BUY', 50000.0 + i, times[i], 0.01, deal_id=i, size_usd=500.0, leverage=3,
+                     open_fee=0.2, stop_loss=49000.0, take_profit=51000.0) for i in range(n)]
+
+
+def make_template():
+    return SimpleNamespace(
+        id=1, template_name='bench', leverage=3, interval='1m', symbol='BTCUSDT',
+        parameters={'ema_fast': 10, 'ema_slow': 30, 'trend_threshold': 0.001,
+                    'stop_loss_pct': 0.004, 'take_profit_pct': 0.006},
+    )
+
+
+def step_peak(df, position, steps: int) -> float:
+    """Average transient peak of one PositionManager step (the position never closes)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        # The bare NovichokStrategy takes the trailing stop branch that builds a deal object
+        strategy = make_strategy('novichok', make_template()).legacy
+    manager = PositionManager()
+    frames = [{'BTCUSDT': df.iloc[i:i + 1]} for i in range(steps)]
+    trades = []
+    total = 0
+    gc.collect()
+    tracemalloc.start()
+    for md in frames:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        manager.check_and_close_positions_sync({'BTCUSDT': position}, md, None, 10000.0, trades, strategy)
+        total += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return total / steps
+
+
+def engine_peak(df) -> tuple:
+    template = make_template()
+    with contextlib.redirect_stdout(io.StringIO()):
+        context = BacktestContext(make_strategy('novichok', template), template, 10000.0,
+                                  {'BTCUSDT': df}, config={'fee_rate': 0.0004})
+        engine = UniversalBacktestEngine(context)
+        gc.collect()
+        tracemalloc.start()
+        result = asyncio.run(engine.run())
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return peak, result.total_trades
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trades', type=int, default=100_000)
+    parser.add_argument('--bars', type=int, default=20_000)
+    parser.add_argument('--steps', type=int, default=2_000)
+    args = parser.parse_args()
+
+    times = make_ohlcv(args.trades + 1, seed=1).index.tolist()
+    n = args.trades
+
+    dict_trade = retained(lambda: trade_dicts(times, n)) / n
+    ledger_trade = retained(lambda: trade_ledger(times, n)) / n
+    dict_position = retained(lambda: position_dicts(times, n)) / n
+    slotted_position = retained(lambda: position_objects(times, n)) / n
+
+    df = make_ohlcv(args.bars, seed=1, volatility=0.002)
+    price = float(df['close'].iloc[0])
+    as_dict = position_dicts([df.index[0]], 1)[0]
+    as_dict.update(entry_price=price, max_price=price, min_price=price, stop_loss=price * 0.1, take_profit=price * 10)
+    as_object = Position('BTCUSDT', 'BUY', price, df.index[0], 0.01, leverage=3,
+                         stop_loss=price * 0.1, take_profit=price * 10)
+    dict_step = step_peak(df, as_dict, min(args.steps, args.bars))
+    object_step = step_peak(df, as_object, min(args.steps, args.bars))
+    peak, trades = engine_peak(df)
+
+    print(f"per trade:     dict {dict_trade:7.0f} B   TradeLedger {ledger_trade:7.0f} B   ({n} trades)")
+    print(f"per position:  dict {dict_position:7.0f} B   Position    {slotted_position:7.0f} B")
+    print(f"per bar:       PositionManager step peak: dict {dict_step:.0f} B, Position {object_step:.0f} B")
+    print(f"engine run:    peak {peak / args.bars:.0f} B per bar ({args.bars} bars, {trades} trades)")
+
+
+if __name__ == '__main__':
+    main()
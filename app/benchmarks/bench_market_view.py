@@ -0,0 +1,62 @@
+"""
+Per-bar market data access: boolean-mask slicing vs MarketDataCursor.
+
+    cd app && python -m benchmarks.bench_market_view --sizes 100000 500000
+
+The mask approach is quadratic, so it is timed on evenly spaced sample steps and
+extrapolated to the full run; the cursor is timed over every step.
+"""
+import argparse
+import time
+
+import numpy as np
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_ohlcv
+from services.backtest.market_view import MarketDataCursor
+
+
+def bench_mask(market_data, timeline, samples: int) -> float:
+    steps = np.linspace(0, len(timeline) - 1, num=min(samples, len(timeline)), dtype=int)
+    started = time.perf_counter()
+    for i in steps:
+        current_time = timeline[i]
+        md = {symbol: df[df.index <= current_time] for symbol, df in market_data.items()}
+        for df in md.values():
+            df['close'].iloc[-1]
+    per_step = (time.perf_counter() - started) / len(steps)
+    return per_step * len(timeline)
+
+
+def bench_cursor(market_data, timeline) -> float:
+    started = time.perf_counter()
+    cursor = MarketDataCursor(market_data)
+    for current_time in timeline:
+        cursor.advance(current_time)
+        md = cursor.view()
+        for symbol in md:
+            md[symbol]
+            cursor.price(symbol)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 500_000])
+    parser.add_argument('--samples', type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{'bars':>10} {'mask (est.)':>14} {'cursor':>10} {'speedup':>10}")
+    for size in args.sizes:
+        market_data = {
+            'BTCUSDT': make_ohlcv(size, seed=1),
+            'ETHUSDT': make_ohlcv(size, seed=2, start_price=2500.0),
+        }
+        timeline = market_data['BTCUSDT'].index.tolist()
+        mask_s = bench_mask(market_data, timeline, args.samples)
+        cursor_s = bench_cursor(market_data, timeline)
+        print(f"{size:>10} {mask_s:>13.1f}s {cursor_s:>9.2f}s {mask_s / cursor_s:>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
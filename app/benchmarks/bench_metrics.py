@@ -0,0 +1,80 @@
+"""
+Backtest statistics on a long equity curve: the former per-point Python loops vs services.backtest.metrics.
+
+    cd app && python -m benchmarks.bench_metrics --points 1000000 --trades 20000
+
+"legacy loops" is the old BacktestStatisticsService path (drawdown, Sharpe and
+win/loss loops over point dicts). "service" is the current service on the same
+point list, "arrays" the engines' path over EquityBuffer/TradeLedger columns with
+every extended metric, and "rolling" adds a one-day window of rolling metrics.
+"""
+import argparse
+import time
+from math import sqrt
+
+import numpy as np
+import pandas as pd
+
+import benchmarks  # noqa: F401
+from services.backtest.metrics import backtest_metrics
+from services.backtest.statistics_service import BacktestStatisticsService
+
+
+def legacy_statistics(trades, equity_curve):
+    wins, losses = [], []
+    for t in trades:
+        pnl = t.get('pnl', 0.0)
+        if pnl > 0:
+            wins.append(pnl)
+        elif pnl < 0:
+            losses.append(abs(pnl))
+    peak, max_dd = None, 0.0
+    returns, prev = [], None
+    for pt in equity_curve:
+        bal = pt['balance']
+        if peak is None or bal > peak:
+            peak = bal
+        if peak and bal < peak:
+            max_dd = max(max_dd, (peak - bal) / peak)
+        if prev:
+            returns.append((bal - prev) / prev)
+        prev = bal
+    mean = sum(returns) / len(returns)
+    std = sqrt(sum((r - mean) ** 2 for r in returns) / len(returns))
+    return max_dd, mean / std, len(wins), len(losses)
+
+
+def timed(label, run):
+    started = time.perf_counter()
+    run()
+    print(f"{label:14s}: {time.perf_counter() - started:7.3f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--trades', type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    balances = 10000.0 * np.exp(np.cumsum(rng.normal(0, 0.0005, args.points)))
+    times = pd.date_range('2024-01-01', periods=args.points, freq='1min')
+    pnl = rng.normal(0.5, 20.0, args.trades)
+    entries = np.sort(rng.integers(0, args.points - 100, args.trades))
+    exits = entries + rng.integers(1, 100, args.trades)
+    codes = rng.integers(0, 2, args.trades)
+
+    points = [{'timestamp': t, 'balance': b} for t, b in zip(times, balances.tolist())]
+    trades = [{'pnl': p} for p in pnl.tolist()]
+    times_ns = times.asi8
+    print(f"{args.points} equity points, {args.trades} trades")
+    timed("legacy loops", lambda: legacy_statistics(trades, points))
+    timed("service", lambda: BacktestStatisticsService().calculate_statistics(trades, points, 10000.0))
+    arrays = dict(trade_pnl=pnl, symbol_codes=codes, symbol_labels=['BTCUSDT', 'ETHUSDT'],
+                  entry_ns=times_ns[entries], exit_ns=times_ns[exits], notional=np.abs(pnl) * 100)
+    timed("arrays", lambda: backtest_metrics(balances, times_ns, **arrays))
+    timed("arrays+rolling", lambda: backtest_metrics(balances, times_ns, rolling_window=1440, **arrays))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Monte Carlo over a trade list: MonteCarloAnalyzer vs a Python loop per simulation.
+
+    cd app && python -m benchmarks.bench_monte_carlo --simulations 10000 --trades 2000
+
+The loop baseline resamples with numpy but walks each equity path with the
+former point-by-point drawdown loop of BacktestStatisticsService; it runs
+--sample simulations and is extrapolated.
+"""
+import argparse
+import time
+
+import numpy as np
+
+import benchmarks  # noqa: F401
+from services.backtest.monte_carlo import MonteCarloAnalyzer
+
+
+def loop_max_drawdown(equity_curve):
+    peak = None
+    max_drawdown = max_drawdown_pct = 0.0
+    for pt in equity_curve:
+        bal = pt['balance']
+        if peak is None or bal > peak:
+            peak = bal
+        if peak and bal < peak:
+            max_drawdown = max(max_drawdown, peak - bal)
+            max_drawdown_pct = max(max_drawdown_pct, (peak - bal) / peak)
+    return max_drawdown, max_drawdown_pct
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--simulations', type=int, default=10_000)
+    parser.add_argument('--trades', type=int, default=2_000)
+    parser.add_argument('--sample', type=int, default=200)
+    args = parser.parse_args()
+
+    pnl = np.random.default_rng(0).normal(1.0, 20.0, args.trades)
+    rng = np.random.default_rng(1)
+    started = time.perf_counter()
+    for _ in range(args.sample):
+        equity = 10000.0 + np.cumsum(pnl[rng.integers(0, args.trades, args.trades)])
+        loop_max_drawdown([{'balance': b} for b in equity.tolist()])
+    loop = (time.perf_counter() - started) / args.sample * args.simulations
+
+    print(f"{args.simulations} simulations x {args.trades} trades")
+    print(f"python loop per simulation: {loop:6.2f}s (extrapolated from {args.sample})")
+    for method in ('bootstrap', 'shuffle'):
+        analyzer = MonteCarloAnalyzer(simulations=args.simulations, method=method, seed=1)
+        started = time.perf_counter()
+        analyzer.analyze_pnl(pnl, 10000.0)
+        print(f"MonteCarloAnalyzer {method:9s}: {time.perf_counter() - started:6.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Parameter sweep throughput by worker count, and what each worker receives.
+
+    cd app && python -m benchmarks.bench_parameter_sweep --bars 50000 --workers 1 2 4 8
+
+"per worker payload" compares a pickled copy of the market data with the shared
+memory spec the workers attach to. Speedup is relative to the first worker count.
+"""
+import argparse
+import contextlib
+import io
+import os
+import pickle
+from types import SimpleNamespace
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_ohlcv
+from services.backtest.parameter_sweep import ParameterSweepRunner, SharedMarketData
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bars', type=int, default=50_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--engine', default='loop', choices=['loop', 'vectorized'])
+    args = parser.parse_args()
+
+    market_data = {'BTCUSDT': make_ohlcv(args.bars, seed=1, volatility=0.002)}
+    template = SimpleNamespace(
+        id=1, template_name='bench', leverage=3, interval='1m', symbol='BTCUSDT',
+        parameters={'ema_fast': 10, 'ema_slow': 30, 'trend_threshold': 0.001,
+                    'stop_loss_pct': 0.004, 'take_profit_pct': 0.006},
+    )
+    grid = {'ema_fast': [5, 10, 15, 20], 'stop_loss_pct': [0.003, 0.004, 0.005, 0.006]}
+    config = {'fee_rate': 0.0004, 'engine': args.engine}
+
+    with SharedMarketData(market_data) as shared:
+        spec_bytes = len(pickle.dumps(shared.specs))
+    copy_bytes = len(pickle.dumps(market_data))
+    print(f"per worker payload: pickled market data {copy_bytes / 1024:.0f} KiB, shared memory spec {spec_bytes} B")
+
+    baseline = None
+    for workers in args.workers:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = ParameterSweepRunner(workers).run('novichok', template, grid, market_data,
+                                                       config=config, leverage=3)
+        baseline = baseline or result.elapsed_seconds
+        print(f"{workers:3d} workers: {len(result.rows)} candidates in {result.elapsed_seconds:6.1f}s, "
+              f"speedup {baseline / result.elapsed_seconds:4.2f}x")
+
+
+if __name__ == '__main__':
+    main()
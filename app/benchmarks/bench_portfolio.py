@@ -0,0 +1,68 @@
+"""
+One portfolio pass over N strategies vs N independent loop-engine backtests.
+
+    cd app && python -m benchmarks.bench_portfolio --bars 100000 --strategies 4
+
+Strategies differ in SL/TP and share EMA spans, so the portfolio computes each
+EMA once for all of them.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from types import SimpleNamespace
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_ohlcv
+from services.backtest.portfolio_engine import PortfolioBacktestEngine, PortfolioStrategy
+from services.backtest.universal_backtest_engine import UniversalBacktestEngine, BacktestContext
+from strategies.strategy_factory import make_strategy
+
+CONFIG = {'fee_rate': 0.0004}
+
+
+def make_template(i):
+    return SimpleNamespace(
+        id=i, template_name=f'bench-{i}', leverage=3, interval='1m', symbol='BTCUSDT', deposit_prct=0.1,
+        parameters={'ema_fast': 10, 'ema_slow': 30, 'trend_threshold': 0.001,
+                    'stop_loss_pct': 0.004 * (i + 1), 'take_profit_pct': 0.006 * (i + 1)},
+    )
+
+
+def timed(make_engine) -> float:
+    async def run() -> float:
+        # Результат не возвращается из корутины: asyncio.run в 3.11 строит repr задачи вместе с ним
+        started = time.perf_counter()
+        await make_engine().run()
+        return time.perf_counter() - started
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(run())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bars', type=int, default=100_000)
+    parser.add_argument('--strategies', type=int, default=4)
+    args = parser.parse_args()
+
+    market_data = {'BTCUSDT': make_ohlcv(args.bars, seed=1, volatility=0.002)}
+    templates = [make_template(i) for i in range(args.strategies)]
+
+    separate_s = sum(
+        timed(lambda t=t: UniversalBacktestEngine(
+            BacktestContext(make_strategy('novichok', t), t, 10000.0, market_data, config=CONFIG)))
+        for t in templates
+    )
+    portfolio_s = timed(lambda: PortfolioBacktestEngine(
+        [PortfolioStrategy(t.template_name, make_strategy('novichok', t), t) for t in templates],
+        10000.0, market_data, config=CONFIG))
+
+    print(f"{args.bars} bars, {args.strategies} strategies")
+    print(f"separate runs : {separate_s:7.2f}s")
+    print(f"portfolio     : {portfolio_s:7.2f}s  ({separate_s / portfolio_s:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Tick replay over a synthetic aggTrade tape: import, candle build and replay with bounded memory.
+
+    cd app && python -m benchmarks.bench_tick_replay --trades 20000000
+
+Trades are generated and appended in segments, so the generator itself never holds
+the whole tape. Peak RSS is reported after the replay; it should stay far below the
+size of the tape on disk.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import resource
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+import benchmarks  # noqa: F401
+from services.backtest.tick_replay_engine import TickReplayEngine
+from services.backtest.trade_tape import TradeTape
+from services.backtest.universal_backtest_engine import BacktestContext
+from strategies.strategy_factory import make_strategy
+
+SEGMENT = 500_000
+
+
+def fill_tape(tape: TradeTape, trades: int) -> None:
+    rng = np.random.default_rng(1)
+    last_ms, last_price = pd.Timestamp('2024-01-01').value // 1_000_000, 50000.0
+    for offset in range(0, trades, SEGMENT):
+        n = min(SEGMENT, trades - offset)
+        timestamps = last_ms + np.cumsum(rng.integers(0, 400, n))
+        price = last_price * np.exp(np.cumsum(rng.normal(0, 0.0001, n)))
+        tape.append('BTCUSDT', timestamps, price, rng.uniform(0.001, 1.0, n))
+        last_ms, last_price = int(timestamps[-1]), float(price[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trades', type=int, default=20_000_000)
+    parser.add_argument('--chunk', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        tape = TradeTape(root)
+        started = time.perf_counter()
+        fill_tape(tape, args.trades)
+        fill_s = time.perf_counter() - started
+        tape_mb = sum(p.stat().st_size for s in tape.segments('BTCUSDT') for p in s.iterdir()) / 2**20
+
+        template = SimpleNamespace(
+            id=1, template_name='bench', leverage=3, interval='1m', symbol='BTCUSDT',
+            parameters={'ema_fast': 10, 'ema_slow': 30, 'trend_threshold': 0.001,
+                        'stop_loss_pct': 0.004, 'take_profit_pct': 0.006, 'trailing_stop_pct': 0.003},
+        )
+        context = BacktestContext(make_strategy('novichok', template), template, 10000.0, {},
+                                  config={'fee_rate': 0.0004})
+        engine = TickReplayEngine(context, tape, '1m', chunk_size=args.chunk)
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = asyncio.run(engine.run())
+        replay_s = time.perf_counter() - started
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f"{args.trades} trades, tape {tape_mb:.0f} MiB on disk, {len(engine.timeline)} 1m candles")
+    print(f"write tape            : {fill_s:7.2f}s")
+    print(f"candles + replay      : {replay_s:7.2f}s ({args.trades / replay_s / 1e6:.1f}M trades/s), "
+          f"{engine.trades_replayed} trades checked in positions, {result.total_trades} deals")
+    print(f"peak RSS              : {rss_before:7.0f} MiB before run, {rss_after:7.0f} MiB after")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Timeline construction and per-bar cursor stepping: set of Timestamps vs build_timeline + seek.
+
+    cd app && python -m benchmarks.bench_timeline --bars 1000000
+
+ETH gets every 7th bar removed, so the union is not just one of the indexes.
+Peak memory is the tracemalloc high-water mark while the timeline is built; the
+loop totals are timed without tracemalloc.
+"""
+import argparse
+import time
+import tracemalloc
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_ohlcv
+from services.backtest.market_view import MarketDataCursor, build_timeline
+
+
+def legacy_timeline(market_data):
+    all_times = []
+    for df in market_data.values():
+        if not df.empty:
+            all_times.extend(df.index.tolist())
+    return sorted(list(set(all_times)))
+
+
+def measure(build):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bars', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    eth = make_ohlcv(args.bars, seed=2, start_price=2500.0)
+    market_data = {'BTCUSDT': make_ohlcv(args.bars, seed=1), 'ETHUSDT': eth[eth.index.minute % 7 != 0]}
+
+    legacy, legacy_s, legacy_mb = measure(lambda: legacy_timeline(market_data))
+    timeline, merge_s, merge_mb = measure(lambda: build_timeline(market_data))
+    assert len(legacy) == len(timeline)
+    print(f"{args.bars} bars x 2 symbols, {len(timeline)} steps")
+    print(f"sorted(set(tolist()))  : {legacy_s:6.2f}s, peak {legacy_mb:7.1f} MiB")
+    print(f"build_timeline         : {merge_s:6.2f}s, peak {merge_mb:7.1f} MiB")
+
+    # Полный путь движка: построение таймлайна плюс проход курсора по всем шагам
+    started = time.perf_counter()
+    cursor = MarketDataCursor(market_data)
+    for current_time in legacy_timeline(market_data):
+        cursor.advance(current_time)
+    legacy_total = time.perf_counter() - started
+    started = time.perf_counter()
+    timeline = build_timeline(market_data)
+    cursor = MarketDataCursor(market_data, timeline)
+    for step, current_time in enumerate(timeline):
+        cursor.seek(step, current_time)
+    merge_total = time.perf_counter() - started
+    print(f"timeline + advance loop: {legacy_total:6.2f}s")
+    print(f"timeline + seek loop   : {merge_total:6.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Novichok backtest: UniversalBacktestEngine loop vs VectorizedBacktestEngine.
+
+    cd app && python -m benchmarks.bench_vectorized_engine --bars 525600 --loop-bars 20000
+
+The loop engine is timed on --loop-bars and extrapolated linearly; the vectorized
+engine runs the full series. "core" is the signal/trade/equity computation without
+materializing per-bar result objects.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from types import SimpleNamespace
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_ohlcv
+from services.backtest.universal_backtest_engine import UniversalBacktestEngine, BacktestContext
+from services.backtest.vectorized_backtest_engine import VectorizedBacktestEngine
+from strategies.strategy_factory import make_strategy
+
+
+def make_context(df, stop_loss_pct: float, take_profit_pct: float) -> BacktestContext:
+    template = SimpleNamespace(
+        id=1, template_name='bench', leverage=3, interval='1m', symbol='BTCUSDT',
+        parameters={'ema_fast': 10, 'ema_slow': 30, 'trend_threshold': 0.001,
+                    'stop_loss_pct': stop_loss_pct, 'take_profit_pct': take_profit_pct},
+    )
+    return BacktestContext(make_strategy('novichok', template), template, 10000.0,
+                           {'BTCUSDT': df}, config={'fee_rate': 0.0004})
+
+
+def timed_run(engine):
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        result = asyncio.run(engine.run())
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bars', type=int, default=525_600)
+    parser.add_argument('--loop-bars', type=int, default=20_000)
+    parser.add_argument('--stop-loss', type=float, default=0.004)
+    parser.add_argument('--take-profit', type=float, default=0.006)
+    args = parser.parse_args()
+
+    df = make_ohlcv(args.bars, seed=1, volatility=0.002)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        loop_engine = UniversalBacktestEngine(make_context(df.iloc[:args.loop_bars], args.stop_loss, args.take_profit))
+    loop_s, _ = timed_run(loop_engine)
+    loop_full = loop_s * args.bars / args.loop_bars
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = VectorizedBacktestEngine(make_context(df, args.stop_loss, args.take_profit))
+    started = time.perf_counter()
+    engine._run_signal_mode(engine.context.strategy.legacy, 'BTCUSDT', df)
+    core_s = time.perf_counter() - started
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = VectorizedBacktestEngine(make_context(df, args.stop_loss, args.take_profit))
+    vec_s, result = timed_run(engine)
+
+    print(f"bars: {args.bars}, trades: {result.total_trades}")
+    print(f"loop (est.):  {loop_full:10.1f}s  ({loop_s:.2f}s on {args.loop_bars} bars)")
+    print(f"vectorized:   {vec_s:10.2f}s  (core {core_s:.2f}s, the rest is building BacktestResult)")
+    print(f"speedup:      {loop_full / vec_s:10.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+"""
+Backtest benchmark suite with a JSON history and a regression check.
+
+    cd app && python -m benchmarks.suite run --sizes 10k 100k
+    cd app && python -m benchmarks.suite run --sizes 1m --cases engine_novichok csv_load
+    cd app && python -m benchmarks.suite compare --threshold 0.15
+
+"run" times every case on seeded synthetic data (GBM with regime switches; BTC/ETH
+as a correlated pair) and appends the best of --repeat per case and size to
+--history. Cases with a bar limit skip larger sizes unless --no-limit is given.
+"compare" checks the latest run against the previous one (or --baseline N) and
+exits with status 1 when a case got slower by more than --threshold.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import benchmarks  # noqa: F401
+from benchmarks.synthetic import make_correlated_pair
+from services.backtest.backtest_trade_executor import BacktestTradeExecutor
+from services.backtest.csv_loader_service import CSVLoaderService
+from services.backtest.data_feed import DataFeed
+from services.backtest.orchestrator_dual import DualBacktestOrchestrator
+from services.backtest.position_manager import PositionManager
+from services.backtest.statistics_service import BacktestStatisticsService
+from services.backtest.universal_backtest_engine import BacktestContext, UniversalBacktestEngine
+from strategies.strategy_factory import make_strategy
+
+DEFAULT_HISTORY = Path(__file__).with_name('history.json')
+DEFAULT_SIZES = ('10k', '100k')
+SEED = 7
+FEE_RATE = 0.0004
+
+
+class Case(NamedTuple):
+    """Бенчмарк: prepare(bars) готовит данные и возвращает замер (секунды); max_bars — предел размера"""
+    prepare: Callable[[int], Callable[[], float]]
+    max_bars: Optional[int] = None
+
+
+def parse_size(value: str) -> int:
+    """'10k' -> 10000, '1m' -> 1000000"""
+    value = value.strip().lower()
+    scale = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    return int(float(value[:-1] if scale > 1 else value) * scale)
+
+
+@lru_cache(maxsize=1)
+def market(bars: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    return make_correlated_pair(bars, seed=SEED)
+
+
+def make_template(strategy: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=1, template_name=f'bench-{strategy}', leverage=3, interval='1m', symbol='BTCUSDT',
+        parameters={'ema_fast': 10, 'ema_slow': 30, 'trend_threshold': 0.001,
+                    'stop_loss_pct': 0.004, 'take_profit_pct': 0.006},
+    )
+
+
+def market_data(strategy: str, bars: int) -> Dict[str, pd.DataFrame]:
+    btc, eth = market(bars)
+    return {'BTCUSDT': btc, 'ETHUSDT': eth} if strategy == 'compensation' else {'BTCUSDT': btc}
+
+
+def timed_async(make_coro: Callable[[], Any]) -> float:
+    async def run() -> float:
+        # Результат не возвращается из корутины: asyncio.run в 3.11 строит repr задачи вместе с ним
+        started = time.perf_counter()
+        await make_coro()
+        return time.perf_counter() - started
+
+    return asyncio.run(run())
+
+
+def timed(fn: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def engine_case(strategy: str) -> Callable[[int], Callable[[], float]]:
+    def prepare(bars: int) -> Callable[[], float]:
+        data = market_data(strategy, bars)
+
+        def run() -> float:
+            template = make_template(strategy)
+            context = BacktestContext(make_strategy(strategy, template), template, 10000.0, data,
+                                      config={'fee_rate': FEE_RATE}, leverage=template.leverage)
+            return timed_async(UniversalBacktestEngine(context).run)
+        return run
+    return prepare
+
+
+def decide_case(strategy: str) -> Callable[[int], Callable[[], float]]:
+    """Только decide стратегии на каждой свече: курсор и кэш индикаторов готовит движок"""
+    def prepare(bars: int) -> Callable[[], float]:
+        data = market_data(strategy, bars)
+
+        def run() -> float:
+            template = make_template(strategy)
+            context = BacktestContext(make_strategy(strategy, template), template, 10000.0, data,
+                                      config={'fee_rate': FEE_RATE})
+            engine = UniversalBacktestEngine(context)
+            engine._initialize_backtest()
+
+            async def loop():
+                decide, cursor = context.strategy.decide, engine.cursor
+                for i, current_time in enumerate(engine.timeline):
+                    cursor.seek(i, current_time)
+                    await decide(cursor.view(), template, {})
+            return timed_async(loop)
+        return run
+    return prepare
+
+
+def prepare_dual_orchestrator(bars: int) -> Callable[[], float]:
+    btc, eth = market(bars)
+
+    def run() -> float:
+        template = make_template('compensation')
+        orchestrator = DualBacktestOrchestrator(
+            PositionManager(fee_rate=FEE_RATE), BacktestTradeExecutor(fee_rate=FEE_RATE),
+            BacktestStatisticsService(), DataFeed(),
+        )
+        strategy = make_strategy('compensation', template)
+        return timed_async(lambda: orchestrator.execute(
+            btc, eth, 10000.0, strategy, 'compensation', 'BTCUSDT', 'ETHUSDT', template.parameters, template
+        ))
+    return run
+
+
+def prepare_iter_dual(bars: int) -> Callable[[], float]:
+    btc, eth = market(bars)
+
+    def run() -> float:
+        def consume():
+            for step in DataFeed().iter_dual(btc, eth, 'BTCUSDT', 'ETHUSDT'):
+                step['prices']
+        return timed(consume)
+    return run
+
+
+def prepare_csv_load(bars: int) -> Callable[[], float]:
+    btc, _ = market(bars)
+    root = tempfile.TemporaryDirectory()
+    path = Path(root.name) / 'BTCUSDT.csv'
+    frame = btc.copy()
+    frame.insert(0, 'timestamp', frame.index.asi8 // 1_000_000)
+    frame.to_csv(path, index=False, float_format='%.8f')
+    loader = CSVLoaderService()
+
+    def run() -> float:
+        # root держится замыканием, пока замер жив
+        assert root.name
+        return timed(lambda: loader.load_csv_data(str(path), use_cache=False))
+    return run
+
+
+def prepare_statistics(bars: int) -> Callable[[], float]:
+    btc, _ = market(bars)
+    rng = np.random.default_rng(SEED)
+    balances = 10000.0 * btc['close'].to_numpy() / btc['close'].iloc[0]
+    points = [{'timestamp': t, 'balance': b} for t, b in zip(btc.index, balances.tolist())]
+    trades = [{'pnl': p} for p in rng.normal(0.5, 20.0, max(bars // 100, 1)).tolist()]
+
+    def run() -> float:
+        return timed(lambda: BacktestStatisticsService().calculate_statistics(trades, points, 10000.0))
+    return run
+
+
+CASES: Dict[str, Case] = {
+    'engine_novichok': Case(engine_case('novichok')),
+    'engine_compensation': Case(engine_case('compensation')),
+    # Старый оркестратор пересобирает срезы и пишет лог на каждой свече: ~0.5 мс на свечу
+    'dual_orchestrator': Case(prepare_dual_orchestrator, max_bars=100_000),
+    'iter_dual': Case(prepare_iter_dual),
+    'csv_load': Case(prepare_csv_load),
+    'statistics': Case(prepare_statistics),
+    'decide_novichok': Case(decide_case('novichok')),
+    'decide_compensation': Case(decide_case('compensation')),
+}
+
+
+def result_key(case: str, bars: int) -> str:
+    return f"{case}[{bars}]"
+
+
+def run_suite(
+    sizes: Sequence[int],
+    cases: Sequence[str] = tuple(CASES),
+    repeat: int = 3,
+    no_limit: bool = False,
+    report: Callable[[str], None] = print,
+) -> Dict[str, float]:
+    """Лучшее время из repeat замеров по каждому кейсу и размеру"""
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark cases: {unknown}")
+
+    results: Dict[str, float] = {}
+    for bars in sizes:
+        for name in cases:
+            case = CASES[name]
+            if case.max_bars and bars > case.max_bars and not no_limit:
+                report(f"{name:22s} {bars:>9}: skipped (limit {case.max_bars} bars)")
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                run = case.prepare(bars)
+                seconds = min(run() for _ in range(repeat))
+            results[result_key(name, bars)] = seconds
+            report(f"{name:22s} {bars:>9}: {seconds:8.3f}s  {bars / seconds:>12,.0f} bars/s")
+    return results
+
+
+def load_history(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    return json.loads(path.read_text())
+
+
+def append_history(path: Path, results: Dict[str, float], repeat: int) -> Dict[str, Any]:
+    entry = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': f"{platform.node()} {platform.machine()}",
+        'repeat': repeat,
+        'results': results,
+    }
+    history = load_history(path)
+    history.append(entry)
+    # Запись через временный файл: прерванный прогон не портит историю
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(history, indent=2))
+    tmp.replace(path)
+    return entry
+
+
+def compare_runs(
+    baseline: Dict[str, float],
+    current: Dict[str, float],
+    threshold: float = 0.1,
+    min_seconds: float = 0.05,
+) -> List[Dict[str, Any]]:
+    """Изменение времени по общим кейсам; regression — медленнее порога.
+
+    Кейсы быстрее min_seconds в базовом прогоне не флагуются: там шум больше порога.
+    """
+    rows = []
+    for key in sorted(set(baseline) & set(current)):
+        change = current[key] / baseline[key] - 1.0 if baseline[key] else 0.0
+        rows.append({
+            'case': key,
+            'baseline': baseline[key],
+            'current': current[key],
+            'change': change,
+            'regression': change > threshold and baseline[key] >= min_seconds,
+        })
+    return rows
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cmd_run(args) -> int:
+    sizes = [parse_size(size) for size in args.sizes]
+    print(f"Sizes: {sizes}, repeat: {args.repeat}, history: {args.history}")
+    results = run_suite(sizes, args.cases or tuple(CASES), args.repeat, args.no_limit)
+    if args.no_save:
+        return 0
+    entry = append_history(args.history, results, args.repeat)
+    print(f"Saved run {entry['timestamp']} ({entry['commit']}) to {args.history}")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    history = load_history(args.history)
+    if len(history) < 2:
+        print(f"Need at least two runs in {args.history}, found {len(history)}")
+        return 2
+    baseline, current = history[args.baseline], history[args.current]
+    print(f"baseline {baseline['timestamp']} ({baseline.get('commit')}) "
+          f"vs current {current['timestamp']} ({current.get('commit')})")
+    if baseline.get('machine') != current.get('machine'):
+        print(f"⚠️ Different machines: {baseline.get('machine')} / {current.get('machine')}")
+
+    rows = compare_runs(baseline['results'], current['results'], args.threshold, args.min_seconds)
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['case']:32s} {row['baseline']:8.3f}s -> {row['current']:8.3f}s  {row['change']:+7.1%}  {flag}")
+
+    regressions = [row['case'] for row in rows if row['regression']]
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"✅ No regressions beyond {args.threshold:.0%} in {len(rows)} cases")
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--history', type=Path, default=DEFAULT_HISTORY)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='time the cases and append the run to the history')
+    run.add_argument('--sizes', nargs='+', default=list(DEFAULT_SIZES), help="bar counts, e.g. 10k 100k 1m")
+    run.add_argument('--cases', nargs='+', choices=list(CASES))
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--no-limit', action='store_true', help='ignore per-case bar limits')
+    run.add_argument('--no-save', action='store_true')
+    run.set_defaults(handler=cmd_run)
+
+    compare = commands.add_parser('compare', help='flag regressions between two runs of the history')
+    compare.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown, 0.1 = 10%%')
+    compare.add_argument('--baseline', type=int, default=-2, help='history index of the baseline run')
+    compare.add_argument('--current', type=int, default=-1, help='history index of the compared run')
+    compare.add_argument('--min-seconds', type=float, default=0.05, help='ignore cases faster than this')
+    compare.set_defaults(handler=cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Режимы рынка: (дрейф, волатильность) лог-доходности за свечу
+REGIMES: Tuple[Tuple[float, float], ...] = (
+    (0.0, 0.0005),      # флэт
+    (0.00002, 0.001),   # рост
+    (-0.00002, 0.001),  # падение
+    (0.0, 0.003),       # высокая волатильность
+)
+
+
+def make_ohlcv(
+    n: int,
+    seed: int = 0,
+    start_price: float = 50000.0,
+    volatility: float = 0.001,
+    start: str = '2024-01-01',
+    freq: str = '1min',
+) -> pd.DataFrame:
+    """Синтетические свечи (логнормальное случайное блуждание) для бенчмарков."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=n, freq=freq)
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0, volatility, n)))
+    return _candles(rng, index, start_price, close, volatility)
+
+
+def make_regime_ohlcv(
+    n: int,
+    seed: int = 0,
+    start_price: float = 50000.0,
+    regimes: Sequence[Tuple[float, float]] = REGIMES,
+    mean_duration: int = 2000,
+    start: str = '2024-01-01',
+    freq: str = '1min',
+) -> pd.DataFrame:
+    """Свечи по геометрическому броуновскому движению с переключением режимов.
+
+    Режим держится в среднем mean_duration свечей, затем выбирается случайный другой.
+    """
+    rng = np.random.default_rng(seed)
+    drift, vol = regime_path(rng, n, regimes, mean_duration)
+    close = start_price * np.exp(np.cumsum(drift - vol ** 2 / 2 + vol * rng.standard_normal(n)))
+    return _candles(rng, pd.date_range(start, periods=n, freq=freq), start_price, close, vol)
+
+
+def make_correlated_pair(
+    n: int,
+    seed: int = 0,
+    correlation: float = 0.8,
+    prices: Tuple[float, float] = (50000.0, 3000.0),
+    vol_ratio: float = 1.3,
+    regimes: Sequence[Tuple[float, float]] = REGIMES,
+    mean_duration: int = 2000,
+    start: str = '2024-01-01',
+    freq: str = '1min',
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Пара BTC/ETH с общими режимами и коррелированными доходностями.
+
+    Волатильность второго инструмента в vol_ratio раз выше, индексы совпадают.
+    """
+    rng = np.random.default_rng(seed)
+    drift, vol = regime_path(rng, n, regimes, mean_duration)
+    z1 = rng.standard_normal(n)
+    z2 = correlation * z1 + np.sqrt(1.0 - correlation ** 2) * rng.standard_normal(n)
+    index = pd.date_range(start, periods=n, freq=freq)
+
+    frames = []
+    for z, price, scale in ((z1, prices[0], 1.0), (z2, prices[1], vol_ratio)):
+        sigma = vol * scale
+        close = price * np.exp(np.cumsum(drift * scale - sigma ** 2 / 2 + sigma * z))
+        frames.append(_candles(rng, index, price, close, sigma))
+    return frames[0], frames[1]
+
+
+def regime_path(
+    rng: np.random.Generator,
+    n: int,
+    regimes: Sequence[Tuple[float, float]] = REGIMES,
+    mean_duration: int = 2000,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Дрейф и волатильность каждой свечи по цепи режимов с геометрическими длительностями"""
+    params = np.asarray(regimes, dtype=np.float64)
+    switches = np.flatnonzero(rng.random(n) < 1.0 / mean_duration)
+    # Новый режим всегда отличается от текущего
+    steps = rng.integers(1, len(params), len(switches) + 1) if len(params) > 1 else np.zeros(len(switches) + 1, int)
+    codes = np.cumsum(steps) % len(params)
+    bars = np.zeros(n, dtype=np.int64)
+    bars[switches] = 1
+    regime = codes[np.cumsum(bars)]
+    return params[regime, 0], params[regime, 1]
+
+
+def _candles(rng, index, start_price, close, volatility) -> pd.DataFrame:
+    n = len(close)
+    open_ = np.empty_like(close)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+    wick = np.abs(rng.normal(0.0, np.asarray(volatility) / 2, (2, n)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = rng.uniform(100.0, 500.0, n)
+    return pd.DataFrame(
+        {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume},
+        index=index,
+    )
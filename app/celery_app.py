@@ -19,6 +19,10 @@ celery_app.conf.beat_schedule = {
         'task': 'tasks.trade_tasks.watcher_update_deals',
         'schedule': 60.0,
     },
+    'prune-backtest-checkpoints-daily': {
+        'task': 'app.tasks.backtest_tasks.prune_backtest_checkpoints',
+        'schedule': 86_400.0,
+    },
 }
 
 
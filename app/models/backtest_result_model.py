@@ -8,6 +8,7 @@ from sqlalchemy import (
     Text,
     Integer,
     JSON,
+    LargeBinary,
     UUID as SQLAUUID
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -32,5 +33,10 @@ class BacktestResultModel(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
     completed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
     results: Mapped[dict] = mapped_column(JSON, nullable=True)
+    # Полная кривая эквити (services.backtest.equity_store); в results — прореженная.
+    # deferred: списки результатов не тянут мегабайты кривых
+    equity_blob: Mapped[bytes] = mapped_column(LargeBinary, nullable=True, deferred=True)
+    # sha256 входных данных прогона (services.backtest.result_cache): одинаковые прогоны берут готовый результат
+    cache_key: Mapped[str] = mapped_column(String(64), nullable=True, index=True)
 
     user: Mapped["User"] = relationship("User")
@@ -3,6 +3,7 @@ from uuid import UUID
 from datetime import datetime
 
 from sqlalchemy import select, desc
+from sqlalchemy.orm import undefer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.backtest_result_model import BacktestResultModel
@@ -41,18 +42,40 @@ class BacktestResultRepository(BaseRepository[BacktestResultModel]):
         self,
         task_id: str,
         status: str,
-        results: Optional[dict] = None
+        results: Optional[dict] = None,
+        equity_blob: Optional[bytes] = None,
+        cache_key: Optional[str] = None
     ) -> Optional[BacktestResultModel]:
         backtest_result = await self.get_by_task_id(task_id)
         if backtest_result:
             backtest_result.status = status
             if results is not None:
                 backtest_result.results = results
-            if status == "completed" or status == "failed":
+            if equity_blob is not None:
+                backtest_result.equity_blob = equity_blob
+            if cache_key is not None:
+                backtest_result.cache_key = cache_key
+            if status in ("completed", "failed", "cancelled"):
                 backtest_result.completed_at = datetime.utcnow()
             await self.session.flush()
         return backtest_result
 
+    async def get_equity_blob(self, task_id: str) -> Optional[bytes]:
+        stmt = select(self.model.equity_blob).where(self.model.task_id == task_id)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_completed_by_cache_key(self, cache_key: str) -> Optional[BacktestResultModel]:
+        stmt = (
+            select(self.model)
+            .options(undefer(self.model.equity_blob))
+            .where(self.model.cache_key == cache_key, self.model.status == "completed")
+            .order_by(desc(self.model.completed_at))
+            .limit(1)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().first()
+
     async def get_all_by_user(self, user_id: UUID) -> List[BacktestResultModel]:
         stmt = select(self.model).where(self.model.user_id == user_id).order_by(desc(self.model.created_at))
         result = await self.session.execute(stmt)
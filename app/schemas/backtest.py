@@ -60,6 +60,97 @@ class BacktestResult(BaseModel):
     equity_curve: List[BacktestEquityPoint]
     parameters: Dict[str, Any]
     leverage: int = 1  # Leverage used in backtest
+    # Extended metrics (Sortino, Calmar, drawdown duration, exposure, turnover, per-symbol breakdown)
+    metrics: Optional[Dict[str, Any]] = None
+    # Number of points in the full curve when equity_curve holds a downsampled copy
+    equity_points: Optional[int] = None
+
+
+class PortfolioBacktestResult(BaseModel):
+    """Several strategies backtested together on one shared balance"""
+    initial_balance: float
+    final_balance: float
+    # Все сделки и общая кривая эквити портфеля
+    combined: BacktestResult
+    # По имени стратегии: её сделки; эквити — начальный баланс плюс PnL только этой стратегии
+    strategies: Dict[str, BacktestResult]
+
+
+class EquityCurveWindow(BaseModel):
+    """Equity curve range downsampled to screen resolution"""
+    total_points: int  # точек полной кривой в запрошенном диапазоне
+    timestamps: List[int]  # epoch ms
+    balances: List[float]
+
+
+class BacktestSweepRow(BaseModel):
+    """Metrics of one parameter combination in a sweep"""
+    rank: int = 0
+    parameters: Dict[str, Any]
+    final_balance: Optional[float] = None
+    total_pnl: Optional[float] = None
+    total_pnl_pct: Optional[float] = None
+    max_drawdown: Optional[float] = None
+    max_drawdown_pct: Optional[float] = None
+    total_trades: Optional[int] = None
+    win_rate: Optional[float] = None
+    profit_factor: Optional[float] = None
+    sharpe_ratio: Optional[float] = None
+    error: Optional[str] = None
+
+
+class BacktestSweepResult(BaseModel):
+    """Parameter sweep result, rows ranked best-first"""
+    strategy_name: str
+    template_id: Optional[int] = None
+    rank_by: str
+    workers: int
+    elapsed_seconds: float
+    rows: List[BacktestSweepRow]
+
+
+class WalkForwardWindow(BaseModel):
+    """One walk-forward window: parameters chosen in-sample, scored out-of-sample"""
+    index: int
+    in_sample_start: datetime
+    in_sample_end: datetime
+    out_of_sample_start: datetime
+    out_of_sample_end: datetime
+    parameters: Optional[Dict[str, Any]] = None
+    in_sample: Optional[BacktestSweepRow] = None
+    out_of_sample: Optional[BacktestSweepRow] = None
+    error: Optional[str] = None
+
+
+class WalkForwardResult(BaseModel):
+    """Walk-forward optimization result"""
+    strategy_name: str
+    template_id: Optional[int] = None
+    rank_by: str
+    workers: int
+    elapsed_seconds: float
+    out_of_sample_pnl: float
+    windows: List[WalkForwardWindow]
+
+
+class MonteCarloBand(BaseModel):
+    """Equity percentile across simulations after each listed trade count"""
+    percentile: float
+    steps: List[int]
+    balances: List[float]
+
+
+class MonteCarloResult(BaseModel):
+    """Distribution of outcomes over resampled trade sequences"""
+    method: str
+    simulations: int
+    trades: int
+    initial_balance: float
+    percentiles: List[float]
+    total_pnl_pct: List[float]  # значение для каждого перцентиля из percentiles
+    max_drawdown_pct: List[float]
+    probability_of_loss: float
+    equity_bands: List[MonteCarloBand]
 
 
 class AvailableStrategy(BaseModel):
@@ -98,8 +98,9 @@ class BacktestService:
         csv_file_path: str,
         initial_balance: float = 10000.0,
         leverage: int = 1,
+        use_cache: bool = True,
     ) -> BacktestResult:
-        df = self.csv_service.load_csv_data(csv_file_path)
+        df = self.csv_service.load_csv_data(csv_file_path, use_cache=use_cache)
         parameters = self._extract_parameters_safely(template)
         return await self._execute_backtest_with_parameters(
             data=df,
@@ -124,7 +125,8 @@ class BacktestService:
             symbol, start_date, end_date, getattr(template, 'interval', '1m') or '1m'
         )
         try:
-            return await self.run_novichok_csv(template, csv_path, initial_balance, leverage)
+            # Временный файл: колоночный кэш для него никогда не пригодится
+            return await self.run_novichok_csv(template, csv_path, initial_balance, leverage, use_cache=False)
         finally:
             self.csv_loader.cleanup_temp_file(csv_path)
 
@@ -135,10 +137,11 @@ class BacktestService:
         csv_eth_path: str,
         initial_balance: float = 10000.0,
         symbol1: str = 'BTCUSDT',
-        symbol2: str = 'ETHUSDT'
+        symbol2: str = 'ETHUSDT',
+        use_cache: bool = True,
     ) -> BacktestResult:
-        df1 = self.csv_service.load_csv_data(csv_btc_path)
-        df2 = self.csv_service.load_csv_data(csv_eth_path)
+        df1 = self.csv_service.load_csv_data(csv_btc_path, use_cache=use_cache)
+        df2 = self.csv_service.load_csv_data(csv_eth_path, use_cache=use_cache)
         df1, df2 = MarketDataUtils.synchronize_two(df1, df2)
         parameters = template.parameters or {}
         return await self._execute_compensation_backtest(
@@ -164,7 +167,7 @@ class BacktestService:
         interval = getattr(template, 'interval', '1m') or '1m'
         p1, p2 = self.csv_loader.download_dual_from_binance(symbol1, symbol2, start_date, end_date, interval)
         try:
-            return await self.run_compensation_csv(template, p1, p2, initial_balance, symbol1, symbol2)
+            return await self.run_compensation_csv(template, p1, p2, initial_balance, symbol1, symbol2, use_cache=False)
         finally:
             self.csv_loader.cleanup_temp_file(p1)
             self.csv_loader.cleanup_temp_file(p2)
@@ -221,7 +224,8 @@ class BacktestService:
         
         try:
             # Загружаем данные
-            df = self.csv_service.load_csv_data(csv_file_path)
+            # Скачанный временный файл не кэшируем: его кэш некому переиспользовать
+            df = self.csv_service.load_csv_data(csv_file_path, use_cache=not should_cleanup)
             
             if df.empty:
                 raise ValueError("Не удалось загрузить данные")
@@ -297,7 +301,8 @@ class BacktestService:
         
         try:
             # Загружаем данные
-            df = self.csv_service.load_csv_data(csv_file_path)
+            # Скачанный временный файл не кэшируем: его кэш некому переиспользовать
+            df = self.csv_service.load_csv_data(csv_file_path, use_cache=not should_cleanup)
             
             if df.empty:
                 raise ValueError("Не удалось загрузить данные")
@@ -372,8 +377,8 @@ class BacktestService:
                 )
                 print(f"  📁 Скачаны файлы: {csv_file_path1}, {csv_file_path2}")
                 
-                df1 = self.csv_service.load_csv_data(csv_file_path1)
-                df2 = self.csv_service.load_csv_data(csv_file_path2)
+                df1 = self.csv_service.load_csv_data(csv_file_path1, use_cache=False)
+                df2 = self.csv_service.load_csv_data(csv_file_path2, use_cache=False)
                 print(f"✅ Данные скачаны и загружены: BTC {len(df1)} свечей, ETH {len(df2)} свечей")
                 
                 # Очищаем временные файлы
@@ -2,6 +2,10 @@ from __future__ import annotations
 
 from typing import Dict, Any, Optional
 
+from utils.hot_log import get_logger
+
+trade_log = get_logger('backtest.trade', max_per_second=50)
+
 
 class BacktestTradeExecutor:
     """Исполнитель торговых решений для бэктеста.
@@ -31,7 +35,7 @@ class BacktestTradeExecutor:
     def can_open_position(self, intent, open_positions: Dict[str, Dict[str, Any]], balance: float) -> bool:
         # Одна позиция на символ
         if intent.symbol in open_positions:
-            print(f"⚠️ Позиция {intent.symbol} уже открыта")
+            trade_log.debug("⚠️ Позиция %s уже открыта", intent.symbol)
             return False
 
         # Требуемый баланс
@@ -43,11 +47,11 @@ class BacktestTradeExecutor:
             required_balance = balance * 0.01
 
         if required_balance > balance:
-            print(f"⚠️ Недостаточно средств: нужно ${required_balance:.2f}, доступно ${balance:.2f}")
+            trade_log.debug("⚠️ Недостаточно средств: нужно $%.2f, доступно $%.2f", required_balance, balance)
             return False
 
         if required_balance < 5:
-            print(f"⚠️ Слишком маленькая позиция: ${required_balance:.2f}")
+            trade_log.debug("⚠️ Слишком маленькая позиция: $%.2f", required_balance)
             return False
 
         return True
@@ -73,7 +77,7 @@ class BacktestTradeExecutor:
                 size_usd = balance * 0.01
 
             if size_usd > balance:
-                print(f"⚠️ Недостаточно средств для сделки: нужно ${size_usd:.2f}, доступно ${balance:.2f}")
+                trade_log.debug("⚠️ Недостаточно средств для сделки: нужно $%.2f, доступно $%.2f", size_usd, balance)
                 return None
 
             quantity = size_usd / effective_price
@@ -94,7 +98,7 @@ class BacktestTradeExecutor:
                 'fee_open': open_fee,
             }
 
-            print(f"📊 Backtest trade: {intent.side} {quantity:.6f} {symbol} @ ${effective_price:.2f}")
+            trade_log.debug("📊 Backtest trade: %s %.6f %s @ $%.2f", intent.side, quantity, symbol, effective_price)
             return trade
         except Exception as e:
             print(f"❌ Ошибка при симуляции сделки: {e}")
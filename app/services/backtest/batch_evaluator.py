@@ -0,0 +1,157 @@
+"""
+Batched evaluation of Novichok parameter combinations on one dataset
+"""
+import contextlib
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from schemas.backtest import BacktestSweepResult, BacktestSweepRow
+from services.backtest.metrics import backtest_metrics
+from services.backtest.parameter_sweep import SWEEP_METRICS, expand_grid, rank_rows, template_with_parameters
+from services.backtest.universal_backtest_engine import BacktestContext, result_statistics
+from services.backtest.vectorized_backtest_engine import (
+    SignalBars,
+    SignalBatch,
+    VectorizedBacktestEngine,
+    crossover_signals,
+    position_sizing,
+    price_impact,
+    signal_equity,
+    simulate_signal_batch,
+)
+from strategies.strategy_factory import make_strategy
+
+
+class BatchSignalEvaluator:
+    """
+    Evaluates a grid of Novichok parameters in a few array passes instead of one backtest each.
+
+    Every distinct EMA span is computed once into a (spans x time) matrix. Signals for
+    all distinct (ema_fast, ema_slow, trend_threshold) combinations are derived from it
+    as (combinations x time) matrices, in chunks of at most MAX_CELLS values, and all
+    grid points of a chunk are simulated together by simulate_signal_batch, the same
+    code VectorizedBacktestEngine runs. Trades and balances are identical to the
+    engine, and rows carry the same units as BacktestResult (percents, drawdown from
+    the peak), like ParameterSweepRunner rows.
+    """
+
+    MAX_CELLS = 4_000_000
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        template: Any,
+        initial_balance: float = 10000.0,
+        config: Dict[str, Any] = None,
+        leverage: int = 1,
+    ):
+        self.df = df
+        self.template = template
+        self.initial_balance = initial_balance
+        self.config = config or {}
+        self.leverage = leverage
+        self.symbol = getattr(template, 'symbol', None) or 'BTCUSDT'
+
+    def ema_matrix(self, spans: List[int]) -> np.ndarray:
+        """EMA of close for every span, one row per span"""
+        close = self.df['close']
+        emas = np.empty((len(spans), len(close)))
+        for row, span in enumerate(spans):
+            emas[row] = close.ewm(span=span).mean().to_numpy()
+        return emas
+
+    def evaluate(self, grid: Dict[str, Iterable[Any]], rank_by: str = 'total_pnl') -> BacktestSweepResult:
+        if rank_by not in SWEEP_METRICS:
+            raise ValueError(f"rank_by must be one of {SWEEP_METRICS}")
+
+        started = time.perf_counter()
+        candidates = expand_grid(grid)
+        templates = [template_with_parameters(self.template, parameters) for parameters in candidates]
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            strategies = [make_strategy('novichok', template) for template in templates]
+
+        context = BacktestContext(
+            strategy=strategies[0],
+            template=templates[0],
+            initial_balance=self.initial_balance,
+            market_data={self.symbol: self.df},
+            config=dict(self.config),
+            leverage=self.leverage,
+        )
+        if not VectorizedBacktestEngine.supports(context):
+            raise ValueError("Batch evaluation supports only Novichok templates on a single timeline")
+
+        by_signal: Dict[tuple, List[int]] = defaultdict(list)
+        for i, strategy in enumerate(strategies):
+            legacy = strategy.legacy
+            by_signal[(legacy.ema_fast, legacy.ema_slow, legacy.trend_threshold)].append(i)
+        keys = list(by_signal)
+
+        spans = sorted({key[0] for key in keys} | {key[1] for key in keys})
+        emas = self.ema_matrix(spans)
+        span_row = {span: row for row, span in enumerate(spans)}
+        print(f"🧮 Batch evaluation: {len(candidates)} candidates, {len(keys)} signal sets, {len(spans)} EMA spans")
+
+        bars = SignalBars.from_frame(self.df)
+        times = self.df.index.as_unit('ns').asi8
+        times_ns = np.concatenate([times[:1], times])
+
+        rows: List[Optional[BacktestSweepRow]] = [None] * len(candidates)
+        chunk = max(1, self.MAX_CELLS // max(len(self.df), 1))
+        for start in range(0, len(keys), chunk):
+            part = keys[start:start + chunk]
+            fast = emas[[span_row[key[0]] for key in part]]
+            slow = emas[[span_row[key[1]] for key in part]]
+            thresholds = np.array([[key[2]] for key in part])
+            warmup = np.array([[max(key[1] - 1, 0)] for key in part])
+            signals = crossover_signals(fast, slow, thresholds, warmup)
+
+            points = [i for key in part for i in by_signal[key]]
+            signal_rows = [row for row, key in enumerate(part) for _ in by_signal[key]]
+            sizing = [position_sizing(templates[i], strategies[i].legacy) for i in points]
+            batch = simulate_signal_batch(
+                bars, signals, signal_rows,
+                stop_loss_pct=[strategies[i].legacy.stop_loss_pct for i in points],
+                take_profit_pct=[strategies[i].legacy.take_profit_pct for i in points],
+                risk_pct=[risk_pct for risk_pct, _ in sizing],
+                leverage=[leverage for _, leverage in sizing],
+                initial_balance=self.initial_balance,
+                fee_rate=context.fee_rate,
+                impact=price_impact(context),
+                intrabar_mode=context.intrabar_mode,
+            )
+            for column, (i, (_, leverage)) in enumerate(zip(points, sizing)):
+                rows[i] = self._row(candidates[i], batch, column, leverage, bars, times_ns)
+
+        return BacktestSweepResult(
+            strategy_name='novichok',
+            template_id=getattr(self.template, 'id', None),
+            rank_by=rank_by,
+            workers=1,
+            elapsed_seconds=time.perf_counter() - started,
+            rows=rank_rows(rows, rank_by),
+        )
+
+    def _row(self, parameters: Dict[str, Any], batch: SignalBatch, column: int, leverage: float,
+             bars: SignalBars, times_ns: np.ndarray) -> BacktestSweepRow:
+        """Sweep row of one grid point from its trades, with the statistics of BacktestResult"""
+        trades = batch.trades_of(column)
+        equity = signal_equity(
+            bars.close, self.initial_balance, batch.entry_bar[trades], batch.exit_bar[trades],
+            batch.balance_open[trades], batch.balance_close[trades], batch.entry_price[trades],
+            batch.quantity[trades], batch.is_long[trades], leverage,
+        )
+        balances = np.concatenate([[float(self.initial_balance)], equity])
+        final_balance = float(batch.final_balance[column])
+        metrics = backtest_metrics(balances, times_ns, trade_pnl=batch.pnl[trades])
+        stats = result_statistics(metrics, self.initial_balance, final_balance)
+        return BacktestSweepRow(
+            parameters=parameters,
+            final_balance=final_balance,
+            **{name: stats[name] for name in SWEEP_METRICS if name in stats},
+        )
@@ -0,0 +1,292 @@
+"""
+Persistent local OHLCV store for backtests, keyed by (symbol, interval)
+"""
+import contextlib
+import fcntl
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Protocol, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from services.backtest.kline_downloader import INTERVAL_MS, AsyncKlineDownloader
+
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Базовый интервал: старшие таймфреймы собираются из него, а не скачиваются отдельно
+BASE_INTERVAL = '1m'
+# Недельные свечи Binance открываются в понедельник, эпоха — четверг
+INTERVAL_OFFSET_MS = {'1w': 4 * 86_400_000}
+
+# Версия данных хранилища: повышать при перестройке или исправлении сохранённых свечей
+DATA_VERSION = 1
+
+DEFAULT_ROOT = Path(__file__).resolve().parents[3] / 'data' / 'candles'
+ENV_ROOT = 'CANDLE_STORE_DIR'
+
+Range = Tuple[int, int]
+TimeLike = Union[str, pd.Timestamp]
+
+
+class KlineFetcher(Protocol):
+    def __call__(self, symbol: str, interval: str, start_ms: int, end_ms: int) -> np.ndarray:
+        """Candles with open time in [start_ms, end_ms] as an (n, 6) array: open time ms, O, H, L, C, V"""
+        ...
+
+
+class CandleStore:
+    """
+    Candles on disk, one directory per (symbol, interval).
+
+    Each column is a separate .npy file (timestamp as int64 ns, prices and volume
+    as float64), so reads are memory-mapped and a slice costs two binary searches.
+    meta.json keeps the fetched ranges: load() asks the fetcher only for the parts
+    of the requested range that were never fetched, including ranges that had no
+    candles. Ranges that are not closed yet are not recorded and are fetched again.
+
+    Higher intervals are derived from 1m candles (derive=True): only the 1m base is
+    downloaded, and 5m/1h/1d/... bars are resampled from it and cached under
+    <base>/derived/<interval>. Each base write bumps a generation number, and a derived
+    cache built from an older generation is rebuilt on the next load. Only bars whose
+    whole span lies inside the fetched base ranges are emitted, so a partial hour at
+    the edge of the data never looks like a complete one. Derived frames are indexed
+    by open time: a 1m strategy using 1h context must only look at bars that have
+    closed (open time + 1h <= current time).
+
+    Writers hold an exclusive flock on the directory and replace files atomically;
+    readers take a shared lock only while mapping, existing maps stay valid.
+    """
+
+    def __init__(self, root: Union[str, Path, None] = None, fetcher: Optional[KlineFetcher] = None,
+                 derive: bool = True):
+        self.root = Path(root or os.environ.get(ENV_ROOT) or DEFAULT_ROOT)
+        self.fetcher = fetcher or AsyncKlineDownloader()
+        self.derive = derive
+
+    def load(self, symbol: str, interval: str, start: TimeLike, end: TimeLike) -> pd.DataFrame:
+        """
+        Candles with open time in [start, end), fetching missing ranges first.
+
+        The frame is backed by read-only memory maps; copy it before modifying values.
+        """
+        start_ms, end_ms = _to_ms(start), _to_ms(end) - 1
+        if start_ms > end_ms:
+            raise ValueError("start must be earlier than end")
+        if not self._derived(interval):
+            self.ensure(symbol, interval, start_ms, end_ms)
+            return self.read(symbol, interval, start_ms, end_ms)
+
+        # Базовые свечи нужны до конца последнего бара, открытого в диапазоне
+        step, offset = _interval_ms(interval), INTERVAL_OFFSET_MS.get(interval, 0)
+        first_bar = -((offset - start_ms) // step) * step + offset
+        last_bar = (end_ms - offset) // step * step + offset
+        if first_bar <= last_bar:
+            self.ensure(symbol, BASE_INTERVAL, first_bar, last_bar + step - 1)
+        return self._read(self._derive(symbol, interval), start_ms, end_ms)
+
+    def ensure(self, symbol: str, interval: str, start_ms: int, end_ms: int) -> List[Range]:
+        """Fetches and stores the missing parts of [start_ms, end_ms]; returns the fetched ranges"""
+        step = _interval_ms(interval)
+        path = self._path(symbol, interval)
+        path.mkdir(parents=True, exist_ok=True)
+        with _locked(path, fcntl.LOCK_EX):
+            coverage = self._coverage(path)
+            missing = missing_ranges(coverage, start_ms, end_ms)
+            if not missing:
+                return []
+            # Незакрытая свеча ещё меняется — такой диапазон не считаем скачанным
+            closed_until = int(time.time() * 1000) // step * step - 1
+            fetched = []
+            for first, last in missing:
+                rows = np.asarray(self.fetcher(symbol, interval, first, last), dtype=np.float64).reshape(-1, 6)
+                fetched.append(rows[(rows[:, 0] >= first) & (rows[:, 0] <= last)])
+                if first <= closed_until:
+                    coverage.append((first, min(last, closed_until)))
+            self._write(path, fetched)
+            generation = self._meta(path).get('generation', 0) + 1
+            self._write_meta(path, symbol=symbol.upper(), interval=interval,
+                             coverage=[list(r) for r in merge_ranges(coverage)], generation=generation)
+            print(f"📥 Candle store {symbol} {interval}: fetched {sum(len(r) for r in fetched)} candles "
+                  f"in {len(missing)} missing range(s)")
+            return missing
+
+    def read(self, symbol: str, interval: str, start_ms: int, end_ms: int) -> pd.DataFrame:
+        """Stored candles with open time in [start_ms, end_ms], without fetching"""
+        path = self._path(symbol, interval)
+        if self._derived(interval):
+            path = self._path(symbol, BASE_INTERVAL) / 'derived' / interval
+        return self._read(path, start_ms, end_ms)
+
+    def _read(self, path: Path, start_ms: int, end_ms: int) -> pd.DataFrame:
+        with _locked(path, fcntl.LOCK_SH):
+            columns = self._columns(path)
+        timestamps = columns.pop('timestamp')
+        first = np.searchsorted(timestamps, start_ms * 1_000_000, side='left')
+        last = np.searchsorted(timestamps, end_ms * 1_000_000, side='right')
+        index = pd.DatetimeIndex(timestamps[first:last].view('M8[ns]'), name='timestamp')
+        return pd.DataFrame({name: columns[name][first:last] for name in COLUMNS}, index=index, copy=False)
+
+    def coverage(self, symbol: str, interval: str) -> List[Range]:
+        return self._coverage(self._path(symbol, interval))
+
+    def _derived(self, interval: str) -> bool:
+        return self.derive and interval != BASE_INTERVAL and _interval_ms(interval) % INTERVAL_MS[BASE_INTERVAL] == 0
+
+    def _derive(self, symbol: str, interval: str) -> Path:
+        """Cache of interval bars resampled from the base; rebuilt when the base generation changed"""
+        base = self._path(symbol, BASE_INTERVAL)
+        path = base / 'derived' / interval
+        path.mkdir(parents=True, exist_ok=True)
+        with _locked(path, fcntl.LOCK_EX):
+            with _locked(base, fcntl.LOCK_SH):
+                base_meta = self._meta(base)
+                columns = self._columns(base)
+            generation = base_meta.get('generation', 0)
+            if self._meta(path).get('base_generation') == generation and (path / 'timestamp.npy').exists():
+                return path
+
+            derived = resample_ohlcv(columns, _interval_ms(interval), INTERVAL_OFFSET_MS.get(interval, 0),
+                                     [tuple(r) for r in base_meta.get('coverage', [])])
+            for name, values in derived.items():
+                _save_atomic(path / f'{name}.npy', values)
+            self._write_meta(path, symbol=symbol.upper(), interval=interval,
+                             derived_from=BASE_INTERVAL, base_generation=generation)
+        return path
+
+    def _path(self, symbol: str, interval: str) -> Path:
+        _interval_ms(interval)
+        return self.root / symbol.upper() / interval
+
+    def _meta(self, path: Path) -> dict:
+        meta = path / 'meta.json'
+        return json.loads(meta.read_text()) if meta.exists() else {}
+
+    def _coverage(self, path: Path) -> List[Range]:
+        return [tuple(r) for r in self._meta(path).get('coverage', [])]
+
+    def _columns(self, path: Path) -> Dict[str, np.ndarray]:
+        if not (path / 'timestamp.npy').exists():
+            empty = {name: np.empty(0) for name in COLUMNS}
+            return {'timestamp': np.empty(0, dtype=np.int64), **empty}
+        return {name: np.load(path / f'{name}.npy', mmap_mode='r') for name in ('timestamp',) + COLUMNS}
+
+    def _write(self, path: Path, fetched: List[np.ndarray]) -> None:
+        new = np.concatenate(fetched) if fetched else np.empty((0, 6))
+        if not len(new):
+            return
+        stored = self._columns(path)
+        timestamps = np.concatenate([stored['timestamp'], new[:, 0].astype(np.int64) * 1_000_000])
+        # Стабильная сортировка: при повторе времени остаётся последняя (свежая) свеча
+        order = np.argsort(timestamps, kind='stable')
+        timestamps = timestamps[order]
+        keep = np.ones(len(timestamps), dtype=bool)
+        keep[:-1] = timestamps[1:] != timestamps[:-1]
+
+        arrays = {'timestamp': timestamps[keep]}
+        for i, name in enumerate(COLUMNS, start=1):
+            arrays[name] = np.concatenate([stored[name], new[:, i]])[order][keep]
+        for name, values in arrays.items():
+            _save_atomic(path / f'{name}.npy', values)
+
+    def _write_meta(self, path: Path, **meta) -> None:
+        tmp = path / 'meta.json.tmp'
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, path / 'meta.json')
+
+
+def resample_ohlcv(columns: Dict[str, np.ndarray], step_ms: int, offset_ms: int = 0,
+                   coverage: Optional[List[Range]] = None) -> Dict[str, np.ndarray]:
+    """
+    Aggregates sorted candles into step_ms bars starting at offset_ms + k * step_ms.
+
+    One pass of reduceat over bar boundaries: first open, max high, min low, last close,
+    summed volume. With coverage (inclusive ms ranges) bars not fully inside one range
+    are dropped.
+    """
+    timestamps = np.asarray(columns['timestamp'])
+    if not len(timestamps):
+        return {'timestamp': timestamps[:0].copy(), **{name: np.empty(0) for name in COLUMNS}}
+    step_ns, offset_ns = step_ms * 1_000_000, offset_ms * 1_000_000
+    keys = (timestamps - offset_ns) // step_ns * step_ns + offset_ns
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.append(starts[1:], len(keys)) - 1
+
+    bars = {
+        'timestamp': keys[starts],
+        'open': np.asarray(columns['open'])[starts],
+        'high': np.maximum.reduceat(columns['high'], starts),
+        'low': np.minimum.reduceat(columns['low'], starts),
+        'close': np.asarray(columns['close'])[ends],
+        'volume': np.add.reduceat(columns['volume'], starts),
+    }
+    if coverage is not None:
+        first_ms = bars['timestamp'] // 1_000_000
+        ranges = np.array(merge_ranges(coverage) or [(0, -1)], dtype=np.int64)
+        # Диапазон, начинающийся не позже бара, должен покрывать бар до конца
+        idx = np.searchsorted(ranges[:, 0], first_ms, side='right') - 1
+        complete = (idx >= 0) & (ranges[np.maximum(idx, 0), 1] >= first_ms + step_ms - 1)
+        bars = {name: values[complete] for name, values in bars.items()}
+    return bars
+
+
+def merge_ranges(ranges: List[Range]) -> List[Range]:
+    """Sorted union of inclusive ranges; adjacent ranges are joined"""
+    merged: List[Range] = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def missing_ranges(coverage: List[Range], start: int, end: int) -> List[Range]:
+    """Parts of the inclusive range [start, end] not covered by coverage"""
+    missing = []
+    cursor = start
+    for first, last in merge_ranges(coverage):
+        if last < cursor:
+            continue
+        if first > end:
+            break
+        if first > cursor:
+            missing.append((cursor, first - 1))
+        cursor = last + 1
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
+
+
+def _interval_ms(interval: str) -> int:
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return INTERVAL_MS[interval]
+
+
+def _to_ms(value: TimeLike) -> int:
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return timestamp.value // 1_000_000
+
+
+def _save_atomic(target: Path, values: np.ndarray) -> None:
+    tmp = target.with_suffix('.tmp.npy')
+    np.save(tmp, values)
+    os.replace(tmp, target)
+
+
+@contextlib.contextmanager
+def _locked(path: Path, mode: int):
+    if not path.exists():
+        yield
+        return
+    with open(path / '.lock', 'a') as handle:
+        fcntl.flock(handle, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
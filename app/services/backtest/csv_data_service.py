@@ -5,6 +5,8 @@ import os
 from typing import Optional
 from datetime import datetime, timedelta
 
+from services.backtest.csv_ingest import read_ohlcv_csv
+
 
 class CSVDataService:
     """Сервис для работы с CSV данными"""
@@ -73,33 +75,15 @@ class CSVDataService:
         return file1, file2
     
     @staticmethod
-    def load_csv_data(file_path: str) -> pd.DataFrame:
-        """Загружает и подготавливает CSV данные"""
+    def load_csv_data(file_path: str, dtype: str = 'float64', use_cache: bool = True) -> pd.DataFrame:
+        """
+        Загружает и подготавливает CSV данные.
+
+        Повторная загрузка того же файла читает бинарный кэш (memory map, только чтение);
+        dtype='float32' вдвое уменьшает память под длинные истории.
+        """
         try:
-            df = pd.read_csv(file_path)
-            
-            # Конвертируем timestamp
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df.set_index('timestamp', inplace=True)
-            
-            # Проверяем наличие необходимых колонок
-            required_cols = ['open', 'high', 'low', 'close', 'volume']
-            missing_cols = [col for col in required_cols if col not in df.columns]
-            
-            if missing_cols:
-                raise ValueError(f"Отсутствуют колонки: {missing_cols}")
-            
-            # Конвертируем числовые колонки в float
-            numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-            for col in numeric_cols:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            # Удаляем строки с NaN значениями
-            df = df.dropna()
-            
-            return df.sort_index()
-            
+            return read_ohlcv_csv(file_path, dtype=dtype, use_cache=use_cache)
         except Exception as e:
             raise ValueError(f"Ошибка загрузки CSV: {e}")
     
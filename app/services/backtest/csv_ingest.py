@@ -0,0 +1,144 @@
+"""
+Typed OHLCV CSV ingestion with a memory-mapped binary sidecar cache
+"""
+import contextlib
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+DTYPES = ('float64', 'float32')
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[3] / 'data' / 'csv_cache'
+ENV_CACHE_DIR = 'CSV_CACHE_DIR'
+# Формат кэша; увеличить при изменении раскладки файлов
+CACHE_VERSION = 1
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+def read_ohlcv_csv(
+    file_path: Union[str, Path],
+    dtype: str = 'float64',
+    engine: Optional[str] = None,
+    cache_dir: Union[str, Path, None] = None,
+    use_cache: bool = True,
+) -> pd.DataFrame:
+    """
+    Reads a timestamp,open,high,low,close,volume CSV (timestamp in ms) into a sorted frame.
+
+    The first read parses with explicit dtypes (pyarrow engine when installed, or when
+    engine='pyarrow') and stores the columns as .npy files under cache_dir keyed by the
+    file's content hash and dtype. Later reads of the same content are memory maps:
+    the frame is read-only, copy it before modifying values. The hash is remembered
+    per path, size and mtime, so an unchanged file is not read again.
+
+    Rows with unparsable or missing values are dropped, as in the old
+    pd.to_numeric(errors='coerce') + dropna path. Other columns are not loaded.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}")
+    file_path = Path(file_path)
+    if not use_cache:
+        return _frame(_parse(file_path, dtype, engine))
+
+    root = Path(cache_dir or os.environ.get(ENV_CACHE_DIR) or DEFAULT_CACHE_DIR)
+    target = root / f"{_known_digest(file_path, root)}-v{CACHE_VERSION}-{dtype}"
+    if not (target / 'timestamp.npy').exists():
+        _store(target, _parse(file_path, dtype, engine))
+    return _frame({
+        name: np.load(target / f'{name}.npy', mmap_mode='r') for name in ('timestamp',) + COLUMNS
+    })
+
+
+def file_digest(file_path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _known_digest(file_path: Path, root: Path) -> str:
+    """Хэш содержимого; пока размер и mtime файла не менялись, берётся из памятки без чтения файла"""
+    stat = file_path.stat()
+    key = hashlib.blake2b(str(file_path.resolve()).encode(), digest_size=16).hexdigest()
+    memo = root / 'digests' / f"{key}.json"
+    with contextlib.suppress(OSError, ValueError, KeyError):
+        known = json.loads(memo.read_text())
+        if known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            return known['digest']
+
+    digest = file_digest(file_path)
+    memo.parent.mkdir(parents=True, exist_ok=True)
+    tmp = memo.with_name(f"{memo.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest}))
+    os.replace(tmp, memo)
+    return digest
+
+
+def _parse(file_path: Path, dtype: str, engine: Optional[str]) -> Dict[str, np.ndarray]:
+    header = pd.read_csv(file_path, nrows=0).columns
+    missing = [col for col in COLUMNS if col not in header]
+    if missing:
+        raise ValueError(f"Отсутствуют колонки: {missing}")
+    if 'timestamp' not in header:
+        raise ValueError("Отсутствует колонка timestamp")
+
+    engine = engine or ('pyarrow' if PYARROW_AVAILABLE else 'c')
+    usecols = ['timestamp', *COLUMNS]
+    try:
+        df = pd.read_csv(file_path, usecols=usecols, engine=engine,
+                         dtype={'timestamp': 'int64', **{col: dtype for col in COLUMNS}})
+        columns = {col: df[col].to_numpy() for col in usecols}
+    except (ValueError, TypeError):
+        # Пустые или нечисловые значения — медленный путь с приведением к NaN
+        df = pd.read_csv(file_path, usecols=usecols, dtype=str, keep_default_na=False)
+        columns = {col: pd.to_numeric(df[col], errors='coerce').to_numpy(np.float64) for col in usecols}
+
+    valid = np.ones(len(columns['timestamp']), dtype=bool)
+    for values in columns.values():
+        if values.dtype.kind == 'f':
+            valid &= ~np.isnan(values)
+    timestamps = columns['timestamp'][valid].astype(np.int64) * 1_000_000
+    order = None if _is_sorted(timestamps) else np.argsort(timestamps, kind='stable')
+
+    parsed = {'timestamp': timestamps if order is None else timestamps[order]}
+    for col in COLUMNS:
+        values = columns[col][valid].astype(dtype, copy=False)
+        parsed[col] = values if order is None else values[order]
+    return parsed
+
+
+def _store(target: Path, columns: Dict[str, np.ndarray]) -> None:
+    """Пишет столбцы во временный каталог и атомарно переименовывает его в target"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    tmp.mkdir(exist_ok=True)
+    for name, values in columns.items():
+        np.save(tmp / f'{name}.npy', values)
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Другой процесс успел записать тот же кэш
+        for path in tmp.iterdir():
+            path.unlink()
+        tmp.rmdir()
+
+
+def _frame(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    index = pd.DatetimeIndex(np.asarray(columns['timestamp']).view('M8[ns]'), name='timestamp')
+    return pd.DataFrame({name: columns[name] for name in COLUMNS}, index=index, copy=False)
+
+
+def _is_sorted(values: np.ndarray) -> bool:
+    return bool(len(values) < 2 or (values[1:] >= values[:-1]).all())
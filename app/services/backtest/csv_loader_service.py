@@ -1,17 +1,22 @@
+import numpy as np
 import pandas as pd
-import requests
 import tempfile
 import os
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from services.backtest.csv_ingest import read_ohlcv_csv
+
+from services.backtest.kline_downloader import AsyncKlineDownloader, run_blocking
+
 
 class CSVLoaderService:
     """Сервис для загрузки и управления CSV данными для бектеста"""
     
-    def __init__(self):
+    def __init__(self, downloader: Optional[AsyncKlineDownloader] = None):
         self.temp_files: List[str] = []
+        self.downloader = downloader or AsyncKlineDownloader()
     
     def download_from_binance(
         self, 
@@ -39,80 +44,17 @@ class CSVLoaderService:
         if start_dt > end_dt:
             raise ValueError("Дата начала должна быть раньше даты окончания")
         
-        # Binance API для исторических данных
-        base_url = "https://api.binance.com/api/v3/klines"
-        
-        # Создаем временный файл
-        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False)
-        temp_file.write("timestamp,open,high,low,close,volume\n")
-        
         # Диапазон времени в миллисекундах: включительно по дате окончания (до конца дня)
         start_ms = int(start_dt.timestamp() * 1000)
         end_ms_inclusive = int((end_dt + timedelta(days=1)).timestamp() * 1000) - 1
 
-        cursor_ms = start_ms
-        total_candles = 0
-        
         print(f"📥 Скачивание данных для {symbol} с {start_date} по {end_date}")
-        
-        # Пагинация запросов по 1000 свечей
-        day_candle_counter = 0
-        current_day = datetime.fromtimestamp(cursor_ms / 1000.0).date()
         try:
-            while cursor_ms <= end_ms_inclusive:
-                params = {
-                    'symbol': symbol.upper(),
-                    'interval': interval,
-                    'startTime': cursor_ms,
-                    'endTime': end_ms_inclusive,
-                    'limit': 1000,
-                }
-                response = requests.get(base_url, params=params, timeout=30)
-                response.raise_for_status()
-                data = response.json()
-                if not isinstance(data, list):
-                    raise ValueError(f"Unexpected response: {data}")
-
-                if not data:
-                    # Нет данных — выходим
-                    break
-
-                for candle in data:
-                    ts = int(candle[0])
-                    open_price = float(candle[1])
-                    high_price = float(candle[2])
-                    low_price = float(candle[3])
-                    close_price = float(candle[4])
-                    volume = float(candle[5])
-
-                    # Записываем только в пределах диапазона
-                    if ts < start_ms or ts > end_ms_inclusive:
-                        continue
-                    temp_file.write(f"{ts},{open_price},{high_price},{low_price},{close_price},{volume}\n")
-                    total_candles += 1
-                    day = datetime.fromtimestamp(ts / 1000.0).date()
-                    if day != current_day:
-                        # Выводим счетчик за предыдущий день
-                        print(f"  ✅ {current_day.isoformat()}: {day_candle_counter} свечей")
-                        current_day = day
-                        day_candle_counter = 0
-                    day_candle_counter += 1
-
-                # Следующий курсор — следующий миллисекунд после последней свечи
-                last_ts = int(data[-1][0])
-                if last_ts == cursor_ms:
-                    # Предохранитель от зацикливания
-                    cursor_ms += 1
-                else:
-                    cursor_ms = last_ts + 1
+            rows = self.downloader(symbol, interval, start_ms, end_ms_inclusive)
         except Exception as e:
             print(f"  ❌ Ошибка при скачивании данных: {e}")
-        
-        temp_file.close()
-        self.temp_files.append(temp_file.name)
-        
-        print(f"✅ Всего скачано {total_candles} свечей в файл: {temp_file.name}")
-        return temp_file.name
+            rows = np.empty((0, 6))
+        return self._write_csv(rows)
 
     def download_dual_from_binance(
         self,
@@ -122,46 +64,48 @@ class CSVLoaderService:
         end_date: str,
         interval: str = "1m"
     ) -> tuple[str, str]:
-        """Скачивает данные для двух символов и возвращает пути к файлам."""
-        file1 = self.download_from_binance(symbol1, start_date, end_date, interval)
-        file2 = self.download_from_binance(symbol2, start_date, end_date, interval)
-        return file1, file2
+        """Скачивает данные для двух символов параллельно и возвращает пути к файлам."""
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+        if start_dt > end_dt:
+            raise ValueError("Дата начала должна быть раньше даты окончания")
+
+        start_ms = int(start_dt.timestamp() * 1000)
+        end_ms_inclusive = int((end_dt + timedelta(days=1)).timestamp() * 1000) - 1
+
+        print(f"📥 Скачивание данных для {symbol1} и {symbol2} с {start_date} по {end_date}")
+        rows = run_blocking(self.downloader.fetch_many([
+            (symbol1, interval, start_ms, end_ms_inclusive),
+            (symbol2, interval, start_ms, end_ms_inclusive),
+        ]))
+        return self._write_csv(rows[symbol1]), self._write_csv(rows[symbol2])
+
+    def _write_csv(self, rows: np.ndarray) -> str:
+        """Пишет свечи во временный CSV и запоминает его для очистки"""
+        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False)
+        temp_file.write("timestamp,open,high,low,close,volume\n")
+        for ts, open_price, high_price, low_price, close_price, volume in rows.tolist():
+            temp_file.write(f"{int(ts)},{open_price},{high_price},{low_price},{close_price},{volume}\n")
+        temp_file.close()
+        self.temp_files.append(temp_file.name)
+
+        print(f"✅ Всего скачано {len(rows)} свечей в файл: {temp_file.name}")
+        return temp_file.name
     
-    def load_csv_data(self, file_path: str) -> pd.DataFrame:
+    def load_csv_data(self, file_path: str, dtype: str = 'float64', use_cache: bool = True) -> pd.DataFrame:
         """
         Загружает и подготавливает CSV данные для бектеста
         
         Args:
             file_path: Путь к CSV файлу
+            dtype: 'float64' или 'float32' (вдвое меньше памяти для длинных 1m историй)
+            use_cache: Читать повторные загрузки из бинарного кэша (memory map, только чтение)
             
         Returns:
             pd.DataFrame: Подготовленные данные
         """
         try:
-            df = pd.read_csv(file_path)
-            
-            # Конвертируем timestamp
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df.set_index('timestamp', inplace=True)
-            
-            # Проверяем наличие необходимых колонок
-            required_cols = ['open', 'high', 'low', 'close', 'volume']
-            missing_cols = [col for col in required_cols if col not in df.columns]
-            
-            if missing_cols:
-                raise ValueError(f"Отсутствуют колонки: {missing_cols}")
-            
-            # Конвертируем числовые колонки в float
-            numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-            for col in numeric_cols:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            # Удаляем строки с NaN значениями
-            df = df.dropna()
-            
-            # Сортируем по времени
-            df = df.sort_index()
+            df = read_ohlcv_csv(file_path, dtype=dtype, use_cache=use_cache)
             
             # Проверяем, что данные не пустые
             if df.empty:
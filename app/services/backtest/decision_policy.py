@@ -49,32 +49,15 @@ def should_analyze_compensation_entry(open_positions: Dict, md: Dict, btc_symbol
 
 
 def build_open_state(open_positions: Dict) -> Dict:
-    """Создает open_state совместимый с тем что ожидают стратегии"""
-    from types import SimpleNamespace
-    
+    """Создает open_state в том же виде, что и UniversalBacktestEngine: адаптеры читают open_state[symbol]['position']"""
     open_state = {}
     for symbol, position in open_positions.items():
-        # Создаем объект с атрибутами как у реальной сделки
-        deal_obj = SimpleNamespace(
-            id=position.get('deal_id'),
-            symbol=symbol,
-            entry_price=position.get('entry_price'),
-            opened_at=position.get('entry_time'),
-            side=position.get('side'),
-            size=position.get('size'),
-            leverage=position.get('leverage', 1),
-            stop_loss=position.get('stop_loss'),
-            take_profit=position.get('take_profit'),
-            # Дополнительные поля для совместимости с реальными сделками
-            position=position,
-            # Добавляем поля которые может ожидать стратегия
-            entry_size_usd=position.get('entry_size_usd'),
-            max_price=position.get('max_price'),
-            min_price=position.get('min_price'),
-            trailing_stop=position.get('trailing_stop'),
-        )
-        open_state[symbol] = deal_obj
-    
-    return open_state
-
+        open_state[symbol] = {
+            'deal_id': position.get('deal_id'),
+            'entry_price': position.get('entry_price'),
+            'entry_time': position.get('entry_time'),
+            'side': position.get('side'),
+            'position': position,
+        }
 
+    return open_state
@@ -0,0 +1,140 @@
+"""
+Compact storage and display downsampling of backtest equity curves
+"""
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Точек кривой в JSON результата (страница результатов рисует их без догрузки)
+DISPLAY_POINTS = 2000
+
+_MAGIC = b'EQC1'
+_HEADER = struct.Struct('<4sQ')
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling; returns indices of kept points.
+
+    The first and last points are always kept. The points between them are split
+    into threshold - 2 buckets and each bucket keeps the point forming the largest
+    triangle with the previously kept point and the average of the next bucket,
+    which preserves peaks and drawdowns that plain striding would drop.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Границы корзин по внутренним точкам [1, n - 1)
+    edges = (1 + np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64)
+    edges[-1] = n - 1
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_lo, next_hi = hi, edges[bucket + 2]
+        else:
+            next_lo, next_hi = n - 1, n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        # Удвоенная площадь треугольника (a, точка, среднее следующей корзины)
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        kept[bucket + 1] = a
+    return kept
+
+
+def encode_equity_curve(times_ns: np.ndarray, balances: np.ndarray) -> bytes:
+    """
+    Full-resolution curve as a compressed blob.
+
+    Timestamps are stored as deltas (constant for a regular timeline) and balances
+    XOR-ed with the previous value (zero while no position is open); both are
+    byte-shuffled before zlib, so long flat stretches cost almost nothing.
+    """
+    times_ns = np.asarray(times_ns, dtype=np.int64)
+    balances = np.asarray(balances, dtype=np.float64)
+    if len(times_ns) != len(balances):
+        raise ValueError("times_ns and balances must have the same length")
+
+    deltas = np.diff(times_ns, prepend=np.int64(0))
+    bits = balances.view(np.uint64)
+    xored = bits ^ np.concatenate(([np.uint64(0)], bits[:-1]))
+    payload = _shuffle(deltas.view(np.uint64)) + _shuffle(xored)
+    return _HEADER.pack(_MAGIC, len(balances)) + zlib.compress(payload, 6)
+
+
+def decode_equity_curve(blob: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Обратно к (times_ns, balances)"""
+    magic, n = _HEADER.unpack_from(blob)
+    if magic != _MAGIC:
+        raise ValueError("Not an equity curve blob")
+    payload = np.frombuffer(zlib.decompress(blob[_HEADER.size:]), dtype=np.uint8)
+    deltas = _unshuffle(payload[:n * 8], n)
+    xored = _unshuffle(payload[n * 8:], n)
+    times_ns = np.cumsum(deltas.view(np.int64))
+    balances = np.bitwise_xor.accumulate(xored).view(np.float64) if n else np.empty(0)
+    return times_ns, balances
+
+
+def equity_arrays(equity_curve: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Кривая из BacktestEquityPoint или словарей (как в JSON результата) в массивы"""
+    if not equity_curve:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    if isinstance(equity_curve[0], dict):
+        times = [p['timestamp'] for p in equity_curve]
+        balances = [p['balance'] for p in equity_curve]
+    else:
+        times = [p.timestamp for p in equity_curve]
+        balances = [p.balance for p in equity_curve]
+    index = pd.DatetimeIndex(times)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    return index.as_unit('ns').asi8, np.asarray(balances, dtype=np.float64)
+
+
+def downsample(times_ns: np.ndarray, balances: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """LTTB до points точек (время — по оси x)"""
+    if not len(times_ns):
+        return times_ns, balances
+    kept = lttb(times_ns - times_ns[0], balances, points)
+    return times_ns[kept], balances[kept]
+
+
+def equity_window(times_ns: np.ndarray, balances: np.ndarray, start_ns: Optional[int] = None,
+                  end_ns: Optional[int] = None,
+                  points: int = DISPLAY_POINTS) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Участок [start_ns, end_ns] кривой, прореженный до points точек, и число точек участка"""
+    lo = 0 if start_ns is None else int(np.searchsorted(times_ns, start_ns, side='left'))
+    hi = len(times_ns) if end_ns is None else int(np.searchsorted(times_ns, end_ns, side='right'))
+    window_times, window_balances = downsample(times_ns[lo:hi], balances[lo:hi], points)
+    return window_times, window_balances, max(hi - lo, 0)
+
+
+def pack_equity_curve(equity_curve: Sequence[Any],
+                      points: int = DISPLAY_POINTS) -> Tuple[bytes, List[Dict[str, Any]]]:
+    """Blob полной кривой и её прореженная версия для JSON результата"""
+    times_ns, balances = equity_arrays(equity_curve)
+    display_times, display_balances = downsample(times_ns, balances, points)
+    display = [
+        {'timestamp': t.isoformat(), 'balance': b}
+        for t, b in zip(pd.to_datetime(display_times).to_pydatetime(), display_balances.tolist())
+    ]
+    return encode_equity_curve(times_ns, balances), display
+
+
+def _shuffle(words: np.ndarray) -> bytes:
+    # Байт i всех слов подряд: старшие байты похожих значений сжимаются лучше
+    return words.view(np.uint8).reshape(-1, 8).T.tobytes()
+
+
+def _unshuffle(data: np.ndarray, n: int) -> np.ndarray:
+    return np.ascontiguousarray(data.reshape(8, n).T).view(np.uint64).ravel()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple, Any
+
+import numpy as np
+import pandas as pd
+
+
+def _buffer_address(values: np.ndarray) -> int:
+    return values.__array_interface__['data'][0]
+
+
+class IndicatorCache:
+    """Кэш индикаторов одного прогона бэктеста.
+
+    Серии считаются один раз векторно по всему набору данных и хранятся по ключу
+    (symbol, indicator, params). Стратегии читают значение на текущей свече: срез,
+    который отдаёт курсор бэктеста, — это префикс исходного DataFrame, разделяющий с ним
+    память, поэтому символ и индекс свечи определяются по адресу буфера колонки и длине.
+    Для любых других DataFrame (хвостовые окна, копии, live-данные) кэш возвращает None
+    и стратегия считает индикатор сама.
+
+    EMA в pandas (adjust=True) рекуррентна: значение на свече i зависит только от
+    предыдущих цен, поэтому полная серия совпадает с расчётом по префиксу бит-в-бит.
+    """
+
+    def __init__(self, market_data: Dict[str, pd.DataFrame]):
+        self._frames = market_data
+        self._series: Dict[Tuple[str, str, Tuple[Tuple[str, Any], ...]], np.ndarray] = {}
+        self._by_address: Dict[Tuple[str, int], str] = {}
+        for symbol, df in market_data.items():
+            if df.empty:
+                continue
+            for column in ('close', 'open', 'high', 'low', 'volume'):
+                if column in df.columns:
+                    values = df[column].to_numpy()
+                    self._by_address[(column, _buffer_address(values))] = symbol
+
+    def get(self, symbol: str, indicator: str, **params) -> np.ndarray:
+        """Полная серия индикатора по символу (считается при первом обращении)."""
+        key = (symbol, indicator, tuple(sorted(params.items())))
+        series = self._series.get(key)
+        if series is None:
+            series = self._compute(symbol, indicator, params)
+            self._series[key] = series
+        return series
+
+    def ema(self, symbol: str, span: int, column: str = 'close') -> np.ndarray:
+        return self.get(symbol, 'ema', span=int(span), column=column)
+
+    def locate(self, df: pd.DataFrame, column: str = 'close') -> Optional[Tuple[str, int]]:
+        """Символ и индекс последней свечи df, если df — префикс данных прогона."""
+        if df is None or column not in df.columns:
+            return None
+        values = df[column].to_numpy()
+        size = len(values)
+        if size == 0:
+            return None
+        symbol = self._by_address.get((column, _buffer_address(values)))
+        if symbol is None or size > len(self._frames[symbol]):
+            return None
+        return symbol, size - 1
+
+    def ema_last(self, df: pd.DataFrame, span: int, column: str = 'close') -> Optional[float]:
+        """Значение EMA на последней свече df или None, если df не из этого прогона."""
+        location = self.locate(df, column)
+        if location is None:
+            return None
+        symbol, index = location
+        return self.ema(symbol, span, column)[index]
+
+    def _compute(self, symbol: str, indicator: str, params: Dict[str, Any]) -> np.ndarray:
+        df = self._frames[symbol]
+        if indicator == 'ema':
+            return df[params['column']].ewm(span=params['span']).mean().to_numpy()
+        raise ValueError(f"Unknown indicator: {indicator}")
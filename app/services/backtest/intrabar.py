@@ -0,0 +1,104 @@
+"""
+Intrabar SL/TP resolution from lower-timeframe sub-bars
+"""
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.backtest.market_view import _index_keys, _time_key
+
+SUBBAR_MODE = 'subbar'
+
+
+class SubBarIndex:
+    """
+    Maps every bar of a higher-timeframe frame to its range of sub-bars (1m, 1s...).
+
+    Ranges are computed once with searchsorted: parent bar i owns the sub-bars with
+    open time in [open_i, open_i + step), where step is the parent interval (the
+    smallest gap between parent bars unless given). Resolving a bar only reads that
+    bar's sub-bars, so the cost follows the number of ambiguous bars rather than the
+    size of the sub-bar data.
+    """
+
+    def __init__(self, parent_index: pd.Index, sub_bars: pd.DataFrame, step: Optional[pd.Timedelta] = None):
+        self._datetime_index = isinstance(parent_index, pd.DatetimeIndex)
+        self._parent_keys = _index_keys(parent_index)
+        sub_keys = _index_keys(sub_bars.index)
+        if step is not None:
+            step_key = pd.Timedelta(step).value
+        elif len(self._parent_keys) > 1:
+            step_key = int(np.diff(self._parent_keys).min())
+        else:
+            step_key = 0
+        self.starts = np.searchsorted(sub_keys, self._parent_keys, side='left')
+        self.ends = np.searchsorted(sub_keys, self._parent_keys + step_key, side='left')
+        self._high = sub_bars['high'].to_numpy(dtype=np.float64)
+        self._low = sub_bars['low'].to_numpy(dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self._parent_keys)
+
+    def bar_at(self, current_time) -> int:
+        """Номер родительской свечи, открытой в current_time, или -1"""
+        key = _time_key(current_time, self._datetime_index)
+        pos = int(np.searchsorted(self._parent_keys, key, side='left'))
+        if pos < len(self._parent_keys) and self._parent_keys[pos] == key:
+            return pos
+        return -1
+
+    def resolve(self, bar: int, side: str, sl_price: float, tp_price: float) -> Optional[str]:
+        """
+        Returns 'stop_loss' or 'take_profit', whichever the sub-bars of the parent bar
+        reach first, or None when the bar has no sub-bars or both levels fall inside
+        the same sub-bar (the caller then applies its fallback mode).
+        """
+        if bar < 0:
+            return None
+        start, end = int(self.starts[bar]), int(self.ends[bar])
+        if start >= end:
+            return None
+        high = self._high[start:end]
+        low = self._low[start:end]
+        if side == 'BUY':
+            sl_hits = low <= sl_price
+            tp_hits = high >= tp_price
+        else:
+            sl_hits = high >= sl_price
+            tp_hits = low <= tp_price
+        first_sl = int(sl_hits.argmax()) if sl_hits.any() else end
+        first_tp = int(tp_hits.argmax()) if tp_hits.any() else end
+        if first_sl == first_tp:
+            return None
+        return 'stop_loss' if first_sl < first_tp else 'take_profit'
+
+
+def build_subbar_indexes(
+    market_data: Dict[str, pd.DataFrame],
+    sub_bars: Optional[Dict[str, pd.DataFrame]],
+) -> Dict[str, SubBarIndex]:
+    """Индексы подсвечей для символов, у которых они есть"""
+    return {
+        symbol: SubBarIndex(market_data[symbol].index, frame)
+        for symbol, frame in (sub_bars or {}).items()
+        if symbol in market_data and frame is not None and not frame.empty
+    }
+
+
+def resolve_ambiguous(
+    index: Optional[SubBarIndex],
+    current_time: Any,
+    side: str,
+    sl_price: float,
+    tp_price: float,
+    bar: Optional[int] = None,
+) -> Tuple[str, float]:
+    """Причина и цена выхода для свечи, где задеты и SL, и TP (режим 'subbar')"""
+    reason = None
+    if index is not None:
+        reason = index.resolve(index.bar_at(current_time) if bar is None else bar, side, sl_price, tp_price)
+    if reason == 'take_profit':
+        return 'take_profit', tp_price
+    # Подсвечей нет или обе цели в одной подсвече — консервативно, как stopfirst
+    return 'stop_loss', sl_price
@@ -0,0 +1,173 @@
+"""
+Concurrent historical kline downloader with Binance request-weight limiting
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+import numpy as np
+
+INTERVAL_MS = {
+    '1s': 1_000, '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000,
+    '8h': 28_800_000, '12h': 43_200_000, '1d': 86_400_000, '3d': 259_200_000,
+    '1w': 604_800_000,
+}
+
+Progress = Callable[[str, int, int], None]
+Request = Tuple[str, str, int, int]
+
+
+class TokenBucket:
+    """
+    Request-weight budget: capacity tokens refilled at rate tokens per second.
+
+    acquire() reserves tokens immediately (the balance may go negative) and sleeps
+    for the deficit, so waiters are served in order. The lock is a threading one:
+    one bucket can be shared by downloads running on different event loops.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, weight: float) -> float:
+        """Takes weight tokens and returns how long to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= weight
+            return max(0.0, -self._tokens / self.rate)
+
+    def drain(self, seconds: float) -> None:
+        """Empties the bucket so nothing is sent for the given time (server asked to back off)"""
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.rate)
+            self._updated = time.monotonic()
+
+    async def acquire(self, weight: float = 1.0) -> None:
+        delay = self.reserve(weight)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class AsyncKlineDownloader:
+    """
+    Downloads klines over a pooled aiohttp session, several page windows at a time.
+
+    A range is split into windows of LIMIT candles that are requested concurrently
+    (at most concurrency in flight per symbol) and stitched back in order. Every request takes
+    REQUEST_WEIGHT from a token bucket sized to the exchange weight limit; 429/418
+    responses drain the bucket for Retry-After seconds and the page is retried.
+
+    Calling the downloader directly is the synchronous KlineFetcher interface used by
+    CandleStore; it blocks until the range is downloaded (see run_blocking).
+    """
+
+    LIMIT = 1000
+    # Вес /api/v3/klines при limit 1000
+    REQUEST_WEIGHT = 2
+    RETRIES = 5
+
+    def __init__(
+        self,
+        base_url: str = "https://api.binance.com",
+        concurrency: int = 8,
+        weight_per_minute: int = 6000,
+        bucket: Optional[TokenBucket] = None,
+        progress: Optional[Progress] = None,
+        timeout: float = 30,
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.bucket = bucket or TokenBucket(weight_per_minute, weight_per_minute / 60)
+        self.progress = progress or print_progress
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+    def __call__(self, symbol: str, interval: str, start_ms: int, end_ms: int) -> np.ndarray:
+        return run_blocking(self.fetch(symbol, interval, start_ms, end_ms))
+
+    async def fetch(self, symbol: str, interval: str, start_ms: int, end_ms: int,
+                    session: Optional[aiohttp.ClientSession] = None) -> np.ndarray:
+        """Candles with open time in [start_ms, end_ms] as an (n, 6) array: open time ms, O, H, L, C, V"""
+        if session is None:
+            async with self._session() as session:
+                return await self.fetch(symbol, interval, start_ms, end_ms, session)
+
+        windows = page_windows(start_ms, end_ms, INTERVAL_MS[interval] * self.LIMIT)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        done = 0
+
+        async def fetch_window(first: int, last: int) -> np.ndarray:
+            nonlocal done
+            async with semaphore:
+                rows = await self._fetch_page(session, symbol, interval, first, last)
+            done += 1
+            self.progress(symbol, done, len(windows))
+            return rows
+
+        pages = await asyncio.gather(*(fetch_window(first, last) for first, last in windows))
+        pages = [page for page in pages if len(page)]
+        return np.concatenate(pages) if pages else np.empty((0, 6))
+
+    async def fetch_many(self, requests: Sequence[Request]) -> Dict[str, np.ndarray]:
+        """Several symbols at once over one session, e.g. BTC and ETH for compensation"""
+        async with self._session(self.concurrency * len(requests)) as session:
+            results = await asyncio.gather(*(self.fetch(*request, session=session) for request in requests))
+        return {request[0]: rows for request, rows in zip(requests, results)}
+
+    def _session(self, connections: Optional[int] = None) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
+            timeout=self.timeout,
+            connector=aiohttp.TCPConnector(limit=connections or self.concurrency),
+        )
+
+    async def _fetch_page(self, session: aiohttp.ClientSession, symbol: str, interval: str,
+                          first: int, last: int) -> np.ndarray:
+        params = {'symbol': symbol.upper(), 'interval': interval,
+                  'startTime': first, 'endTime': last, 'limit': self.LIMIT}
+        for attempt in range(self.RETRIES):
+            await self.bucket.acquire(self.REQUEST_WEIGHT)
+            async with session.get(f"{self.base_url}/api/v3/klines", params=params) as response:
+                if response.status in (418, 429):
+                    # Превышен лимит веса — ждём, сколько просит биржа, и повторяем страницу
+                    self.bucket.drain(float(response.headers.get('Retry-After', 2 ** attempt)))
+                    continue
+                response.raise_for_status()
+                data = await response.json()
+            if not isinstance(data, list):
+                raise ValueError(f"Unexpected response: {data}")
+            return np.array([row[:6] for row in data], dtype=np.float64).reshape(-1, 6)
+        raise RuntimeError(f"Rate limited too many times for {symbol} {first}-{last}")
+
+
+def page_windows(start_ms: int, end_ms: int, span_ms: int) -> List[Tuple[int, int]]:
+    """Consecutive inclusive windows of span_ms covering [start_ms, end_ms]"""
+    return [(first, min(first + span_ms - 1, end_ms)) for first in range(start_ms, end_ms + 1, span_ms)]
+
+
+def run_blocking(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Runs a coroutine to completion from synchronous code. Inside a running event loop
+    (legacy sync calls from async services) it runs on a separate thread's loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def print_progress(symbol: str, done: int, total: int) -> None:
+    """Prints every 10% of the pages and the last one"""
+    step = max(1, total // 10)
+    if done % step == 0 or done == total:
+        print(f"  📥 {symbol}: {done}/{total} pages")
@@ -0,0 +1,474 @@
+"""
+Компактное состояние бэктеста: позиция со __slots__, колоночный журнал сделок
+и буфер кривой доходности.
+"""
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from schemas.backtest import BacktestEquityPoint
+
+
+class Position:
+    """Открытая позиция бэктеста.
+
+    Набор атрибутов фиксирован (__slots__), у позиции нет собственного словаря.
+    Доступ ``position['stop_loss']`` и ``position.get(...)`` сохранён для кода,
+    написанного под позиции-словари. Позиция сама подходит как ``deal`` для
+    методов трейлинга BaseStrategy (entry_price, side, max_price, min_price).
+    """
+
+    __slots__ = (
+        'deal_id', 'symbol', 'side', 'entry_price', 'entry_time', 'size', 'size_usd',
+        'leverage', 'open_fee', 'stop_loss', 'take_profit', 'max_price', 'min_price', 'trailing_stop',
+    )
+
+    def __init__(
+        self,
+        symbol: str,
+        side: str,
+        entry_price: float,
+        entry_time,
+        size: float,
+        *,
+        deal_id: Optional[int] = None,
+        size_usd: Optional[float] = None,
+        leverage: float = 1,
+        open_fee: float = 0.0,
+        stop_loss: Optional[float] = None,
+        take_profit: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_price: Optional[float] = None,
+        trailing_stop: Optional[float] = None,
+    ):
+        self.deal_id = deal_id
+        self.symbol = symbol
+        self.side = side
+        self.entry_price = entry_price
+        self.entry_time = entry_time
+        self.size = size
+        self.size_usd = size_usd
+        self.leverage = leverage
+        self.open_fee = open_fee
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        # Экстремумы для трейлинга отсчитываются от цены входа
+        self.max_price = entry_price if max_price is None else max_price
+        self.min_price = entry_price if min_price is None else min_price
+        self.trailing_stop = trailing_stop
+
+    @property
+    def entry_size_usd(self) -> Optional[float]:
+        """Старое имя size_usd в позициях оркестраторов"""
+        return self.size_usd
+
+    @entry_size_usd.setter
+    def entry_size_usd(self, value: Optional[float]) -> None:
+        self.size_usd = value
+
+    @property
+    def is_long(self) -> bool:
+        return str(self.side).upper() in ('BUY', 'LONG')
+
+    # Совместимость с позициями-словарями
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _POSITION_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in _POSITION_KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in _POSITION_KEYS and getattr(self, key) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in _POSITION_KEYS else None
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return (f"Position({self.symbol} {self.side} {self.size} @ {self.entry_price}, "
+                f"sl={self.stop_loss}, tp={self.take_profit})")
+
+
+_POSITION_KEYS = frozenset(Position.__slots__) | {'entry_size_usd'}
+
+
+class TradeLedger:
+    """Журнал сделок бэктеста в колонках numpy.
+
+    Строки лежат в структурированном массиве, ёмкость которого растёт вдвое.
+    Строковые поля (символ, сторона, причина, статус) хранятся кодами справочников,
+    время — наносекундами, отсутствующие значения — NaN/NaT/-1. Итерация и
+    индексация отдают прежние словари сделок (без отсутствующих полей), поэтому
+    журнал можно передавать туда, где раньше был список словарей, а статистику
+    считать по колонкам (``column``/``mask``).
+    """
+
+    LABEL_FIELDS = ('symbol', 'side', 'reason', 'status')
+    TIME_FIELDS = ('entry_time', 'exit_time')
+    FLOAT_FIELDS = (
+        'entry_price', 'exit_price', 'size', 'size_usd', 'leverage',
+        'pnl', 'pnl_pct', 'fee_open', 'fee_close', 'new_balance',
+    )
+    FIELDS = LABEL_FIELDS + TIME_FIELDS + FLOAT_FIELDS
+    DTYPE = np.dtype(
+        [(name, np.int16) for name in LABEL_FIELDS]
+        + [(name, np.int64) for name in TIME_FIELDS]
+        + [(name, np.float64) for name in FLOAT_FIELDS]
+    )
+
+    MISSING_LABEL = -1
+    MISSING_TIME = np.iinfo(np.int64).min  # NaT
+    _EMPTY_ROW = tuple([-1] * len(LABEL_FIELDS) + [np.iinfo(np.int64).min] * len(TIME_FIELDS)
+                       + [np.nan] * len(FLOAT_FIELDS))
+
+    def __init__(self, capacity: int = 256, tz: Any = None):
+        self._data = np.empty(max(int(capacity), 1), dtype=self.DTYPE)
+        self._size = 0
+        self._labels: Dict[str, List[Any]] = {name: [] for name in self.LABEL_FIELDS}
+        self._codes: Dict[str, Dict[Any, int]] = {name: {} for name in self.LABEL_FIELDS}
+        self._tz = tz
+        self._tz_known = tz is not None
+
+    # Запись
+
+    def add(
+        self,
+        symbol: str,
+        side: str,
+        entry_price: float,
+        entry_time,
+        size: float,
+        *,
+        exit_price: Optional[float] = None,
+        exit_time=None,
+        size_usd: Optional[float] = None,
+        leverage: Optional[float] = None,
+        pnl: Optional[float] = None,
+        pnl_pct: Optional[float] = None,
+        fee_open: Optional[float] = None,
+        fee_close: Optional[float] = None,
+        new_balance: Optional[float] = None,
+        reason: Optional[str] = None,
+        status: Optional[str] = None,
+    ) -> int:
+        """Добавляет сделку, возвращает номер строки"""
+        row = self._reserve(1)
+        self._data[row] = (
+            self._code('symbol', symbol), self._code('side', side),
+            self._code('reason', reason), self._code('status', status),
+            self._time(entry_time), self._time(exit_time),
+            _number(entry_price), _number(exit_price), _number(size), _number(size_usd), _number(leverage),
+            _number(pnl), _number(pnl_pct), _number(fee_open), _number(fee_close), _number(new_balance),
+        )
+        return row
+
+    def append(self, trade: Mapping[str, Any]) -> None:
+        """Добавляет сделку-словарь (как list.append); неизвестные поля — KeyError"""
+        unknown = set(trade) - set(self.FIELDS)
+        if unknown:
+            raise KeyError(f"Unknown trade fields: {sorted(unknown)}")
+        self.add(**trade)
+
+    @classmethod
+    def from_columns(cls, tz: Any = None, **columns: Sequence) -> 'TradeLedger':
+        """Журнал из готовых колонок одинаковой длины.
+
+        Время передаётся в наносекундах (int64), строковые поля — значениями.
+        """
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        size = lengths.pop() if lengths else 0
+        ledger = cls(capacity=size, tz=tz)
+        ledger._tz_known = True
+        data = ledger._data
+        data[:size] = np.array(cls._EMPTY_ROW, dtype=cls.DTYPE)
+        for name, values in columns.items():
+            if name not in cls.FIELDS:
+                raise KeyError(f"Unknown trade field: {name}")
+            if name in cls.LABEL_FIELDS:
+                data[name][:size] = [ledger._code(name, value) for value in values]
+            else:
+                data[name][:size] = values
+        ledger._size = size
+        return ledger
+
+    def _reserve(self, count: int) -> int:
+        row = self._size
+        self._data = _grown(self._data, row, row + count)
+        self._size = row + count
+        return row
+
+    def _code(self, name: str, value: Any) -> int:
+        if value is None:
+            return self.MISSING_LABEL
+        codes = self._codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._labels[name])
+            self._labels[name].append(value)
+        return code
+
+    def _time(self, value) -> int:
+        if value is None:
+            return self.MISSING_TIME
+        ts = value if isinstance(value, pd.Timestamp) else pd.Timestamp(value)
+        if not self._tz_known:
+            self._tz = ts.tz
+            self._tz_known = True
+        return ts.value
+
+    # Чтение
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def column(self, name: str) -> np.ndarray:
+        """Колонка без копирования (коды для строковых полей, нс для времени)"""
+        return self._data[name][:self._size]
+
+    def mask(self, name: str, value: Any) -> np.ndarray:
+        """Булева маска строк, где строковое поле равно value"""
+        code = self._codes[name].get(value)
+        if code is None:
+            return np.zeros(self._size, dtype=bool)
+        return self.column(name) == code
+
+    def labels(self, name: str) -> List[Any]:
+        """Справочник строкового поля: значение кода i — labels(name)[i]"""
+        return list(self._labels[name])
+
+    def times(self, name: str) -> List[Optional[pd.Timestamp]]:
+        return _timestamps(self.column(name), self._tz)
+
+    def records(self, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Сделки словарями (в формате прежнего списка trades)"""
+        columns = []
+        for name in self.FIELDS:
+            if name in self.LABEL_FIELDS:
+                labels = self._labels[name]
+                values = [labels[code] if code >= 0 else None for code in self.column(name).tolist()]
+            elif name in self.TIME_FIELDS:
+                values = self.times(name)
+            else:
+                values = [None if v != v else v for v in self.column(name).tolist()]
+            columns.append((name, values))
+        rows = range(self._size) if mask is None else np.flatnonzero(mask).tolist()
+        return [
+            {name: values[i] for name, values in columns if values[i] is not None}
+            for i in rows
+        ]
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('trade index out of range')
+        row = self._data[index]
+        trade: Dict[str, Any] = {}
+        for name in self.FIELDS:
+            value = row[name].item()
+            if name in self.LABEL_FIELDS:
+                value = self._labels[name][value] if value >= 0 else None
+            elif name in self.TIME_FIELDS:
+                value = None if value == self.MISSING_TIME else pd.Timestamp(value, tz=self._tz)
+            elif value != value:
+                value = None
+            if value is not None:
+                trade[name] = value
+        return trade
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.records())
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    # Чекпойнты
+
+    def snapshot(self) -> Tuple[Dict[str, Any], np.ndarray]:
+        """Справочники (JSON-совместимые) и копия строк журнала"""
+        meta = {'labels': {name: list(values) for name, values in self._labels.items()},
+                'tz': _tz_name(self._tz), 'tz_known': self._tz_known}
+        return meta, self._data[:self._size].copy()
+
+    @classmethod
+    def restore(cls, meta: Mapping[str, Any], rows: np.ndarray) -> 'TradeLedger':
+        ledger = cls(capacity=len(rows), tz=_tz_from_name(meta['tz']))
+        ledger._tz_known = meta['tz_known']
+        ledger._data[:len(rows)] = rows
+        ledger._size = len(rows)
+        for name, values in meta['labels'].items():
+            ledger._labels[name] = list(values)
+            ledger._codes[name] = {value: code for code, value in enumerate(values)}
+        return ledger
+
+
+class EquityBuffer:
+    """Кривая доходности в двух колонках numpy: время (нс) и баланс.
+
+    Заполняется по точке на свечу без создания моделей; BacktestEquityPoint
+    собираются один раз, при построении результата (``to_points``).
+    """
+
+    def __init__(self, capacity: int = 1024, tz: Any = None):
+        capacity = max(int(capacity), 1)
+        self._times = np.empty(capacity, dtype=np.int64)
+        self._balances = np.empty(capacity, dtype=np.float64)
+        self._size = 0
+        self._tz = tz
+        self._tz_known = tz is not None
+
+    def reserve(self, capacity: int) -> None:
+        """Заранее выделяет место под capacity точек (например, по длине таймлайна)"""
+        self._times = _grown(self._times, self._size, capacity, exact=True)
+        self._balances = _grown(self._balances, self._size, capacity, exact=True)
+
+    def append(self, time, balance: float) -> None:
+        i = self._size
+        if i == len(self._times):
+            self._times = _grown(self._times, i, i + 1)
+            self._balances = _grown(self._balances, i, i + 1)
+        ts = time if isinstance(time, pd.Timestamp) else pd.Timestamp(time)
+        if not self._tz_known:
+            self._tz = ts.tz
+            self._tz_known = True
+        self._times[i] = ts.value
+        self._balances[i] = balance
+        self._size = i + 1
+
+    def extend(self, times_ns: np.ndarray, balances: np.ndarray, tz: Any = None) -> None:
+        """Добавляет точки пачкой: время в нс (int64) и балансы"""
+        count = len(times_ns)
+        if count != len(balances):
+            raise ValueError(f"Got {count} times and {len(balances)} balances")
+        if not self._tz_known:
+            self._tz = tz
+            self._tz_known = True
+        start = self._size
+        self._times = _grown(self._times, start, start + count)
+        self._balances = _grown(self._balances, start, start + count)
+        self._times[start:start + count] = times_ns
+        self._balances[start:start + count] = balances
+        self._size = start + count
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._times.nbytes + self._balances.nbytes
+
+    @property
+    def balances(self) -> np.ndarray:
+        return self._balances[:self._size]
+
+    @property
+    def times_ns(self) -> np.ndarray:
+        return self._times[:self._size]
+
+    def times(self) -> List[pd.Timestamp]:
+        return _timestamps(self.times_ns, self._tz)
+
+    def snapshot(self) -> Tuple[Dict[str, Any], np.ndarray, np.ndarray]:
+        return {'tz': _tz_name(self._tz), 'tz_known': self._tz_known}, self.times_ns.copy(), self.balances.copy()
+
+    @classmethod
+    def restore(cls, meta: Mapping[str, Any], times_ns: np.ndarray, balances: np.ndarray,
+                capacity: int = 0) -> 'EquityBuffer':
+        buffer = cls(capacity=max(capacity, len(times_ns)), tz=_tz_from_name(meta['tz']))
+        buffer._tz_known = meta['tz_known']
+        buffer.extend(times_ns, balances, tz=buffer._tz)
+        return buffer
+
+    def to_points(self, times: Optional[Sequence] = None) -> List[BacktestEquityPoint]:
+        """Точки публичной схемы без повторной валидации.
+
+        times — готовые Timestamp тех же точек (например, таймлайн движка), чтобы не
+        создавать их заново.
+        """
+        if times is None:
+            times = self.times()
+        elif len(times) != self._size:
+            raise ValueError(f"Got {len(times)} times for {self._size} equity points")
+        construct = BacktestEquityPoint.model_construct
+        # Общий fields_set на все точки вместо собственного множества у каждой
+        return [
+            construct(_POINT_FIELDS, timestamp=ts, balance=balance)
+            for ts, balance in zip(times, self.balances.tolist())
+        ]
+
+
+_POINT_FIELDS = frozenset(('timestamp', 'balance'))
+
+
+def _grown(array: np.ndarray, size: int, needed: int, exact: bool = False) -> np.ndarray:
+    """Массив ёмкостью не меньше needed с сохранёнными первыми size элементами"""
+    capacity = len(array)
+    if needed <= capacity:
+        return array
+    if exact:
+        capacity = needed
+    else:
+        while capacity < needed:
+            capacity *= 2
+    grown = np.empty(capacity, dtype=array.dtype)
+    grown[:size] = array[:size]
+    return grown
+
+
+def _timestamps(values_ns: np.ndarray, tz: Any) -> List[Optional[pd.Timestamp]]:
+    """Наносекунды в Timestamp одним вызовом; NaT -> None"""
+    values = pd.DatetimeIndex(values_ns.view('M8[ns]'))
+    if tz is not None:
+        values = values.tz_localize('UTC').tz_convert(tz)
+    return [None if ts is pd.NaT else ts for ts in values.tolist()]
+
+
+def _tz_name(tz: Any) -> Optional[str]:
+    return None if tz is None else str(tz)
+
+
+def _tz_from_name(name: Optional[str]) -> Any:
+    return None if name is None else pd.Timestamp(0, tz=name).tz
+
+
+def _number(value) -> float:
+    return np.nan if value is None else value
+
+
+def as_position(position: Union[Position, Mapping[str, Any]], symbol: Optional[str] = None) -> Position:
+    """Position как есть, позицию-словарь — копией в Position (для чтения, например как deal)"""
+    if isinstance(position, Position):
+        return position
+    values = {name: position[name] for name in _POSITION_KEYS if position.get(name) is not None}
+    if 'entry_size_usd' in values:
+        values.setdefault('size_usd', values.pop('entry_size_usd'))
+    return Position(
+        values.pop('symbol', symbol),
+        values.pop('side', None),
+        values.pop('entry_price', None),
+        values.pop('entry_time', None),
+        values.pop('size', 0.0),
+        **values,
+    )
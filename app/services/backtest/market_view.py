@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Dict, Iterator, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def _index_keys(index: pd.Index) -> np.ndarray:
+    """Возвращает отсортированные ключи индекса, пригодные для сравнения со временем шага."""
+    if isinstance(index, pd.DatetimeIndex):
+        return index.as_unit('ns').asi8
+    return index.to_numpy()
+
+
+def _time_key(value: Any, datetime_index: bool) -> Any:
+    if datetime_index:
+        return pd.Timestamp(value).value
+    return value
+
+
+def build_timeline(market_data: Dict[str, pd.DataFrame]) -> pd.Index:
+    """Объединение отсортированных индексов всех символов без повторов.
+
+    Для DatetimeIndex с общей таймзоной ключи-int64 сливаются устойчивой сортировкой
+    (timsort на уже отсортированных отрезках работает как слияние) — без создания
+    Timestamp на каждую свечу. Прочие индексы объединяются как раньше, через set.
+    """
+    indexes = [df.index for df in market_data.values() if not df.empty]
+    if not indexes:
+        return pd.DatetimeIndex([])
+    tz = getattr(indexes[0], 'tz', None)
+    if not all(isinstance(index, pd.DatetimeIndex) and index.tz == tz for index in indexes):
+        return pd.Index(sorted(set().union(*(index.tolist() for index in indexes))))
+
+    keys = np.concatenate([index.as_unit('ns').asi8 for index in indexes])
+    keys.sort(kind='stable')
+    if len(keys) > 1:
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    timeline = pd.DatetimeIndex(keys.view('M8[ns]'))
+    return timeline.tz_localize('UTC').tz_convert(tz) if tz is not None else timeline
+
+
+class MarketDataCursor:
+    """Курсор по историческим данным бэктеста.
+
+    Для каждого символа хранит количество свечей с временем <= текущего шага и сдвигает его
+    вперёд по мере движения по таймлайну (амортизированно O(1) на шаг). Срезы отдаются
+    позиционно (``iloc[:n]``) — без булевых масок и копирования данных, а текущая свеча
+    читается напрямую из numpy-массивов.
+
+    С таймлайном (``build_timeline``) позиции всех шагов считаются заранее через
+    searchsorted, и ``seek(step)`` ставит курсор за O(1) на символ. Символы с пропусками
+    просто держат последнюю свечу до следующей — без ffill-копий.
+    """
+
+    PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+
+    def __init__(self, market_data: Dict[str, pd.DataFrame], timeline: Optional[pd.Index] = None):
+        self._frames = market_data
+        self._keys: Dict[str, np.ndarray] = {}
+        self._datetime_index: Dict[str, bool] = {}
+        self._prices: Dict[str, Dict[str, np.ndarray]] = {}
+        self._positions: Dict[str, int] = {}
+        self._slices: Dict[str, pd.DataFrame] = {}
+        self._position_maps: Optional[np.ndarray] = None
+        self._timeline = timeline
+        self.current_time = None
+
+        for symbol, df in market_data.items():
+            self._keys[symbol] = _index_keys(df.index)
+            self._datetime_index[symbol] = isinstance(df.index, pd.DatetimeIndex)
+            self._prices[symbol] = {
+                col: df[col].to_numpy(dtype=np.float64)
+                for col in self.PRICE_COLUMNS if col in df.columns
+            }
+            self._positions[symbol] = 0
+
+        if timeline is not None:
+            timeline_keys = _index_keys(timeline)
+            # Строка на шаг таймлайна: сколько свечей каждого символа доступно на этом шаге
+            self._position_maps = np.empty((len(timeline_keys), len(self._keys)), dtype=np.int64)
+            for column, keys in enumerate(self._keys.values()):
+                self._position_maps[:, column] = np.searchsorted(keys, timeline_keys, side='right')
+
+    @property
+    def symbols(self) -> list[str]:
+        return list(self._frames.keys())
+
+    def advance(self, current_time) -> None:
+        """Сдвигает курсоры всех символов на свечи с временем <= current_time."""
+        for symbol, keys in self._keys.items():
+            key = _time_key(current_time, self._datetime_index[symbol])
+            pos = self._positions[symbol]
+            size = len(keys)
+            start = pos
+            while pos < size and keys[pos] <= key:
+                pos += 1
+            if pos != start:
+                self._positions[symbol] = pos
+                self._slices.pop(symbol, None)
+        self.current_time = current_time
+
+    def seek(self, step: int, current_time=None) -> None:
+        """Ставит курсоры на шаг step таймлайна, переданного в конструктор."""
+        for symbol, pos in zip(self._keys, self._position_maps[step].tolist()):
+            if pos != self._positions[symbol]:
+                self._positions[symbol] = pos
+                self._slices.pop(symbol, None)
+        self.current_time = current_time if current_time is not None else self._timeline[step]
+
+    def position(self, symbol: str) -> int:
+        """Количество доступных на текущем шаге свечей символа."""
+        return self._positions.get(symbol, 0)
+
+    def has_data(self, symbol: str) -> bool:
+        return self._positions.get(symbol, 0) > 0
+
+    def price(self, symbol: str, column: str = 'close') -> float:
+        """Значение колонки текущей (последней закрытой) свечи за O(1)."""
+        pos = self._positions[symbol]
+        if pos == 0:
+            raise IndexError(f"No data for {symbol} at {self.current_time}")
+        return float(self._prices[symbol][column][pos - 1])
+
+    def ohlc(self, symbol: str) -> Dict[str, float]:
+        pos = self._positions[symbol]
+        if pos == 0:
+            raise IndexError(f"No data for {symbol} at {self.current_time}")
+        prices = self._prices[symbol]
+        return {col: float(prices[col][pos - 1]) for col in self.PRICE_COLUMNS}
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        """Позиционный срез истории символа до текущего шага включительно (view, без копии)."""
+        cached = self._slices.get(symbol)
+        if cached is None:
+            cached = self._frames[symbol].iloc[: self._positions[symbol]]
+            self._slices[symbol] = cached
+        return cached
+
+    def view(self) -> 'MarketDataView':
+        return MarketDataView(self)
+
+
+class MarketDataView(Mapping):
+    """Read-only отображение symbol -> DataFrame для стратегий.
+
+    Совместимо с ``MarketData`` (Dict[str, DataFrame]): срез символа строится лениво при
+    первом обращении и отражает текущее положение курсора.
+    """
+
+    def __init__(self, cursor: MarketDataCursor):
+        self.cursor = cursor
+
+    def __getitem__(self, symbol: str) -> pd.DataFrame:
+        if symbol not in self.cursor._frames:
+            raise KeyError(symbol)
+        return self.cursor.frame(symbol)
+
+    def __contains__(self, symbol: object) -> bool:
+        return symbol in self.cursor._frames
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.cursor._frames)
+
+    def __len__(self) -> int:
+        return len(self.cursor._frames)
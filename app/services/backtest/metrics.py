@@ -0,0 +1,222 @@
+"""
+Backtest metrics over equity and trade arrays, shared by all engines
+"""
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Крипторынок торгуется круглосуточно: год — 365 полных дней
+YEAR_NS = 365 * 86_400 * 1_000_000_000
+
+
+def periods_per_year(times_ns: Optional[np.ndarray]) -> Optional[float]:
+    """Число интервалов кривой в году по медианному шагу времени (повторы времени не считаются)"""
+    if times_ns is None or len(times_ns) < 2:
+        return None
+    steps = np.diff(np.asarray(times_ns, dtype=np.int64))
+    steps = steps[steps > 0]
+    if not len(steps):
+        return None
+    return YEAR_NS / float(np.median(steps))
+
+
+def equity_metrics(balances: np.ndarray, times_ns: Optional[np.ndarray] = None,
+                   periods: Optional[float] = None) -> Dict[str, float]:
+    """
+    Drawdown and risk-adjusted return metrics of an equity curve.
+
+    Returns are simple returns between consecutive points (points after a zero
+    balance are skipped). Sharpe, Sortino and volatility are annualized with
+    periods (points per year), by default inferred from times_ns; without either
+    they are per point. Percentages are fractions. Drawdown duration is the longest
+    stretch below a previous peak, in points and, with times_ns, in seconds.
+    """
+    balances = np.asarray(balances, dtype=np.float64)
+    if not len(balances):
+        return empty_equity_metrics()
+
+    peaks = np.maximum.accumulate(balances)
+    drawdowns = peaks - balances
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns_pct = np.where(peaks > 0, drawdowns / peaks, 0.0)
+        returns = np.diff(balances) / balances[:-1]
+    returns = returns[balances[:-1] != 0]
+
+    # Точки на пике (не в просадке); между соседними пиками — отрезок под водой
+    at_peak = np.flatnonzero(drawdowns <= 0)
+    underwater = np.append(at_peak[1:], len(balances)) - at_peak - 1
+    duration = int(underwater.max())
+    duration_seconds = 0.0
+    if times_ns is not None and duration:
+        times_ns = np.asarray(times_ns, dtype=np.int64)
+        peak = int(at_peak[underwater.argmax()])
+        # До восстановления (следующего пика) или до конца кривой
+        recovered = min(peak + duration + 1, len(balances) - 1)
+        duration_seconds = (times_ns[recovered] - times_ns[peak]) / 1e9
+
+    periods = periods or periods_per_year(times_ns) or 1.0
+    scale = float(np.sqrt(periods))
+    mean = float(returns.mean()) if len(returns) else 0.0
+    std = float(returns.std()) if len(returns) else 0.0
+    downside = float(np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))) if len(returns) else 0.0
+
+    growth = balances[-1] / balances[0] if balances[0] > 0 else 0.0
+    if times_ns is not None and len(times_ns) > 1:
+        years = (int(times_ns[-1]) - int(times_ns[0])) / YEAR_NS
+    else:
+        years = len(returns) / periods
+    annual_return = float(growth ** (1.0 / years) - 1.0) if years > 0 and growth > 0 else 0.0
+    max_drawdown_pct = float(drawdowns_pct.max())
+
+    return {
+        'max_drawdown': float(drawdowns.max()),
+        'max_drawdown_pct': max_drawdown_pct,
+        'max_drawdown_duration': duration,
+        'max_drawdown_duration_seconds': float(duration_seconds),
+        'sharpe_ratio': mean / std * scale if std > 0 else 0.0,
+        'sortino_ratio': mean / downside * scale if downside > 0 else 0.0,
+        'calmar_ratio': annual_return / max_drawdown_pct if max_drawdown_pct > 0 else 0.0,
+        'annual_return': annual_return,
+        'volatility': std * scale,
+        'periods_per_year': float(periods),
+    }
+
+
+def empty_equity_metrics() -> Dict[str, float]:
+    return {
+        'max_drawdown': 0.0, 'max_drawdown_pct': 0.0, 'max_drawdown_duration': 0,
+        'max_drawdown_duration_seconds': 0.0, 'sharpe_ratio': 0.0, 'sortino_ratio': 0.0,
+        'calmar_ratio': 0.0, 'annual_return': 0.0, 'volatility': 0.0, 'periods_per_year': 0.0,
+    }
+
+
+def trade_metrics(pnl: np.ndarray) -> Dict[str, float]:
+    """
+    Win/loss statistics of closed trades. Sums run in trade order (as the previous
+    list-based code did), so results are bit-identical to it. profit_factor is
+    gross_profit when there are no losing trades; callers with another convention
+    check gross_loss.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    win_amounts = pnl[pnl > 0].tolist()
+    loss_amounts = np.abs(pnl[pnl < 0]).tolist()
+    total = len(pnl)
+    gross_profit = sum(win_amounts)
+    gross_loss = sum(loss_amounts)
+    return {
+        'total_trades': total,
+        'winning_trades': len(win_amounts),
+        'losing_trades': len(loss_amounts),
+        'win_rate': (len(win_amounts) / total * 100.0) if total else 0.0,
+        'avg_win': (gross_profit / len(win_amounts)) if win_amounts else 0.0,
+        'avg_loss': (gross_loss / len(loss_amounts)) if loss_amounts else 0.0,
+        'gross_profit': gross_profit,
+        'gross_loss': gross_loss,
+        'profit_factor': (gross_profit / gross_loss) if loss_amounts else (gross_profit if win_amounts else 0.0),
+    }
+
+
+def exposure(entry_ns: np.ndarray, exit_ns: np.ndarray, start_ns: int, end_ns: int) -> float:
+    """Доля времени [start_ns, end_ns], когда была открыта хотя бы одна позиция"""
+    entry_ns = np.asarray(entry_ns, dtype=np.int64)
+    exit_ns = np.asarray(exit_ns, dtype=np.int64)
+    if not len(entry_ns) or end_ns <= start_ns:
+        return 0.0
+    order = np.argsort(entry_ns, kind='stable')
+    entries = np.clip(entry_ns[order], start_ns, end_ns)
+    exits = np.clip(exit_ns[order], start_ns, end_ns)
+    # Объединение отрезков: каждый добавляет только часть после уже покрытого конца
+    covered_until = np.maximum.accumulate(exits)
+    previous = np.concatenate(([start_ns], covered_until[:-1]))
+    covered = np.maximum(exits - np.maximum(entries, previous), 0).sum()
+    return float(covered / (end_ns - start_ns))
+
+
+def rolling_metrics(balances: np.ndarray, window: int, periods: float = 1.0) -> Dict[str, np.ndarray]:
+    """
+    Rolling return, annualized Sharpe and drawdown over the last window points.
+
+    Mean and variance come from cumulative sums and the rolling peak from pandas,
+    so the cost is O(n) whatever the window. The first window - 1 values are NaN.
+    """
+    balances = np.asarray(balances, dtype=np.float64)
+    n = len(balances)
+    result = {name: np.full(n, np.nan) for name in ('return', 'sharpe_ratio', 'drawdown_pct')}
+    if window < 2 or n < window:
+        return result
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.concatenate(([0.0], np.diff(balances) / balances[:-1]))
+    returns[~np.isfinite(returns)] = 0.0
+    sums = np.concatenate(([0.0], np.cumsum(returns)))
+    squares = np.concatenate(([0.0], np.cumsum(returns ** 2)))
+    # Доходности внутри окна: window - 1 штук, первая доходность окна — переход в его начало
+    count = window - 1
+    mean = (sums[window:] - sums[1:n - window + 2]) / count
+    variance = np.maximum((squares[window:] - squares[1:n - window + 2]) / count - mean ** 2, 0.0)
+    std = np.sqrt(variance)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['sharpe_ratio'][window - 1:] = np.where(std > 0, mean / std * np.sqrt(periods), 0.0)
+        result['return'][window - 1:] = balances[window - 1:] / balances[:n - window + 1] - 1.0
+        peaks = pd.Series(balances).rolling(window).max().to_numpy()
+        result['drawdown_pct'][window - 1:] = ((peaks - balances) / peaks)[window - 1:]
+    return result
+
+
+def per_symbol(symbol_codes: np.ndarray, labels: Sequence[Any], pnl: np.ndarray) -> Dict[str, Dict[str, float]]:
+    """Сделки, PnL и доля прибыльных по символам (коды символов как в TradeLedger)"""
+    symbol_codes = np.asarray(symbol_codes, dtype=np.int64)
+    pnl = np.asarray(pnl, dtype=np.float64)
+    if not len(symbol_codes):
+        return {}
+    size = max(len(labels), int(symbol_codes.max()) + 1)
+    valid = symbol_codes >= 0
+    counts = np.bincount(symbol_codes[valid], minlength=size)
+    totals = np.bincount(symbol_codes[valid], weights=pnl[valid], minlength=size)
+    wins = np.bincount(symbol_codes[valid], weights=(pnl[valid] > 0), minlength=size)
+    return {
+        str(labels[code]): {
+            'trades': int(counts[code]),
+            'total_pnl': float(totals[code]),
+            'winning_trades': int(wins[code]),
+            'win_rate': float(wins[code] / counts[code] * 100.0),
+        }
+        for code in np.flatnonzero(counts).tolist()
+    }
+
+
+def backtest_metrics(
+    balances: np.ndarray,
+    times_ns: Optional[np.ndarray] = None,
+    trade_pnl: Optional[np.ndarray] = None,
+    symbol_codes: Optional[np.ndarray] = None,
+    symbol_labels: Sequence[Any] = (),
+    entry_ns: Optional[np.ndarray] = None,
+    exit_ns: Optional[np.ndarray] = None,
+    notional: Optional[np.ndarray] = None,
+    rolling_window: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    All metrics of one run: equity_metrics, trade_metrics, exposure, turnover
+    (traded notional over average equity) and the per-symbol breakdown. Rolling
+    series are added only with rolling_window.
+    """
+    balances = np.asarray(balances, dtype=np.float64)
+    metrics: Dict[str, Any] = equity_metrics(balances, times_ns)
+    pnl = np.empty(0) if trade_pnl is None else np.asarray(trade_pnl, dtype=np.float64)
+    metrics.update(trade_metrics(pnl))
+
+    metrics['exposure'] = 0.0
+    if entry_ns is not None and exit_ns is not None and times_ns is not None and len(times_ns):
+        metrics['exposure'] = exposure(entry_ns, exit_ns, int(times_ns[0]), int(times_ns[-1]))
+    average_equity = float(balances.mean()) if len(balances) else 0.0
+    traded = float(np.nansum(notional)) if notional is not None else 0.0
+    metrics['turnover'] = traded / average_equity if average_equity > 0 else 0.0
+    metrics['per_symbol'] = per_symbol(symbol_codes, symbol_labels, pnl) if symbol_codes is not None else {}
+
+    if rolling_window:
+        rolling = rolling_metrics(balances, int(rolling_window), metrics['periods_per_year'] or 1.0)
+        # NaN начала окна — None, чтобы результат оставался валидным JSON
+        metrics['rolling'] = {name: [None if v != v else v for v in values.tolist()] for name, values in rolling.items()}
+    return metrics
@@ -0,0 +1,105 @@
+"""
+Monte Carlo robustness analysis of a finished backtest's trade sequence
+"""
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from schemas.backtest import BacktestResult, BacktestTrade, MonteCarloBand, MonteCarloResult
+
+METHODS = ('bootstrap', 'shuffle')
+
+
+class MonteCarloAnalyzer:
+    """
+    Resamples the closed trades of a backtest into many alternative sequences.
+
+    'bootstrap' draws trades with replacement, 'shuffle' permutes the original order
+    (same final PnL, different path). Trade PnL is applied additively to the initial
+    balance. All simulations are matrix operations over (simulations x trades) arrays,
+    processed in chunks of at most MAX_CELLS values to bound memory.
+    """
+
+    MAX_CELLS = 4_000_000
+    # Points per equity band, enough to draw it inline
+    BAND_POINTS = 200
+
+    def __init__(self, simulations: int = 10000, method: str = 'bootstrap',
+                 percentiles: Sequence[float] = (5.0, 25.0, 50.0, 75.0, 95.0), seed: Optional[int] = None):
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS}")
+        if simulations <= 0:
+            raise ValueError("simulations must be positive")
+        self.simulations = simulations
+        self.method = method
+        self.percentiles = tuple(float(p) for p in percentiles)
+        self.seed = seed
+
+    def analyze(self, result: BacktestResult) -> MonteCarloResult:
+        return self.analyze_trades(result.trades, result.initial_balance)
+
+    def analyze_trades(self, trades: List[Union[BacktestTrade, Dict[str, Any]]],
+                       initial_balance: float) -> MonteCarloResult:
+        pnl = np.array([
+            value for value in (_pnl(trade) for trade in trades) if value is not None
+        ], dtype=np.float64)
+        return self.analyze_pnl(pnl, initial_balance)
+
+    def analyze_pnl(self, pnl: np.ndarray, initial_balance: float) -> MonteCarloResult:
+        pnl = np.asarray(pnl, dtype=np.float64)
+        count = len(pnl)
+        rng = np.random.default_rng(self.seed)
+
+        final_pnl = np.empty(self.simulations)
+        max_drawdown_pct = np.empty(self.simulations)
+        steps = np.unique(np.linspace(0, count, min(self.BAND_POINTS, count + 1)).round().astype(np.int64))
+        band_equity = np.empty((self.simulations, len(steps)))
+
+        chunk = max(1, self.MAX_CELLS // max(count, 1))
+        for start in range(0, self.simulations, chunk):
+            rows = min(chunk, self.simulations - start)
+            if self.method == 'bootstrap':
+                sampled = pnl[rng.integers(0, count, size=(rows, count))] if count else np.empty((rows, 0))
+            else:
+                sampled = rng.permuted(np.broadcast_to(pnl, (rows, count)), axis=1)
+
+            equity = np.empty((rows, count + 1))
+            equity[:, 0] = initial_balance
+            np.cumsum(sampled, axis=1, out=equity[:, 1:])
+            equity[:, 1:] += initial_balance
+
+            part = slice(start, start + rows)
+            final_pnl[part] = equity[:, -1] - initial_balance
+            band_equity[part] = equity[:, steps]
+
+            # Просадка от пика: 1 - equity / peak; считаем на месте, без лишних матриц
+            peaks = np.maximum.accumulate(equity, axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                np.divide(equity, peaks, out=peaks)
+            np.nan_to_num(peaks, copy=False, nan=1.0, posinf=1.0, neginf=1.0)
+            max_drawdown_pct[part] = np.maximum(0.0, (1.0 - peaks.min(axis=1)) * 100)
+
+        scale = 100.0 / initial_balance if initial_balance else 0.0
+        return MonteCarloResult(
+            method=self.method,
+            simulations=self.simulations,
+            trades=count,
+            initial_balance=initial_balance,
+            percentiles=list(self.percentiles),
+            total_pnl_pct=_percentiles(final_pnl * scale, self.percentiles),
+            max_drawdown_pct=_percentiles(max_drawdown_pct, self.percentiles),
+            probability_of_loss=float((final_pnl < 0).mean()),
+            equity_bands=[
+                MonteCarloBand(percentile=p, steps=steps.tolist(), balances=values.tolist())
+                for p, values in zip(self.percentiles, np.percentile(band_equity, self.percentiles, axis=0))
+            ],
+        )
+
+
+def _pnl(trade) -> Optional[float]:
+    value = trade.get('pnl') if isinstance(trade, dict) else getattr(trade, 'pnl', None)
+    return None if value is None else float(value)
+
+
+def _percentiles(values: np.ndarray, percentiles: Sequence[float]) -> List[float]:
+    return np.percentile(values, percentiles).tolist()
@@ -5,10 +5,15 @@ import pandas as pd
 
 from schemas.backtest import BacktestResult, BacktestEquityPoint
 from services.backtest.result_builder import ResultBuilder
+from services.backtest.ledger import Position, TradeLedger
 from services.backtest.decision_policy import (
     should_analyze_compensation_entry,
     build_open_state,
 )
+from utils.hot_log import get_logger
+
+trade_log = get_logger('backtest.trade', max_per_second=50)
+signal_log = get_logger('strategy.signal')
 
 
 class DualBacktestOrchestrator:
@@ -33,8 +38,8 @@ class DualBacktestOrchestrator:
     ) -> BacktestResult:
         balance = initial_balance
         equity_curve: List[BacktestEquityPoint] = [BacktestEquityPoint(timestamp=btc_data.index[0], balance=balance)]
-        trades: List[Dict[str, Any]] = []
-        open_positions: Dict[str, Dict[str, Any]] = {}
+        trades = TradeLedger()
+        open_positions: Dict[str, Position] = {}
         pending_opens: List[Any] = []
 
         print(f"\n🚀 ЗАПУСК КОМПЕНСАЦИОННОГО БЕКТЕСТА (dual): {strategy_name}")
@@ -48,8 +53,8 @@ class DualBacktestOrchestrator:
             eth_open = float(md[symbol2]['open'].iloc[-1]) if 'open' in md[symbol2].columns else eth_current_price
 
             if i % 100 == 0:
-                print(f"⏰ Время: {current_time}, Свеча: {i}/{len(btc_data)}, Баланс: ${balance:,.2f}")
-                print(f"  🔍 Открытые позиции: {len(open_positions)}")
+                trade_log.debug("⏰ Время: %s, Свеча: %d/%d, Баланс: $%.2f, открытых позиций: %d",
+                                current_time, i, len(btc_data), balance, len(open_positions))
 
             initial_positions_count = len(open_positions)
 
@@ -100,21 +105,18 @@ class DualBacktestOrchestrator:
                                 # На крайний случай — жёсткие дефолты
                                 stop_loss_price = trade_result['price'] * (0.98 if intent.side == 'BUY' else 1.02)
                                 take_profit_price = trade_result['price'] * (1.03 if intent.side == 'BUY' else 0.97)
-                            open_positions[intent.symbol] = {
-                                'deal_id': len(trades),
-                                'entry_price': trade_result['price'],
-                                'entry_time': current_time,
-                                'side': intent.side,
-                                'size': trade_result['size'],
-                                'symbol': intent.symbol,
-                                'leverage': leverage_val,
-                                'entry_size_usd': trade_result.get('size_usd'),
-                                'stop_loss': stop_loss_price,
-                                'take_profit': take_profit_price,
-                                # Инициализируем max_price и min_price для trailing stop
-                                'max_price': trade_result['price'],  # Для LONG позиции
-                                'min_price': trade_result['price'],  # Для SHORT позиции
-                            }
+                            open_positions[intent.symbol] = Position(
+                                intent.symbol,
+                                intent.side,
+                                trade_result['price'],
+                                current_time,
+                                trade_result['size'],
+                                deal_id=len(trades),
+                                size_usd=trade_result.get('size_usd'),
+                                leverage=leverage_val,
+                                stop_loss=stop_loss_price,
+                                take_profit=take_profit_price,
+                            )  # max_price/min_price для трейлинга инициализируются ценой входа
             balance = self.position_manager.check_and_close_positions_sync(
                 open_positions, md, current_time, balance, trades, strategy=strategy
             )
@@ -124,19 +126,17 @@ class DualBacktestOrchestrator:
                 open_state = build_open_state(open_positions)
                 
                 # Логируем состояние для отладки
-                if i % 50 == 0:
-                    print(f"🔍 Анализ стратегии на свече {i}:")
-                    print(f"  📊 Открытые позиции: {len(open_state)}")
-                    print(f"  💰 Баланс: ${balance:,.2f}")
-                    if open_state:
-                        for sym, pos in open_state.items():
-                            print(f"  📈 {sym}: {pos.side} @ ${pos.entry_price:,.2f}")
+                if i % 50 == 0 and signal_log.is_enabled():
+                    signal_log.debug("🔍 Анализ стратегии на свече %d: позиций %d, баланс $%.2f",
+                                     i, len(open_state), balance)
+                    for sym, pos in open_state.items():
+                        signal_log.debug("  📈 %s: %s @ $%.2f", sym, pos['side'], pos['entry_price'])
                 
                 decision = await strategy.decide(md, template, open_state)
                 if decision and not decision.is_empty():
-                    print(f"🎯 Стратегия приняла решение: {len(decision.intents)} намерений")
+                    signal_log.debug("🎯 Стратегия приняла решение: %d намерений", len(decision.intents))
                     for intent in list(decision.intents):
-                        print(f"  📋 Намерение: {intent.symbol} {intent.side} {intent.sizing}")
+                        signal_log.debug("  📋 Намерение: %s %s %s", intent.symbol, intent.side, intent.sizing)
                         if intent.sizing == "close":
                             if intent.symbol in open_positions:
                                 position = open_positions[intent.symbol]
@@ -160,14 +160,15 @@ class DualBacktestOrchestrator:
                                 })
                                 balance = new_balance
                                 del open_positions[intent.symbol]
-                                print(f"✅ Закрыта позиция {intent.symbol}: PnL ${pnl:,.2f}")
+                                trade_log.debug("✅ Закрыта позиция %s: PnL $%.2f", intent.symbol, pnl)
                         else:
                             # Открытия откладываем
                             pending_opens.append(intent)
-                            print(f"📝 Отложено открытие: {intent.symbol} {intent.side} (будет исполнено на следующей свече)")
+                            trade_log.debug("📝 Отложено открытие: %s %s (будет исполнено на следующей свече)",
+                                            intent.symbol, intent.side)
                 else:
                     if i % 50 == 0:
-                        print(f"🤔 Стратегия не приняла решений на свече {i}")
+                        signal_log.debug("🤔 Стратегия не приняла решений на свече %d", i)
 
             # Mark-to-market equity
             unrealized = 0.0
@@ -208,6 +209,7 @@ class DualBacktestOrchestrator:
             trades=trades,
             equity_curve=equity_curve,
             parameters=parameters,
+            template_id=getattr(template, 'id', None) or 0,
         )
 
 
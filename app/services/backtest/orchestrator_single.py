@@ -5,7 +5,12 @@ import pandas as pd
 
 from schemas.backtest import BacktestResult, BacktestEquityPoint
 from services.backtest.result_builder import ResultBuilder
+from services.backtest.ledger import Position, TradeLedger
 from services.backtest.decision_policy import should_analyze_for_entry, build_open_state
+from utils.hot_log import get_logger
+
+trade_log = get_logger('backtest.trade', max_per_second=50)
+signal_log = get_logger('strategy.signal')
 
 
 class SingleBacktestOrchestrator:
@@ -28,9 +33,9 @@ class SingleBacktestOrchestrator:
         leverage: int = 1,
     ) -> BacktestResult:
         balance = initial_balance
-        trades: List[Dict[str, Any]] = []
+        trades = TradeLedger()
         equity_curve: List[BacktestEquityPoint] = []
-        open_positions: Dict[str, Dict[str, Any]] = {}
+        open_positions: Dict[str, Position] = {}
         pending_opens: List[Any] = []  # intents, будут исполнены на открытии следующей свечи
 
         print(f"\n🚀 ЗАПУСК БЕКТЕСТА (single): {strategy_name}")
@@ -48,8 +53,8 @@ class SingleBacktestOrchestrator:
             current_open = float(md[symbol]['open'].iloc[-1]) if 'open' in md[symbol].columns else current_price
 
             if i % 100 == 0:
-                print(f"⏰ Время: {current_time}, Свеча: {i}/{len(data)}, Баланс: ${balance:,.2f}")
-                print(f"  🔍 Открытые позиции: {len(open_positions)}")
+                trade_log.debug("⏰ Время: %s, Свеча: %d/%d, Баланс: $%.2f, открытых позиций: %d",
+                                current_time, i, len(data), balance, len(open_positions))
 
             # 1) Исполняем отложенные открытия по open текущей свечи
             if pending_opens:
@@ -91,22 +96,20 @@ class SingleBacktestOrchestrator:
                                         take_profit_price = trade_result['price'] * (1.03 if strategy_side == 'long' else 0.97)
                             except Exception:
                                 pass
-                            open_positions[intent.symbol] = {
-                                'deal_id': len(trades),
-                                'entry_price': trade_result['price'],
-                                'entry_time': current_time,
-                                'side': intent.side,
-                                'size': trade_result['size'],
-                                'symbol': intent.symbol,
-                                'leverage': leverage_val,
-                                'entry_size_usd': trade_result.get('size_usd'),
-                                'stop_loss': stop_loss_price,
-                                'take_profit': take_profit_price,
-                                # Инициализируем max_price и min_price для trailing stop
-                                'max_price': trade_result['price'],  # Для LONG позиции
-                                'min_price': trade_result['price'],  # Для SHORT позиции
-                            }
-                            print(f"💰 ОТКРЫТА позиция (отлож.): {intent.side} {intent.symbol} @ ${trade_result['price']:.2f}")
+                            open_positions[intent.symbol] = Position(
+                                intent.symbol,
+                                intent.side,
+                                trade_result['price'],
+                                current_time,
+                                trade_result['size'],
+                                deal_id=len(trades),
+                                size_usd=trade_result.get('size_usd'),
+                                leverage=leverage_val,
+                                stop_loss=stop_loss_price,
+                                take_profit=take_profit_price,
+                            )  # max_price/min_price для трейлинга инициализируются ценой входа
+                            trade_log.debug("💰 ОТКРЫТА позиция (отлож.): %s %s @ $%.2f",
+                                            intent.side, intent.symbol, trade_result['price'])
 
             balance = await self.position_manager.check_and_close_positions_async(
                 open_positions, md, current_time, balance, trades, strategy=strategy
@@ -117,7 +120,7 @@ class SingleBacktestOrchestrator:
                 open_state = build_open_state(open_positions)
                 decision = await strategy.decide(md, template, open_state)
                 if decision and not decision.is_empty():
-                    print(f"🎯 Сигналы стратегии на свече {i}: {decision}")
+                    signal_log.debug("🎯 Сигналы стратегии на свече %d: %s", i, decision)
                     for intent in decision.intents:
                         if intent.symbol != symbol:
                             continue
@@ -161,7 +164,7 @@ class SingleBacktestOrchestrator:
 
         # Закрытие остаточных позиций
         if open_positions:
-            print(f"\n🔚 ЗАКРЫТИЕ ОСТАВШИХСЯ ПОЗИЦИЙ:")
+            trade_log.debug("🔚 ЗАКРЫТИЕ ОСТАВШИХСЯ ПОЗИЦИЙ: %d", len(open_positions))
             last_price = data['close'].iloc[-1]
             for sym, pos in list(open_positions.items()):
                 pnl = self.position_manager.calculate_pnl(pos, last_price)
@@ -191,6 +194,7 @@ class SingleBacktestOrchestrator:
             equity_curve=equity_curve,
             parameters=parameters,
             leverage=leverage,
+            template_id=getattr(template, 'id', None) or 0,
         )
 
 
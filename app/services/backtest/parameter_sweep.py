@@ -0,0 +1,243 @@
+"""
+Parallel parameter sweep: one template, a grid of parameters, market data loaded once
+"""
+import asyncio
+import contextlib
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from schemas.backtest import BacktestSweepResult, BacktestSweepRow
+
+# Metrics copied from BacktestResult into every sweep row
+SWEEP_METRICS = (
+    'final_balance', 'total_pnl', 'total_pnl_pct', 'max_drawdown', 'max_drawdown_pct',
+    'total_trades', 'win_rate', 'profit_factor', 'sharpe_ratio',
+)
+# Metrics where a smaller value ranks higher
+LOWER_IS_BETTER = frozenset(('max_drawdown', 'max_drawdown_pct'))
+
+# Template attributes copied into each candidate (as in run_backtest_task with custom_params)
+_TEMPLATE_FIELDS = (
+    'id', 'template_name', 'description', 'symbol', 'interval', 'leverage',
+    'strategy_config_id', 'user_id',
+)
+
+
+def expand_grid(grid: Dict[str, Iterable[Any]]) -> List[Dict[str, Any]]:
+    """Cartesian product of a parameter grid: {'ema_fast': [5, 10]} -> [{'ema_fast': 5}, ...]"""
+    if not grid:
+        return [{}]
+    names = list(grid)
+    values = [list(grid[name]) for name in names]
+    for name, options in zip(names, values):
+        if not options:
+            raise ValueError(f"Parameter grid has no values for '{name}'")
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def template_with_parameters(template: Any, parameters: Dict[str, Any]) -> SimpleNamespace:
+    """Picklable copy of the template with parameters overridden"""
+    candidate = SimpleNamespace(**{name: getattr(template, name, None) for name in _TEMPLATE_FIELDS})
+    base = getattr(template, 'parameters', None) or {}
+    candidate.parameters = {**dict(base), **parameters}
+    return candidate
+
+
+class SharedMarketData:
+    """
+    Market data published in shared memory for worker processes.
+
+    Each symbol gets one block: the int64 index (ns) followed by every column as
+    a contiguous float64 row. Workers attach by name and build DataFrames over
+    read-only views instead of unpickling their own copies.
+    """
+
+    def __init__(self, market_data: Dict[str, pd.DataFrame]):
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.specs: Dict[str, Dict[str, Any]] = {}
+        try:
+            for symbol, df in market_data.items():
+                self.specs[symbol] = self._publish(df)
+        except Exception:
+            self.close()
+            raise
+
+    def _publish(self, df: pd.DataFrame) -> Dict[str, Any]:
+        if not isinstance(df.index, pd.DatetimeIndex):
+            raise ValueError("Shared market data requires a DatetimeIndex")
+        rows, columns = len(df), [str(c) for c in df.columns]
+        block = shared_memory.SharedMemory(create=True, size=max(8, 8 * rows * (len(columns) + 1)))
+        self._blocks.append(block)
+        index, values = _views(block, rows, len(columns))
+        index[:] = df.index.asi8
+        values[:] = df.to_numpy(dtype=np.float64).T
+        return {
+            'name': block.name, 'rows': rows, 'columns': columns,
+            'tz': str(df.index.tz) if df.index.tz is not None else None,
+            'index_name': df.index.name,
+        }
+
+    @staticmethod
+    def attach(specs: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, pd.DataFrame], List[shared_memory.SharedMemory]]:
+        """DataFrames over the shared blocks; keep the returned handles alive while they are used"""
+        market_data, handles = {}, []
+        for symbol, spec in specs.items():
+            block = shared_memory.SharedMemory(name=spec['name'])
+            handles.append(block)
+            index, values = _views(block, spec['rows'], len(spec['columns']))
+            index.flags.writeable = False
+            values.flags.writeable = False
+            timeline = pd.DatetimeIndex(index.view('M8[ns]'), name=spec['index_name'])
+            if spec['tz']:
+                timeline = timeline.tz_localize('UTC').tz_convert(spec['tz'])
+            # values.T is column-major, so pandas keeps it as a single block without a copy
+            market_data[symbol] = pd.DataFrame(values.T, index=timeline, columns=spec['columns'], copy=False)
+        return market_data, handles
+
+    def close(self) -> None:
+        """Releases and removes the blocks"""
+        for block in self._blocks:
+            block.close()
+            with contextlib.suppress(FileNotFoundError):
+                block.unlink()
+        self._blocks = []
+
+    def __enter__(self) -> 'SharedMarketData':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _views(block: shared_memory.SharedMemory, rows: int, columns: int) -> Tuple[np.ndarray, np.ndarray]:
+    index = np.ndarray((rows,), dtype=np.int64, buffer=block.buf)
+    values = np.ndarray((columns, rows), dtype=np.float64, buffer=block.buf, offset=8 * rows)
+    return index, values
+
+
+# Worker process state, filled once by _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(specs: Dict[str, Dict[str, Any]], strategy_name: str, initial_balance: float,
+                 config: Dict[str, Any], leverage: int) -> None:
+    from services.backtest.universal_backtest_service import UniversalBacktestService
+
+    market_data, handles = SharedMarketData.attach(specs)
+    _worker.update(
+        market_data=market_data, handles=handles, strategy_name=strategy_name,
+        initial_balance=initial_balance, config=config, leverage=leverage,
+        service=UniversalBacktestService(config=config),
+    )
+
+
+def worker_market_data() -> Dict[str, pd.DataFrame]:
+    """Shared market data attached by this pool worker"""
+    return _worker['market_data']
+
+
+def backtest_in_worker(template: SimpleNamespace, market_data: Optional[Dict[str, pd.DataFrame]] = None,
+                       indicator_cache=None, trade_from: Optional[pd.Timestamp] = None) -> Dict[str, Any]:
+    """Runs one backtest in a pool worker (shared data by default); engine logs are discarded"""
+    from services.backtest.universal_backtest_engine import BacktestContext
+    from strategies.strategy_factory import make_strategy
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        strategy = make_strategy(_worker['strategy_name'], template)
+        context = BacktestContext(
+            strategy=strategy,
+            template=template,
+            initial_balance=_worker['initial_balance'],
+            market_data=dict(_worker['market_data'] if market_data is None else market_data),
+            config=dict(_worker['config']),
+            leverage=_worker['leverage'],
+            indicator_cache=indicator_cache,
+            trade_from=trade_from,
+        )
+        result = asyncio.run(_worker['service']._create_engine(context).run())
+    return {name: getattr(result, name) for name in SWEEP_METRICS}
+
+
+def worker_pool(shared: SharedMarketData, workers: int, strategy_name: str, initial_balance: float,
+                config: Dict[str, Any], leverage: int) -> ProcessPoolExecutor:
+    """Process pool whose workers attach to the shared market data once"""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(shared.specs, strategy_name, initial_balance, config or {}, leverage),
+    )
+
+
+class ParameterSweepRunner:
+    """Fans sweep candidates out over a process pool sharing one copy of the market data"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def run(
+        self,
+        strategy_name: str,
+        template: Any,
+        grid: Dict[str, Iterable[Any]],
+        market_data: Dict[str, pd.DataFrame],
+        initial_balance: float = 10000.0,
+        config: Dict[str, Any] = None,
+        leverage: int = 1,
+        rank_by: str = 'total_pnl',
+    ) -> BacktestSweepResult:
+        if rank_by not in SWEEP_METRICS:
+            raise ValueError(f"rank_by must be one of {SWEEP_METRICS}")
+
+        candidates = expand_grid(grid)
+        workers = min(self.max_workers, len(candidates))
+        print(f"🧪 Parameter sweep: {len(candidates)} candidates on {workers} workers")
+
+        started = time.perf_counter()
+        rows: List[Optional[BacktestSweepRow]] = [None] * len(candidates)
+        with SharedMarketData(market_data) as shared, worker_pool(
+            shared, workers, strategy_name, initial_balance, config, leverage
+        ) as executor:
+            futures = {
+                executor.submit(backtest_in_worker, template_with_parameters(template, parameters)): i
+                for i, parameters in enumerate(candidates)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    rows[i] = BacktestSweepRow(parameters=candidates[i], **future.result())
+                except Exception as e:
+                    print(f"⚠️ Sweep candidate {candidates[i]} failed: {e}")
+                    rows[i] = BacktestSweepRow(parameters=candidates[i], error=str(e))
+
+        return BacktestSweepResult(
+            strategy_name=strategy_name,
+            template_id=getattr(template, 'id', None),
+            rank_by=rank_by,
+            workers=workers,
+            elapsed_seconds=time.perf_counter() - started,
+            rows=rank_rows(rows, rank_by),
+        )
+
+
+def rank_rows(rows: List[BacktestSweepRow], rank_by: str) -> List[BacktestSweepRow]:
+    """Sorts rows best-first by rank_by (ties keep grid order) and numbers them; failed candidates go last"""
+    sign = 1.0 if rank_by in LOWER_IS_BETTER else -1.0
+
+    def key(row: BacktestSweepRow):
+        value = getattr(row, rank_by)
+        if row.error is not None or value is None or value != value:
+            return (1, 0.0)
+        return (0, sign * value)
+
+    ranked = sorted(rows, key=key)
+    for position, row in enumerate(ranked, start=1):
+        row.rank = position
+    return ranked
@@ -0,0 +1,215 @@
+"""
+Single-pass portfolio backtest: many strategies on one timeline and one shared balance
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from schemas.backtest import BacktestResult, PortfolioBacktestResult
+from strategies.contracts import MarketData, OrderIntent, Strategy
+from services.backtest.ledger import TradeLedger
+from services.backtest.progress import BacktestProgress
+from services.backtest.universal_backtest_engine import BacktestContext, UniversalBacktestEngine, trade_log
+
+
+class PortfolioStrategy(NamedTuple):
+    """Стратегия портфеля: уникальное имя, реализация Strategy и её шаблон"""
+    name: str
+    strategy: Strategy
+    template: Any
+
+
+class SleeveEngine(UniversalBacktestEngine):
+    """Одна стратегия портфеля.
+
+    Позиции, журнал сделок и кривая эквити свои, баланс общий: портфель передаёт
+    его перед каждой свечой и забирает изменение после. Позиция открывается, только
+    если её покрывает свободная маржа портфеля (баланс минус маржа открытых позиций
+    всех стратегий).
+    """
+
+    def __init__(self, context: BacktestContext, portfolio: 'PortfolioBacktestEngine'):
+        super().__init__(context)
+        self.portfolio = portfolio
+        # Реализованный PnL стратегии за вычетом комиссий
+        self.pnl = 0.0
+
+    def locked_margin(self) -> float:
+        return sum(position.size_usd or 0.0 for position in self.context.open_positions.values())
+
+    def _can_open_position(self, intent: OrderIntent, current_price: float) -> bool:
+        if not super()._can_open_position(intent, current_price):
+            return False
+        size_usd = self._position_size_usd(intent)
+        free_margin = self.context.current_balance - self.portfolio.locked_margin()
+        if size_usd > free_margin:
+            trade_log.debug("⚠️ Portfolio margin exhausted: need $%.2f, free $%.2f", size_usd, free_margin)
+            return False
+        return True
+
+
+class PortfolioBacktestEngine(UniversalBacktestEngine):
+    """Backtests several strategies together in one pass over the timeline.
+
+    The timeline, cursor and indicator cache are built once and shared. Strategies
+    with the same indicator parameters (e.g. the same EMA spans on a symbol) read
+    one precomputed series. Every bar is dispatched to all strategies in the given
+    order and all of them trade one balance: risk_pct sizing follows the portfolio
+    balance, and a position opens only if the portfolio's free margin covers it.
+    The result holds the combined trades and equity and, per strategy, its own
+    trades and PnL curve.
+    """
+
+    def __init__(
+        self,
+        strategies: Sequence[PortfolioStrategy],
+        initial_balance: float,
+        market_data: MarketData,
+        config: Dict[str, Any] = None,
+        leverage: int = 1,
+        sub_bars: Optional[MarketData] = None,
+        progress: Optional[BacktestProgress] = None
+    ):
+        # Контекст портфеля: общий баланс, все сделки и общая кривая; своей стратегии нет
+        super().__init__(BacktestContext(None, None, initial_balance, market_data, config, leverage,
+                                         sub_bars=sub_bars, progress=progress))
+        self.sleeves: Dict[str, SleeveEngine] = {}
+        for item in strategies:
+            if item.name in self.sleeves:
+                raise ValueError(f"Duplicate portfolio strategy name: {item.name}")
+            context = BacktestContext(item.strategy, item.template, initial_balance, market_data,
+                                      self.context.config, leverage, sub_bars=sub_bars)
+            self.sleeves[item.name] = SleeveEngine(context, self)
+
+    def validate_context(self) -> bool:
+        if not self.sleeves:
+            raise ValueError("Portfolio has no strategies")
+        for sleeve in self.sleeves.values():
+            sleeve.validate_context()
+        return True
+
+    def get_required_symbols(self) -> List[str]:
+        symbols: List[str] = []
+        for sleeve in self.sleeves.values():
+            symbols.extend(s for s in sleeve.get_required_symbols() if s not in symbols)
+        return symbols
+
+    def locked_margin(self) -> float:
+        return sum(sleeve.locked_margin() for sleeve in self.sleeves.values())
+
+    async def run(self) -> PortfolioBacktestResult:
+        self.validate_context()
+
+        print("🚀 Starting portfolio backtest")
+        print(f"📊 Strategies: {', '.join(self.sleeves)}")
+        print(f"💰 Initial balance: ${self.context.initial_balance:,.2f}")
+        print(f"📈 Data: {list(self.context.market_data.keys())}")
+
+        self._initialize_backtest()
+
+        try:
+            await self._run_main_loop()
+            self._finalize_backtest()
+        finally:
+            for sleeve in self.sleeves.values():
+                sleeve._bind_indicator_cache(None)
+
+        return self._build_portfolio_result()
+
+    def _initialize_backtest(self):
+        super()._initialize_backtest()
+        # Стратегии работают на общих таймлайне, курсоре и кэше индикаторов
+        for sleeve in self.sleeves.values():
+            sleeve._reset_strategy_state()
+            sleeve.timeline = self.timeline
+            sleeve.cursor = self.cursor
+            sleeve.indicator_cache = self.indicator_cache
+            sleeve.subbar_indexes = self.subbar_indexes
+            sleeve._bind_indicator_cache(self.indicator_cache)
+            sleeve.context.equity_curve.reserve(len(self.timeline) + 1)
+            sleeve.context.equity_curve.append(self.timeline[0], self.context.initial_balance)
+
+    async def _run_main_loop(self, start: int = 0):
+        """Один проход по таймлайну: каждая свеча — всем стратегиям по очереди"""
+        total_steps = len(self.timeline)
+        next_report = self._first_progress_step(start)
+        sleeves = list(self.sleeves.values())
+
+        for i, current_time in enumerate(self.timeline[start:], start):
+            if i >= next_report:
+                next_report = await self._report_progress(i, total_steps, current_time)
+            self.context.current_time = current_time
+
+            self.cursor.seek(i, current_time)
+            current_md = self.cursor.view()
+            for sleeve in sleeves:
+                before = self._lend_balance(sleeve)
+                await sleeve._on_bar(current_md, current_time)
+                self._collect_balance(sleeve, before)
+
+            self._update_equity_curve(current_time)
+
+    def _lend_balance(self, sleeve: SleeveEngine) -> float:
+        balance = self.context.current_balance
+        sleeve.context.current_balance = balance
+        sleeve.context.current_time = self.context.current_time
+        return balance
+
+    def _collect_balance(self, sleeve: SleeveEngine, before: float) -> None:
+        self.context.current_balance = sleeve.context.current_balance
+        sleeve.pnl += self.context.current_balance - before
+
+    def _update_equity_curve(self, current_time):
+        """Общая эквити и по стратегии: начальный баланс плюс её реализованный и открытый PnL"""
+        unrealized_total = 0.0
+        for sleeve in self.sleeves.values():
+            unrealized = sleeve._unrealized_pnl()
+            unrealized_total += unrealized
+            sleeve.context.equity_curve.append(current_time, self.context.initial_balance + sleeve.pnl + unrealized)
+        self.context.equity_curve.append(current_time, self.context.current_balance + unrealized_total)
+
+    def _finalize_backtest(self):
+        for sleeve in self.sleeves.values():
+            before = self._lend_balance(sleeve)
+            sleeve._finalize_backtest()
+            self._collect_balance(sleeve, before)
+
+    def _build_portfolio_result(self) -> PortfolioBacktestResult:
+        strategies = {}
+        for name, sleeve in self.sleeves.items():
+            # Итог стратегии — начальный баланс плюс только её PnL
+            sleeve.context.current_balance = self.context.initial_balance + sleeve.pnl
+            strategies[name] = sleeve._build_result()
+
+        self.context.trades = self._merged_trades()
+        return PortfolioBacktestResult(
+            initial_balance=self.context.initial_balance,
+            final_balance=self.context.current_balance,
+            combined=self._build_result(),
+            strategies=strategies,
+        )
+
+    def _merged_trades(self) -> TradeLedger:
+        """Сделки всех стратегий в порядке событий (открытие или закрытие)"""
+        records = [trade for sleeve in self.sleeves.values() for trade in sleeve.context.trades]
+        records.sort(key=lambda trade: trade.get('exit_time') or trade['entry_time'])
+        ledger = TradeLedger(capacity=len(records))
+        for trade in records:
+            ledger.append(trade)
+        return ledger
+
+    def _build_result(self) -> BacktestResult:
+        """Общий результат портфеля: все сделки, общая кривая эквити"""
+        stats = self._calculate_statistics()
+        return BacktestResult(
+            strategy_name="portfolio",
+            symbol=", ".join(self.get_required_symbols()),
+            template_id=0,  # у портфеля нет своего шаблона
+            start_date=self.timeline[0],
+            end_date=self.timeline[-1],
+            initial_balance=self.context.initial_balance,
+            final_balance=self.context.current_balance,
+            trades=self._format_trades_for_result(),
+            equity_curve=self._equity_points(),
+            parameters={name: sleeve.context.template.parameters or {} for name, sleeve in self.sleeves.items()},
+            leverage=self.context.leverage,
+            **stats
+        )
@@ -1,6 +1,13 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Union
+
+from services.backtest.intrabar import SUBBAR_MODE, SubBarIndex, resolve_ambiguous
+from services.backtest.ledger import Position, TradeLedger, as_position
+from utils.hot_log import get_logger
+
+trade_log = get_logger('backtest.trade', max_per_second=50)
+stops_log = get_logger('backtest.stops', max_per_second=50)
 
 
 class PositionManager:
@@ -10,11 +17,19 @@ class PositionManager:
       - 'stopfirst' (по умолчанию): считаем, что сначала сработает стоп-лосс (консервативно)
       - 'tpfirst': считаем, что сначала достигнем тейк-профита (оптимистично)
       - 'mid': выбираем ближайшую к цене открытия текущей свечи цель
+      - 'subbar': проигрываем подсвечи (1m/1s) из subbar_indexes и берём цель, задетую первой;
+        если подсвечей нет или обе цели в одной подсвече — как 'stopfirst'
     """
 
-    def __init__(self, fee_rate: float = 0.0004, intrabar_mode: str = 'stopfirst') -> None:
+    def __init__(
+        self,
+        fee_rate: float = 0.0004,
+        intrabar_mode: str = 'stopfirst',
+        subbar_indexes: Optional[Dict[str, SubBarIndex]] = None,
+    ) -> None:
         self.fee_rate = fee_rate
         self.intrabar_mode = intrabar_mode
+        self.subbar_indexes = subbar_indexes or {}
 
     def calculate_pnl(self, position: Dict[str, Any], current_price: float) -> float:
         entry_price = position['entry_price']
@@ -38,7 +53,7 @@ class PositionManager:
             return (current_price - entry_price) / entry_price * leverage
         return (entry_price - current_price) / entry_price * leverage
 
-    def check_close_conditions(self, position: Dict[str, Any], ohlc: Dict[str, float], current_time) -> Tuple[bool, str, float]:
+    def check_close_conditions(self, position: Dict[str, Any], ohlc: Dict[str, float], current_time, symbol: Optional[str] = None) -> Tuple[bool, str, float]:
         """
         Проверяет условия закрытия позиции по OHLC свечи
         Возвращает (нужно_закрыть, причина, цена_выхода)
@@ -83,6 +98,11 @@ class PositionManager:
                     if cand:
                         cand.sort(key=lambda x: x[2])
                         return True, cand[0][0], cand[0][1]
+                if self.intrabar_mode == SUBBAR_MODE and sl_price is not None and tp_price is not None:
+                    reason, price = resolve_ambiguous(
+                        self.subbar_indexes.get(symbol or position.get('symbol')), current_time, side, sl_price, tp_price
+                    )
+                    return True, reason, price
                 # default stopfirst
                 return True, 'stop_loss', sl_price if sl_price is not None else close_price
             if sl_hit:
@@ -96,17 +116,17 @@ class PositionManager:
 
     async def check_and_close_positions_async(
         self,
-        open_positions: Dict[str, Dict[str, Any]],
+        open_positions: Dict[str, Position],
         market_data: Dict[str, Any],
         current_time,
         balance: float,
-        trades: List[Dict[str, Any]],
+        trades: Union[TradeLedger, List[Dict[str, Any]]],
         strategy=None
     ) -> float:
         if not open_positions:
             return balance
 
-        positions_to_close: List[Tuple[str, Dict[str, Any], str, float]] = []
+        positions_to_close: List[Tuple[str, Position, str, float]] = []
         for symbol, position in open_positions.items():
             if symbol not in market_data:
                 continue
@@ -133,15 +153,8 @@ class PositionManager:
                 # Рассчитываем трейлинг-стоп через стратегию, если доступно
                 if strategy and hasattr(strategy, 'calculate_trailing_stop_price'):
                     try:
-                        # Создаем адаптер позиции для совместимости с BaseStrategy
-                        class PositionAdapter:
-                            def __init__(self, position_dict):
-                                self.entry_price = position_dict['entry_price']
-                                self.side = position_dict['side']
-                                self.max_price = position_dict.get('max_price', position_dict['entry_price'])
-                                self.min_price = position_dict.get('min_price', position_dict['entry_price'])
-
-                        position_adapter = PositionAdapter(position)
+                        # Position сама подходит как deal для BaseStrategy
+                        position_adapter = as_position(position, symbol)
 
                         # Проверяем, нужно ли обновлять trailing stop
                         if hasattr(strategy, 'legacy') and hasattr(strategy.legacy, 'should_update_trailing_stop'):
@@ -187,16 +200,16 @@ class PositionManager:
                             # Обновляем фактический стоп-лосс уровнем трейлинга
                             position['stop_loss'] = new_stop
                     except Exception as e:
-                        print(f"⚠️  Ошибка обновления trailing stop: {e}")
+                        stops_log.warning("⚠️  Ошибка обновления trailing stop: %s", e)
                         pass
             except Exception:
                 pass
 
-            should_close, reason, exit_price = self.check_close_conditions(position, ohlc, current_time)
+            should_close, reason, exit_price = self.check_close_conditions(position, ohlc, current_time, symbol)
             if should_close:
                 if reason in ('stop_loss', 'take_profit'):
                     try:
-                        print(f"[BT-{reason.upper()}] {symbol} at {exit_price:.2f} side={position.get('side')} sl={position.get('stop_loss')} tp={position.get('take_profit')} H/L={ohlc['high']}/{ohlc['low']} t={current_time}")
+                        trade_log.debug("[BT-%s] %s at %.2f side=%s sl=%s tp=%s H/L=%s/%s t=%s", reason.upper(), symbol, exit_price, position.get('side'), position.get('stop_loss'), position.get('take_profit'), ohlc['high'], ohlc['low'], current_time)
                     except Exception:
                         pass
                 positions_to_close.append((symbol, position, reason, exit_price))
@@ -231,11 +244,11 @@ class PositionManager:
 
     def check_and_close_positions_sync(
         self,
-        open_positions: Dict[str, Dict[str, Any]],
+        open_positions: Dict[str, Position],
         market_data: Dict[str, Any],
         current_time,
         balance: float,
-        trades: List[Dict[str, Any]],
+        trades: Union[TradeLedger, List[Dict[str, Any]]],
         strategy=None
     ) -> float:
         # Переиспользуем асинхронную логику без await
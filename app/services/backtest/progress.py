@@ -0,0 +1,135 @@
+"""
+Backtest progress publishing over Redis pub/sub and cooperative cancellation
+"""
+import json
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from utils.redis_client import redis_from_env
+
+# Шаг проверки в главном цикле: раз в столько свечей — один GET флага отмены
+PROGRESS_EVERY = 1000
+# Не чаще одного сообщения о прогрессе в секунду
+PUBLISH_INTERVAL_SECONDS = 1.0
+STATE_TTL_SECONDS = 86_400
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+CHANNEL_PREFIX = 'backtest:progress:'
+CANCEL_PREFIX = 'backtest:cancel:'
+
+
+class BacktestCancelled(Exception):
+    """Raised from the engine loop when the task's cancel flag is set"""
+
+
+class BacktestProgress:
+    """Progress of one backtest task: throttled pub/sub updates and the cancel flag.
+
+    Engines call update() every `every` bars. Each call reads the cancel flag (one
+    GET, so a cancelled run stops within `every` bars) and publishes
+    {status, done, total, percent, eta_seconds, equity, current_time} at most once
+    per min_interval. The latest message is also kept under the channel name, so
+    a page subscribing mid-run starts from the current state. Without Redis every
+    call is a no-op.
+    """
+
+    def __init__(self, task_id: str, redis=None, every: int = PROGRESS_EVERY,
+                 min_interval: float = PUBLISH_INTERVAL_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.task_id = task_id
+        self.redis = redis
+        self.every = every
+        self.min_interval = min_interval
+        self.clock = clock
+        self.started = clock()
+        self.last_published: Optional[float] = None
+
+    @classmethod
+    def from_env(cls, task_id: str, **kwargs) -> 'BacktestProgress':
+        return cls(task_id, redis_from_env(), **kwargs)
+
+    @property
+    def channel(self) -> str:
+        return CHANNEL_PREFIX + self.task_id
+
+    async def check_cancelled(self) -> None:
+        if self.redis is None:
+            return
+        try:
+            cancelled = await self.redis.exists(CANCEL_PREFIX + self.task_id)
+        except Exception as e:
+            print(f"⚠️ Cancel flag unavailable: {e}")
+            return
+        if cancelled:
+            raise BacktestCancelled(f"Backtest {self.task_id} cancelled")
+
+    async def update(self, done: int, total: int, current_time: Any = None, equity: Optional[float] = None) -> None:
+        if self.redis is None:
+            return
+        await self.check_cancelled()
+        now = self.clock()
+        if self.last_published is not None and now - self.last_published < self.min_interval:
+            return
+        self.last_published = now
+        elapsed = now - self.started
+        await self.publish({
+            'status': 'running',
+            'done': done,
+            'total': total,
+            'percent': round(done / total * 100.0, 2) if total else 0.0,
+            'eta_seconds': round(elapsed / done * (total - done), 1) if done else None,
+            'equity': equity,
+            'current_time': current_time.isoformat() if hasattr(current_time, 'isoformat') else current_time,
+        })
+
+    async def finish(self, status: str, **extra: Any) -> None:
+        """Финальное сообщение: completed / failed / cancelled"""
+        await self.publish({'status': status, **extra})
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        if self.redis is None:
+            return
+        payload = json.dumps(message, default=str)
+        try:
+            await self.redis.set(self.channel, payload, ex=STATE_TTL_SECONDS)
+            await self.redis.publish(self.channel, payload)
+        except Exception as e:
+            print(f"⚠️ Failed to publish backtest progress: {e}")
+
+    async def close(self) -> None:
+        if self.redis is not None:
+            await self.redis.aclose()
+
+
+async def request_cancel(redis, task_id: str) -> None:
+    """Ставит флаг отмены; задача увидит его при следующей проверке"""
+    await redis.set(CANCEL_PREFIX + task_id, '1', ex=STATE_TTL_SECONDS)
+
+
+async def progress_events(redis, task_id: str, keepalive_seconds: float = 15.0) -> AsyncIterator[str]:
+    """
+    Server-sent events of a task's progress: the latest known state first, then
+    every published update until a terminal status. A comment line is sent when
+    nothing arrives for keepalive_seconds so proxies keep the connection open.
+    """
+    channel = CHANNEL_PREFIX + task_id
+    pubsub = redis.pubsub()
+    # Подписка до чтения последнего состояния: сообщение между ними не потеряется
+    await pubsub.subscribe(channel)
+    try:
+        last = await redis.get(channel)
+        if last:
+            yield f"data: {last}\n\n"
+            if json.loads(last).get('status') in TERMINAL_STATUSES:
+                return
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=keepalive_seconds)
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            data = message['data']
+            yield f"data: {data}\n\n"
+            if json.loads(data).get('status') in TERMINAL_STATUSES:
+                return
+    finally:
+        await pubsub.unsubscribe(channel)
+        await pubsub.aclose()
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Union
 from schemas.backtest import BacktestResult
+from services.backtest.ledger import TradeLedger
 
 
 class ResultBuilder:
@@ -16,15 +17,19 @@ class ResultBuilder:
         end_date,
         initial_balance: float,
         final_balance: float,
-        trades: List[Dict[str, Any]],
+        trades: Union[TradeLedger, List[Dict[str, Any]]],
         equity_curve: List[Any],
         parameters: Dict[str, Any],
         leverage: int = 1,
+        template_id: int = 0,
     ) -> BacktestResult:
+        if isinstance(trades, TradeLedger):
+            trades = trades.records()
         stats = self.stats_service.calculate_statistics(trades, equity_curve, initial_balance)
         return BacktestResult(
             strategy_name=strategy_name,
             symbol=symbol,
+            template_id=template_id,
             start_date=start_date,
             end_date=end_date,
             initial_balance=initial_balance,
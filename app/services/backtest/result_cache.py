@@ -0,0 +1,154 @@
+"""
+Content-addressed backtest result keys and collapsing of identical in-flight runs
+"""
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional, Union
+
+import pandas as pd
+
+from services.backtest.candle_store import DATA_VERSION
+from services.backtest.kline_downloader import INTERVAL_MS
+from utils.redis_client import redis_from_env
+from services.backtest.universal_backtest_engine import ENGINE_VERSION
+
+# Дольше любого бэктеста: ключ переживает только упавший без release воркер
+LOCK_TTL_SECONDS = 6 * 3600
+LOCK_PREFIX = 'backtest:inflight:'
+
+# Снять блокировку, только если она всё ещё наша
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def data_version(interval: str, start_date: Union[str, pd.Timestamp], end_date: Union[str, pd.Timestamp],
+                 now: Optional[pd.Timestamp] = None) -> str:
+    """
+    Version of the candles a download-mode run reads.
+
+    Closed exchange candles never change, so a range fully in the past is always
+    the same data. A range reaching into the present is cut at the last closed
+    candle and the version moves with it, so such runs only hit the cache until
+    the next candle closes.
+    """
+    step_ms = INTERVAL_MS.get(interval, INTERVAL_MS['1m'])
+    # Дата окончания включительно, до конца дня, как при загрузке свечей
+    end_ms = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).value // 1_000_000
+    now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+    if now.tz is not None:
+        now = now.tz_convert('UTC').tz_localize(None)
+    closed_ms = now.value // 1_000_000 // step_ms * step_ms
+    return f"{DATA_VERSION}:{min(end_ms, closed_ms)}"
+
+
+def backtest_cache_key(
+    strategy_id: str,
+    parameters: Dict[str, Any],
+    symbols: Iterable[str],
+    interval: str,
+    start_date: str,
+    end_date: str,
+    initial_balance: float,
+    leverage: int,
+    config: Optional[Dict[str, Any]] = None,
+    now: Optional[pd.Timestamp] = None,
+) -> str:
+    """
+    sha256 of everything that determines a run's result: strategy, effective
+    parameters, symbols, interval, date range, balance, leverage, fee/slippage
+    config, data version and ENGINE_VERSION. Numbers are normalized, so the form's
+    "12" and a template's 12 give the same key.
+    """
+    payload = {
+        'strategy': strategy_id,
+        'parameters': _canonical(parameters or {}),
+        'symbols': [str(s).upper() for s in symbols],
+        'interval': interval,
+        'start': pd.Timestamp(start_date).isoformat(),
+        'end': pd.Timestamp(end_date).isoformat(),
+        'initial_balance': float(initial_balance),
+        'leverage': int(leverage or 1),
+        'config': _canonical(config or {}),
+        'data': data_version(interval, start_date, end_date, now),
+        'engine': ENGINE_VERSION,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class InFlightRuns:
+    """Redis lock per cache key: the first task of identical runs simulates, the rest wait for it.
+
+    Without Redis (no REDIS_URL or the server unreachable) every task runs on its
+    own; only the stored-result cache applies.
+    """
+
+    def __init__(self, redis=None, ttl: int = LOCK_TTL_SECONDS, poll_seconds: float = 2.0):
+        self.redis = redis
+        self.ttl = ttl
+        self.poll_seconds = poll_seconds
+
+    @classmethod
+    def from_env(cls) -> 'InFlightRuns':
+        return cls(redis_from_env())
+
+    async def claim(self, key: str, task_id: str) -> str:
+        """Id of the task running this key: task_id if the claim succeeded"""
+        if self.redis is None:
+            return task_id
+        try:
+            if await self.redis.set(LOCK_PREFIX + key, task_id, nx=True, ex=self.ttl):
+                return task_id
+            return await self.redis.get(LOCK_PREFIX + key) or task_id
+        except Exception as e:
+            print(f"⚠️ In-flight lock unavailable, running without it: {e}")
+            return task_id
+
+    async def wait(self, key: str, timeout: Optional[float] = None) -> bool:
+        """Ждёт, пока ключ освободится; False — по таймауту"""
+        if self.redis is None:
+            return True
+        deadline = asyncio.get_running_loop().time() + (timeout if timeout is not None else self.ttl)
+        try:
+            while await self.redis.exists(LOCK_PREFIX + key):
+                if asyncio.get_running_loop().time() >= deadline:
+                    return False
+                await asyncio.sleep(self.poll_seconds)
+        except Exception as e:
+            print(f"⚠️ In-flight lock unavailable while waiting: {e}")
+        return True
+
+    async def release(self, key: str, task_id: str) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.eval(_RELEASE_SCRIPT, 1, LOCK_PREFIX + key, task_id)
+        except Exception as e:
+            print(f"⚠️ Failed to release in-flight lock {key}: {e}")
+
+    async def close(self) -> None:
+        if self.redis is not None:
+            await self.redis.aclose()
+
+
+def _canonical(value: Any) -> Any:
+    """Числа (и строки-числа из формы) — float; словари и списки — рекурсивно"""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return str(value)
@@ -1,104 +1,75 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any
-from math import sqrt
+from collections.abc import Mapping
+from operator import attrgetter, itemgetter
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from services.backtest.metrics import backtest_metrics, equity_metrics
 
 
 class BacktestStatisticsService:
-    """Сервис расчёта ключевых метрик бектеста."""
+    """Сервис расчёта ключевых метрик бектеста.
+
+    Считает через services.backtest.metrics (numpy), как и движки. Проценты — доли,
+    Шарп годовой по шагу кривой (без времени точек — на точку).
+    """
 
     def calculate_statistics(
         self,
         trades: List[Dict[str, Any]],
         equity_curve: List[Any],
         initial_balance: float
-    ) -> Dict[str, float]:
+    ) -> Dict[str, Any]:
         if not equity_curve:
             return self._empty_stats()
 
-        final_balance = equity_curve[-1].balance if hasattr(equity_curve[-1], 'balance') else equity_curve[-1]['balance']
-        total_pnl = final_balance - initial_balance
-        total_pnl_pct = (final_balance / initial_balance - 1.0) if initial_balance else 0.0
-
-        # Win/Loss
-        wins = 0
-        losses = 0
-        win_amounts: List[float] = []
-        loss_amounts: List[float] = []
-        for t in trades:
-            pnl = t.get('pnl', 0.0)
-            if pnl > 0:
-                wins += 1
-                win_amounts.append(pnl)
-            elif pnl < 0:
-                losses += 1
-                loss_amounts.append(abs(pnl))
-
-        total_trades = len(trades)
-        win_rate = (wins / total_trades * 100.0) if total_trades else 0.0
-
-        avg_win = (sum(win_amounts) / len(win_amounts)) if win_amounts else 0.0
-        avg_loss = (sum(loss_amounts) / len(loss_amounts)) if loss_amounts else 0.0
-
-        profit_factor = (sum(win_amounts) / sum(loss_amounts)) if loss_amounts else (sum(win_amounts) if win_amounts else 0.0)
+        balances = _column(equity_curve, 'balance', np.float64)
+        times_ns = None
+        if _has_field(equity_curve[0], 'timestamp'):
+            times_ns = pd.DatetimeIndex(_column(equity_curve, 'timestamp', object)).as_unit('ns').asi8
+        pnl = np.fromiter((t.get('pnl', 0.0) or 0.0 for t in trades), dtype=np.float64, count=len(trades))
+        return self.calculate_statistics_from_arrays(pnl, balances, initial_balance, times_ns)
 
-        # Max drawdown
-        max_dd, max_dd_pct = self._calculate_max_drawdown(equity_curve)
-
-        # Sharpe
-        sharpe = self._calculate_sharpe(equity_curve)
+    def calculate_statistics_from_arrays(
+        self,
+        trade_pnl: np.ndarray,
+        balances: np.ndarray,
+        initial_balance: float,
+        times_ns: Optional[np.ndarray] = None
+    ) -> Dict[str, Any]:
+        """Те же метрики по массивам: PnL закрытых сделок и баланс в каждой точке кривой.
+
+        Для пакетной оценки параметров, где кривая не превращается в список точек.
+        """
+        balances = np.asarray(balances, dtype=np.float64)
+        if not len(balances):
+            return self._empty_stats()
 
+        metrics = backtest_metrics(balances, times_ns, trade_pnl=trade_pnl)
+        final_balance = float(balances[-1])
         return {
-            'total_pnl': total_pnl,
-            'total_pnl_pct': total_pnl_pct,
-            'max_drawdown': max_dd,
-            'max_drawdown_pct': max_dd_pct,
-            'winning_trades': wins,
-            'losing_trades': losses,
-            'win_rate': win_rate,
-            'avg_win': avg_win,
-            'avg_loss': avg_loss,
-            'profit_factor': profit_factor,
-            'sharpe_ratio': sharpe,
+            'total_pnl': final_balance - initial_balance,
+            'total_pnl_pct': (final_balance / initial_balance - 1.0) if initial_balance else 0.0,
+            'max_drawdown': metrics['max_drawdown'],
+            'max_drawdown_pct': metrics['max_drawdown_pct'],
+            'winning_trades': metrics['winning_trades'],
+            'losing_trades': metrics['losing_trades'],
+            'win_rate': metrics['win_rate'],
+            'avg_win': metrics['avg_win'],
+            'avg_loss': metrics['avg_loss'],
+            'profit_factor': metrics['profit_factor'],
+            'sharpe_ratio': metrics['sharpe_ratio'],
+            'metrics': metrics,
         }
 
     def _calculate_max_drawdown(self, equity_curve: List[Any]) -> tuple[float, float]:
-        peak = None
-        max_drawdown = 0.0
-        max_drawdown_pct = 0.0
-        for pt in equity_curve:
-            bal = pt.balance if hasattr(pt, 'balance') else pt['balance']
-            if peak is None or bal > peak:
-                peak = bal
-            if peak and bal < peak:
-                dd = peak - bal
-                dd_pct = dd / peak
-                if dd > max_drawdown:
-                    max_drawdown = dd
-                if dd_pct > max_drawdown_pct:
-                    max_drawdown_pct = dd_pct
-        return max_drawdown, max_drawdown_pct
-
-    def _calculate_sharpe(self, equity_curve: List[Any]) -> float:
-        returns: List[float] = []
-        prev = None
-        for pt in equity_curve:
-            bal = pt.balance if hasattr(pt, 'balance') else pt['balance']
-            if prev is not None and prev:
-                returns.append((bal - prev) / prev)
-            prev = bal
-
-        if not returns:
-            return 0.0
-
-        mean_r = sum(returns) / len(returns)
-        variance = sum((r - mean_r) ** 2 for r in returns) / len(returns)
-        std = sqrt(variance) if variance > 0 else 0.0
-        if std == 0:
-            return 0.0
-        return mean_r / std
-
-    def _empty_stats(self) -> Dict[str, float]:
+        metrics = equity_metrics(_column(equity_curve, 'balance', np.float64))
+        return metrics['max_drawdown'], metrics['max_drawdown_pct']
+
+    def _empty_stats(self) -> Dict[str, Any]:
         return {
             'total_pnl': 0.0,
             'total_pnl_pct': 0.0,
@@ -114,3 +85,11 @@ class BacktestStatisticsService:
         }
 
 
+def _has_field(point: Any, name: str) -> bool:
+    return name in point if isinstance(point, Mapping) else hasattr(point, name)
+
+
+def _column(equity_curve: List[Any], name: str, dtype) -> np.ndarray:
+    """Поле всех точек кривой (BacktestEquityPoint или словари) одним массивом"""
+    getter = itemgetter(name) if isinstance(equity_curve[0], Mapping) else attrgetter(name)
+    return np.fromiter(map(getter, equity_curve), dtype=dtype, count=len(equity_curve))
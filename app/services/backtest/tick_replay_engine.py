@@ -0,0 +1,196 @@
+"""
+Event-driven backtest engine replaying stored trades (aggTrades/ticks)
+"""
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from schemas.backtest import BacktestResult
+from services.backtest.kline_downloader import INTERVAL_MS
+from services.backtest.ledger import Position
+from services.backtest.trade_tape import DEFAULT_CHUNK, TradeCursor, TradeTape, trades_to_candles
+from services.backtest.universal_backtest_engine import UniversalBacktestEngine, BacktestContext, stops_log
+
+
+class StopReplay(NamedTuple):
+    index: int              # номер сделки, закрывшей позицию, или -1
+    reason: str
+    exit_price: float
+    stop_loss: Optional[float]
+    extreme: float          # max (лонг) / min (шорт) цены с момента входа
+
+
+def replay_stops(prices: np.ndarray, side: str, stop_loss: Optional[float], take_profit: Optional[float],
+                 trailing_pct: Optional[float], extreme: float) -> StopReplay:
+    """
+    Walks a window of trade prices against a position's stops.
+
+    With trailing_pct the stop follows the best price seen so far (never loosening);
+    each trade is checked against the stop set by the trades before and including it.
+    A stop fills at the trade price that crossed it, a take-profit at its level.
+    """
+    is_long = side == 'BUY'
+    if is_long:
+        running = np.maximum(np.maximum.accumulate(prices), extreme)
+    else:
+        running = np.minimum(np.minimum.accumulate(prices), extreme)
+
+    stops = stop_loss
+    if trailing_pct:
+        trail = running * (1 - trailing_pct) if is_long else running * (1 + trailing_pct)
+        if stop_loss is None:
+            stops = trail
+        else:
+            stops = np.maximum(trail, stop_loss) if is_long else np.minimum(trail, stop_loss)
+
+    size = len(prices)
+    first_sl = first_tp = size
+    if stops is not None:
+        hits = prices <= stops if is_long else prices >= stops
+        if hits.any():
+            first_sl = int(hits.argmax())
+    if take_profit is not None:
+        hits = prices >= take_profit if is_long else prices <= take_profit
+        if hits.any():
+            first_tp = int(hits.argmax())
+
+    if first_sl < size and first_sl <= first_tp:
+        stop_after = float(stops[first_sl]) if isinstance(stops, np.ndarray) else stop_loss
+        return StopReplay(first_sl, 'stop_loss', float(prices[first_sl]), stop_after, float(running[first_sl]))
+    if first_tp < size:
+        stop_after = float(stops[first_tp]) if isinstance(stops, np.ndarray) else stop_loss
+        return StopReplay(first_tp, 'take_profit', float(take_profit), stop_after, float(running[first_tp]))
+    stop_after = float(stops[-1]) if isinstance(stops, np.ndarray) else stop_loss
+    return StopReplay(-1, '', float(prices[-1]), stop_after, float(running[-1]))
+
+
+class TickReplayEngine(UniversalBacktestEngine):
+    """Replays trades from a TradeTape through the Strategy.decide contract.
+
+    Candles of the given interval are built from the same trades (one streaming
+    pass) and the strategy decides on every candle close, exactly as in the loop
+    engine; entries fill at the candle close. Between closes every trade of the
+    candle is checked against the open position's SL/TP and trailing stop, so a
+    0.3% trailing stop reacts to the path inside the candle instead of its
+    high/low. Trades are read in chunks from memory maps: memory stays bounded by
+    chunk_size plus the candle frames, whatever the number of trades.
+
+    The trailing distance is config['trailing_stop_pct'] or the strategy's
+    trailing_stop_pct; without either only the fixed SL/TP are replayed.
+    """
+
+    def __init__(self, context: BacktestContext, tape: Optional[TradeTape] = None, interval: str = '1m',
+                 start=None, end=None, chunk_size: int = DEFAULT_CHUNK):
+        super().__init__(context)
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"Unsupported interval: {interval}")
+        self.tape = tape or TradeTape()
+        self.interval = interval
+        self.start = start
+        self.end = end
+        self.chunk_size = chunk_size
+        self.trade_cursors: Dict[str, TradeCursor] = {}
+        self.trades_replayed = 0
+        self.trailing_pct: Optional[float] = None
+
+    def validate_context(self) -> bool:
+        if not self.context.strategy:
+            raise ValueError("Strategy not defined")
+        for symbol in self.get_required_symbols():
+            if not self.tape.segments(symbol):
+                raise ValueError(f"No stored trades for symbol {symbol}")
+        return True
+
+    async def run(self) -> BacktestResult:
+        self.validate_context()
+
+        print("🚀 Starting tick replay backtest")
+        print(f"📊 Strategy: {self.context.strategy.id}")
+        print(f"💰 Initial balance: ${self.context.initial_balance:,.2f}")
+
+        step_ms = INTERVAL_MS[self.interval]
+        for symbol in self.get_required_symbols():
+            chunks = self.tape.iter_chunks(symbol, self.start, self.end, self.chunk_size)
+            self.context.market_data[symbol] = trades_to_candles(chunks, step_ms)
+            print(f"📈 Data: {symbol} {len(self.context.market_data[symbol])} {self.interval} candles from trades")
+
+        self._initialize_backtest()
+        start = self._resume()
+        self.trailing_pct = self._trailing_pct()
+        # После чекпойнта сделки читаются с закрытия последней просимулированной свечи
+        trades_from = self.start
+        if start:
+            trades_from = pd.Timestamp(int(self.timeline.asi8[start - 1]) + step_ms * 1_000_000)
+        self.trade_cursors = {
+            symbol: TradeCursor(self.tape.iter_chunks(symbol, trades_from, self.end, self.chunk_size))
+            for symbol in self.get_required_symbols()
+        }
+
+        try:
+            await self._run_main_loop(start)
+            self._save_checkpoint(len(self.timeline))
+            self._finalize_backtest()
+        finally:
+            self._bind_indicator_cache(None)
+
+        print(f"✅ Replayed {self.trades_replayed} trades against open positions")
+        return self._build_result()
+
+    async def _run_main_loop(self, start: int = 0):
+        """Сделки свечи проверяются по стопам до её закрытия, решение стратегии — на закрытии"""
+        step_ns = INTERVAL_MS[self.interval] * 1_000_000
+        timeline_keys = self.timeline.asi8
+        total_steps = len(self.timeline)
+        next_report = self._first_progress_step(start)
+        next_checkpoint = self._first_checkpoint_step(start)
+
+        for i, current_time in enumerate(self.timeline[start:], start):
+            if i >= next_report:
+                next_report = await self._report_progress(i, total_steps, current_time)
+            if i >= next_checkpoint:
+                next_checkpoint = self._save_checkpoint(i)
+            close_key = int(timeline_keys[i]) + step_ns
+            for symbol, trade_cursor in self.trade_cursors.items():
+                timestamps, prices = trade_cursor.take_until(close_key)
+                position = self.context.open_positions.get(symbol)
+                if position is not None and len(prices):
+                    self._replay_position(symbol, position, timestamps, prices)
+
+            self.context.current_time = current_time
+            self.cursor.seek(i, current_time)
+            current_md = self.cursor.view()
+
+            decision = await self.context.strategy.decide(current_md, self.context.template, self._build_open_state())
+            if decision and not decision.is_empty():
+                await self._execute_decision(decision, current_md, current_time)
+
+            self._update_equity_curve(current_time)
+
+    def _replay_position(self, symbol: str, position: Position, timestamps: np.ndarray, prices: np.ndarray):
+        self.trades_replayed += len(prices)
+        is_long = position.side == 'BUY'
+        extreme = (position.max_price if is_long else position.min_price) or position.entry_price
+        result = replay_stops(prices, position.side, position.stop_loss, position.take_profit,
+                              self.trailing_pct, extreme)
+
+        if is_long:
+            position.max_price = result.extreme
+        else:
+            position.min_price = result.extreme
+        if result.stop_loss is not None and result.stop_loss != position.stop_loss:
+            stops_log.debug("📈 [TICKS] Trailing stop %s: %s -> %.4f", symbol, position.stop_loss, result.stop_loss)
+            position.stop_loss = result.stop_loss
+
+        if result.index >= 0:
+            exit_time = pd.Timestamp(int(timestamps[result.index]), tz=self.timeline.tz)
+            self._close_position(symbol, position, result.exit_price, exit_time, result.reason)
+
+    def _trailing_pct(self) -> Optional[float]:
+        pct = self.context.config.get('trailing_stop_pct')
+        if pct is None:
+            strategy = self.context.strategy
+            for attr in ('strategy', 'legacy'):
+                strategy = getattr(strategy, attr, None) or strategy
+            pct = getattr(strategy, 'trailing_stop_pct', None)
+        return float(pct) if pct else None
@@ -0,0 +1,166 @@
+"""
+Local aggTrade/tick storage for replay backtests, streamed in memory-mapped chunks
+"""
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from services.backtest.candle_store import COLUMNS, TimeLike, _save_atomic, _to_ms, resample_ohlcv
+
+TRADE_COLUMNS = ('timestamp', 'price', 'qty')
+DEFAULT_CHUNK = 1_000_000
+
+DEFAULT_ROOT = Path(__file__).resolve().parents[3] / 'data' / 'trades'
+ENV_ROOT = 'TRADE_TAPE_DIR'
+
+# Колонки CSV aggTrades из архивов data.binance.vision (старые файлы без заголовка)
+AGG_TRADE_COLUMNS = ('agg_trade_id', 'price', 'quantity', 'first_trade_id', 'last_trade_id',
+                     'transact_time', 'is_buyer_maker')
+
+
+class TradeChunk(NamedTuple):
+    timestamp: np.ndarray  # int64 ns
+    price: np.ndarray
+    qty: np.ndarray
+
+
+class TradeTape:
+    """
+    Trades on disk, one directory per symbol split into immutable segments.
+
+    A segment is a directory of .npy columns (timestamp as int64 ns, price and qty
+    as float64) named after its first timestamp; segments of a symbol follow each
+    other in time. iter_chunks() maps the segments and yields slices of at most
+    chunk_size trades, so a replay over tens of millions of trades only keeps the
+    pages it is reading in memory.
+    """
+
+    def __init__(self, root: Union[str, Path, None] = None):
+        self.root = Path(root or os.environ.get(ENV_ROOT) or DEFAULT_ROOT)
+
+    def segments(self, symbol: str) -> List[Path]:
+        path = self.root / symbol.upper()
+        if not path.exists():
+            return []
+        return sorted(p for p in path.iterdir() if p.is_dir() and (p / 'timestamp.npy').exists())
+
+    def append(self, symbol: str, timestamp_ms: np.ndarray, price: np.ndarray, qty: np.ndarray) -> int:
+        """Stores trades after the ones already on the tape; returns the number written"""
+        timestamps = np.asarray(timestamp_ms, dtype=np.int64) * 1_000_000
+        if not len(timestamps):
+            return 0
+        order = np.argsort(timestamps, kind='stable')
+        columns = {
+            'timestamp': timestamps[order],
+            'price': np.asarray(price, dtype=np.float64)[order],
+            'qty': np.asarray(qty, dtype=np.float64)[order],
+        }
+        last = self.last_timestamp(symbol)
+        if last is not None and columns['timestamp'][0] < last:
+            raise ValueError(f"Trades for {symbol} must start at or after {pd.Timestamp(last)}")
+
+        target = self.root / symbol.upper() / f"{columns['timestamp'][0]:020d}"
+        if target.exists():
+            target = target.with_name(f"{target.name}-{len(self.segments(symbol))}")
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        tmp.mkdir(parents=True)
+        for name, values in columns.items():
+            _save_atomic(tmp / f'{name}.npy', values)
+        os.rename(tmp, target)
+        return len(timestamps)
+
+    def last_timestamp(self, symbol: str) -> Optional[int]:
+        segments = self.segments(symbol)
+        if not segments:
+            return None
+        timestamps = np.load(segments[-1] / 'timestamp.npy', mmap_mode='r')
+        return int(timestamps[-1]) if len(timestamps) else None
+
+    def iter_chunks(self, symbol: str, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None,
+                    chunk_size: int = DEFAULT_CHUNK) -> Iterator[TradeChunk]:
+        """Trades with time in [start, end) as memory-mapped slices of at most chunk_size rows"""
+        start_ns = None if start is None else _to_ms(start) * 1_000_000
+        end_ns = None if end is None else _to_ms(end) * 1_000_000
+        for segment in self.segments(symbol):
+            columns = {name: np.load(segment / f'{name}.npy', mmap_mode='r') for name in TRADE_COLUMNS}
+            timestamps = columns['timestamp']
+            if not len(timestamps):
+                continue
+            if end_ns is not None and timestamps[0] >= end_ns:
+                break
+            first = 0 if start_ns is None else int(np.searchsorted(timestamps, start_ns, side='left'))
+            last = len(timestamps) if end_ns is None else int(np.searchsorted(timestamps, end_ns, side='left'))
+            for offset in range(first, last, chunk_size):
+                stop = min(offset + chunk_size, last)
+                yield TradeChunk(*(columns[name][offset:stop] for name in TRADE_COLUMNS))
+
+    def import_agg_trades_csv(self, file_path: Union[str, Path], symbol: str, chunk_size: int = DEFAULT_CHUNK) -> int:
+        """Loads a Binance aggTrades CSV (with or without a header) chunk by chunk"""
+        with open(file_path) as handle:
+            has_header = not handle.readline().split(',')[0].strip().isdigit()
+        reader = pd.read_csv(
+            file_path, header=0 if has_header else None, names=AGG_TRADE_COLUMNS,
+            usecols=['price', 'quantity', 'transact_time'], chunksize=chunk_size,
+            dtype={'price': 'float64', 'quantity': 'float64', 'transact_time': 'int64'},
+        )
+        written = 0
+        for frame in reader:
+            written += self.append(symbol, frame['transact_time'].to_numpy(),
+                                   frame['price'].to_numpy(), frame['quantity'].to_numpy())
+        print(f"📥 Trade tape {symbol}: imported {written} trades from {file_path}")
+        return written
+
+
+def trades_to_candles(chunks: Iterator[TradeChunk], step_ms: int) -> pd.DataFrame:
+    """OHLCV candles from a trade stream: each chunk is aggregated, then chunk edges are joined"""
+    parts: List[Dict[str, np.ndarray]] = []
+    for chunk in chunks:
+        price = np.asarray(chunk.price)
+        parts.append(resample_ohlcv({
+            'timestamp': np.asarray(chunk.timestamp), 'open': price, 'high': price,
+            'low': price, 'close': price, 'volume': np.asarray(chunk.qty),
+        }, step_ms))
+    if parts:
+        # Свеча на границе двух чанков собирается повторным проходом по уже агрегированным барам
+        bars = resample_ohlcv({name: np.concatenate([p[name] for p in parts]) for name in ('timestamp',) + COLUMNS},
+                              step_ms)
+    else:
+        bars = resample_ohlcv({'timestamp': np.empty(0, dtype=np.int64)}, step_ms)
+    index = pd.DatetimeIndex(bars.pop('timestamp').view('M8[ns]'), name='timestamp')
+    return pd.DataFrame({name: bars[name] for name in COLUMNS}, index=index)
+
+
+class TradeCursor:
+    """Reads a chunk stream forward in time windows without loading more than one chunk"""
+
+    def __init__(self, chunks: Iterator[TradeChunk]):
+        self._chunks = chunks
+        self._chunk: Optional[TradeChunk] = None
+        self._pos = 0
+
+    def take_until(self, end_ns: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Timestamps and prices of the next trades with time < end_ns"""
+        timestamps, prices = [], []
+        while True:
+            if self._chunk is None:
+                self._chunk = next(self._chunks, None)
+                self._pos = 0
+                if self._chunk is None:
+                    break
+            chunk_ts = self._chunk.timestamp
+            stop = int(np.searchsorted(chunk_ts, end_ns, side='left'))
+            if stop > self._pos:
+                timestamps.append(chunk_ts[self._pos:stop])
+                prices.append(self._chunk.price[self._pos:stop])
+            if stop < len(chunk_ts):
+                self._pos = stop
+                break
+            self._chunk = None
+        if len(timestamps) == 1:
+            return timestamps[0], prices[0]
+        if not timestamps:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(timestamps), np.concatenate(prices)
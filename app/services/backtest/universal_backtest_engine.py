@@ -1,14 +1,78 @@
 """
 Universal backtest engine for any strategies
 """
+import hashlib
+import json
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional, Protocol
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
 from schemas.backtest import BacktestResult, BacktestEquityPoint, BacktestTrade
 from strategies.contracts import Strategy, MarketData, OpenState, Decision, OrderIntent
 from strategies.compensation_strategy import CompensationStrategy
+from services.backtest.market_view import MarketDataCursor, build_timeline
+from services.backtest.indicator_cache import IndicatorCache
+from services.backtest.intrabar import SUBBAR_MODE, SubBarIndex, build_subbar_indexes, resolve_ambiguous
+from services.backtest.ledger import EquityBuffer, Position, TradeLedger
+from services.backtest.metrics import backtest_metrics
+from services.backtest.progress import BacktestProgress
+from services.backtest.checkpoint import CheckpointWriter, decode_checkpoint, encode_checkpoint
+from utils.hot_log import get_logger
+
+# Версия семантики симуляции: повышать при любом изменении, меняющем результаты
+# (исполнение, комиссии, стопы, метрики) — сохранённые результаты перестают совпадать с кэшем
+ENGINE_VERSION = 1
+
+trade_log = get_logger('backtest.trade', max_per_second=50)
+stops_log = get_logger('backtest.stops', max_per_second=50)
+
+
+def result_statistics(metrics: Dict[str, Any], initial_balance: float, final_balance: float) -> Dict[str, Any]:
+    """Статистики BacktestResult из backtest_metrics: доходность в процентах, просадка — от пика"""
+    if not metrics['total_trades']:
+        return {
+            'total_pnl': 0.0,
+            'total_pnl_pct': 0.0,
+            'max_drawdown': 0.0,
+            'max_drawdown_pct': 0.0,
+            'total_trades': 0,
+            'winning_trades': 0,
+            'losing_trades': 0,
+            'win_rate': 0.0,
+            'avg_win': 0.0,
+            'avg_loss': 0.0,
+            'profit_factor': 0.0,
+            'sharpe_ratio': 0.0,
+            'metrics': metrics
+        }
+
+    # Calculate total profitability
+    total_pnl = final_balance - initial_balance
+    total_pnl_pct = (total_pnl / initial_balance) * 100 if initial_balance > 0 else 0.0
+
+    # Max drawdown: процент от пика; max_drawdown_pct — он же относительно начального баланса
+    max_drawdown = max(0.0, metrics['max_drawdown_pct'] * 100)
+    max_drawdown_pct = (max_drawdown / initial_balance) * 100 if initial_balance > 0 else 0.0
+
+    return {
+        'total_pnl': total_pnl,
+        'total_pnl_pct': total_pnl_pct,
+        'max_drawdown': max_drawdown,
+        'max_drawdown_pct': max_drawdown_pct,
+        'total_trades': metrics['total_trades'],
+        'winning_trades': metrics['winning_trades'],
+        'losing_trades': metrics['losing_trades'],
+        'win_rate': metrics['win_rate'],
+        'avg_win': metrics['avg_win'],
+        'avg_loss': metrics['avg_loss'],
+        # Без убытков — 0.0 (а не Infinity) для совместимости с JSON/валидацией
+        'profit_factor': metrics['profit_factor'] if metrics['gross_loss'] > 0 else 0.0,
+        # Годовой Шарп по интервалу свечей
+        'sharpe_ratio': metrics['sharpe_ratio'],
+        'metrics': metrics
+    }
 
 
 class BacktestContext:
@@ -21,7 +85,13 @@ class BacktestContext:
         initial_balance: float,
         market_data: MarketData,
         config: Dict[str, Any] = None,
-        leverage: int = 1
+        leverage: int = 1,
+        indicator_cache: Optional[IndicatorCache] = None,
+        sub_bars: Optional[MarketData] = None,
+        progress: Optional[BacktestProgress] = None,
+        checkpoints: Optional[CheckpointWriter] = None,
+        resume_from: Optional[bytes] = None,
+        trade_from: Optional[pd.Timestamp] = None
     ):
         self.strategy = strategy
         self.template = template
@@ -29,12 +99,23 @@ class BacktestContext:
         self.market_data = market_data
         self.config = config or {}
         self.leverage = leverage
+        # Кэш индикаторов, общий для нескольких прогонов по тем же DataFrame (иначе создаётся на прогон)
+        self.indicator_cache = indicator_cache
+        # Свечи младшего таймфрейма (1m, 1s) для intrabar_mode='subbar'
+        self.sub_bars = sub_bars
+        # Прогресс и флаг отмены задачи (проверяются раз в progress.every свечей)
+        self.progress = progress
+        # Куда и как часто сохранять чекпойнты; с какого чекпойнта продолжить прогон
+        self.checkpoints = checkpoints
+        self.resume_from = resume_from
+        # Свечи раньше trade_from — только история для индикаторов: без решений, сделок и точек equity
+        self.trade_from = trade_from
 
         # Backtest state
         self.current_balance = initial_balance
-        self.open_positions: Dict[str, Dict[str, Any]] = {}
-        self.trades: List[Dict[str, Any]] = []
-        self.equity_curve: List[BacktestEquityPoint] = []
+        self.open_positions: Dict[str, Position] = {}
+        self.trades = TradeLedger()
+        self.equity_curve = EquityBuffer()
         self.current_time = None
 
         # Commission and risk configuration
@@ -72,6 +153,9 @@ class UniversalBacktestEngine(BacktestEngine):
     def __init__(self, context: BacktestContext):
         super().__init__(context)
         self.executor = None  # Will be set later
+        self.cursor: Optional[MarketDataCursor] = None
+        self.indicator_cache: Optional[IndicatorCache] = None
+        self.subbar_indexes: Dict[str, SubBarIndex] = {}
 
     def validate_context(self) -> bool:
         """Validate context"""
@@ -102,16 +186,42 @@ class UniversalBacktestEngine(BacktestEngine):
         print(f"📈 Data: {list(self.context.market_data.keys())}")
 
         self._initialize_backtest()
+        start = self._resume()
 
-        await self._run_main_loop()
-
-        self._finalize_backtest()
+        try:
+            await self._run_main_loop(start)
+            # Финальный чекпойнт — до закрытия позиций по end_of_data, чтобы прогон можно было продлить
+            self._save_checkpoint(len(self.timeline))
+            self._finalize_backtest()
+        finally:
+            self._bind_indicator_cache(None)
 
         return self._build_result()
 
     def _initialize_backtest(self):
         """Initialize backtest"""
-        # Сбрасываем состояние стратегии при старте бэктеста, если метод доступен
+        self._reset_strategy_state()
+
+        self.timeline = build_timeline(self.context.market_data)
+        if self.context.trade_from is not None:
+            # Курсор ищет позиции во всех свечах, поэтому стратегия видит и историю до trade_from
+            self.timeline = self.timeline[self.timeline.searchsorted(self.context.trade_from):]
+        if not len(self.timeline):
+            raise ValueError("No data for backtest")
+
+        self.cursor = MarketDataCursor(self.context.market_data, self.timeline)
+        self.indicator_cache = self.context.indicator_cache or IndicatorCache(self.context.market_data)
+        self._bind_indicator_cache(self.indicator_cache)
+        if self.context.intrabar_mode == SUBBAR_MODE:
+            self.subbar_indexes = build_subbar_indexes(self.context.market_data, self.context.sub_bars)
+
+        if len(self.timeline):
+            # Начальная точка плюс по одной на свечу
+            self.context.equity_curve.reserve(len(self.timeline) + 1)
+            self.context.equity_curve.append(self.timeline[0], self.context.initial_balance)
+
+    def _reset_strategy_state(self):
+        """Сбрасывает состояние стратегии при старте бэктеста, если метод доступен"""
         try:
             strategy = getattr(self.context.strategy, 'strategy', self.context.strategy)
             if hasattr(strategy, 'reset_state') and callable(getattr(strategy, 'reset_state')):
@@ -119,48 +229,152 @@ class UniversalBacktestEngine(BacktestEngine):
         except Exception:
             pass
 
-        all_times = []
-        for df in self.context.market_data.values():
-            if not df.empty:
-                all_times.extend(df.index.tolist())
-
-        if not all_times:
-            raise ValueError("No data for backtest")
-
-        unique_times = sorted(list(set(all_times)))
-        self.timeline = unique_times
-
-        if self.timeline:
-            self.context.equity_curve.append(
-                BacktestEquityPoint(
-                    timestamp=self.timeline[0],
-                    balance=self.context.initial_balance
-                )
-            )
-
-    async def _run_main_loop(self):
+    def _inner_strategy(self):
+        """Стратегия под адаптером (legacy_strategy / strategy / legacy) или сама стратегия"""
+        strategy = self.context.strategy
+        for attr in ('legacy_strategy', 'strategy', 'legacy'):
+            inner = getattr(strategy, attr, None)
+            if inner is not None:
+                strategy = inner
+        return strategy
+
+    def _bind_indicator_cache(self, cache: Optional[IndicatorCache]):
+        """Подключает (или отключает) кэш индикаторов прогона к стратегии"""
+        strategy = self._inner_strategy()
+        if hasattr(strategy, 'indicator_cache'):
+            strategy.indicator_cache = cache
+
+    async def _run_main_loop(self, start: int = 0):
         """Основной цикл обработки данных"""
         total_steps = len(self.timeline)
-
-        for i, current_time in enumerate(self.timeline):
+        next_report = self._first_progress_step(start)
+        next_checkpoint = self._first_checkpoint_step(start)
+
+        for i, current_time in enumerate(self.timeline[start:], start):
+            if i >= next_report:
+                next_report = await self._report_progress(i, total_steps, current_time)
+            if i >= next_checkpoint:
+                next_checkpoint = self._save_checkpoint(i)
             self.context.current_time = current_time
 
-            # Изменено: получаем текущие данные напрямую из контекста
-            current_md = {symbol: df[df.index <= current_time] for symbol, df in self.context.market_data.items()}
-
-            open_state = self._build_open_state()
-
-            decision = await self.context.strategy.decide(current_md, self.context.template, open_state)
-
-            if decision and not decision.is_empty():
-                await self._execute_decision(decision, current_md, current_time)
-
-            await self._update_trailing_stops(current_md, current_time)
-
-            await self._check_and_close_positions(current_md, current_time)
+            # Позиции символов на шаге посчитаны заранее, стратегии получают срезы без копий
+            self.cursor.seek(i, current_time)
+            await self._on_bar(self.cursor.view(), current_time)
 
             self._update_equity_curve(current_time)
 
+    async def _on_bar(self, current_md: MarketData, current_time):
+        """Решение стратегии, исполнение, трейлинг и стопы на одной свече (курсор уже на ней)"""
+        open_state = self._build_open_state()
+
+        decision = await self.context.strategy.decide(current_md, self.context.template, open_state)
+
+        if decision and not decision.is_empty():
+            await self._execute_decision(decision, current_md, current_time)
+
+        await self._update_trailing_stops(current_md, current_time)
+
+        await self._check_and_close_positions(current_md, current_time)
+
+    def _first_progress_step(self, start: int = 0) -> int:
+        # Без прогресса порог недостижим, и проверка в цикле — одно сравнение
+        progress = self.context.progress
+        return start + progress.every if progress is not None else len(self.timeline)
+
+    async def _report_progress(self, step: int, total_steps: int, current_time) -> int:
+        """Публикует прогресс (BacktestCancelled при отмене); возвращает следующий шаг проверки"""
+        progress = self.context.progress
+        equity = self.context.equity_curve.balances
+        await progress.update(step, total_steps, current_time, float(equity[-1]) if len(equity) else None)
+        return step + progress.every
+
+    # Чекпойнты
+
+    def _first_checkpoint_step(self, start: int = 0) -> int:
+        checkpoints = self.context.checkpoints
+        return start + checkpoints.interval(len(self.timeline)) if checkpoints is not None else len(self.timeline)
+
+    def _save_checkpoint(self, step: int) -> int:
+        """Сохраняет состояние после step свечей; возвращает следующий шаг сохранения"""
+        checkpoints = self.context.checkpoints
+        if checkpoints is None:
+            return len(self.timeline)
+        checkpoints.save(self.capture_checkpoint(step))
+        return step + checkpoints.interval(len(self.timeline))
+
+    def _resume(self) -> int:
+        """Свеча, с которой начинается цикл: 0 или следующая за чекпойнтом context.resume_from"""
+        if self.context.resume_from is None:
+            return 0
+        step = self.restore_checkpoint(self.context.resume_from)
+        print(f"♻️ Resuming from checkpoint: {step}/{len(self.timeline)} bars already simulated")
+        return step
+
+    def capture_checkpoint(self, step: int) -> bytes:
+        """
+        Serialized state after the first `step` bars of the timeline: balance, open
+        positions, trade ledger, equity curve and the strategy's own state
+        (dataclass state and streaming indicators).
+        """
+        context = self.context
+        strategy = self._inner_strategy()
+        ledger_meta, ledger_rows = context.trades.snapshot()
+        equity_meta, equity_times, equity_balances = context.equity_curve.snapshot()
+        state = {
+            'identity': self._checkpoint_identity(),
+            'step': step,
+            'last_time': self.timeline[step - 1] if step else None,
+            'current_time': context.current_time,
+            'balance': context.current_balance,
+            'positions': [position.to_dict() for position in context.open_positions.values()],
+            'strategy': strategy.state_snapshot() if hasattr(strategy, 'state_snapshot') else {},
+            'ledger': ledger_meta,
+            'equity': equity_meta,
+        }
+        arrays = {'trades': ledger_rows, 'equity_times': equity_times, 'equity_balances': equity_balances}
+        return encode_checkpoint(state, arrays)
+
+    def restore_checkpoint(self, blob: bytes) -> int:
+        """
+        Restores a checkpoint of the same run into the initialized engine and
+        returns the bar to continue from. The timeline may extend past the
+        checkpoint (extending a finished run) but must contain the simulated
+        bars unchanged; otherwise ValueError.
+        """
+        state, arrays = decode_checkpoint(blob)
+        if state['identity'] != self._checkpoint_identity():
+            raise ValueError("Checkpoint belongs to a different run (strategy, parameters, config or start)")
+        step = state['step']
+        if step > len(self.timeline) or (step and self.timeline[step - 1] != state['last_time']):
+            raise ValueError(f"Checkpoint after {state['last_time']} does not match the loaded data")
+
+        context = self.context
+        context.current_balance = state['balance']
+        context.current_time = state['current_time']
+        context.open_positions = {p['symbol']: Position(**p) for p in state['positions']}
+        context.trades = TradeLedger.restore(state['ledger'], arrays['trades'])
+        context.equity_curve = EquityBuffer.restore(state['equity'], arrays['equity_times'], arrays['equity_balances'],
+                                                    capacity=len(self.timeline) + 1)
+        strategy = self._inner_strategy()
+        if hasattr(strategy, 'restore_state'):
+            strategy.restore_state(state['strategy'])
+        return step
+
+    def _checkpoint_identity(self) -> str:
+        """Хэш всего, от чего зависит продолжение прогона, кроме конца данных"""
+        identity = {
+            'engine': ENGINE_VERSION,
+            'strategy': self.context.strategy.id,
+            'parameters': getattr(self.context.template, 'parameters', None) or {},
+            'config': self.context.config,
+            'initial_balance': float(self.context.initial_balance),
+            'leverage': self.context.leverage,
+            'symbols': sorted(self.context.market_data),
+            'start': self.timeline[0],
+        }
+        encoded = json.dumps(identity, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
     def _finalize_backtest(self):
         """Финализация бэктеста - закрытие оставшихся позиций"""
         if self.context.open_positions:
@@ -172,7 +386,7 @@ class UniversalBacktestEngine(BacktestEngine):
                     last_prices[symbol] = df['close'].iloc[-1]
 
             for symbol, position in list(self.context.open_positions.items()):
-                exit_price = last_prices.get(symbol, position['entry_price'])
+                exit_price = last_prices.get(symbol, position.entry_price)
                 self._close_position(symbol, position, exit_price, self.context.current_time, "end_of_data")
 
     def _build_open_state(self) -> OpenState:
@@ -181,10 +395,10 @@ class UniversalBacktestEngine(BacktestEngine):
 
         for symbol, position in self.context.open_positions.items():
             open_state[symbol] = {
-                'deal_id': position['deal_id'],
-                'entry_price': position['entry_price'],
-                'entry_time': position['entry_time'],
-                'side': position['side'],
+                'deal_id': position.deal_id,
+                'entry_price': position.entry_price,
+                'entry_time': position.entry_time,
+                'side': position.side,
                 'position': position
             }
 
@@ -194,15 +408,14 @@ class UniversalBacktestEngine(BacktestEngine):
         """Исполнить решение стратегии"""
         for intent in decision.intents:
             if intent.symbol not in market_data:
-                print(f"⚠️ No data for symbol {intent.symbol}, skipping")
+                trade_log.debug("⚠️ No data for symbol %s, skipping", intent.symbol)
                 continue
 
-            df = market_data[intent.symbol]
-            if df.empty:
-                print(f"⚠️ Empty data for {intent.symbol}, skipping")
+            if not self.cursor.has_data(intent.symbol):
+                trade_log.debug("⚠️ Empty data for %s, skipping", intent.symbol)
                 continue
 
-            current_price = df['close'].iloc[-1]
+            current_price = self.cursor.price(intent.symbol)
 
             await self._execute_intent(intent, current_price, current_time)
 
@@ -219,41 +432,39 @@ class UniversalBacktestEngine(BacktestEngine):
         else:
             # Opening position
             if symbol in self.context.open_positions:
-                print(f"⚠️ Position {symbol} already open, skipping open")
+                trade_log.debug("⚠️ Position %s already open, skipping open", symbol)
                 return
 
             if self._can_open_position(intent, current_price):
                 self._open_position(intent, current_price, current_time)
 
-    def _can_open_position(self, intent: OrderIntent, current_price: float) -> bool:
-        """Проверить, можем ли открыть позицию"""
-        # Calculate position size
+    def _position_size_usd(self, intent: OrderIntent) -> float:
+        """Размер позиции в долларах по sizing интента"""
         if intent.sizing == "risk_pct":
-            size_usd = self.context.current_balance * intent.size
+            return self.context.current_balance * intent.size
         elif intent.sizing == "usd":
-            size_usd = intent.size
+            return intent.size
         else:
-            size_usd = self.context.current_balance * 0.01
+            return self.context.current_balance * 0.01
+
+    def _can_open_position(self, intent: OrderIntent, current_price: float) -> bool:
+        """Проверить, можем ли открыть позицию"""
+        size_usd = self._position_size_usd(intent)
 
         # Checks
         if size_usd > self.context.current_balance:
-            print(f"⚠️ Insufficient funds for trade: need ${size_usd:.2f}, available ${self.context.current_balance:.2f}")
+            trade_log.debug("⚠️ Insufficient funds for trade: need $%.2f, available $%.2f", size_usd, self.context.current_balance)
             return False
 
         if size_usd < 5:
-            print(f"⚠️ Too small position: ${size_usd:.2f}")
+            trade_log.debug("⚠️ Too small position: $%.2f", size_usd)
             return False
 
         return True
 
     def _open_position(self, intent: OrderIntent, current_price: float, current_time):
         """Открыть позицию"""
-        if intent.sizing == "risk_pct":
-            size_usd = self.context.current_balance * intent.size
-        elif intent.sizing == "usd":
-            size_usd = intent.size
-        else:
-            size_usd = self.context.current_balance * 0.01
+        size_usd = self._position_size_usd(intent)
 
         # Apply slippage and spread
         effective_price = self._apply_price_impacts(intent.side, current_price)
@@ -268,27 +479,25 @@ class UniversalBacktestEngine(BacktestEngine):
         self.context.current_balance -= open_fee
 
         # Create position
-        position = {
-            'deal_id': len(self.context.trades),
-            'entry_price': effective_price,
-            'entry_time': current_time,
-            'side': intent.side,
-            'size': quantity,
-            'size_usd': size_usd,
-            'symbol': intent.symbol,
-            'leverage': getattr(self.context.template, 'leverage', 1),
-            'open_fee': open_fee,
-            'stop_loss': None,  # May be set by strategy later
-            'take_profit': None
-        }
+        position = Position(
+            intent.symbol,
+            intent.side,
+            effective_price,
+            current_time,
+            quantity,
+            deal_id=len(self.context.trades),
+            size_usd=size_usd,
+            leverage=getattr(self.context.template, 'leverage', 1),
+            open_fee=open_fee,
+        )  # stop_loss/take_profit may be set by strategy later
 
         self.context.open_positions[intent.symbol] = position
 
         # Set stop loss and take profit via strategy
         self._set_initial_stop_loss(position, intent.symbol)
         try:
-            if position.get('stop_loss') is not None or position.get('take_profit') is not None:
-                print(f"[BT-OPEN] {intent.symbol} {intent.side} @ {position['entry_price']:.2f} SL={position.get('stop_loss')} TP={position.get('take_profit')} t={current_time}")
+            if position.stop_loss is not None or position.take_profit is not None:
+                trade_log.debug("[BT-OPEN] %s %s @ %.2f SL=%s TP=%s t=%s", intent.symbol, intent.side, position.entry_price, position.stop_loss, position.take_profit, current_time)
         except Exception:
             pass
         try:
@@ -301,31 +510,22 @@ class UniversalBacktestEngine(BacktestEngine):
                 strategy = self.context.strategy
 
             if hasattr(strategy, 'calculate_take_profit_price'):
-                side_upper = str(position['side']).upper()
+                side_upper = str(position.side).upper()
                 side_alias = 'long' if side_upper in ('BUY', 'LONG') else 'short'
-                tp = strategy.calculate_take_profit_price(position['entry_price'], side_alias, intent.symbol)
+                tp = strategy.calculate_take_profit_price(position.entry_price, side_alias, intent.symbol)
                 if tp is not None:
-                    position['take_profit'] = tp
-                    print(f"🎯 [BACKTEST] Set initial take profit: {tp:.4f} for position {intent.symbol}")
+                    position.take_profit = tp
+                    stops_log.debug("🎯 [BACKTEST] Set initial take profit: %.4f for position %s", tp, intent.symbol)
         except Exception as e:
-            print(f"⚠️ [BACKTEST] Error setting take profit: {e}")
+            stops_log.warning("⚠️ [BACKTEST] Error setting take profit: %s", e)
 
         # Add trade
-        trade = {
-            'symbol': intent.symbol,
-            'side': intent.side,
-            'entry_price': effective_price,
-            'entry_time': current_time,
-            'size': quantity,
-            'size_usd': size_usd,
-            'leverage': self.context.leverage,
-            'fee_open': open_fee,
-            'status': 'opened'
-        }
-
-        self.context.trades.append(trade)
+        self.context.trades.add(
+            intent.symbol, intent.side, effective_price, current_time, quantity,
+            size_usd=size_usd, leverage=self.context.leverage, fee_open=open_fee, status='opened'
+        )
 
-        print(f"💰 OPENED position: {intent.side} {quantity:.6f} {intent.symbol} @ ${effective_price:.2f}")
+        trade_log.debug("💰 OPENED position: %s %.6f %s @ $%.2f", intent.side, quantity, intent.symbol, effective_price)
 
     def _apply_price_impacts(self, side: str, reference_price: float) -> float:
         """Применить проскальзывание и спред"""
@@ -347,18 +547,11 @@ class UniversalBacktestEngine(BacktestEngine):
             if symbol not in market_data:
                 continue
 
-            df = market_data[symbol]
-            if df.empty:
+            if not self.cursor.has_data(symbol):
                 continue
 
             # Get OHLC of current candle
-            last_row = df.iloc[-1]
-            ohlc = {
-                'open': float(last_row['open']),
-                'high': float(last_row['high']),
-                'low': float(last_row['low']),
-                'close': float(last_row['close'])
-            }
+            ohlc = self.cursor.ohlc(symbol)
 
             # Check closing conditions
             should_close, reason, exit_price = self._check_close_conditions(position, ohlc, current_time)
@@ -370,28 +563,28 @@ class UniversalBacktestEngine(BacktestEngine):
         for symbol, position, reason, exit_price in positions_to_close:
             self._close_position(symbol, position, exit_price, current_time, reason)
 
-    def _check_close_conditions(self, position: Dict, ohlc: Dict, current_time) -> tuple[bool, str, float]:
+    def _check_close_conditions(self, position: Position, ohlc: Dict, current_time) -> tuple[bool, str, float]:
         """Проверить условия закрытия позиции"""
-        sl_price = position.get('stop_loss')
-        tp_price = position.get('take_profit')
+        sl_price = position.stop_loss
+        tp_price = position.take_profit
 
         if sl_price is not None or tp_price is not None:
             sl_hit = False
             tp_hit = False
 
             if sl_price is not None:
-                if position['side'] == 'BUY':
+                if position.side == 'BUY':
                     sl_hit = ohlc['low'] <= sl_price
                 else:
                     sl_hit = ohlc['high'] >= sl_price
                 if sl_hit:
                     try:
-                        print(f"[BT-SL-HIT] {position['symbol']} side={position['side']} SL={sl_price} H/L={ohlc['high']}/{ohlc['low']} t={current_time}")
+                        stops_log.debug("[BT-SL-HIT] %s side=%s SL=%s H/L=%s/%s t=%s", position.symbol, position.side, sl_price, ohlc['high'], ohlc['low'], current_time)
                     except Exception:
                         pass
 
             if tp_price is not None:
-                if position['side'] == 'BUY':
+                if position.side == 'BUY':
                     tp_hit = ohlc['high'] >= tp_price
                 else:
                     tp_hit = ohlc['low'] <= tp_price
@@ -408,6 +601,14 @@ class UniversalBacktestEngine(BacktestEngine):
                         return True, 'stop_loss', sl_price
                     else:
                         return True, 'take_profit', tp_price
+                elif self.context.intrabar_mode == SUBBAR_MODE:
+                    # Проигрываем подсвечи этой свечи; без них — как stopfirst
+                    bar = self.cursor.position(position.symbol) - 1 if self.cursor is not None else None
+                    reason, price = resolve_ambiguous(
+                        self.subbar_indexes.get(position.symbol), current_time,
+                        position.side, sl_price, tp_price, bar=bar,
+                    )
+                    return True, reason, price
                 else:  # stopfirst
                     return True, 'stop_loss', sl_price
             elif sl_hit:
@@ -417,18 +618,18 @@ class UniversalBacktestEngine(BacktestEngine):
 
         return False, '', ohlc['close']
 
-    def _set_initial_stop_loss(self, position: Dict, symbol: str):
+    def _set_initial_stop_loss(self, position: Position, symbol: str):
         """Устанавливает начальный стоп-лосс для позиции через стратегию"""
         try:
             # Создаем mock market data для стратегии
             # Используем entry_price как текущую цену для расчета стоп-лосса
             mock_df = pd.DataFrame({
-                'open': [position['entry_price']],
-                'high': [position['entry_price']],
-                'low': [position['entry_price']],
-                'close': [position['entry_price']],
+                'open': [position.entry_price],
+                'high': [position.entry_price],
+                'low': [position.entry_price],
+                'close': [position.entry_price],
                 'volume': [0]
-            }, index=[position['entry_time']])
+            }, index=[position.entry_time])
 
             mock_md = {symbol: mock_df}
 
@@ -442,24 +643,24 @@ class UniversalBacktestEngine(BacktestEngine):
 
             # Рассчитываем стоп-лосс
             if hasattr(strategy, 'calculate_stop_loss_price'):
-                side_upper = str(position['side']).upper()
+                side_upper = str(position.side).upper()
                 side = 'long' if side_upper in ('BUY', 'LONG') else 'short'
                 stop_loss_price = strategy.calculate_stop_loss_price(
-                    position['entry_price'],
+                    position.entry_price,
                     side,
                     symbol
                 )
 
                 if stop_loss_price is not None:
-                    position['stop_loss'] = stop_loss_price
-                    print(f"🎯 [BACKTEST] Set initial stop loss: {stop_loss_price:.4f} for position {symbol}")
+                    position.stop_loss = stop_loss_price
+                    stops_log.debug("🎯 [BACKTEST] Set initial stop loss: %.4f for position %s", stop_loss_price, symbol)
 
                     # Set initial max_price/min_price for trailing stop
-                    position['max_price'] = position['entry_price']
-                    position['min_price'] = position['entry_price']
+                    position.max_price = position.entry_price
+                    position.min_price = position.entry_price
 
         except Exception as e:
-            print(f"⚠️ [BACKTEST] Error setting stop loss: {e}")
+            stops_log.warning("⚠️ [BACKTEST] Error setting stop loss: %s", e)
 
     async def _update_trailing_stops(self, current_md: MarketData, current_time):
         """Обновляет trailing stop для всех открытых позиций"""
@@ -467,65 +668,55 @@ class UniversalBacktestEngine(BacktestEngine):
             if symbol not in current_md:
                 continue
 
-            df = current_md[symbol]
-            if df.empty:
+            if not self.cursor.has_data(symbol):
                 continue
 
-            current_price = df['close'].iloc[-1]
+            current_price = self.cursor.price(symbol)
 
             # Check if trailing stop needs update
             await self._update_single_trailing_stop(position, current_price, symbol)
 
-    async def _update_single_trailing_stop(self, position: Dict, current_price: float, symbol: str):
+    async def _update_single_trailing_stop(self, position: Position, current_price: float, symbol: str):
         """Обновляет trailing stop для одной позиции"""
-        if 'stop_loss' not in position or position['stop_loss'] is None:
+        if position.stop_loss is None:
             return
 
-        side = position['side']
-        entry_price = position['entry_price']
-
         # Update max_price/min_price for tracking extremes
-        if side == 'BUY':
-            if 'max_price' not in position or current_price > position.get('max_price', entry_price):
-                position['max_price'] = current_price
-                max_price = current_price
-            else:
-                max_price = position.get('max_price', entry_price)
+        if position.side == 'BUY':
+            if current_price > position.max_price:
+                position.max_price = current_price
         else:  # SELL
-            if 'min_price' not in position or current_price < position.get('min_price', entry_price):
-                position['min_price'] = current_price
-                min_price = current_price
-            else:
-                min_price = position.get('min_price', entry_price)
+            if current_price < position.min_price:
+                position.min_price = current_price
 
         # Check if trailing stop needs update
         should_update = self._should_update_trailing_stop(position, current_price)
         if should_update:
             new_stop_price = self._calculate_trailing_stop_price(position, current_price)
             if new_stop_price is not None:
-                old_stop = position['stop_loss']
-                position['stop_loss'] = new_stop_price
-                print(f"📈 [BACKTEST] Updated trailing stop: {old_stop:.4f} -> {new_stop_price:.4f}")
+                old_stop = position.stop_loss
+                position.stop_loss = new_stop_price
+                stops_log.debug("📈 [BACKTEST] Updated trailing stop: %.4f -> %.4f", old_stop, new_stop_price)
 
-    def _should_update_trailing_stop(self, position: Dict, current_price: float) -> bool:
+    def _should_update_trailing_stop(self, position: Position, current_price: float) -> bool:
         """Проверяет, нужно ли обновлять trailing stop"""
-        side = position['side']
+        side = position.side
 
         if side == 'BUY':
             # For long, update if price is above current max
-            max_price = position.get('max_price', position['entry_price'])
+            max_price = position.max_price
             return current_price > max_price
         else:
             # For short, update if price is below current min
-            min_price = position.get('min_price', position['entry_price'])
+            min_price = position.min_price
             return current_price < min_price
 
-    def _calculate_trailing_stop_price(self, position: Dict, current_price: float) -> Optional[float]:
+    def _calculate_trailing_stop_price(self, position: Position, current_price: float) -> Optional[float]:
         """Рассчитывает новую цену trailing stop"""
         # Используем trailing_stop_pct из контекста или дефолтное значение
         trailing_pct = self.context.config.get('trailing_stop_pct', 0.005)  # 0.5% по умолчанию
 
-        side = position['side']
+        side = position.side
 
         if side == 'BUY':
             # For long: stop loss below current price
@@ -534,60 +725,58 @@ class UniversalBacktestEngine(BacktestEngine):
             # For short: stop loss above current price
             return current_price * (1 + trailing_pct)
 
-    def _close_position(self, symbol: str, position: Dict, exit_price: float, current_time, reason: str):
+    def _close_position(self, symbol: str, position: Position, exit_price: float, current_time, reason: str):
         """Закрыть позицию"""
         # Calculate PnL
         pnl = self._calculate_pnl(position, exit_price)
         pnl_pct = self._calculate_pnl_pct(position, exit_price)
 
         # Close fee
-        close_fee = abs(exit_price * position['size']) * self.context.fee_rate
+        close_fee = abs(exit_price * position.size) * self.context.fee_rate
 
         # Update balance
         self.context.current_balance += pnl - close_fee
 
         # Add closing trade
-        close_trade = {
-            'symbol': symbol,
-            'side': 'long' if position['side'] == 'BUY' else 'short',
-            'entry_price': position['entry_price'],
-            'exit_price': exit_price,
-            'entry_time': position['entry_time'],
-            'exit_time': current_time,
-            'size': position['size'],
-            'leverage': self.context.leverage,
-            'pnl': pnl,
-            'pnl_pct': pnl_pct,
-            'fee_close': close_fee,
-            'reason': reason,
-            'status': 'closed'
-        }
-
-        self.context.trades.append(close_trade)
+        self.context.trades.add(
+            symbol,
+            'long' if position.side == 'BUY' else 'short',
+            position.entry_price,
+            position.entry_time,
+            position.size,
+            exit_price=exit_price,
+            exit_time=current_time,
+            leverage=self.context.leverage,
+            pnl=pnl,
+            pnl_pct=pnl_pct,
+            fee_close=close_fee,
+            reason=reason,
+            status='closed',
+        )
 
         # Remove position
         del self.context.open_positions[symbol]
 
-        print(f"💰 CLOSED position: {position['side']} {symbol} @ ${exit_price:.2f} (PnL: ${pnl:.2f})")
+        trade_log.debug("💰 CLOSED position: %s %s @ $%.2f (PnL: $%.2f)", position.side, symbol, exit_price, pnl)
         
         
-    def _calculate_pnl(self, position: Dict, exit_price: float) -> float:
+    def _calculate_pnl(self, position: Position, exit_price: float) -> float:
         """Расчет прибыли/убытка"""
-        entry_price = position['entry_price']
-        size = position['size']
-        side = position['side']
-        leverage = position.get('leverage', 1)
+        entry_price = position.entry_price
+        size = position.size
+        side = position.side
+        leverage = position.leverage
 
         if side == 'BUY':
             return (exit_price - entry_price) * size * leverage
         else:
             return (entry_price - exit_price) * size * leverage
 
-    def _calculate_pnl_pct(self, position: Dict, exit_price: float) -> float:
+    def _calculate_pnl_pct(self, position: Position, exit_price: float) -> float:
         """Расчет прибыли/убытка в процентах"""
-        entry_price = position['entry_price']
-        side = position['side']
-        leverage = position.get('leverage', 1)
+        entry_price = position.entry_price
+        side = position.side
+        leverage = position.leverage
 
         if entry_price == 0:
             return 0.0
@@ -599,31 +788,27 @@ class UniversalBacktestEngine(BacktestEngine):
 
     def _update_equity_curve(self, current_time):
         """Обновить кривую доходности"""
-        # Calculate unrealized PnL
+        # Add point to equity curve (models are built once in _build_result)
+        self.context.equity_curve.append(current_time, self.context.current_balance + self._unrealized_pnl())
+
+    def _unrealized_pnl(self) -> float:
+        """Нереализованный PnL открытых позиций по ценам текущей свечи"""
         unrealized_pnl = 0.0
 
         if self.context.open_positions:
             # Get current prices
             current_prices = {}
-            for symbol, df in self.context.market_data.items():
-                if not df.empty and symbol in self.context.open_positions:
-                    # Find price at current moment or previous one
-                    mask = df.index <= current_time
-                    if mask.any():
-                        current_prices[symbol] = df[mask]['close'].iloc[-1]
+            for symbol in self.context.open_positions:
+                # Price at current moment or previous one
+                if symbol in self.context.market_data and self.cursor.has_data(symbol):
+                    current_prices[symbol] = self.cursor.price(symbol)
 
             for symbol, position in self.context.open_positions.items():
                 if symbol in current_prices:
                     price = current_prices[symbol]
                     unrealized_pnl += self._calculate_pnl(position, price)
 
-        # Add point to equity curve
-        self.context.equity_curve.append(
-            BacktestEquityPoint(
-                timestamp=current_time,
-                balance=self.context.current_balance + unrealized_pnl
-            )
-        )
+        return unrealized_pnl
 
     def _build_result(self) -> BacktestResult:
         """Сформировать результат бэктеста"""
@@ -643,125 +828,67 @@ class UniversalBacktestEngine(BacktestEngine):
             strategy_name=self.context.strategy.id,
             symbol=", ".join(self.get_required_symbols()),
             template_id=self.context.template.id,
-            start_date=self.timeline[0] if self.timeline else datetime.now(),
-            end_date=self.timeline[-1] if self.timeline else datetime.now(),
+            start_date=self.timeline[0] if len(self.timeline) else datetime.now(),
+            end_date=self.timeline[-1] if len(self.timeline) else datetime.now(),
             initial_balance=self.context.initial_balance,
             final_balance=self.context.current_balance,
             trades=formatted_trades,
-            equity_curve=self.context.equity_curve,
+            equity_curve=self._equity_points(),
             parameters=self.context.template.parameters or {},
             leverage=self.context.leverage,
             **stats
         )
 
+    def _equity_points(self) -> List[BacktestEquityPoint]:
+        """Equity curve in the public schema, reusing timeline timestamps when it has a point per bar"""
+        curve = self.context.equity_curve
+        if len(curve) == len(self.timeline) + 1:
+            return curve.to_points(self.timeline[:1].append(self.timeline))
+        return curve.to_points()
+
     def _format_trades_for_result(self) -> List[BacktestTrade]:
         """Форматирование сделок для соответствия схеме BacktestTrade"""
         formatted_trades = []
 
-        for trade in self.context.trades:
-            # В результаты отправляем только закрытые сделки
-            if trade.get('status') == 'closed':
-                formatted_trade = BacktestTrade(
-                    entry_time=trade['entry_time'],
-                    exit_time=trade.get('exit_time'),
-                    entry_price=trade['entry_price'],
-                    exit_price=trade.get('exit_price'),
-                    side=trade.get('side'),
-                    size=trade['size'],
-                    pnl=trade.get('pnl'),
-                    pnl_pct=trade.get('pnl_pct'),
-                    reason=trade.get('reason', 'unknown'),
-                    symbol=trade['symbol'],
-                    leverage=trade.get('leverage', self.context.leverage),
-                    status=trade.get('status', 'unknown')
-                )
-                formatted_trades.append(formatted_trade)
-            # Открытые сделки игнорируем
+        # В результаты отправляем только закрытые сделки, открытые игнорируем
+        trades = self.context.trades
+        for trade in trades.records(trades.mask('status', 'closed')):
+            formatted_trade = BacktestTrade(
+                entry_time=trade['entry_time'],
+                exit_time=trade.get('exit_time'),
+                entry_price=trade['entry_price'],
+                exit_price=trade.get('exit_price'),
+                side=trade.get('side'),
+                size=trade['size'],
+                pnl=trade.get('pnl'),
+                pnl_pct=trade.get('pnl_pct'),
+                reason=trade.get('reason', 'unknown'),
+                symbol=trade['symbol'],
+                leverage=trade.get('leverage', self.context.leverage),
+                status=trade.get('status', 'unknown')
+            )
+            formatted_trades.append(formatted_trade)
 
         return formatted_trades
 
     def _calculate_statistics(self) -> Dict[str, Any]:
-        """Расчет статистик бэктеста"""
-        closed_trades = [t for t in self.context.trades if t.get('status') == 'closed']
-
-        if not closed_trades:
-            return {
-                'total_pnl': 0.0,
-                'total_pnl_pct': 0.0,
-                'max_drawdown': 0.0,
-                'max_drawdown_pct': 0.0,
-                'total_trades': 0,
-                'winning_trades': 0,
-                'losing_trades': 0,
-                'win_rate': 0.0,
-                'avg_win': 0.0,
-                'avg_loss': 0.0,
-                'profit_factor': 0.0,
-                'sharpe_ratio': 0.0
-            }
-
-        # Calculate total profitability
-        total_pnl = self.context.current_balance - self.context.initial_balance
-        total_pnl_pct = (total_pnl / self.context.initial_balance) * 100 if self.context.initial_balance > 0 else 0.0
-
-        # Win rate and trade statistics
-        winning_trades = [t for t in closed_trades if t['pnl'] > 0]
-        losing_trades = [t for t in closed_trades if t['pnl'] < 0]
-
-        winning_count = len(winning_trades)
-        losing_count = len(losing_trades)
-        total_trades_count = len(closed_trades)
-
-        win_rate = (winning_count / total_trades_count * 100) if total_trades_count > 0 else 0.0
-
-        # Average winning and losing trades
-        avg_win = sum(t['pnl'] for t in winning_trades) / winning_count if winning_count > 0 else 0.0
-        avg_loss = abs(sum(t['pnl'] for t in losing_trades) / losing_count) if losing_count > 0 else 0.0
-
-        # Profit factor (избегаем Infinity/NaN)
-        gross_profit = sum(t['pnl'] for t in winning_trades)
-        gross_loss = abs(sum(t['pnl'] for t in losing_trades))
-        if gross_loss > 0:
-            profit_factor = gross_profit / gross_loss
-        else:
-            # Если нет убытков, задаем 0.0 (или 1.0). Используем 0.0 для совместимости с JSON/валидацией
-            profit_factor = 0.0
-
-        # Max drawdown
-        max_drawdown = self._calculate_max_drawdown()
-        max_drawdown_pct = (max_drawdown / self.context.initial_balance) * 100 if self.context.initial_balance > 0 else 0.0
-
-        # Sharpe ratio (simplified version)
-        sharpe_ratio = 0.0  # Requires more data for calculation
-
-        return {
-            'total_pnl': total_pnl,
-            'total_pnl_pct': total_pnl_pct,
-            'max_drawdown': max_drawdown,
-            'max_drawdown_pct': max_drawdown_pct,
-            'total_trades': total_trades_count,
-            'winning_trades': winning_count,
-            'losing_trades': losing_count,
-            'win_rate': win_rate,
-            'avg_win': avg_win,
-            'avg_loss': avg_loss,
-            'profit_factor': profit_factor,
-            'sharpe_ratio': sharpe_ratio
-        }
-
-    def _calculate_max_drawdown(self) -> float:
-        """Расчет максимальной просадки"""
-        if not self.context.equity_curve:
-            return 0.0
-
-        balances = [point.balance for point in self.context.equity_curve]
-        peak = balances[0]
-        max_drawdown = 0.0
-
-        for balance in balances:
-            if balance > peak:
-                peak = balance
-            drawdown = (peak - balance) / peak * 100 if peak > 0 else 0
-            max_drawdown = max(max_drawdown, drawdown)
+        """Расчет статистик бэктеста (services.backtest.metrics)"""
+        trades = self.context.trades
+        closed = trades.mask('status', 'closed')
+        closed_pnl = trades.column('pnl')[closed]
+        size = trades.column('size')[closed]
+        curve = self.context.equity_curve
+
+        metrics = backtest_metrics(
+            curve.balances,
+            curve.times_ns,
+            trade_pnl=closed_pnl,
+            symbol_codes=trades.column('symbol')[closed],
+            symbol_labels=trades.labels('symbol'),
+            entry_ns=trades.column('entry_time')[closed],
+            exit_ns=trades.column('exit_time')[closed],
+            notional=np.abs(size) * (trades.column('entry_price')[closed] + trades.column('exit_price')[closed]),
+            rolling_window=self.context.config.get('rolling_window'),
+        )
 
-        return max_drawdown
\ No newline at end of file
+        return result_statistics(metrics, self.context.initial_balance, self.context.current_balance)
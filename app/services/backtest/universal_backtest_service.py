@@ -1,15 +1,24 @@
 """
 Universal backtest service for any strategies
 """
+import asyncio
 from typing import Dict, Any, List, Optional, Union
 import pandas as pd
 from datetime import datetime
 
 from services.backtest.universal_backtest_engine import UniversalBacktestEngine, BacktestContext
+from services.backtest.vectorized_backtest_engine import VectorizedBacktestEngine
+from services.backtest.portfolio_engine import PortfolioBacktestEngine, PortfolioStrategy
 from services.backtest.csv_data_service import CSVDataService
 from services.backtest.csv_loader_service import CSVLoaderService
+from services.backtest.candle_store import CandleStore
+from services.backtest.intrabar import SUBBAR_MODE
+from services.backtest.progress import BacktestProgress
+from services.backtest.checkpoint import CheckpointWriter
+from services.backtest.tick_replay_engine import TickReplayEngine
+from services.backtest.trade_tape import DEFAULT_CHUNK, TradeTape
 from services.backtest.market_data_utils import MarketDataUtils
-from schemas.backtest import BacktestResult
+from schemas.backtest import BacktestResult, BacktestSweepResult, PortfolioBacktestResult, WalkForwardResult
 from strategies.contracts import Strategy
 
 
@@ -20,7 +29,7 @@ class UniversalBacktestService:
     This service:
     - Works with any strategy implementing the Strategy protocol.
     - Supports both single and multiple symbols.
-    - Can load data from CSV files or download from exchanges.
+    - Can load data from CSV files or download from exchanges (cached in a local candle store).
     - Provides flexible configuration for fees, slippage, etc.
     """
 
@@ -28,16 +37,21 @@ class UniversalBacktestService:
         self,
         csv_service: Optional[CSVDataService] = None,
         csv_loader: Optional[CSVLoaderService] = None,
-        config: Dict[str, Any] = None
+        config: Dict[str, Any] = None,
+        candle_store: Optional[CandleStore] = None,
+        trade_tape: Optional[TradeTape] = None
     ):
         self.csv_service = csv_service or CSVDataService()
         self.csv_loader = csv_loader or CSVLoaderService()
+        self.candle_store = candle_store or CandleStore()
+        self.trade_tape = trade_tape or TradeTape()
 
         self.default_config = {
             'fee_rate': 0.0004,
             'slippage_bps': 0.0,
             'spread_bps': 0.0,
-            'intrabar_mode': 'stopfirst'
+            'intrabar_mode': 'stopfirst',
+            'subbar_interval': '1m'
         }
 
         if config:
@@ -54,7 +68,10 @@ class UniversalBacktestService:
         end_date: str = None,
         initial_balance: float = 10000.0,
         leverage: int = 1,
-        config: Dict[str, Any] = None
+        config: Dict[str, Any] = None,
+        progress: Optional[BacktestProgress] = None,
+        checkpoints: Optional[CheckpointWriter] = None,
+        resume_from: Optional[bytes] = None
     ) -> BacktestResult:
         """
         Runs a backtest for the strategy.
@@ -62,13 +79,16 @@ class UniversalBacktestService:
         Args:
             strategy: The strategy implementing the Strategy protocol.
             template: Strategy template with parameters.
-            data_source: Data source ('file' or 'download').
+            data_source: Data source ('file', 'download' or 'ticks' for a replay of stored trades).
             symbols: Symbol(s) to test.
             csv_files: Path(s) to CSV file(s).
-            start_date: Start date (for download).
-            end_date: End date (for download).
+            start_date: Start date (for download and ticks).
+            end_date: End date (for download and ticks).
             initial_balance: Initial balance.
             config: Backtest configuration.
+            progress: Progress publisher and cancel flag of the calling task.
+            checkpoints: Writer saving the engine state every N bars.
+            resume_from: Checkpoint of the same run to continue from (a resumed or extended run).
 
         Returns:
             BacktestResult: The backtest result.
@@ -80,24 +100,39 @@ class UniversalBacktestService:
         if isinstance(symbols, str):
             symbols = [symbols]
 
-        market_data = await self._load_market_data(
-            data_source, symbols, csv_files, start_date, end_date, template
-        )
+        if data_source == 'ticks':
+            # Свечи строятся движком из тех же сделок
+            market_data = {}
+        else:
+            market_data = await self._load_market_data(
+                data_source, symbols, csv_files, start_date, end_date, template
+            )
 
         backtest_config = self.default_config.copy()
         if config:
             backtest_config.update(config)
 
+        sub_bars = None
+        if backtest_config.get('intrabar_mode') == SUBBAR_MODE and data_source != 'ticks':
+            sub_bars = await self._load_sub_bars(market_data, backtest_config.get('subbar_interval') or '1m')
+
         context = BacktestContext(
             strategy=strategy,
             template=template,
             initial_balance=initial_balance,
             market_data=market_data,
             config=backtest_config,
-            leverage=leverage
+            leverage=leverage,
+            sub_bars=sub_bars,
+            progress=progress,
+            checkpoints=checkpoints,
+            resume_from=resume_from
         )
 
-        engine = UniversalBacktestEngine(context)
+        if data_source == 'ticks':
+            engine = self._create_tick_engine(context, start_date, end_date)
+        else:
+            engine = self._create_engine(context)
         result = await engine.run()
 
         print("✅ Backtest completed successfully!")
@@ -150,6 +185,211 @@ class UniversalBacktestService:
 
         return result
 
+    async def run_parameter_sweep(
+        self,
+        strategy_name: str,
+        template: Any,
+        grid: Dict[str, List[Any]],
+        data_source: str = 'file',
+        symbols: Union[str, List[str]] = 'BTCUSDT',
+        csv_files: Union[str, List[str]] = None,
+        start_date: str = None,
+        end_date: str = None,
+        initial_balance: float = 10000.0,
+        leverage: int = 1,
+        config: Dict[str, Any] = None,
+        rank_by: str = 'total_pnl',
+        max_workers: Optional[int] = None
+    ) -> BacktestSweepResult:
+        """
+        Runs one backtest per combination of a parameter grid.
+
+        Market data is loaded once and shared with worker processes through
+        shared memory; every candidate is the template with its parameters
+        overridden by one grid combination.
+
+        Args:
+            strategy_name: Strategy key for make_strategy ('novichok', 'compensation').
+            template: Strategy template with base parameters.
+            grid: Parameter name -> list of values, e.g. {'ema_fast': [5, 10], 'ema_slow': [20, 50]}.
+            rank_by: BacktestResult metric to rank by (max drawdown ranks ascending).
+            max_workers: Process count, defaults to the number of CPUs.
+            Other arguments are the same as in run_backtest.
+
+        Returns:
+            BacktestSweepResult: Rows ranked best-first.
+        """
+        from services.backtest.parameter_sweep import ParameterSweepRunner
+
+        if isinstance(symbols, str):
+            symbols = [symbols]
+
+        market_data = await self._load_market_data(
+            data_source, symbols, csv_files, start_date, end_date, template
+        )
+
+        backtest_config = self.default_config.copy()
+        if config:
+            backtest_config.update(config)
+
+        result = ParameterSweepRunner(max_workers).run(
+            strategy_name, template, grid, market_data,
+            initial_balance=initial_balance,
+            config=backtest_config,
+            leverage=leverage,
+            rank_by=rank_by
+        )
+
+        print(f"✅ Sweep completed: {len(result.rows)} candidates in {result.elapsed_seconds:.1f}s")
+        if result.rows:
+            best = result.rows[0]
+            print(f"🏆 Best {rank_by}: {getattr(best, rank_by)} with {best.parameters}")
+
+        return result
+
+    async def run_walk_forward(
+        self,
+        strategy_name: str,
+        template: Any,
+        grid: Dict[str, List[Any]],
+        in_sample: Union[str, pd.Timedelta],
+        out_of_sample: Union[str, pd.Timedelta],
+        step: Union[str, pd.Timedelta] = None,
+        data_source: str = 'file',
+        symbols: Union[str, List[str]] = 'BTCUSDT',
+        csv_files: Union[str, List[str]] = None,
+        start_date: str = None,
+        end_date: str = None,
+        initial_balance: float = 10000.0,
+        leverage: int = 1,
+        config: Dict[str, Any] = None,
+        rank_by: str = 'total_pnl',
+        max_workers: Optional[int] = None
+    ) -> WalkForwardResult:
+        """
+        Walk-forward optimization over one loaded dataset.
+
+        The range is split into rolling windows: the grid is optimized on the
+        in-sample part and the best parameters are scored on the following
+        out-of-sample part. Windows run concurrently in worker processes.
+
+        Args:
+            in_sample: In-sample length, e.g. '90D'.
+            out_of_sample: Out-of-sample length, e.g. '30D'.
+            step: Window shift, defaults to out_of_sample.
+            Other arguments are the same as in run_parameter_sweep.
+
+        Returns:
+            WalkForwardResult: Per-window parameters and in/out-of-sample metrics.
+        """
+        from services.backtest.walk_forward import WalkForwardRunner
+
+        if isinstance(symbols, str):
+            symbols = [symbols]
+
+        market_data = await self._load_market_data(
+            data_source, symbols, csv_files, start_date, end_date, template
+        )
+
+        backtest_config = self.default_config.copy()
+        if config:
+            backtest_config.update(config)
+
+        result = WalkForwardRunner(max_workers).run(
+            strategy_name, template, grid, market_data,
+            in_sample=in_sample,
+            out_of_sample=out_of_sample,
+            step=step,
+            initial_balance=initial_balance,
+            config=backtest_config,
+            leverage=leverage,
+            rank_by=rank_by
+        )
+
+        print(f"✅ Walk-forward completed: {len(result.windows)} windows in {result.elapsed_seconds:.1f}s, "
+              f"out-of-sample PnL {result.out_of_sample_pnl:.2f}")
+
+        return result
+
+    async def run_portfolio_backtest(
+        self,
+        strategies: List[PortfolioStrategy],
+        data_source: str = 'file',
+        csv_files: Union[str, List[str]] = None,
+        start_date: str = None,
+        end_date: str = None,
+        initial_balance: float = 10000.0,
+        leverage: int = 1,
+        config: Dict[str, Any] = None,
+        progress: Optional[BacktestProgress] = None
+    ) -> PortfolioBacktestResult:
+        """
+        Runs several strategies together on one shared balance in a single pass.
+
+        Market data for the union of the strategies' symbols is loaded once; all
+        templates must use the same candle interval.
+
+        Args:
+            strategies: Named strategies with their templates.
+            csv_files: Path(s) to CSV file(s), one per symbol of the union.
+            Other arguments are the same as in run_backtest.
+
+        Returns:
+            PortfolioBacktestResult: Combined and per-strategy results.
+        """
+        intervals = {getattr(item.template, 'interval', None) or '1m' for item in strategies}
+        if len(intervals) > 1:
+            raise ValueError(f"Portfolio strategies use different intervals: {sorted(intervals)}")
+
+        symbols: List[str] = []
+        for item in strategies:
+            symbols.extend(s for s in item.strategy.required_symbols(item.template) if s not in symbols)
+
+        market_data = await self._load_market_data(
+            data_source, symbols, csv_files, start_date, end_date, strategies[0].template if strategies else None
+        )
+
+        backtest_config = self.default_config.copy()
+        if config:
+            backtest_config.update(config)
+
+        sub_bars = None
+        if backtest_config.get('intrabar_mode') == SUBBAR_MODE:
+            sub_bars = await self._load_sub_bars(market_data, backtest_config.get('subbar_interval') or '1m')
+
+        engine = PortfolioBacktestEngine(strategies, initial_balance, market_data, backtest_config, leverage,
+                                         sub_bars=sub_bars, progress=progress)
+        result = await engine.run()
+
+        print(f"✅ Portfolio backtest completed: final balance ${result.final_balance:.2f}")
+        for name, strategy_result in result.strategies.items():
+            print(f"   {name}: PnL ${strategy_result.total_pnl:+.2f}, {strategy_result.total_trades} trades")
+
+        return result
+
+    def _create_engine(self, context: BacktestContext) -> UniversalBacktestEngine:
+        """
+        Selects the engine from config['engine']: 'loop' (default) or 'vectorized'.
+        Falls back to the loop engine when the strategy cannot run in signal mode.
+        """
+        if context.config.get('engine') == 'vectorized':
+            if VectorizedBacktestEngine.supports(context):
+                return VectorizedBacktestEngine(context)
+            print("⚠️ Vectorized engine does not support this strategy, using the loop engine")
+        return UniversalBacktestEngine(context)
+
+    def _create_tick_engine(self, context: BacktestContext, start_date: str = None,
+                            end_date: str = None) -> TickReplayEngine:
+        """
+        Trade replay engine over the service's trade tape; candles use the template interval.
+        The end date is inclusive, as for downloads.
+        """
+        interval = getattr(context.template, 'interval', None) or '1m'
+        start = pd.Timestamp(start_date) if start_date else None
+        end = pd.Timestamp(end_date) + pd.Timedelta(days=1) if end_date else None
+        return TickReplayEngine(context, self.trade_tape, interval, start, end,
+                                chunk_size=context.config.get('tick_chunk_size') or DEFAULT_CHUNK)
+
     async def _load_market_data(
         self,
         data_source: str,
@@ -202,17 +442,20 @@ class UniversalBacktestService:
             if template:
                 interval = getattr(template, 'interval', '1m') or '1m'
 
-            # Если несколько символов, загружаем их по отдельности
-            for symbol in symbols:
-                csv_path = self.csv_loader.download_from_binance(
-                    symbol, start_date, end_date, interval
-                )
-                try:
-                    df = self.csv_service.load_csv_data(csv_path)
-                    market_data[symbol] = df
-                    print(f"📥 Downloaded data {symbol}: {len(df)} candles")
-                finally:
-                    self.csv_loader.cleanup_temp_file(csv_path)
+            # Свечи из локального хранилища: с биржи докачиваются только недостающие диапазоны.
+            # Дата окончания включительно, до конца дня
+            start = pd.Timestamp(start_date)
+            end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+            # Символы качаются параллельно (BTC и ETH для компенсации), каждый в своём потоке
+            frames = await asyncio.gather(*(
+                asyncio.to_thread(self.candle_store.load, symbol, interval, start, end)
+                for symbol in symbols
+            ))
+            for symbol, df in zip(symbols, frames):
+                if df.empty:
+                    raise ValueError(f"No candles for {symbol} {interval} from {start_date} to {end_date}")
+                market_data[symbol] = df
+                print(f"📥 Loaded data {symbol} from candle store: {len(df)} candles")
 
             # Синхронизируем пары при загрузке с биржи
             if len(symbols) >= 2 and 'BTCUSDT' in market_data and 'ETHUSDT' in market_data:
@@ -233,6 +476,32 @@ class UniversalBacktestService:
 
         return market_data
 
+    async def _load_sub_bars(self, market_data: Dict[str, pd.DataFrame], interval: str) -> Dict[str, pd.DataFrame]:
+        """
+        Loads lower-timeframe candles covering every symbol's bars from the candle store.
+        Symbols whose sub-bars cannot be loaded fall back to the 'stopfirst' order.
+        """
+        ranges = {}
+        for symbol, df in market_data.items():
+            if len(df) < 2 or not isinstance(df.index, pd.DatetimeIndex):
+                continue
+            # Последняя свеча тоже должна быть покрыта подсвечами целиком
+            ranges[symbol] = (df.index[0], df.index[-1] + (df.index[1:] - df.index[:-1]).min())
+
+        frames = await asyncio.gather(*(
+            asyncio.to_thread(self.candle_store.load, symbol, interval, start, end)
+            for symbol, (start, end) in ranges.items()
+        ), return_exceptions=True)
+
+        sub_bars = {}
+        for symbol, frame in zip(ranges, frames):
+            if isinstance(frame, Exception) or frame.empty:
+                print(f"⚠️ No {interval} sub-bars for {symbol}, SL/TP in one candle resolved as stopfirst")
+                continue
+            sub_bars[symbol] = frame
+            print(f"🔎 Loaded {interval} sub-bars {symbol}: {len(frame)} candles")
+        return sub_bars
+
     def _find_csv_files_for_symbols(self, symbols: List[str]) -> List[str]:
         """
         Automatically finds CSV files for given symbols.
@@ -267,7 +536,10 @@ class UniversalBacktestService:
         start_date: str = None,
         end_date: str = None,
         initial_balance: float = 10000.0,
-        config: Dict[str, Any] = None
+        config: Dict[str, Any] = None,
+        progress: Optional[BacktestProgress] = None,
+        checkpoints: Optional[CheckpointWriter] = None,
+        resume_from: Optional[bytes] = None
     ) -> BacktestResult:
         """
         Runs a backtest for multiple symbols.
@@ -283,7 +555,10 @@ class UniversalBacktestService:
             start_date=start_date,
             end_date=end_date,
             initial_balance=initial_balance,
-            config=config
+            config=config,
+            progress=progress,
+            checkpoints=checkpoints,
+            resume_from=resume_from
         )
 
     async def run_compensation_backtest(
@@ -297,7 +572,10 @@ class UniversalBacktestService:
         start_date: str = None,
         end_date: str = None,
         initial_balance: float = 10000.0,
-        config: Dict[str, Any] = None
+        config: Dict[str, Any] = None,
+        progress: Optional[BacktestProgress] = None,
+        checkpoints: Optional[CheckpointWriter] = None,
+        resume_from: Optional[bytes] = None
     ) -> BacktestResult:
         """
         Runs a compensation backtest (with BTC and ETH).
@@ -316,7 +594,10 @@ class UniversalBacktestService:
             start_date=start_date,
             end_date=end_date,
             initial_balance=initial_balance,
-            config=config
+            config=config,
+            progress=progress,
+            checkpoints=checkpoints,
+            resume_from=resume_from
         )
 
     def get_available_config_options(self) -> Dict[str, Any]:
@@ -342,7 +623,13 @@ class UniversalBacktestService:
             'intrabar_mode': {
                 'description': 'SL/TP processing mode in one candle',
                 'default': 'stopfirst',
-                'options': ['stopfirst', 'tpfirst', 'mid'],
+                'options': ['stopfirst', 'tpfirst', 'mid', 'subbar'],
+                'type': 'str'
+            },
+            'subbar_interval': {
+                'description': "Sub-bar interval replayed by intrabar_mode 'subbar'",
+                'default': '1m',
+                'options': ['1s', '1m', '3m', '5m'],
                 'type': 'str'
             }
         }
@@ -352,7 +639,8 @@ class UniversalBacktestService:
         fee_rate: float = None,
         slippage_bps: float = None,
         spread_bps: float = None,
-        intrabar_mode: str = None
+        intrabar_mode: str = None,
+        subbar_interval: str = None
     ) -> Dict[str, Any]:
         """
         Creates a backtest configuration.
@@ -367,5 +655,7 @@ class UniversalBacktestService:
             config['spread_bps'] = spread_bps
         if intrabar_mode is not None:
             config['intrabar_mode'] = intrabar_mode
+        if subbar_interval is not None:
+            config['subbar_interval'] = subbar_interval
 
         return config
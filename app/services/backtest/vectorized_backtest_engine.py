@@ -0,0 +1,469 @@
+"""
+Vectorized "signal mode" backtest engine for stateless EMA-crossover templates
+"""
+from bisect import bisect_left
+from functools import partial
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from schemas.backtest import BacktestResult
+from services.backtest.intrabar import SUBBAR_MODE, build_subbar_indexes, resolve_ambiguous
+from services.backtest.ledger import EquityBuffer, TradeLedger
+from services.backtest.universal_backtest_engine import UniversalBacktestEngine, BacktestContext
+from strategies.novichok_adapter import NovichokAdapter
+from strategies.novichok_strategy import NovichokStrategy
+
+# Коды причин выхода в SignalBatch.reason
+EXIT_REASONS = ('stop_loss', 'take_profit', 'end_of_data')
+STOP_LOSS, TAKE_PROFIT, END_OF_DATA = range(len(EXIT_REASONS))
+# С меньшим числом колонок цепочки дешевле пройти скалярами, чем шагами по массивам
+LOCKSTEP_COLUMNS = 16
+_TRADE_DTYPES = (np.int64, bool, np.int64, np.int64) + (np.float64,) * 6 + (np.int8,) + (np.float64,) * 2
+
+# (бар, лонг, SL, TP) -> (причина, цена) для свечи, где задеты обе цели (intrabar_mode='subbar')
+AmbiguityResolver = Callable[[int, bool, float, float], Tuple[str, float]]
+
+
+def crossover_signals(ema_fast: np.ndarray, ema_slow: np.ndarray, trend_threshold, warmup) -> np.ndarray:
+    """+1 long / -1 short / 0 none per bar from fast/slow EMAs.
+
+    Works on 1-D series and on (combinations x time) matrices; trend_threshold and
+    warmup (bars without a signal) are then (combinations, 1) columns.
+    """
+    diff = np.abs(ema_fast - ema_slow) / ema_slow
+
+    signal = np.where(ema_fast > ema_slow, 1, -1).astype(np.int8)
+    signal[diff < trend_threshold] = 0
+    signal[np.broadcast_to(np.arange(signal.shape[-1]) < warmup, signal.shape)] = 0
+    return signal
+
+
+def price_impact(context: BacktestContext) -> float:
+    """Relative price shift of a fill from half the spread and the slippage (bps)"""
+    return context.spread_bps / 2 / 100 + context.slippage_bps / 100
+
+
+def position_sizing(template, strategy: NovichokStrategy) -> Tuple[float, float]:
+    """Share of the balance per trade and position leverage, as _open_position takes them"""
+    risk_pct = float(getattr(template, "deposit_prct", getattr(strategy, "deposit_prct", 0.01)))
+    return risk_pct, getattr(template, 'leverage', 1)
+
+
+class SignalBars:
+    """OHLC of one symbol with sparse tables of window extremes for SL/TP searches.
+
+    highs[k][j] / lows[k][j] are the extremes of bars [j, j + 2**k), so the first bar
+    reaching a level is found in log2(n) array steps for any number of entries at once.
+    NaN bars never reach a level, as in the loop engine.
+    """
+
+    def __init__(self, open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray):
+        self.open = np.asarray(open_, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.size = len(self.close)
+
+        self.highs = [self.high]
+        self.lows = [self.low]
+        width = 1
+        while width * 2 <= self.size:
+            self.highs.append(np.fmax(self.highs[-1][:-width], self.highs[-1][width:]))
+            self.lows.append(np.fmin(self.lows[-1][:-width], self.lows[-1][width:]))
+            width *= 2
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'SignalBars':
+        return cls(*(df[column].to_numpy(dtype=np.float64) for column in ('open', 'high', 'low', 'close')))
+
+    def first_hits(self, start: np.ndarray, is_long: np.ndarray, stop_loss: np.ndarray,
+                   take_profit: np.ndarray) -> np.ndarray:
+        """First bar at or after start whose range reaches SL or TP, -1 if none"""
+        position = np.array(start, dtype=np.int64)
+        for level in range(len(self.highs) - 1, -1, -1):
+            width = 1 << level
+            inside = position + width <= self.size
+            # Окна, вылезающие за конец ряда, не берём: индекс 0 — только заглушка
+            at = np.where(inside, position, 0)
+            high, low = self.highs[level][at], self.lows[level][at]
+            hit = np.where(is_long, (low <= stop_loss) | (high >= take_profit),
+                           (high >= stop_loss) | (low <= take_profit))
+            position += np.where(inside & ~hit, width, 0)
+        return np.where(position < self.size, position, -1)
+
+    def exits(self, entry_bars: np.ndarray, is_long: np.ndarray, stop_loss_pct: float, take_profit_pct: float,
+              impact: float = 0.0, intrabar_mode: str = 'stopfirst', resolve: Optional[AmbiguityResolver] = None):
+        """Entry price, exit bar (-1 = end of data), reason code and exit price of entries at the bar closes.
+
+        Prices and the SL/TP choice on a bar reaching both follow _open_position and
+        _check_close_conditions of the loop engine.
+        """
+        close = self.close[entry_bars]
+        entry = np.where(is_long, close * (1.0 + impact), close * (1.0 - impact))
+        stop_loss = np.where(is_long, entry * (1 - stop_loss_pct), entry * (1 + stop_loss_pct))
+        take_profit = np.where(is_long, entry * (1 + take_profit_pct), entry * (1 - take_profit_pct))
+        exit_bar = self.first_hits(entry_bars, is_long, stop_loss, take_profit)
+
+        found = exit_bar >= 0
+        bar = np.where(found, exit_bar, 0)
+        high, low = self.high[bar], self.low[bar]
+        sl_hit = np.where(is_long, low <= stop_loss, high >= stop_loss)
+        tp_hit = np.where(is_long, high >= take_profit, low <= take_profit)
+        both = sl_hit & tp_hit
+        if intrabar_mode == 'tpfirst':
+            stop = sl_hit & ~tp_hit
+        elif intrabar_mode == 'mid':
+            stop = sl_hit & ~tp_hit | both & (np.abs(stop_loss - self.open[bar]) < np.abs(take_profit - self.open[bar]))
+        else:
+            stop = sl_hit.copy()
+
+        exit_price = np.where(stop, stop_loss, take_profit)
+        if intrabar_mode == SUBBAR_MODE and resolve is not None:
+            for j in np.flatnonzero(found & both).tolist():
+                reason, exit_price[j] = resolve(int(bar[j]), bool(is_long[j]), float(stop_loss[j]),
+                                                float(take_profit[j]))
+                stop[j] = reason == 'stop_loss'
+
+        reason = np.where(stop, STOP_LOSS, TAKE_PROFIT).astype(np.int8)
+        reason[~found] = END_OF_DATA
+        exit_price[~found] = self.close[-1]
+        return entry, exit_bar, reason, exit_price
+
+
+class SignalBatch(NamedTuple):
+    """Closed trades of several columns, ordered by column and then by time.
+
+    exit_bar is -1 for end_of_data (the trade closes at the last close);
+    final_balance has one value per column.
+    """
+    column: np.ndarray
+    is_long: np.ndarray
+    entry_bar: np.ndarray
+    exit_bar: np.ndarray
+    entry_price: np.ndarray
+    exit_price: np.ndarray
+    quantity: np.ndarray
+    pnl: np.ndarray
+    pnl_pct: np.ndarray
+    close_fee: np.ndarray
+    reason: np.ndarray
+    balance_open: np.ndarray
+    balance_close: np.ndarray
+    final_balance: np.ndarray
+
+    def trades_of(self, column: int) -> slice:
+        """Rows of one column"""
+        return slice(*np.searchsorted(self.column, [column, column + 1]).tolist())
+
+
+def simulate_signal_batch(
+    bars: SignalBars,
+    signals: np.ndarray,
+    signal_rows: Sequence[int],
+    stop_loss_pct,
+    take_profit_pct,
+    risk_pct,
+    leverage,
+    initial_balance,
+    fee_rate: float,
+    impact: float = 0.0,
+    intrabar_mode: str = 'stopfirst',
+    resolve: Optional[AmbiguityResolver] = None,
+) -> SignalBatch:
+    """Chains of trades of K columns at once.
+
+    Column k trades signals[signal_rows[k]] (+1 long / -1 short / 0 none per bar) with
+    its own SL/TP, risk share and leverage (scalars apply to all columns). An entry is
+    filled at the signal bar close while flat; its exit depends only on the entry bar,
+    side and SL/TP, so exits of every candidate entry are found once per (SL, TP) pair.
+    The chains then advance in lockstep, one trade per column per step (below
+    LOCKSTEP_COLUMNS columns each chain is walked with scalars), with the arithmetic
+    of the loop engine, so results are identical to it.
+    """
+    signals = np.atleast_2d(signals)
+    size = bars.size
+    rows = np.asarray(signal_rows, dtype=np.int64).reshape(-1)
+    count = len(rows)
+    per_column = [np.broadcast_to(np.asarray(value, dtype=np.float64), (count,))
+                  for value in (stop_loss_pct, take_profit_pct, risk_pct, leverage, initial_balance)]
+    stop_loss_pct, take_profit_pct, risk_pct, leverage, initial_balance = per_column
+
+    # Выходы одной пары (SL, TP) считаются один раз для входов всех её колонок; сторона 0 — лонг
+    pairs, group = np.unique(np.stack([stop_loss_pct, take_profit_pct], axis=1), axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    exit_bars = np.full((len(pairs), 2, size), -1, dtype=np.int64)
+    reasons = np.full((len(pairs), 2, size), END_OF_DATA, dtype=np.int8)
+    exit_prices = np.zeros((len(pairs), 2, size))
+    for g, (sl_pct, tp_pct) in enumerate(pairs.tolist()):
+        used = signals[np.unique(rows[group == g])]
+        for side, sign in ((0, 1), (1, -1)):
+            entries = np.flatnonzero((used == sign).any(axis=0))
+            if len(entries):
+                _, exit_bar, reason, exit_price = bars.exits(
+                    entries, np.full(len(entries), side == 0), sl_pct, tp_pct, impact, intrabar_mode, resolve
+                )
+                exit_bars[g, side, entries] = exit_bar
+                reasons[g, side, entries] = reason
+                exit_prices[g, side, entries] = exit_price
+    exit_bars, reasons, exit_prices = exit_bars.reshape(-1), reasons.reshape(-1), exit_prices.reshape(-1)
+
+    balance = initial_balance.copy()
+    bar = np.zeros(count, dtype=np.int64)
+    active = np.arange(count)
+    steps: List[tuple] = []
+    if count < LOCKSTEP_COLUMNS:
+        for column in active.tolist():
+            trades = _walk_chain(column, signals[rows[column]], bars.close, group[column] * 2 * size,
+                                 exit_bars, reasons, exit_prices, risk_pct[column], leverage[column],
+                                 balance, fee_rate, impact)
+            if trades:
+                steps.append(tuple(np.array(values, dtype=dtype) for values, dtype in zip(zip(*trades), _TRADE_DTYPES)))
+        active = active[:0]
+    else:
+        # Ближайший кандидат каждой строки сигналов на баре и после него (size — кандидатов больше нет)
+        next_entry = np.where(signals != 0, np.arange(size), size)
+        next_entry = np.minimum.accumulate(next_entry[:, ::-1], axis=1)[:, ::-1]
+        next_entry = np.concatenate([next_entry, np.full((len(signals), 1), size)], axis=1).reshape(-1)
+    while len(active):
+        # First candidate at or after the bar
+        entry_bar = next_entry[rows[active] * (size + 1) + bar[active]]
+        size_usd = balance[active] * risk_pct[active]
+        # Balance only changes on trades, so a rejected size stays rejected
+        found = (entry_bar < size) & ~((size_usd > balance[active]) | (size_usd < 5))
+        active, entry_bar, size_usd = active[found], entry_bar[found], size_usd[found]
+        if not len(active):
+            break
+
+        is_long = signals[rows[active], entry_bar] > 0
+        close = bars.close[entry_bar]
+        entry_price = np.where(is_long, close * (1.0 + impact), close * (1.0 - impact))
+        quantity = size_usd / entry_price
+        balance[active] -= size_usd * fee_rate
+        balance_open = balance[active]
+
+        at = (group[active] * 2 + np.where(is_long, 0, 1)) * size + entry_bar
+        exit_bar, reason, exit_price = exit_bars[at], reasons[at], exit_prices[at]
+        difference = np.where(is_long, exit_price - entry_price, entry_price - exit_price)
+        pnl = difference * quantity * leverage[active]
+        pnl_pct = np.divide(difference, entry_price, out=np.zeros(len(active)), where=entry_price != 0) * leverage[active]
+        close_fee = np.abs(exit_price * quantity) * fee_rate
+        balance[active] += pnl - close_fee
+
+        steps.append((active, is_long, entry_bar, exit_bar, entry_price, exit_price, quantity, pnl, pnl_pct,
+                      close_fee, reason, balance_open, balance[active]))
+        bar[active] = exit_bar + 1
+        active = active[exit_bar >= 0]
+
+    if steps:
+        columns = [np.concatenate(values) for values in zip(*steps)]
+        order = np.argsort(columns[0], kind='stable')
+        columns = [values[order] for values in columns]
+    else:
+        columns = [np.empty(0, dtype=dtype) for dtype in _TRADE_DTYPES]
+    return SignalBatch(*columns, final_balance=balance)
+
+
+def _walk_chain(column: int, signal: np.ndarray, close: np.ndarray, table: int, exit_bars: np.ndarray,
+                reasons: np.ndarray, exit_prices: np.ndarray, risk_pct: float, leverage: float,
+                balances: np.ndarray, fee_rate: float, impact: float) -> List[tuple]:
+    """Trades of one column with Python scalars, the same arithmetic as the lockstep walk"""
+    candidates = np.flatnonzero(signal)
+    is_long = signal[candidates] > 0
+    at = table + np.where(is_long, 0, len(close)) + candidates
+    candidate_bars, is_long_l, close_l = candidates.tolist(), is_long.tolist(), close[candidates].tolist()
+    exit_l, reason_l, price_l = exit_bars[at].tolist(), reasons[at].tolist(), exit_prices[at].tolist()
+    risk_pct, leverage = float(risk_pct), float(leverage)
+
+    balance = float(balances[column])
+    trades: List[tuple] = []
+    c = 0
+    while c < len(candidate_bars):
+        size_usd = balance * risk_pct
+        # Balance only changes on trades, so a rejected size stays rejected
+        if size_usd > balance or size_usd < 5:
+            break
+        long_side = is_long_l[c]
+        entry_price = close_l[c] * (1.0 + impact) if long_side else close_l[c] * (1.0 - impact)
+        quantity = size_usd / entry_price
+        balance -= size_usd * fee_rate
+        balance_open = balance
+
+        exit_bar, exit_price = exit_l[c], price_l[c]
+        difference = exit_price - entry_price if long_side else entry_price - exit_price
+        pnl = difference * quantity * leverage
+        pnl_pct = difference / entry_price * leverage if entry_price != 0 else 0.0
+        close_fee = abs(exit_price * quantity) * fee_rate
+        balance += pnl - close_fee
+
+        trades.append((column, long_side, candidate_bars[c], exit_bar, entry_price, exit_price, quantity,
+                       pnl, pnl_pct, close_fee, reason_l[c], balance_open, balance))
+        if exit_bar < 0:
+            break
+        c = bisect_left(candidate_bars, exit_bar + 1, c + 1)
+    balances[column] = balance
+    return trades
+
+
+def _resolve_subbar(index, bar: int, is_long: bool, stop_loss: float, take_profit: float) -> Tuple[str, float]:
+    """AmbiguityResolver по минутным барам символа"""
+    return resolve_ambiguous(index, None, 'BUY' if is_long else 'SELL', stop_loss, take_profit, bar=bar)
+
+
+def signal_equity(close: np.ndarray, initial_balance: float, entry_bar: np.ndarray, exit_bar: np.ndarray,
+                  balance_open: np.ndarray, balance_close: np.ndarray, entry_price: np.ndarray,
+                  quantity: np.ndarray, is_long: np.ndarray, leverage) -> np.ndarray:
+    """Balance plus unrealized PnL after every bar for one chain of trades, as _update_equity_curve records it"""
+    size = len(close)
+    equity = np.full(size, float(initial_balance))
+    if not len(entry_bar):
+        return equity
+
+    # end_of_data: позиция открыта до последней свечи включительно
+    exit_bars = np.where(exit_bar < 0, size, exit_bar)
+    leverage = np.broadcast_to(np.asarray(leverage, dtype=np.float64), entry_bar.shape)
+    bars = np.arange(size)
+
+    # Flat bars keep the balance after the latest closed trade (бары отсортированы: счёт вместо поиска)
+    last_closed = np.cumsum(np.bincount(exit_bars, minlength=size + 1)[:size]) - 1
+    flat = last_closed >= 0
+    equity[flat] = balance_close[last_closed[flat]]
+
+    # Bars with an open position: balance after the open fee plus unrealized PnL
+    owner = np.cumsum(np.bincount(entry_bar, minlength=size)[:size]) - 1
+    held = owner >= 0
+    held[held] = bars[held] < exit_bars[owner[held]]
+    t = owner[held]
+    prices = close[held]
+    difference = np.where(is_long[t], prices - entry_price[t], entry_price[t] - prices)
+    equity[held] = balance_open[t] + difference * quantity[t] * leverage[t]
+    return equity
+
+
+class VectorizedBacktestEngine(UniversalBacktestEngine):
+    """Vectorized engine for Novichok templates.
+
+    Reproduces UniversalBacktestEngine semantics without the bar-by-bar loop:
+    entry signals are computed over the whole series, an entry is filled at the
+    signal bar close while flat, SL/TP are fixed at entry and checked from the
+    entry bar on, fees and slippage are applied exactly as in the loop engine.
+    The trades come from simulate_signal_batch with a single column, the same
+    public API BatchSignalEvaluator uses for whole parameter grids.
+
+    The loop engine never moves the initial stop (its trailing update compares
+    the price with an extreme it has just set), so SL stays fixed here as well.
+    """
+
+    @classmethod
+    def supports(cls, context: BacktestContext) -> bool:
+        """Whether the context can be run in signal mode with identical results"""
+        strategy = context.strategy
+        if not isinstance(strategy, NovichokAdapter) or type(strategy.legacy) is not NovichokStrategy:
+            return False
+        # Сигнальный режим не проходит свечи по одной: чекпойнты пишет и читает только цикловой движок
+        if context.checkpoints is not None or context.resume_from is not None:
+            return False
+        symbol = strategy.required_symbols(context.template)[0]
+        df = context.market_data.get(symbol)
+        if df is None or df.empty:
+            return False
+        if not (df.index.is_unique and df.index.is_monotonic_increasing):
+            return False
+        # Other symbols must not add timeline steps
+        return all(
+            other.empty or other.index.equals(df.index)
+            for name, other in context.market_data.items() if name != symbol
+        )
+
+    def validate_context(self) -> bool:
+        super().validate_context()
+        if not self.supports(self.context):
+            raise ValueError("Vectorized engine supports only Novichok templates on a single timeline")
+        return True
+
+    async def run(self) -> BacktestResult:
+        self.validate_context()
+
+        strategy: NovichokStrategy = self.context.strategy.legacy
+        symbol = self.get_required_symbols()[0]
+        df = self.context.market_data[symbol]
+
+        print("🚀 Starting vectorized backtest")
+        print(f"📊 Strategy: {self.context.strategy.id}")
+        print(f"💰 Initial balance: ${self.context.initial_balance:,.2f}")
+        print(f"📈 Data: {symbol} {len(df)} candles")
+
+        # Свечи до trade_from — только прогрев EMA, как в цикловом движке
+        start = df.index.searchsorted(self.context.trade_from) if self.context.trade_from is not None else 0
+        if start == len(df):
+            raise ValueError("No data for backtest")
+        equity = self._run_signal_mode(strategy, symbol, df, start)[start:]
+
+        self.timeline = df.index[start:]
+        self.context.equity_curve = EquityBuffer(capacity=len(self.timeline) + 1, tz=df.index.tz)
+        self.context.equity_curve.extend(
+            np.concatenate([self.timeline.asi8[:1], self.timeline.asi8]),
+            np.concatenate([[float(self.context.initial_balance)], equity]),
+            tz=df.index.tz,
+        )
+
+        return self._build_result()
+
+    def _run_signal_mode(self, strategy: NovichokStrategy, symbol: str, df: pd.DataFrame,
+                         start: int = 0) -> np.ndarray:
+        """Fills context trades and balance from bar `start` on; returns equity after every bar"""
+        self.context.current_time = df.index[-1]
+
+        bars = SignalBars.from_frame(df)
+        signal = self._compute_signals(strategy, df['close'])
+        signal[:start] = 0
+        if self.context.intrabar_mode == SUBBAR_MODE:
+            self.subbar_indexes = build_subbar_indexes({symbol: df}, self.context.sub_bars)
+        batch = self._simulate(strategy, symbol, df, signal, bars)
+        return signal_equity(bars.close, self.context.initial_balance, batch.entry_bar, batch.exit_bar,
+                             batch.balance_open, batch.balance_close, batch.entry_price, batch.quantity,
+                             batch.is_long, position_sizing(self.context.template, strategy)[1])
+
+    def _compute_signals(self, strategy: NovichokStrategy, close: pd.Series) -> np.ndarray:
+        """+1 long / -1 short / 0 none for every bar (NovichokStrategy.generate_signal)"""
+        ema_fast = close.ewm(span=strategy.ema_fast).mean().to_numpy()
+        ema_slow = close.ewm(span=strategy.ema_slow).mean().to_numpy()
+        # generate_signal needs at least ema_slow candles
+        return crossover_signals(ema_fast, ema_slow, strategy.trend_threshold, max(strategy.ema_slow - 1, 0))
+
+    def _simulate(self, strategy: NovichokStrategy, symbol: str, df: pd.DataFrame, signal: np.ndarray,
+                  bars: SignalBars) -> SignalBatch:
+        """Chain of trades of the template as a one-column batch; fills the ledger and the balance"""
+        risk_pct, leverage = position_sizing(self.context.template, strategy)
+        resolve = None
+        if self.context.intrabar_mode == SUBBAR_MODE:
+            resolve = partial(_resolve_subbar, self.subbar_indexes.get(symbol))
+        batch = simulate_signal_batch(
+            bars, signal, [0],
+            stop_loss_pct=strategy.stop_loss_pct,
+            take_profit_pct=strategy.take_profit_pct,
+            risk_pct=risk_pct,
+            leverage=leverage,
+            initial_balance=self.context.current_balance,
+            fee_rate=self.context.fee_rate,
+            impact=price_impact(self.context),
+            intrabar_mode=self.context.intrabar_mode,
+            resolve=resolve,
+        )
+
+        # Номера свечей переводим во время журнала (нс) одним обращением к индексу
+        index = df.index
+        count = len(batch.pnl)
+        self.context.trades = TradeLedger.from_columns(
+            tz=index.tz, symbol=[symbol] * count, leverage=[self.context.leverage] * count,
+            status=['closed'] * count,
+            side=['long' if is_long else 'short' for is_long in batch.is_long.tolist()],
+            entry_price=batch.entry_price, exit_price=batch.exit_price,
+            entry_time=index.asi8[batch.entry_bar],
+            exit_time=index.asi8[np.where(batch.exit_bar < 0, len(index) - 1, batch.exit_bar)],
+            size=batch.quantity, pnl=batch.pnl, pnl_pct=batch.pnl_pct, fee_close=batch.close_fee,
+            reason=[EXIT_REASONS[code] for code in batch.reason.tolist()],
+        )
+        self.context.current_balance = float(batch.final_balance[0])
+        return batch
@@ -0,0 +1,155 @@
+"""
+Walk-forward optimization: rolling in-sample/out-of-sample windows over one loaded dataset
+"""
+import os
+import time
+from concurrent.futures import as_completed
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from schemas.backtest import BacktestSweepRow, WalkForwardResult, WalkForwardWindow
+from services.backtest.indicator_cache import IndicatorCache
+from services.backtest.parameter_sweep import (
+    SWEEP_METRICS, SharedMarketData, backtest_in_worker, expand_grid, rank_rows,
+    template_with_parameters, worker_market_data, worker_pool,
+)
+
+Period = Union[str, pd.Timedelta]
+
+
+def walk_forward_windows(
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    in_sample: Period,
+    out_of_sample: Period,
+    step: Optional[Period] = None,
+) -> List[Tuple[pd.Timestamp, pd.Timestamp, pd.Timestamp]]:
+    """
+    Rolling windows over [start, end): (in-sample start, in-sample end = out-of-sample start,
+    out-of-sample end). Windows move by step (out_of_sample by default); the last
+    out-of-sample period is cut at end.
+    """
+    in_sample, out_of_sample = pd.Timedelta(in_sample), pd.Timedelta(out_of_sample)
+    step = pd.Timedelta(step) if step is not None else out_of_sample
+    if in_sample <= pd.Timedelta(0) or out_of_sample <= pd.Timedelta(0) or step <= pd.Timedelta(0):
+        raise ValueError("in_sample, out_of_sample and step must be positive")
+
+    windows = []
+    window_start = start
+    while window_start + in_sample < end:
+        split = window_start + in_sample
+        windows.append((window_start, split, min(split + out_of_sample, end)))
+        window_start += step
+    return windows
+
+
+def slice_market_data(market_data: Dict[str, pd.DataFrame], start: pd.Timestamp,
+                      end: pd.Timestamp) -> Dict[str, pd.DataFrame]:
+    """Candles in [start, end) for every symbol; positional slices share memory with the source"""
+    sliced = {}
+    for symbol, df in market_data.items():
+        first, last = df.index.searchsorted(start), df.index.searchsorted(end)
+        sliced[symbol] = df.iloc[first:last]
+    return sliced
+
+
+def _run_window(window: Dict[str, Any], candidates: List[Dict[str, Any]], templates: list,
+                rank_by: str) -> WalkForwardWindow:
+    """Optimizes one window in a pool worker: every candidate in-sample, the best one out-of-sample"""
+    market_data = worker_market_data()
+    in_sample = slice_market_data(market_data, window['in_sample_start'], window['in_sample_end'])
+    # Out-of-sample прогон видит in-sample свечи как историю (прогрев EMA), торгует и считается с split
+    history = slice_market_data(market_data, window['in_sample_start'], window['out_of_sample_end'])
+
+    # Все кандидаты окна считают индикаторы по одним и тем же срезам — кэш общий
+    cache = IndicatorCache(in_sample)
+    rows = []
+    for parameters, template in zip(candidates, templates):
+        try:
+            rows.append(BacktestSweepRow(parameters=parameters,
+                                         **backtest_in_worker(template, in_sample, cache)))
+        except Exception as e:
+            rows.append(BacktestSweepRow(parameters=parameters, error=str(e)))
+    best = rank_rows(rows, rank_by)[0]
+    if best.error is not None:
+        return WalkForwardWindow(**window, in_sample=best, error=f"No candidate finished in-sample: {best.error}")
+
+    template = templates[candidates.index(best.parameters)]
+    scored = backtest_in_worker(template, history, IndicatorCache(history),
+                                trade_from=window['out_of_sample_start'])
+    return WalkForwardWindow(
+        **window,
+        parameters=best.parameters,
+        in_sample=best,
+        out_of_sample=BacktestSweepRow(parameters=best.parameters, rank=best.rank, **scored),
+    )
+
+
+class WalkForwardRunner:
+    """Runs walk-forward windows concurrently on a process pool sharing one copy of the market data"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def run(
+        self,
+        strategy_name: str,
+        template: Any,
+        grid: Dict[str, Iterable[Any]],
+        market_data: Dict[str, pd.DataFrame],
+        in_sample: Period,
+        out_of_sample: Period,
+        step: Optional[Period] = None,
+        initial_balance: float = 10000.0,
+        config: Dict[str, Any] = None,
+        leverage: int = 1,
+        rank_by: str = 'total_pnl',
+    ) -> WalkForwardResult:
+        if rank_by not in SWEEP_METRICS:
+            raise ValueError(f"rank_by must be one of {SWEEP_METRICS}")
+        frames = [df for df in market_data.values() if not df.empty]
+        if not frames:
+            raise ValueError("No data for walk-forward")
+
+        start = min(df.index[0] for df in frames)
+        # Конец полуинтервала — сразу после последней свечи
+        end = max(df.index[-1] for df in frames) + pd.Timedelta(1, 'ns')
+        bounds = walk_forward_windows(start, end, in_sample, out_of_sample, step)
+        if not bounds:
+            raise ValueError("Data range is shorter than one in-sample period")
+
+        candidates = expand_grid(grid)
+        templates = [template_with_parameters(template, parameters) for parameters in candidates]
+        workers = min(self.max_workers, len(bounds))
+        print(f"🪟 Walk-forward: {len(bounds)} windows x {len(candidates)} candidates on {workers} workers")
+
+        started = time.perf_counter()
+        windows: List[Optional[WalkForwardWindow]] = [None] * len(bounds)
+        with SharedMarketData(market_data) as shared, worker_pool(
+            shared, workers, strategy_name, initial_balance, config, leverage
+        ) as executor:
+            futures = {}
+            for i, (is_start, split, oos_end) in enumerate(bounds):
+                window = {
+                    'index': i, 'in_sample_start': is_start, 'in_sample_end': split,
+                    'out_of_sample_start': split, 'out_of_sample_end': oos_end,
+                }
+                futures[executor.submit(_run_window, window, candidates, templates, rank_by)] = window
+            for future in as_completed(futures):
+                window = futures[future]
+                try:
+                    windows[window['index']] = future.result()
+                except Exception as e:
+                    print(f"⚠️ Walk-forward window {window['index']} failed: {e}")
+                    windows[window['index']] = WalkForwardWindow(**window, error=str(e))
+
+        return WalkForwardResult(
+            strategy_name=strategy_name,
+            template_id=getattr(template, 'id', None),
+            rank_by=rank_by,
+            workers=workers,
+            elapsed_seconds=time.perf_counter() - started,
+            out_of_sample_pnl=sum(w.out_of_sample.total_pnl for w in windows if w.out_of_sample is not None),
+            windows=windows,
+        )
@@ -1,11 +1,13 @@
 from typing import List, Optional, Tuple
 from uuid import UUID
 
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from repositories.backtest_result_repository import BacktestResultRepository
 from schemas.backtest_result import BacktestResultCreate, BacktestResultRead
 from models.backtest_result_model import BacktestResultModel
+from services.backtest.equity_store import decode_equity_curve, equity_arrays
 from celery.result import AsyncResult
 
 
@@ -33,12 +35,16 @@ class BacktestResultService:
         self,
         task_id: str,
         status: str,
-        results: Optional[dict] = None
+        results: Optional[dict] = None,
+        equity_blob: Optional[bytes] = None,
+        cache_key: Optional[str] = None
     ) -> Optional[BacktestResultRead]:
         updated_result = await self.repository.update_backtest_status(
             task_id,
             status,
-            results
+            results,
+            equity_blob,
+            cache_key
         )
         await self.repository.session.commit()
         return BacktestResultRead.model_validate(updated_result) if updated_result else None
@@ -47,6 +53,30 @@ class BacktestResultService:
         result = await self.repository.get_by_task_id(task_id)
         return BacktestResultRead.model_validate(result) if result else None
 
+    async def reuse_cached_result(self, task_id: str, cache_key: str) -> bool:
+        """Completes task_id with a stored result of an identical run; False if there is none."""
+        cached = await self.repository.get_completed_by_cache_key(cache_key)
+        record = await self.repository.get_by_task_id(task_id)
+        if not cached or not record:
+            return False
+        # Результат мог быть посчитан по чужому шаблону с теми же параметрами
+        results = {**cached.results, 'template_id': record.template_id}
+        await self.update_result_status(task_id, "completed", results, cached.equity_blob, cache_key)
+        return True
+
+    async def get_equity_curve(self, task_id: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Full-resolution equity curve (times_ns, balances) of a stored result.
+
+        Results saved before the blob column existed fall back to the curve in the JSON.
+        """
+        blob = await self.repository.get_equity_blob(task_id)
+        if blob:
+            return decode_equity_curve(blob)
+        result = await self.repository.get_by_task_id(task_id)
+        if not result or not result.results or not result.results.get('equity_curve'):
+            return None
+        return equity_arrays(result.results['equity_curve'])
+
     async def get_all_results_by_user(self, user_id: UUID) -> List[BacktestResultRead]:
         results = await self.repository.get_all_by_user(user_id)
         return [BacktestResultRead.model_validate(result) for result in results]
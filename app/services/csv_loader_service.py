@@ -6,6 +6,8 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from services.backtest.csv_ingest import read_ohlcv_csv
+
 
 class CSVLoaderService:
     """Сервис для загрузки и управления CSV данными для бектеста"""
@@ -127,41 +129,20 @@ class CSVLoaderService:
         file2 = self.download_from_binance(symbol2, start_date, end_date, interval)
         return file1, file2
     
-    def load_csv_data(self, file_path: str) -> pd.DataFrame:
+    def load_csv_data(self, file_path: str, dtype: str = 'float64', use_cache: bool = True) -> pd.DataFrame:
         """
         Загружает и подготавливает CSV данные для бектеста
         
         Args:
             file_path: Путь к CSV файлу
+            dtype: 'float64' или 'float32' (вдвое меньше памяти для длинных 1m историй)
+            use_cache: Читать повторные загрузки из бинарного кэша (memory map, только чтение)
             
         Returns:
             pd.DataFrame: Подготовленные данные
         """
         try:
-            df = pd.read_csv(file_path)
-            
-            # Конвертируем timestamp
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df.set_index('timestamp', inplace=True)
-            
-            # Проверяем наличие необходимых колонок
-            required_cols = ['open', 'high', 'low', 'close', 'volume']
-            missing_cols = [col for col in required_cols if col not in df.columns]
-            
-            if missing_cols:
-                raise ValueError(f"Отсутствуют колонки: {missing_cols}")
-            
-            # Конвертируем числовые колонки в float
-            numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-            for col in numeric_cols:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            # Удаляем строки с NaN значениями
-            df = df.dropna()
-            
-            # Сортируем по времени
-            df = df.sort_index()
+            df = read_ohlcv_csv(file_path, dtype=dtype, use_cache=use_cache)
             
             # Проверяем, что данные не пустые
             if df.empty:
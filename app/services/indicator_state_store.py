@@ -0,0 +1,63 @@
+"""
+Streaming indicator snapshots of live strategies, kept in Redis between trading cycles
+"""
+import json
+from typing import Any, Dict, Optional
+
+from utils.redis_client import redis_from_env
+
+KEY_PREFIX = 'strategy:indicators:'
+# Снимок, который неделю не обновлялся, всё равно не продолжит поток: свечи в окне ушли вперёд
+STATE_TTL_SECONDS = 7 * 86_400
+
+
+class IndicatorStateStore:
+    """Indicator snapshots per (user, template) in Redis.
+
+    Shared by all worker processes and kept across restarts. Every save refreshes
+    the TTL, so snapshots of stopped bots expire; deleting a template drops its
+    snapshot. Without Redis the store is empty and every cycle warms the
+    indicators from the fetched klines.
+    """
+
+    def __init__(self, redis=None, ttl: int = STATE_TTL_SECONDS):
+        self.redis = redis
+        self.ttl = ttl
+
+    @classmethod
+    def from_env(cls, **kwargs) -> 'IndicatorStateStore':
+        return cls(redis_from_env(), **kwargs)
+
+    @staticmethod
+    def key(user_id: Any, template_id: Any) -> str:
+        return f"{KEY_PREFIX}{user_id}:{template_id}"
+
+    async def load(self, user_id: Any, template_id: Any) -> Optional[Dict[str, Any]]:
+        if self.redis is None:
+            return None
+        try:
+            payload = await self.redis.get(self.key(user_id, template_id))
+        except Exception as e:
+            print(f"⚠️ Indicator state unavailable: {e}")
+            return None
+        return json.loads(payload) if payload else None
+
+    async def save(self, user_id: Any, template_id: Any, snapshot: Dict[str, Any]) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(self.key(user_id, template_id), json.dumps(snapshot), ex=self.ttl)
+        except Exception as e:
+            print(f"⚠️ Failed to save indicator state: {e}")
+
+    async def delete(self, user_id: Any, template_id: Any) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(self.key(user_id, template_id))
+        except Exception as e:
+            print(f"⚠️ Failed to delete indicator state: {e}")
+
+    async def close(self) -> None:
+        if self.redis is not None:
+            await self.redis.aclose()
@@ -1,5 +1,6 @@
 from uuid import UUID
 import asyncio
+from typing import Optional
 
 import pandas as pd
 
@@ -22,6 +23,15 @@ from services.bot_service import UserBotService
 from schemas.strategy_log import StrategyLogCreate
 from services.strategy_parameters import StrategyParameters
 from services.trade_executor import TradeExecutor
+from services.indicator_state_store import IndicatorStateStore
+
+
+def _streaming_strategy(strategy):
+    """Внутренняя стратегия адаптера, если у неё включены инкрементальные индикаторы"""
+    inner = getattr(strategy, 'strategy', None) or getattr(strategy, 'legacy', None)
+    if isinstance(inner, BaseStrategy) and getattr(inner, 'streaming', False):
+        return inner
+    return None
 
 
 class TradeService:
@@ -36,7 +46,8 @@ class TradeService:
         strategy_config_service: StrategyConfigService,
         balance_service: BalanceService,
         order_service: OrderService,
-        userbot_service: UserBotService
+        userbot_service: UserBotService,
+        indicator_states: Optional[IndicatorStateStore] = None
     ):
         self.deal_service = deal_service
         self.marketdata_service = marketdata_service
@@ -48,6 +59,8 @@ class TradeService:
         self.order_service = order_service
         self.strategy_config_service = strategy_config_service
         self.userbot_service = userbot_service
+        # Без явного хранилища снимки индикаторов берутся из Redis по REDIS_URL на каждый цикл
+        self.indicator_states = indicator_states
         
         # Создаем TradeExecutor
         self.trade_executor = TradeExecutor(
@@ -216,7 +229,11 @@ class TradeService:
             except Exception as e:
                 print(f"Ошибка построения open_state: {e}")
 
-            decision = await strategy.decide(md, template, open_state=open_state)
+            streaming = _streaming_strategy(strategy)
+            if streaming is None:
+                decision = await strategy.decide(md, template, open_state=open_state)
+            else:
+                decision = await self._decide_streaming(strategy, streaming, md, template, open_state, user_id)
 
             print(f"Decision: intents={len(decision.intents)}, ttl={decision.bundle_ttl_sec}")
             if not decision.intents:
@@ -238,6 +255,32 @@ class TradeService:
 
         print("=== END: Trading Cycle ===")
 
+    async def _decide_streaming(self, strategy, streaming, md, template, open_state, user_id) -> Decision:
+        """decide() с индикаторами, продолжающими считаться с прошлого цикла: в on_bar попадают только новые свечи.
+
+        Снимок хранится в Redis по (user, template). Если с прошлого цикла пропущены свечи
+        или изменились параметры шаблона, индикаторы прогреваются заново по всему окну свечей.
+        """
+        template_id = getattr(template, 'id', None)
+        indicator_states = self.indicator_states or IndicatorStateStore.from_env()
+        try:
+            snapshot = await indicator_states.load(user_id, template_id)
+            if snapshot is not None:
+                initial_state = streaming.indicator_snapshot()
+                try:
+                    if not streaming.resume_indicators(snapshot, md.get(self._sym_str(template.symbol))):
+                        print("Пропущены свечи с прошлого цикла — индикаторы прогреваются заново")
+                except (KeyError, ValueError) as e:
+                    print(f"Состояние индикаторов сброшено: {e}")
+                    streaming.restore_indicators(initial_state)
+
+            decision = await strategy.decide(md, template, open_state=open_state)
+            await indicator_states.save(user_id, template_id, streaming.indicator_snapshot())
+            return decision
+        finally:
+            if self.indicator_states is None:
+                await indicator_states.close()
+
     async def _check_bot_and_deal(self, bot_id, user_id, symbol):
         print(f"Проверка активности бота (user_id={user_id}, symbol={symbol}) и открытых сделок")
         bot = await self.userbot_service.get_active_bot(user_id, symbol)
@@ -10,6 +10,7 @@ from schemas.user_strategy_template import (
     UserStrategyTemplateRead
 )
 from models.user_model import Symbols, Intervals
+from services.indicator_state_store import IndicatorStateStore
 
 
 class UserStrategyTemplateService:
@@ -102,6 +103,12 @@ class UserStrategyTemplateService:
             deleted = await self.repo.delete_by_id(id_, user_id)
             if autocommit:
                 await session.commit()
+            # Снимок индикаторов удалённого шаблона больше не нужен
+            indicator_states = IndicatorStateStore.from_env()
+            try:
+                await indicator_states.delete(user_id, id_)
+            finally:
+                await indicator_states.close()
         except Exception as e:
             raise HTTPException(
                 status_code=500,
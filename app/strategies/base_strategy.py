@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
+from dataclasses import asdict, is_dataclass
 
 from pandas import DataFrame
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Mapping
+
+from strategies.indicators import IncrementalIndicator, KlineFeed
 
 # Константы для процентных параметров стратегий
 PERCENTAGE_PARAMS = [
@@ -66,9 +69,83 @@ def should_show_percentage_format(params_dict):
 
 
 class BaseStrategy(ABC):
+    # Кэш индикаторов прогона бэктеста (IndicatorCache); вне бэктеста не используется
+    indicator_cache = None
+
     def __init__(self, config: dict):
         self.config = config
 
+    def ema_last(self, df: DataFrame, span: int):
+        """Значение EMA(close, span) на последней свече df.
+
+        В бэктесте берётся из предрассчитанной серии кэша прогона, иначе считается по df.
+        """
+        cache = self.indicator_cache
+        if cache is not None:
+            value = cache.ema_last(df, span)
+            if value is not None:
+                return value
+        return df['close'].ewm(span=span).mean().iloc[-1]
+
+    def _init_streaming(self, enabled: bool, indicators: Dict[str, IncrementalIndicator]) -> None:
+        """Настраивает инкрементальный путь on_bar (параметр шаблона streaming_indicators)"""
+        self.streaming = enabled
+        self.indicators = indicators
+        self.kline_feed = KlineFeed()
+        self.stream_signal = None
+
+    def on_bar(self, bar: Mapping[str, float]) -> Optional[str]:
+        """Учитывает одну новую закрытую свечу и возвращает сигнал (опционально)"""
+        raise NotImplementedError(f"{type(self).__name__} does not support on_bar")
+
+    def feed_klines(self, df: DataFrame) -> Optional[str]:
+        """Передаёт в on_bar только свечи, которых стратегия ещё не видела"""
+        for bar in self.kline_feed.new_bars(df):
+            self.stream_signal = self.on_bar(bar)
+        return self.stream_signal
+
+    def indicator_snapshot(self) -> Dict[str, Any]:
+        """Состояние инкрементальных индикаторов для сохранения между циклами"""
+        return {
+            'feed': self.kline_feed.snapshot(),
+            'signal': self.stream_signal,
+            'indicators': {name: ind.snapshot() for name, ind in self.indicators.items()},
+        }
+
+    def resume_indicators(self, snapshot: Mapping[str, Any], df: DataFrame) -> bool:
+        """Восстанавливает индикаторы из снимка, если df продолжает их поток без пропуска свечей.
+
+        Иначе состояние не трогается, и индикаторы прогреваются по всему df.
+        """
+        feed = KlineFeed()
+        feed.restore(snapshot['feed'])
+        if not feed.continues(df):
+            return False
+        self.restore_indicators(snapshot)
+        return True
+
+    def restore_indicators(self, snapshot: Mapping[str, Any]) -> None:
+        self.kline_feed.restore(snapshot['feed'])
+        self.stream_signal = snapshot.get('signal')
+        for name, state in snapshot['indicators'].items():
+            self.indicators[name].restore(state)
+
+    def state_snapshot(self) -> Dict[str, Any]:
+        """Изменяемое состояние стратегии для чекпойнта бэктеста: индикаторы и dataclass state"""
+        snapshot: Dict[str, Any] = {}
+        if getattr(self, 'indicators', None) is not None:
+            snapshot['streaming'] = self.indicator_snapshot()
+        state = getattr(self, 'state', None)
+        if is_dataclass(state):
+            snapshot['state'] = asdict(state)
+        return snapshot
+
+    def restore_state(self, snapshot: Mapping[str, Any]) -> None:
+        if 'streaming' in snapshot:
+            self.restore_indicators(snapshot['streaming'])
+        if 'state' in snapshot:
+            self.state = type(self.state)(**snapshot['state'])
+
     @abstractmethod
     def generate_signal(self, df: DataFrame) -> str:
         """Генерирует торговый сигнал: 'long', 'short' или None"""
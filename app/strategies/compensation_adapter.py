@@ -6,7 +6,7 @@ import pandas as pd
 from strategies.base_strategy import BaseStrategy
 from services.strategy_parameters import StrategyParameters
 from strategies.contracts import Decision, OrderIntent, MarketData, OpenState, Strategy
-from strategies.compensation_strategy import CompensationStrategy
+from strategies.compensation_strategy import CompensationStrategy, comp_log, signal_log
 from services.deal_service import DealService
 # from strategies.market_data import MarketData
 
@@ -62,9 +62,13 @@ class CompensationAdapter(Strategy):
         btc_df = md.get(btc_symbol)
 
         if btc_df is None or btc_df.empty:
-            print("[COMP] Пропуск решения: нет данных BTC для анализа")
+            comp_log.debug("[COMP] Пропуск решения: нет данных BTC для анализа")
             return Decision(intents=[])
 
+        # Инкрементальные индикаторы обновляем на каждой новой свече, даже при открытой позиции
+        if self.strategy.streaming:
+            self.strategy.feed_klines(btc_df)
+
         # Получаем текущую цену BTC
         current_btc_price = btc_df['close'].iloc[-1]
         current_time = btc_df.index[-1] if hasattr(btc_df.index[-1], 'timestamp') else datetime.now()
@@ -87,7 +91,7 @@ class CompensationAdapter(Strategy):
         # КРИТИЧЕСКАЯ ПРОВЕРКА: ETH может существовать только вместе с BTC
         # Если есть ETH позиция без BTC — немедленно закрываем ETH и чистим состояние ETH
         if eth_position and not btc_position:
-            print("[COMP] Обнаружена ETH позиция без BTC — создаём emergency_close для ETH и чистим состояние ETH")
+            comp_log.debug("[COMP] Обнаружена ETH позиция без BTC — создаём emergency_close для ETH и чистим состояние ETH")
             close_eth_intent = OrderIntent(
                 symbol="ETHUSDT",
                 side="SELL" if eth_position['side'] == "BUY" else "BUY",
@@ -128,26 +132,24 @@ class CompensationAdapter(Strategy):
             # print("🔍 DEBUG: Нет BTC позиции, проверяем вход")
             btc_intent = self._generate_btc_entry_intent(btc_df, template)
             if btc_intent:
-                print(f"✅ CompensationAdapter: Создан BTC entry intent: {btc_intent.symbol} {btc_intent.side} {btc_intent.role}")
+                comp_log.debug("✅ CompensationAdapter: Создан BTC entry intent: %s %s %s", btc_intent.symbol, btc_intent.side, btc_intent.role)
                 intents.append(btc_intent)
             else:
-                # Подробно логируем причины холда
-                try:
-                    # Рассчитываем текущие EMA и отклонение для наглядности (без повторного вызова generate_signal)
-                    ema_fast = btc_df['close'].ewm(span=self.strategy.ema_fast).mean().iloc[-1]
-                    ema_slow = btc_df['close'].ewm(span=self.strategy.ema_slow).mean().iloc[-1]
-                    diff_pct = abs(float(ema_fast) - float(ema_slow)) / float(ema_slow) if float(ema_slow) != 0 else 0.0
-                    if verbose:
-                        print(f"[HOLD] BTC: сигнал=hold | EMA_fast={float(ema_fast):.2f} EMA_slow={float(ema_slow):.2f} diff={diff_pct*100:.2f}% < threshold={self.strategy.trend_threshold*100:.2f}%")
-                except Exception as e:
-                    if verbose:
-                        print(f"[HOLD] BTC: не удалось вычислить детали причины hold: {e}")
+                # Подробно логируем причины холда (EMA считаем только ради лога)
+                if verbose and signal_log.is_enabled():
+                    try:
+                        ema_fast = self.strategy.ema_last(btc_df, self.strategy.ema_fast)
+                        ema_slow = self.strategy.ema_last(btc_df, self.strategy.ema_slow)
+                        diff_pct = abs(float(ema_fast) - float(ema_slow)) / float(ema_slow) if float(ema_slow) != 0 else 0.0
+                        signal_log.debug("[HOLD] BTC: сигнал=hold | EMA_fast=%.2f EMA_slow=%.2f diff=%.2f%% < threshold=%.2f%%", float(ema_fast), float(ema_slow), diff_pct*100, self.strategy.trend_threshold*100)
+                    except Exception as e:
+                        signal_log.debug("[HOLD] BTC: не удалось вычислить детали причины hold: %s", e)
                 # print("❌ CompensationAdapter: BTC entry intent не создан")
         else:
             # Есть BTC — проверяем, нужна ли компенсация. Открывать ETH можно только один раз за жизнь BTC-позиции
             if not eth_position and not self.strategy.state.compensation_triggered:
                 if verbose:
-                    print("[COMP] Есть BTC без ETH, проверяем условия компенсации")
+                    comp_log.debug("[COMP] Есть BTC без ETH, проверяем условия компенсации")
                 eth_intент = self._generate_eth_compensation_intent(
                     btc_df, current_btc_price, current_time, template, md
                 )
@@ -156,14 +158,14 @@ class CompensationAdapter(Strategy):
                     current_deal_id = getattr(self.strategy.state, 'last_btc_deal_id', None)
                     if current_deal_id is not None and getattr(self.strategy.state, 'compensation_done_for_deal_id', None) == current_deal_id:
                         if verbose:
-                            print("[COMP] Компенсация для этого BTC уже выполнена — пропускаем повторный ETH")
+                            comp_log.debug("[COMP] Компенсация для этого BTC уже выполнена — пропускаем повторный ETH")
                     else:
                         self.strategy.state.compensation_done_for_deal_id = current_deal_id
-                    print(f"✅ CompensationAdapter: Создан ETH compensation intent: {eth_intент.symbol} {eth_intент.side} {eth_intент.role}")
+                    comp_log.debug("✅ CompensationAdapter: Создан ETH compensation intent: %s %s %s", eth_intент.symbol, eth_intент.side, eth_intент.role)
                     intents.append(eth_intент)
                 else:
                     if verbose:
-                        print("[COMP] Компенсация не требуется: условия не выполнены")
+                        comp_log.debug("[COMP] Компенсация не требуется: условия не выполнены")
 
         # Дополнительно: если BTC закрыт недавно, но ETH ещё не открыт — проверим компенсацию в пост-окне
         # Разрешаем пост-компенсацию только если в этом прогоне уже был реальный вход в BTC (had_btc=True)
@@ -175,7 +177,7 @@ class CompensationAdapter(Strategy):
             and self.strategy.can_compensate_after_close(current_time)
         ):
             if verbose:
-                print("[COMP] Пост-компенсация: BTC закрыт недавно, проверяем условия для ETH")
+                comp_log.debug("[COMP] Пост-компенсация: BTC закрыт недавно, проверяем условия для ETH")
             eth_intent_post = self._generate_eth_compensation_intent(
                 btc_df, current_btc_price, current_time, template, md
             )
@@ -184,10 +186,10 @@ class CompensationAdapter(Strategy):
                 last_deal_id = getattr(self.strategy.state, 'last_btc_deal_id', None)
                 if last_deal_id is not None and getattr(self.strategy.state, 'compensation_done_for_deal_id', None) == last_deal_id:
                     if verbose:
-                        print("[COMP] Пост-компенсация уже выполнена для этого BTC — пропускаем")
+                        comp_log.debug("[COMP] Пост-компенсация уже выполнена для этого BTC — пропускаем")
                 else:
                     self.strategy.state.compensation_done_for_deal_id = last_deal_id
-                    print(f"✅ CompensationAdapter: Создан ETH compensation intent (post-close): {eth_intent_post.symbol} {eth_intent_post.side} {eth_intent_post.role}")
+                    comp_log.debug("✅ CompensationAdapter: Создан ETH compensation intent (post-close): %s %s %s", eth_intent_post.symbol, eth_intent_post.side, eth_intent_post.role)
                     intents.append(eth_intent_post)
             # else:
             #     print("❌ CompensationAdapter: ETH compensation intent не создан")
@@ -197,11 +199,11 @@ class CompensationAdapter(Strategy):
         close_intents = self._generate_close_intents(btc_df, eth_df, btc_position, eth_position)
         if close_intents:
             if verbose:
-                print(f"✅ CompensationAdapter: Созданы close intents: {len(close_intents)}")
+                comp_log.debug("✅ CompensationAdapter: Созданы close intents: %s", len(close_intents))
             intents.extend(close_intents)
         else:
             if verbose:
-                print("[COMP] Close intents не созданы: условия закрытия не выполнены")
+                comp_log.debug("[COMP] Close intents не созданы: условия закрытия не выполнены")
         # else:
         #     print("❌ CompensationAdapter: Close intents не созданы")
 
@@ -219,7 +221,7 @@ class CompensationAdapter(Strategy):
                 # Для бэктеста - просто возвращаем пустой список
                 return []
         except Exception as e:
-            print(f"Ошибка при получении открытых сделок: {e}")
+            comp_log.warning("Ошибка при получении открытых сделок: %s", e)
             return []
 
     def _update_strategy_state(self, btc_deal, eth_deal):
@@ -257,7 +259,10 @@ class CompensationAdapter(Strategy):
 
     def _generate_btc_entry_intent(self, btc_df: pd.DataFrame, template) -> Optional[OrderIntent]:
         """Генерирует намерение входа в BTC по логике новичка"""
-        signal = self.strategy.generate_signal(btc_df)
+        if self.strategy.streaming:
+            signal = self.strategy.stream_signal or 'hold'
+        else:
+            signal = self.strategy.generate_signal(btc_df)
 
         # print(f"🔍 DEBUG: _generate_btc_entry_intent - signal: {signal}, df_len: {len(btc_df)}")
 
@@ -297,19 +302,19 @@ class CompensationAdapter(Strategy):
         # либо в пост-окно после её закрытия (при сохранённых entry_price/side), и если не была уже выполнена
         if self.strategy.state.compensation_triggered:
             if verbose:
-                print("[COMP] Компенсация уже была выполнена ранее — повторный вход запрещён")
+                comp_log.debug("[COMP] Компенсация уже была выполнена ранее — повторный вход запрещён")
             return None
         # Требуем наличие цены входа и стороны BTC
         if not getattr(self.strategy.state, 'btc_entry_price', None) or not getattr(self.strategy.state, 'btc_side', None):
             if verbose:
-                print("[COMP] Невозможно создать компенсацию: не хватает данных BTC (entry_price/side)")
+                comp_log.debug("[COMP] Невозможно создать компенсацию: не хватает данных BTC (entry_price/side)")
             return None
         # Разрешаем, если BTC ещё открыт (btc_deal_id есть) ИЛИ если пост-окно после закрытия активно
         btc_active = getattr(self.strategy.state, 'btc_deal_id', None) is not None
         post_window = self.strategy.can_compensate_after_close(current_time)
         if not (btc_active or post_window):
             if verbose:
-                print("[COMP] Невозможно создать компенсацию: нет активной BTC позиции и пост-окно истекло")
+                comp_log.debug("[COMP] Невозможно создать компенсацию: нет активной BTC позиции и пост-окно истекло")
             return None
 
         # Получаем данные ETH по запросу
@@ -319,18 +324,19 @@ class CompensationAdapter(Strategy):
         full_eth_df = md.get(eth_symbol)
         if full_eth_df is None or full_eth_df.empty:
             if verbose:
-                print(f"[COMP] Нет ETH данных в market_data — компенсация недоступна")
+                comp_log.debug("[COMP] Нет ETH данных в market_data — компенсация недоступна")
             return None
         
         # Берем данные за последние N свечей для анализа тренда ETH
         required_eth_candles = self.strategy.ema_slow + self.strategy.compensation_delay_candles + 10 # Добавляем запас
         
         # Фильтруем данные ETH до текущего времени и берем нужное количество свечей
-        eth_df_filtered = full_eth_df[full_eth_df.index <= current_time]
+        # (индекс отсортирован — позиционный срез вместо булевой маски по всей истории)
+        eth_df_filtered = full_eth_df.iloc[:full_eth_df.index.searchsorted(current_time, side='right')]
         
         if len(eth_df_filtered) < required_eth_candles:
             if verbose:
-                print(f"[COMP] ETH данных недостаточно для компенсации: есть {len(eth_df_filtered)}, нужно {required_eth_candles}")
+                comp_log.debug("[COMP] ETH данных недостаточно для компенсации: есть %s, нужно %s", len(eth_df_filtered), required_eth_candles)
             return None
         
         # Берем последние required_eth_candles для анализа
@@ -339,7 +345,7 @@ class CompensationAdapter(Strategy):
         # Проверяем условия для компенсации
         if not self.strategy.should_trigger_compensation(btc_df, eth_df_for_analysis, current_btc_price, current_time):
             if verbose:
-                print("[COMP] Условия компенсации не выполнены (should_trigger_compensation=False)")
+                comp_log.debug("[COMP] Условия компенсации не выполнены (should_trigger_compensation=False)")
             return None
             
         # Определяем сторону для ETH (совпадает с BTC). Нормализуем BUY/SELL по входу в BTC
@@ -358,7 +364,7 @@ class CompensationAdapter(Strategy):
         # Зафиксируем сторону и признак компенсации в состоянии (для корректного закрытия и запрета повторных входов)
         self.strategy.update_state(eth_side=eth_side, compensation_triggered=True)
         if verbose:
-            print(f"[COMP] Компенсация подтверждена: side={eth_side} risk_pct={eth_risk_pct}")
+            comp_log.debug("[COMP] Компенсация подтверждена: side=%s risk_pct=%s", eth_side, eth_risk_pct)
         return order_intent
 
     def _generate_close_intents(
@@ -385,7 +391,7 @@ class CompensationAdapter(Strategy):
                 should_close_btc, btc_reason = self.strategy.should_close_btc_position(btc_df, current_time)
                 if should_close_btc:
                     if verbose:
-                        print(f"✅ CompensationAdapter: Создаем close интент для BTC: {btc_reason}")
+                        comp_log.debug("✅ CompensationAdapter: Создаем close интент для BTC: %s", btc_reason)
                     intents.append(OrderIntent(
                         symbol="BTCUSDT",
                         side="SELL" if btc_position['side'] == "BUY" else "BUY",
@@ -404,7 +410,7 @@ class CompensationAdapter(Strategy):
             # ETH: разрешаем close-интент только для emergency сценариев
             if should_close_eth and isinstance(eth_reason, str) and "emergency_close" in eth_reason:
                 if verbose:
-                    print(f"✅ CompensationAdapter: Создаем emergency close интент для ETH: {eth_reason}")
+                    comp_log.debug("✅ CompensationAdapter: Создаем emergency close интент для ETH: %s", eth_reason)
                 intents.append(OrderIntent(
                     symbol="ETHUSDT",
                     side="SELL" if eth_position['side'] == "BUY" else "BUY",
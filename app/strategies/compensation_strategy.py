@@ -1,12 +1,18 @@
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Mapping
 from dataclasses import dataclass
 
 from strategies.base_strategy import BaseStrategy
+from strategies.indicators import EMA, CandlesAgainstCounter
 from services.strategy_parameters import StrategyParameters
 from strategies.contracts import Decision, OrderIntent
 from schemas.user_strategy_template import UserStrategyTemplateRead
+from utils.hot_log import get_logger
+
+params_log = get_logger('strategy.params')
+signal_log = get_logger('strategy.signal')
+comp_log = get_logger('strategy.compensation')
 
 
 @dataclass
@@ -105,23 +111,33 @@ class CompensationStrategy(BaseStrategy):
         # Управление болтливостью логов
         self.verbose = self.params.get_bool("verbose", False)
 
-        print("🎛️ Параметры компенсационной стратегии:")
-        print(f"   EMA: fast={self.ema_fast} slow={self.ema_slow} threshold={self.trend_threshold*100:.2f}%")
-        print(f"   BTC Stop Loss: {self.btc_stop_loss_pct:.4f} ({self.btc_stop_loss_pct*100:.2f}%)")
-        print(f"   BTC Take Profit: {self.btc_take_profit_pct:.4f} ({self.btc_take_profit_pct*100:.2f}%)")
-        print(f"   BTC Risk %: {self.btc_risk_pct:.4f} ({self.btc_risk_pct*100:.2f}%)")
-        print(f"   ETH Stop Loss: {self.eth_stop_loss_pct:.4f} ({self.eth_stop_loss_pct*100:.2f}%)")
-        print(f"   ETH Take Profit: {self.eth_take_profit_pct:.4f} ({self.eth_take_profit_pct*100:.2f}%)")
-        print(f"   Compensation: threshold={self.compensation_threshold*100:.2f}% candles_against≥{self.candles_against_threshold} delay={self.compensation_delay_candles} max_window={self.max_compensation_window_candles} high_adverse={self.high_adverse_threshold*100:.2f}%")
-        print(f"   ETH confirm: candles={self.eth_confirmation_candles} require_alignment={self.require_eth_ema_alignment}")
-        print(f"   ETH volume check: {'disabled' if self.eth_volume_min_ratio <= 0 else f'min_ratio={self.eth_volume_min_ratio:.2f}'}")
-        print(f"   Trailing stop %: {self.trailing_stop_pct*100:.2f}%")
-        print(f"   Post-close window: {self.post_close_compensation_candles} candles")
-        print(f"   ETH compensation side: {'opposite' if self.eth_compensation_opposite else 'same'} to BTC")
+        params_log.debug("🎛️ Параметры компенсационной стратегии:")
+        params_log.debug("   EMA: fast=%s slow=%s threshold=%.2f%%", self.ema_fast, self.ema_slow, self.trend_threshold*100)
+        params_log.debug("   BTC Stop Loss: %.4f (%.2f%%)", self.btc_stop_loss_pct, self.btc_stop_loss_pct*100)
+        params_log.debug("   BTC Take Profit: %.4f (%.2f%%)", self.btc_take_profit_pct, self.btc_take_profit_pct*100)
+        params_log.debug("   BTC Risk %%: %.4f (%.2f%%)", self.btc_risk_pct, self.btc_risk_pct*100)
+        params_log.debug("   ETH Stop Loss: %.4f (%.2f%%)", self.eth_stop_loss_pct, self.eth_stop_loss_pct*100)
+        params_log.debug("   ETH Take Profit: %.4f (%.2f%%)", self.eth_take_profit_pct, self.eth_take_profit_pct*100)
+        params_log.debug("   Compensation: threshold=%.2f%% candles_against≥%s delay=%s max_window=%s high_adverse=%.2f%%", self.compensation_threshold*100, self.candles_against_threshold, self.compensation_delay_candles, self.max_compensation_window_candles, self.high_adverse_threshold*100)
+        params_log.debug("   ETH confirm: candles=%s require_alignment=%s", self.eth_confirmation_candles, self.require_eth_ema_alignment)
+        params_log.debug("   ETH volume check: %s", 'disabled' if self.eth_volume_min_ratio <= 0 else f'min_ratio={self.eth_volume_min_ratio:.2f}')
+        params_log.debug("   Trailing stop %%: %.2f%%", self.trailing_stop_pct*100)
+        params_log.debug("   Post-close window: %s candles", self.post_close_compensation_candles)
+        params_log.debug("   ETH compensation side: %s to BTC", 'opposite' if self.eth_compensation_opposite else 'same')
 
         self.state = CompensationState()
         self.interval = params.get_str("interval", "1m") # Добавляем интервал свечей
 
+        # Инкрементальные индикаторы BTC для пути on_bar
+        self._init_streaming(
+            self.params.get_bool("streaming_indicators", False),
+            {
+                'ema_fast': EMA(self.ema_fast),
+                'ema_slow': EMA(self.ema_slow),
+                'candles_against': CandlesAgainstCounter(window=2),
+            }
+        )
+
     def required_symbols(self, template=None) -> List[str]:
         """Возвращает список необходимых символов для компенсационной стратегии"""
         return ["BTCUSDT", "ETHUSDT"]
@@ -141,25 +157,26 @@ class CompensationStrategy(BaseStrategy):
         """Вспомогательная функция для генерации сигнала тренда на основе EMA"""
         if len(df) < ema_slow_span:
             if self.verbose:
-                print(f"[SIGNAL] BTC hold: недостаточно данных для EMA (len={len(df)} < slow={ema_slow_span})")
+                signal_log.debug("[SIGNAL] BTC hold: недостаточно данных для EMA (len=%s < slow=%s)", len(df), ema_slow_span)
             return None
 
-        ema_fast = df['close'].ewm(span=ema_fast_span).mean()
-        ema_slow = df['close'].ewm(span=ema_slow_span).mean()
+        fast_val = float(self.ema_last(df, ema_fast_span))
+        slow_val = float(self.ema_last(df, ema_slow_span))
+        return self._trend_from_emas(fast_val, slow_val, trend_threshold)
 
-        fast_val = float(ema_fast.iloc[-1])
-        slow_val = float(ema_slow.iloc[-1])
+    def _trend_from_emas(self, fast_val: float, slow_val: float, trend_threshold: float) -> str:
+        """Сигнал тренда по готовым значениям EMA"""
         diff = abs(fast_val - slow_val) / slow_val if slow_val != 0 else 0.0
         if self.verbose:
-            print(f"[SIGNAL] BTC EMA fast={fast_val:.2f} slow={slow_val:.2f} diff={diff*100:.2f}% threshold={trend_threshold*100:.2f}%")
+            signal_log.debug("[SIGNAL] BTC EMA fast=%.2f slow=%.2f diff=%.2f%% threshold=%.2f%%", fast_val, slow_val, diff*100, trend_threshold*100)
         if diff < trend_threshold:
             if self.verbose:
-                print("[SIGNAL] BTC hold: |EMA_fast-EMA_slow| ниже порога тренда")
+                signal_log.debug("[SIGNAL] BTC hold: |EMA_fast-EMA_slow| ниже порога тренда")
             return 'hold'
 
         trend = 'long' if fast_val > slow_val else 'short'
         if self.verbose:
-            print(f"[SIGNAL] BTC тренд: {trend} (EMA_fast {'>' if fast_val > slow_val else '<'} EMA_slow)")
+            signal_log.debug("[SIGNAL] BTC тренд: %s (EMA_fast %s EMA_slow)", trend, '>' if fast_val > slow_val else '<')
         return trend
 
     def generate_signal(self, df: pd.DataFrame) -> str:
@@ -171,9 +188,19 @@ class CompensationStrategy(BaseStrategy):
             pass
         else:
             if self.verbose:
-                print(f"[SIGNAL] BTC итоговый сигнал: {final_signal}")
+                signal_log.debug("[SIGNAL] BTC итоговый сигнал: %s", final_signal)
         return final_signal
 
+    def on_bar(self, bar: Mapping[str, float]) -> str:
+        """Инкрементальный вариант generate_signal для одной новой свечи BTC"""
+        close = bar['close']
+        fast_val = self.indicators['ema_fast'].update(close)
+        slow_val = self.indicators['ema_slow'].update(close)
+        self.indicators['candles_against'].update_bar(bar)
+        if self.indicators['ema_slow'].count < self.ema_slow:
+            return 'hold'
+        return self._trend_from_emas(fast_val, slow_val, self.trend_threshold)
+
     def calculate_position_size(self, balance: float, symbol: str = "BTC") -> float:
         """Рассчитывает размер позиции для BTC или ETH"""
         if symbol == "BTC":
@@ -224,27 +251,27 @@ class CompensationStrategy(BaseStrategy):
         # 1) BTC позиция активна (btc_deal_id установлен)
         # 2) BTC недавно закрыта (btc_closed_time установлен) и мы в пределах окна пост-компенсации
         if not self.state.btc_entry_price:
-            print("[COMP] Нет цены входа по BTC в состоянии — компенсация не рассматривается")
+            comp_log.debug("[COMP] Нет цены входа по BTC в состоянии — компенсация не рассматривается")
             return False
         if self.state.btc_deal_id is None:
             if not self.state.btc_closed_time:
                 if self.verbose:
-                    print("[COMP] BTC уже закрыт и нет отметки времени закрытия — компенсация не рассматривается")
+                    comp_log.debug("[COMP] BTC уже закрыт и нет отметки времени закрытия — компенсация не рассматривается")
                 return False
             interval_minutes = self._parse_interval_to_minutes(self.interval)
             candles_since_close = (current_time - self.state.btc_closed_time).total_seconds() / (interval_minutes * 60)
             if candles_since_close > self.post_close_compensation_candles:
                 if self.verbose:
-                    print(f"[COMP] Истекло пост-окно компенсации: прошло {candles_since_close:.1f} свечей > {self.post_close_compensation_candles}")
+                    comp_log.debug("[COMP] Истекло пост-окно компенсации: прошло %.1f свечей > %s", candles_since_close, self.post_close_compensation_candles)
                 return False
             if self.verbose:
-                print(f"[COMP] BTC закрыт недавно ({candles_since_close:.1f} свечей назад) — проверяем компенсацию в пост-окне")
+                comp_log.debug("[COMP] BTC закрыт недавно (%.1f свечей назад) — проверяем компенсацию в пост-окне", candles_since_close)
 
         # Обновляем анализ свечей и импульс
         self._update_candles_analysis(btc_df)
         self._check_impulse(btc_df)
         if self.verbose:
-            print(f"[COMP] Анализ компенсации: candles_against={self.state.btc_candles_against} impulse={self.state.btc_impulse_detected}")
+            comp_log.debug("[COMP] Анализ компенсации: candles_against=%s impulse=%s", self.state.btc_candles_against, self.state.btc_impulse_detected)
 
         # Рассчитываем неблагоприятное движение в процентах
         if self.state.btc_side == "BUY":
@@ -252,26 +279,26 @@ class CompensationStrategy(BaseStrategy):
         else:
             adverse_pct = (current_price - self.state.btc_entry_price) / self.state.btc_entry_price
         if self.verbose:
-            print(f"[COMP] Неблагоприятное движение BTC: {adverse_pct*100:.3f}% | threshold={self.compensation_threshold*100:.2f}%")
+            comp_log.debug("[COMP] Неблагоприятное движение BTC: %.3f%% | threshold=%.2f%%", adverse_pct*100, self.compensation_threshold*100)
 
         # Должно превысить порог
         if adverse_pct < self.compensation_threshold:
             self.state.compensation_signal_time = None
             if self.verbose:
-                print("[COMP] Порог неблагоприятного движения не достигнут — компенсация отклонена")
+                comp_log.debug("[COMP] Порог неблагоприятного движения не достигнут — компенсация отклонена")
             return False
 
         # Достаточное число свечей против
         if self.state.btc_candles_against < self.candles_against_threshold:
             if self.verbose:
-                print(f"[COMP] Недостаточно свечей против: {self.state.btc_candles_against} < {self.candles_against_threshold}")
+                comp_log.debug("[COMP] Недостаточно свечей против: %s < %s", self.state.btc_candles_against, self.candles_against_threshold)
             return False
 
         # Фиксируем старт компенсационного окна ожидания
         if self.state.compensation_signal_time is None:
             self.state.compensation_signal_time = current_time
             if self.verbose:
-                print(f"[COMP] Старт окна ожидания компенсации: t0={self.state.compensation_signal_time}")
+                comp_log.debug("[COMP] Старт окна ожидания компенсации: t0=%s", self.state.compensation_signal_time)
             return False
 
         # Проверяем задержку в свечах
@@ -280,25 +307,25 @@ class CompensationStrategy(BaseStrategy):
         # Аварийный вход: сильная просадка BTC — можно не ждать подтверждения ETH
         if adverse_pct >= self.high_adverse_threshold:
             if self.verbose:
-                print(f"[COMP] Аварийный вход: просадка {adverse_pct*100:.2f}% ≥ {self.high_adverse_threshold*100:.2f}% — разрешаем компенсацию без подтверждения ETH")
+                comp_log.debug("[COMP] Аварийный вход: просадка %.2f%% ≥ %.2f%% — разрешаем компенсацию без подтверждения ETH", adverse_pct*100, self.high_adverse_threshold*100)
             return True
 
         if candles_passed < self.compensation_delay_candles:
             if self.verbose:
-                print(f"[COMP] Ожидание задержки: прошло {candles_passed:.1f} свечей из {self.compensation_delay_candles}")
+                comp_log.debug("[COMP] Ожидание задержки: прошло %.1f свечей из %s", candles_passed, self.compensation_delay_candles)
             return False
 
         # Ограничение окна ожидания от первого сигнала
         if candles_passed > self.max_compensation_window_candles:
             if self.verbose:
-                print(f"[COMP] Истекло окно ожидания компенсации: прошло {candles_passed:.1f} свечей > {self.max_compensation_window_candles}")
+                comp_log.debug("[COMP] Истекло окно ожидания компенсации: прошло %.1f свечей > %s", candles_passed, self.max_compensation_window_candles)
             self.state.compensation_signal_time = None
             return False
 
         # Проверяем тренд ETH
         if eth_df.empty or len(eth_df) < self.ema_slow:
             if self.verbose:
-                print("[COMP] Недостаточно ETH данных для подтверждения тренда")
+                comp_log.debug("[COMP] Недостаточно ETH данных для подтверждения тренда")
             return False
 
         eth_trend = self._get_ema_trend_signal(eth_df, self.ema_fast, self.ema_slow, self.trend_threshold)
@@ -306,14 +333,14 @@ class CompensationStrategy(BaseStrategy):
         expected_eth_trend = ('short' if btc_trend == 'long' else 'long') if self.eth_compensation_opposite else btc_trend
         if self.require_eth_ema_alignment and eth_trend != expected_eth_trend:
             if self.verbose:
-                print(f"[COMP] ETH тренд не соответствует ожидаемому: eth={eth_trend} vs expected_eth={expected_eth_trend} (btc={btc_trend}, mode={'opposite' if self.eth_compensation_opposite else 'same'})")
+                comp_log.debug("[COMP] ETH тренд не соответствует ожидаемому: eth=%s vs expected_eth=%s (btc=%s, mode=%s)", eth_trend, expected_eth_trend, btc_trend, 'opposite' if self.eth_compensation_opposite else 'same')
             return False
 
         # Подтверждение последними N свечами ETH в сторону BTC
         n = max(1, int(self.eth_confirmation_candles))
         if len(eth_df) < n:
             if self.verbose:
-                print(f"[COMP] Недостаточно ETH свечей для подтверждения: {len(eth_df)} < {n}")
+                comp_log.debug("[COMP] Недостаточно ETH свечей для подтверждения: %s < %s", len(eth_df), n)
             return False
         eth_last = eth_df.iloc[-n:]
         # Подтверждаем направление именно для ETH-стороны компенсации
@@ -326,7 +353,7 @@ class CompensationStrategy(BaseStrategy):
             dir_ok = red_count == n and float(eth_last['close'].iloc[-1]) < float(eth_last['close'].iloc[0])
         if not dir_ok:
             if self.verbose:
-                print(f"[COMP] ETH не подтвердил {n} свечами направление компенсации ({eth_side_for_entry}) — компенсация отклонена")
+                comp_log.debug("[COMP] ETH не подтвердил %s свечами направление компенсации (%s) — компенсация отклонена", n, eth_side_for_entry)
             return False
 
         # Минимальное подтверждение объёмами ETH (по желанию)
@@ -335,22 +362,22 @@ class CompensationStrategy(BaseStrategy):
             base_window = min(len(eth_df) - n, n * 4)
             if base_window <= 0:
                 if self.verbose:
-                    print("[COMP] Недостаточно исторических данных ETH для оценки объёма")
+                    comp_log.debug("[COMP] Недостаточно исторических данных ETH для оценки объёма")
                 return False
             base_vol = float(eth_df['volume'].iloc[-(n+base_window):-n].mean())
             vol_ratio = recent_vol / base_vol if base_vol > 0 else 0.0
             if vol_ratio < self.eth_volume_min_ratio:
                 if self.verbose:
-                    print(f"[COMP] Объём ETH слабый: ratio={vol_ratio:.2f} < {self.eth_volume_min_ratio:.2f}")
+                    comp_log.debug("[COMP] Объём ETH слабый: ratio=%.2f < %.2f", vol_ratio, self.eth_volume_min_ratio)
                 return False
 
         # Базовая проверка качества компенсационного сигнала
         quality = self.get_compensation_quality_score(btc_df, eth_df)
         if self.verbose:
-            print(f"[COMP] Качество сигнала: corr_ok={quality.get('correlation_ok')} eth_dir_ok={quality.get('eth_direction_ok')} score={quality.get('score')}")
+            comp_log.debug("[COMP] Качество сигнала: corr_ok=%s eth_dir_ok=%s score=%s", quality.get('correlation_ok'), quality.get('eth_direction_ok'), quality.get('score'))
         if not (quality.get("correlation_ok") and quality.get("eth_direction_ok")):
             if self.verbose:
-                print("[COMP] Качество компенсационного сигнала недостаточно — компенсация отклонена")
+                comp_log.debug("[COMP] Качество компенсационного сигнала недостаточно — компенсация отклонена")
             return False
 
         return True
@@ -364,7 +391,7 @@ class CompensationStrategy(BaseStrategy):
             return
         if not self.state.btc_closed_time:
             self.state.btc_closed_time = current_time
-            print(f"[COMP] BTC позиция помечена как закрытая: t_close={self.state.btc_closed_time}")
+            comp_log.debug("[COMP] BTC позиция помечена как закрытая: t_close=%s", self.state.btc_closed_time)
 
     def can_compensate_after_close(self, current_time: datetime) -> bool:
         """Можно ли ещё проверять компенсацию после закрытия BTC (в пределах окна)."""
@@ -533,6 +560,11 @@ class CompensationStrategy(BaseStrategy):
         """Анализирует свечи против позиции"""
         if len(df) < 3 or not self.state.btc_side:
             return
+
+        counter = self.indicators['candles_against']
+        if self.streaming and counter.count >= 3:
+            self.state.btc_candles_against = counter.against(self.state.btc_side)
+            return
             
         candles_against = 0
         for i in range(len(df) - 2, len(df)):
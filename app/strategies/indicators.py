@@ -0,0 +1,280 @@
+"""
+Инкрементальные индикаторы: O(1) на новую свечу, общие для live-торговли и бэктеста.
+
+Каждый индикатор хранит только своё состояние, обновляется методом ``update`` и умеет
+сохраняться в JSON-совместимый словарь (``snapshot``/``restore``), чтобы состояние
+можно было переносить между торговыми циклами.
+"""
+import math
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class IncrementalIndicator:
+    """Базовый класс инкрементального индикатора"""
+
+    # Параметры (проверяются при restore) и атрибуты состояния, которые попадают в snapshot
+    _param_fields: tuple = ()
+    _state_fields: tuple = ()
+
+    def __init__(self):
+        self.count = 0
+
+    @property
+    def value(self) -> float:
+        raise NotImplementedError
+
+    @property
+    def ready(self) -> bool:
+        return not math.isnan(self.value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = {'type': type(self).__name__, 'count': self.count}
+        for name in self._param_fields + self._state_fields:
+            attr = getattr(self, name)
+            state[name] = list(attr) if isinstance(attr, deque) else attr
+        return state
+
+    def restore(self, state: Mapping[str, Any]) -> None:
+        if state.get('type') != type(self).__name__:
+            raise ValueError(f"Snapshot type {state.get('type')} does not match {type(self).__name__}")
+        for name in self._param_fields:
+            if state.get(name) != getattr(self, name):
+                raise ValueError(f"Snapshot {name}={state.get(name)} does not match {getattr(self, name)}")
+        self.count = int(state['count'])
+        for name in self._state_fields:
+            current = getattr(self, name)
+            if isinstance(current, deque):
+                setattr(self, name, deque(state[name], maxlen=current.maxlen))
+            else:
+                setattr(self, name, state[name])
+
+
+class EMA(IncrementalIndicator):
+    """EMA с семантикой ``Series.ewm(span=span).mean()`` (adjust=True).
+
+    Повторяет рекуррентную формулу pandas, поэтому значения совпадают бит-в-бит.
+    """
+
+    _param_fields = ('span',)
+    _state_fields = ('_weighted', '_old_wt')
+
+    def __init__(self, span: int):
+        super().__init__()
+        self.span = int(span)
+        com = (self.span - 1) / 2.0
+        self._factor = 1.0 - 1.0 / (1.0 + com)
+        self._weighted = math.nan
+        self._old_wt = 1.0
+
+    @property
+    def value(self) -> float:
+        return self._weighted
+
+    def update(self, value: float) -> float:
+        cur = float(value)
+        is_observation = cur == cur
+        if self.count == 0:
+            self._weighted = cur
+        elif self._weighted == self._weighted:
+            self._old_wt *= self._factor
+            if is_observation:
+                if self._weighted != cur:
+                    self._weighted = (self._old_wt * self._weighted + cur) / (self._old_wt + 1.0)
+                self._old_wt += 1.0
+        elif is_observation:
+            self._weighted = cur
+        self.count += 1
+        return self._weighted
+
+
+class SMA(IncrementalIndicator):
+    """Скользящее среднее за ``period`` значений (NaN до заполнения окна)"""
+
+    _param_fields = ('period',)
+    _state_fields = ('_window', '_sum')
+
+    def __init__(self, period: int):
+        super().__init__()
+        self.period = int(period)
+        self._window: deque = deque(maxlen=self.period)
+        self._sum = 0.0
+
+    @property
+    def value(self) -> float:
+        if len(self._window) < self.period:
+            return math.nan
+        return self._sum / self.period
+
+    def update(self, value: float) -> float:
+        cur = float(value)
+        if len(self._window) == self.period:
+            self._sum -= self._window[0]
+        self._window.append(cur)
+        self.count += 1
+        # Периодически пересчитываем сумму, чтобы не копить ошибку округления
+        if self.count % self.period == 0:
+            self._sum = math.fsum(self._window)
+        else:
+            self._sum += cur
+        return self.value
+
+
+class RollingMean(SMA):
+    """Скользящее среднее объёма (или любой другой колонки свечи)"""
+
+    def __init__(self, period: int, column: str = 'volume'):
+        super().__init__(period)
+        self.column = column
+
+    def update_bar(self, bar: Mapping[str, float]) -> float:
+        return self.update(bar[self.column])
+
+
+class ATR(IncrementalIndicator):
+    """Average True Range со сглаживанием Уайлдера.
+
+    Первое значение — среднее первых ``period`` true range, далее
+    ``atr = (atr * (period - 1) + tr) / period``.
+    """
+
+    _param_fields = ('period',)
+    _state_fields = ('_prev_close', '_seed_sum', '_atr')
+
+    def __init__(self, period: int = 14):
+        super().__init__()
+        self.period = int(period)
+        self._prev_close: Optional[float] = None
+        self._seed_sum = 0.0
+        self._atr = math.nan
+
+    @property
+    def value(self) -> float:
+        return self._atr
+
+    def update(self, high: float, low: float, close: float) -> float:
+        high, low, close = float(high), float(low), float(close)
+        if self._prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self.count += 1
+        if self.count < self.period:
+            self._seed_sum += tr
+        elif self.count == self.period:
+            self._atr = (self._seed_sum + tr) / self.period
+        else:
+            self._atr = (self._atr * (self.period - 1) + tr) / self.period
+        return self._atr
+
+    def update_bar(self, bar: Mapping[str, float]) -> float:
+        return self.update(bar['high'], bar['low'], bar['close'])
+
+
+class CandlesAgainstCounter(IncrementalIndicator):
+    """Количество свечей против позиции среди последних ``window`` свечей.
+
+    Свеча считается растущей, если close > open, иначе — падающей.
+    """
+
+    _param_fields = ('window',)
+    _state_fields = ('_directions',)
+
+    def __init__(self, window: int = 2):
+        super().__init__()
+        self.window = int(window)
+        self._directions: deque = deque(maxlen=self.window)
+
+    @property
+    def value(self) -> float:
+        return float(len(self._directions))
+
+    def update(self, open_price: float, close_price: float) -> None:
+        self._directions.append(1 if float(close_price) > float(open_price) else -1)
+        self.count += 1
+
+    def update_bar(self, bar: Mapping[str, float]) -> None:
+        self.update(bar['open'], bar['close'])
+
+    def against(self, side: str) -> int:
+        """Свечи против позиции стороны 'BUY'/'SELL'"""
+        against_direction = -1 if side == 'BUY' else 1
+        return sum(1 for d in self._directions if d == against_direction)
+
+
+BAR_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def _bar_times(df: pd.DataFrame) -> np.ndarray:
+    """Время открытия свечей в наносекундах (из индекса или колонки open_time)"""
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df.index.asi8
+    if 'open_time' in df.columns:
+        column = df['open_time']
+        if pd.api.types.is_datetime64_any_dtype(column):
+            return column.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        # Сырые свечи Binance: миллисекунды
+        return column.to_numpy(dtype=np.int64) * 1_000_000
+    return df.index.to_numpy(dtype=np.int64)
+
+
+class KlineFeed:
+    """Отдаёт индикаторам только новые закрытые свечи из очередного DataFrame.
+
+    Запоминает время последней переданной свечи; свечи с ``close_time`` в будущем
+    (формирующаяся свеча Binance) пропускаются до своего закрытия.
+    """
+
+    def __init__(self):
+        self.last_time: Optional[int] = None
+
+    def new_bars(self, df: pd.DataFrame, now_ms: Optional[int] = None) -> Iterator[Dict[str, float]]:
+        if df is None or df.empty:
+            return
+        times = _bar_times(df)
+        end = len(times)
+        if 'close_time' in df.columns:
+            now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+            close_column = df['close_time']
+            if pd.api.types.is_datetime64_any_dtype(close_column):
+                close_times = close_column.to_numpy(dtype='datetime64[ms]').astype(np.int64)
+            else:
+                close_times = close_column.to_numpy(dtype=np.int64)
+            while end > 0 and close_times[end - 1] > now_ms:
+                end -= 1
+        start = 0 if self.last_time is None else int(np.searchsorted(times[:end], self.last_time, side='right'))
+        if start >= end:
+            return
+        columns = {col: df[col].to_numpy() for col in BAR_COLUMNS if col in df.columns}
+        for i in range(start, end):
+            self.last_time = int(times[i])
+            yield {col: float(values[i]) for col, values in columns.items()}
+
+    def continues(self, df: pd.DataFrame) -> bool:
+        """Продолжает ли df поток без пропуска: первая новая свеча идёт сразу за last_time.
+
+        Шаг свечей берётся из самого df. Если бот пропустил больше свечей, чем вмещает
+        окно, индикаторы нужно прогреть заново по всему df.
+        """
+        if self.last_time is None or df is None or df.empty:
+            return True
+        times = _bar_times(df)
+        start = int(np.searchsorted(times, self.last_time, side='right'))
+        if start >= len(times):
+            return True
+        steps = np.diff(times)
+        steps = steps[steps > 0]
+        if not len(steps):
+            return False
+        return int(times[start]) - self.last_time <= int(steps.min())
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {'last_time': self.last_time}
+
+    def restore(self, state: Mapping[str, Any]) -> None:
+        self.last_time = state.get('last_time')
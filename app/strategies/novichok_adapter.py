@@ -3,6 +3,10 @@ from typing import Dict, List, Any
 import pandas as pd
 
 from strategies.contracts import Decision, OrderIntent
+from services.backtest.ledger import as_position
+from utils.hot_log import get_logger
+
+signal_log = get_logger('strategy.signal')
 
 
 def _sym_str(x) -> str:
@@ -34,7 +38,10 @@ class NovichokAdapter:
         if df is None or df.empty:
             return Decision(intents=[])
 
-        signal = self.legacy.generate_signal(df)
+        if getattr(self.legacy, 'streaming', False):
+            signal = self.legacy.feed_klines(df)
+        else:
+            signal = self.legacy.generate_signal(df)
 
         if signal in (None, "hold"):
             return Decision(intents=[])
@@ -84,17 +91,10 @@ class NovichokAdapter:
                     # Не создаём close-интент — придерживаемся закрытия по SL/внешней логике
                     return Decision(intents=[])
 
-                # Создаем простой объект для совместимости с BaseStrategy
-                class PositionAdapter:
-                    def __init__(self, pos_dict):
-                        self.entry_price = pos_dict.get('entry_price')
-                        self.side = pos_dict.get('side')
-                        self.max_price = pos_dict.get('max_price', pos_dict.get('entry_price'))
-                        self.min_price = pos_dict.get('min_price', pos_dict.get('entry_price'))
-
                 # Определяем правильную сигнатуру метода calculate_trailing_stop_price
                 if hasattr(self.legacy, 'should_update_trailing_stop'):
-                    position_adapter = PositionAdapter(pos)
+                    # Позиция бэктеста передаётся как есть, словарь из live — копией в Position
+                    position_adapter = as_position(pos, symbol)
                     should_update = self.legacy.should_update_trailing_stop(position_adapter, current_price)
                     if should_update:
                         # Определяем сигнатуру метода
@@ -123,7 +123,7 @@ class NovichokAdapter:
                     try:
                         trailing_stop_price = self.legacy.calculate_trailing_stop_price(entry_price, current_price, strategy_side, symbol)
                     except Exception as e:
-                        print(f"⚠️ Ошибка вызова calculate_trailing_stop_price: {e}")
+                        signal_log.warning("⚠️ Ошибка вызова calculate_trailing_stop_price: %s", e)
                         trailing_stop_price = entry_price * (0.98 if strategy_side == 'long' else 1.02)
                 trailing_stop_triggered = (
                     (pos_side == 'BUY' and current_price <= trailing_stop_price) or
@@ -142,6 +142,6 @@ class NovichokAdapter:
             size=risk_pct,
             role="primary"
         )
-        print(f"✅ NovichokAdapter: Создан intent: {intent.symbol} {intent.side} {intent.role}")
+        signal_log.debug("✅ NovichokAdapter: Создан intent: %s %s %s", intent.symbol, intent.side, intent.role)
         return Decision(intents=[intent])
 
@@ -1,7 +1,8 @@
 import pandas as pd
-from typing import Dict
+from typing import Dict, Mapping, Optional
 
 from strategies.base_strategy import BaseStrategy
+from strategies.indicators import EMA
 from services.strategy_parameters import StrategyParameters
 
 
@@ -26,18 +27,31 @@ class NovichokStrategy(BaseStrategy):
         self.take_profit_pct = self.params.get_float("take_profit_pct", 0.03)
         self.trailing_stop_pct = self.params.get_float("trailing_stop_pct", 0.005)
 
+        self._init_streaming(
+            self.params.get_bool("streaming_indicators", False),
+            {'ema_fast': EMA(self.ema_fast), 'ema_slow': EMA(self.ema_slow)}
+        )
+
     def generate_signal(self, df: pd.DataFrame) -> str:
         if len(df) < self.ema_slow:
             return None
 
-        ema_fast = df['close'].ewm(span=self.ema_fast).mean()
-        ema_slow = df['close'].ewm(span=self.ema_slow).mean()
+        return self._signal_from_emas(self.ema_last(df, self.ema_fast), self.ema_last(df, self.ema_slow))
+
+    def on_bar(self, bar: Mapping[str, float]) -> Optional[str]:
+        close = bar['close']
+        ema_fast = self.indicators['ema_fast'].update(close)
+        ema_slow = self.indicators['ema_slow'].update(close)
+        if self.indicators['ema_slow'].count < self.ema_slow:
+            return None
+        return self._signal_from_emas(ema_fast, ema_slow)
 
-        diff = abs(ema_fast.iloc[-1] - ema_slow.iloc[-1]) / ema_slow.iloc[-1]
+    def _signal_from_emas(self, ema_fast: float, ema_slow: float) -> Optional[str]:
+        diff = abs(ema_fast - ema_slow) / ema_slow
         if diff < self.trend_threshold:
             return None
 
-        return 'long' if ema_fast.iloc[-1] > ema_slow.iloc[-1] else 'short'
+        return 'long' if ema_fast > ema_slow else 'short'
 
     def calculate_position_size(self, balance: float) -> float:
         return balance * self.risk_pct
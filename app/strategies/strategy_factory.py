@@ -5,6 +5,9 @@ from services.strategy_parameters import StrategyParameters
 from strategies.novichok_adapter import NovichokAdapter
 from strategies.compensation_adapter import CompensationAdapter
 from services.deal_service import DealService # Импортируем DealService
+from utils.hot_log import get_logger
+
+params_log = get_logger('strategy.params')
 
 
 STRATEGY_REGISTRY = {
@@ -60,11 +63,11 @@ def make_strategy(strategy_name: str, template) -> object:
             pass
 
         async def open_position(self, symbol: str, side: str, amount: float, leverage: int = 1, deal_id: int = None):
-            print(f"[MockDealService] Открытие позиции {side} {amount} {symbol}")
+            params_log.debug("[MockDealService] Открытие позиции %s %s %s", side, amount, symbol)
             return {"orderId": "mock_order_id", "price": 100.0, "qty": amount}
 
         async def close_position(self, symbol: str, side: str, deal_id: int):
-            print(f"[MockDealService] Закрытие позиции {side} {symbol}")
+            params_log.debug("[MockDealService] Закрытие позиции %s %s", side, symbol)
             return {"orderId": "mock_close_order_id", "price": 100.0, "qty": 0.0}
 
         async def get_open_positions(self):
@@ -76,11 +79,11 @@ def make_strategy(strategy_name: str, template) -> object:
     mock_deal_service = MockDealService()
 
     if name == "novichok":
-        print(f"🧠 Создание NovichokStrategy с параметрами: {params}")
+        params_log.debug("🧠 Создание NovichokStrategy с параметрами: %s", params)
         legacy = NovichokStrategy(StrategyParameters(raw=params))
         return NovichokAdapter(legacy)
     elif name == "compensation":
-        print(f"🧠 Создание CompensationStrategy с параметрами: {params}")
+        params_log.debug("🧠 Создание CompensationStrategy с параметрами: %s", params)
         legacy = CompensationStrategy(StrategyParameters(raw={**params, "interval": template.interval}))
         adapter = CompensationAdapter(legacy, template, mock_deal_service)
         return adapter
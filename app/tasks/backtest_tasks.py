@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 import os
 import asyncio
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Optional, Union
 from uuid import UUID
 from datetime import datetime
 import pandas as pd
@@ -26,6 +26,10 @@ from services.csv_data_service import CSVDataService
 from services.csv_loader_service import CSVLoaderService
 from repositories.backtest_result_repository import BacktestResultRepository
 from services.backtest_result_service import BacktestResultService
+from services.backtest.equity_store import pack_equity_curve
+from services.backtest.result_cache import InFlightRuns, backtest_cache_key
+from services.backtest.progress import TERMINAL_STATUSES, BacktestCancelled, BacktestProgress
+from services.backtest.checkpoint import CheckpointStore, CheckpointWriter
 
 
 def get_async_session_maker():
@@ -70,7 +74,8 @@ def sanitize_json_values(obj):
         return obj
     return obj
 
-@celery_app.task(bind=True, name='app.tasks.backtest_tasks.run_backtest_task')
+# acks_late: задача, чей воркер умер посреди прогона, доставляется заново и продолжает с чекпойнта
+@celery_app.task(bind=True, name='app.tasks.backtest_tasks.run_backtest_task', acks_late=True, reject_on_worker_lost=True)
 def run_backtest_task(
     self,
     user_id: str,
@@ -82,8 +87,16 @@ def run_backtest_task(
     leverage: int,
     strategy_config_id: int,
     compensation_strategy: bool = False,
-    custom_params: Dict[str, Any] = None
+    custom_params: Dict[str, Any] = None,
+    extend_from: Optional[str] = None
 ):
+    """
+    Runs a backtest and stores its result under the task id.
+
+    extend_from is the task id of a finished run with the same inputs and an
+    earlier end_date: the run continues from that run's final checkpoint, so only
+    the new bars are simulated.
+    """
     print("DEBUG: Celery task run_backtest_task started.")
     async def main():
         print("DEBUG: Starting backtest task main function.")
@@ -118,15 +131,23 @@ def run_backtest_task(
             # Create initial backtest record in the database
             print("DEBUG: Attempting to create initial backtest record.")
             try:
-                await backtest_result_service.create_result(self.request.id, template_id, UUID(user_id))
-                await session.commit() # Save initial status
-                print(f"DEBUG: Initial backtest record created for task ID {self.request.id}.")
+                # Повторная доставка после падения воркера: запись уже создана первым запуском
+                existing = await backtest_result_service.get_result_by_task_id(self.request.id)
+                if existing is None:
+                    await backtest_result_service.create_result(self.request.id, template_id, UUID(user_id))
+                    await session.commit() # Save initial status
+                    print(f"DEBUG: Initial backtest record created for task ID {self.request.id}.")
+                elif existing.status in TERMINAL_STATUSES:
+                    print(f"DEBUG: Backtest {self.request.id} already {existing.status}, nothing to do.")
+                    return
             except Exception as e:
                 print(f"ERROR: Error creating initial backtest record: {e}")
                 # Continue if initial record could not be saved, but this is undesirable
                 return
 
             print("DEBUG: Fetching strategy template.")
+            in_flight = None
+            progress = BacktestProgress.from_env(self.request.id)
             try:
                 # Get strategy template
                 template = await user_strategy_template_service.get_by_id(template_id, UUID(user_id))
@@ -171,11 +192,55 @@ def run_backtest_task(
                 if compensation_strategy:
                     print("DEBUG: Skipping live DB open-trades check for compensation strategy in backtest mode.")
 
+                universal_service = build_universal_backtest_service(session)
+
+                # Identical runs (same inputs, data and engine version) reuse a stored result
+                run_symbols = symbol if isinstance(symbol, list) else (['BTCUSDT', 'ETHUSDT'] if compensation_strategy else [symbol])
+                cache_key = backtest_cache_key(
+                    strategy_id=f"{strategy_config_id}:{'compensation' if compensation_strategy else 'novichok'}",
+                    parameters=getattr(template, 'parameters', {}) or {},
+                    symbols=run_symbols,
+                    interval=getattr(template, 'interval', None) or '1m',
+                    start_date=start_date,
+                    end_date=end_date,
+                    initial_balance=initial_balance,
+                    leverage=leverage,
+                    config=universal_service.default_config,
+                )
+                if await backtest_result_service.reuse_cached_result(self.request.id, cache_key):
+                    print(f"♻️ Backtest result reused from cache (key {cache_key[:12]})")
+                    await progress.finish("completed", cached=True)
+                    return
+
+                # Одинаковые запросы, пришедшие одновременно, ждут первый вместо повторной симуляции
+                in_flight = InFlightRuns.from_env()
+                owner = await in_flight.claim(cache_key, self.request.id)
+                if owner != self.request.id:
+                    print(f"⏳ Identical backtest is running in task {owner}, waiting for its result")
+                    await in_flight.wait(cache_key)
+                    if await backtest_result_service.reuse_cached_result(self.request.id, cache_key):
+                        print(f"♻️ Backtest result reused from task {owner}")
+                        await progress.finish("completed", cached=True)
+                        return
+                    # Первый прогон упал или не дождались — считаем сами
+                    await in_flight.claim(cache_key, self.request.id)
+
+                # Отмена, пришедшая пока задача ждала в очереди, — до скачивания свечей
+                await progress.check_cancelled()
+
+                # Свой чекпойнт есть, если воркер упал посреди прогона; иначе — финальный продлеваемого прогона
+                checkpoint_store = CheckpointStore()
+                resume_from = checkpoint_store.load(self.request.id)
+                if resume_from is None and extend_from:
+                    resume_from = checkpoint_store.load(extend_from)
+                    if resume_from is None:
+                        print(f"⚠️ No checkpoint of task {extend_from}, running the whole range")
+                checkpoints = CheckpointWriter(checkpoint_store, self.request.id)
+
                 # Use UniversalBacktestService aligned with online logic
                 result: BacktestResult
                 if compensation_strategy:
                     from strategies.strategy_factory import make_strategy
-                    universal_service = build_universal_backtest_service(session)
                     # Build the same adapter used online
                     strategy = make_strategy('compensation', template)
                     symbols_list = symbol if isinstance(symbol, list) else ['BTCUSDT', 'ETHUSDT']
@@ -192,12 +257,14 @@ def run_backtest_task(
                         start_date=start_date,
                         end_date=end_date,
                         initial_balance=initial_balance,
-                        config=None
+                        config=None,
+                        progress=progress,
+                        checkpoints=checkpoints,
+                        resume_from=resume_from
                     )
                 else:
                     # Align regular strategy backtest with online logic as well
                     from strategies.strategy_factory import make_strategy
-                    universal_service = build_universal_backtest_service(session)
                     strategy = make_strategy('novichok', template)
                     # Normalize symbol list
                     symbols_list = symbol if isinstance(symbol, list) else [symbol]
@@ -214,28 +281,61 @@ def run_backtest_task(
                         start_date=start_date,
                         end_date=end_date,
                         initial_balance=initial_balance,
-                        config=None
+                        config=None,
+                        progress=progress,
+                        checkpoints=checkpoints,
+                        resume_from=resume_from
                     )
                 
                 print(f"DEBUG: Backtest result equity_curve size: {len(result.equity_curve)}")
                 print(f"DEBUG: Backtest result equity_curve: {result.equity_curve[:5]}...{result.equity_curve[-5:]}" if len(result.equity_curve) > 10 else f"DEBUG: Backtest result equity_curve: {result.equity_curve}")
                 
-                # Save backtest results to database
-                processed_results = convert_timestamps_to_datetime(result.model_dump(mode='json'))
+                # Save backtest results to database: full curve as a blob, downsampled copy in JSON
+                equity_blob, display_curve = pack_equity_curve(result.equity_curve)
+                processed_results = convert_timestamps_to_datetime(result.model_dump(mode='json', exclude={'equity_curve'}))
+                processed_results['equity_curve'] = display_curve
+                processed_results['equity_points'] = len(result.equity_curve)
+                # Аргументы задачи: по ним /extend запускает продление прогона
+                processed_results['run_request'] = {
+                    'symbol': symbol,
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'initial_balance': initial_balance,
+                    'leverage': leverage,
+                    'strategy_config_id': strategy_config_id,
+                    'compensation_strategy': compensation_strategy,
+                    'custom_params': custom_params,
+                }
                 processed_results = sanitize_json_values(processed_results)
                 await backtest_result_service.update_result_status(
-                    self.request.id, "completed", processed_results
+                    self.request.id, "completed", processed_results, equity_blob, cache_key
                 )
                 await session.commit()
+                await progress.finish("completed", final_balance=result.final_balance)
                 print(f"✅ Backtest completed successfully in Celery! Final balance: {result.final_balance:.2f}")
 
+            except BacktestCancelled:
+                await session.rollback()
+                await backtest_result_service.update_result_status(self.request.id, "cancelled", {"error": "Бэктест отменён пользователем"})
+                await session.commit()
+                await progress.finish("cancelled")
+                CheckpointStore().delete(self.request.id)
+                print(f"🛑 Backtest {self.request.id} cancelled by user")
             except Exception as e:
                 print(f"ERROR: Exception during backtest execution: {e}")
                 await session.rollback() # Rollback transaction before updating status
                 await backtest_result_service.update_result_status(self.request.id, "failed", {"error": str(e)})
                 await session.commit()
+                await progress.finish("failed", error=str(e))
+                # Упавший прогон никто не продолжит: его чекпойнт не нужен
+                CheckpointStore().delete(self.request.id)
                 print(f"❌ Error executing backtest in Celery: {e}")
                 raise # Re-raise exception for Celery to mark the task as FAILED
+            finally:
+                if in_flight is not None:
+                    await in_flight.release(cache_key, self.request.id)
+                    await in_flight.close()
+                await progress.close()
     
     try:
         asyncio.run(main())
@@ -244,3 +344,12 @@ def run_backtest_task(
         # Здесь можно также попытаться обновить статус задачи в БД до 'failed'
         # Но это может быть сложно, если сессия БД еще не инициализирована или уже закрыта.
         raise
+
+
+@celery_app.task(name='app.tasks.backtest_tasks.prune_backtest_checkpoints')
+def prune_backtest_checkpoints() -> int:
+    """Удаляет чекпойнты, которые не обновлялись дольше CHECKPOINT_TTL_SECONDS"""
+    removed = CheckpointStore().prune()
+    if removed:
+        print(f"🧹 Removed {removed} expired backtest checkpoints")
+    return removed
@@ -0,0 +1,135 @@
+import asyncio
+import contextlib
+import io
+import os
+from dataclasses import asdict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtest.checkpoint import CheckpointStore, CheckpointWriter, decode_checkpoint, encode_checkpoint
+from services.backtest.universal_backtest_engine import BacktestContext, UniversalBacktestEngine
+from strategies.strategy_factory import make_strategy
+from tests.test_vectorized_backtest_engine import make_ohlcv, make_template
+
+
+class MemoryStore:
+    """Хранит все сохранённые чекпойнты, а не только последний"""
+
+    def __init__(self):
+        self.blobs = []
+
+    def save(self, name, blob):
+        self.blobs.append(blob)
+
+
+def market(bars, strategy):
+    if strategy == 'compensation':
+        return {'BTCUSDT': make_ohlcv(bars, seed=5, volatility=0.003),
+                'ETHUSDT': make_ohlcv(bars, seed=6, volatility=0.003, start_price=3000.0)}
+    return {'BTCUSDT': make_ohlcv(bars, seed=4)}
+
+
+def run(strategy, market_data, every=None, resume_from=None, template=None):
+    store = MemoryStore()
+    template = template or make_template()
+    context = BacktestContext(
+        make_strategy(strategy, template), template, 10000.0, market_data, config={'fee_rate': 0.0004},
+        checkpoints=CheckpointWriter(store, 'run', every) if every else None, resume_from=resume_from,
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = asyncio.run(UniversalBacktestEngine(context).run())
+    return result.model_dump(mode='json'), store.blobs
+
+
+@pytest.mark.parametrize('strategy', ['novichok', 'compensation'])
+def test_resumed_and_extended_runs_match_a_full_run(strategy):
+    data = market(3000, strategy)
+    expected, blobs = run(strategy, data, every=700)
+    assert expected['total_trades'] > 0
+    # 700, 1400, 2100, 2800 и финальный после 3000 свечей
+    assert [decode_checkpoint(b)[0]['step'] for b in blobs] == [700, 1400, 2100, 2800, 3000]
+
+    resumed, _ = run(strategy, data, resume_from=blobs[1])
+    assert resumed == expected
+
+    # Прогон по первой половине, продлённый от его финального чекпойнта
+    half = {symbol: df.iloc[:1500] for symbol, df in data.items()}
+    _, half_blobs = run(strategy, half, every=10_000)
+    extended, _ = run(strategy, data, resume_from=half_blobs[-1])
+    assert extended == expected
+
+
+def test_checkpoint_of_another_run_is_rejected():
+    data = market(2000, 'novichok')
+    _, blobs = run('novichok', data, every=500)
+
+    with pytest.raises(ValueError, match='different run'):
+        run('novichok', data, resume_from=blobs[0], template=make_template(ema_fast=12))
+
+    changed = data['BTCUSDT'].copy()
+    changed.index = changed.index + pd.Timedelta(minutes=1)
+    with pytest.raises(ValueError, match='different run'):
+        run('novichok', {'BTCUSDT': changed}, resume_from=blobs[0])
+
+    with pytest.raises(ValueError, match='does not match the loaded data'):
+        run('novichok', {'BTCUSDT': data['BTCUSDT'].iloc[:400]}, resume_from=blobs[0])
+
+
+def test_strategy_state_round_trip(tmp_path):
+    template = make_template(streaming_indicators=True)
+    strategy = make_strategy('compensation', template).strategy
+    strategy.feed_klines(make_ohlcv(200, seed=9))
+    strategy.state.btc_entry_price = np.float64(50123.5)
+    strategy.state.btc_entry_time = pd.Timestamp('2024-01-01 03:20', tz='UTC')
+    strategy.state.btc_side = 'BUY'
+    strategy.state.btc_position = {'size': 0.1, 'opened': pd.Timestamp('2024-01-01 03:20')}
+    strategy.state.btc_candles_against = 2
+
+    store = CheckpointStore(tmp_path)
+    store.save('task-1', encode_checkpoint({'strategy': strategy.state_snapshot()}, {'x': np.arange(3)}))
+    state, arrays = decode_checkpoint(store.load('task-1'))
+    assert arrays['x'].tolist() == [0, 1, 2]
+
+    restored = make_strategy('compensation', template).strategy
+    restored.restore_state(state['strategy'])
+    assert asdict(restored.state) == asdict(strategy.state)
+    assert restored.indicator_snapshot() == strategy.indicator_snapshot()
+
+    assert store.load('missing') is None
+    with pytest.raises(ValueError):
+        store.path('../escape')
+
+
+def test_long_runs_stretch_the_checkpoint_interval():
+    writer = CheckpointWriter(MemoryStore(), 'run', every=100, max_checkpoints=4)
+    assert writer.interval(300) == 100
+    assert writer.interval(1000) == 250
+
+    data = market(2000, 'novichok')
+    store = MemoryStore()
+    template = make_template()
+    context = BacktestContext(
+        make_strategy('novichok', template), template, 10000.0, data, config={'fee_rate': 0.0004},
+        checkpoints=CheckpointWriter(store, 'run', every=100, max_checkpoints=4),
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(UniversalBacktestEngine(context).run())
+    assert [decode_checkpoint(b)[0]['step'] for b in store.blobs] == [500, 1000, 1500, 2000]
+
+
+def test_prune_removes_expired_checkpoints(tmp_path):
+    store = CheckpointStore(tmp_path, ttl=3600)
+    for name in ('old', 'fresh'):
+        store.save(name, b'blob')
+    leftover = tmp_path / 'killed.npz.123.tmp'
+    leftover.write_bytes(b'partial')
+    (tmp_path / 'notes.txt').write_text('keep')
+    now = os.path.getmtime(store.path('fresh'))
+    os.utime(store.path('old'), (now - 7200, now - 7200))
+    os.utime(leftover, (now - 7200, now - 7200))
+
+    assert store.prune(now=now) == 2
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['fresh.npz', 'notes.txt']
+    assert CheckpointStore(tmp_path / 'missing').prune() == 0
@@ -0,0 +1,126 @@
+import asyncio
+import contextlib
+import io
+import json
+
+import pytest
+
+from services.backtest.progress import (
+    CANCEL_PREFIX, BacktestCancelled, BacktestProgress, progress_events, request_cancel,
+)
+from services.backtest.universal_backtest_engine import BacktestContext, UniversalBacktestEngine
+from strategies.strategy_factory import make_strategy
+from tests.test_result_cache import FakeRedis
+from tests.test_vectorized_backtest_engine import make_ohlcv, make_template
+
+
+class FakePubSubRedis(FakeRedis):
+    """FakeRedis с publish и pubsub: сообщения копятся в очереди канала"""
+
+    def __init__(self):
+        super().__init__()
+        self.published = []
+        self.queues = {}
+
+    async def publish(self, channel, data):
+        self.published.append(json.loads(data))
+        for queue in self.queues.get(channel, []):
+            queue.put_nowait(data)
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.redis.queues.setdefault(channel, []).append(self.queue)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+        try:
+            return {'data': await asyncio.wait_for(self.queue.get(), timeout)}
+        except asyncio.TimeoutError:
+            return None
+
+    async def unsubscribe(self, channel):
+        self.redis.queues[channel].remove(self.queue)
+
+    async def aclose(self):
+        pass
+
+
+class StepClock:
+    """Каждый вызов — плюс step секунд"""
+
+    def __init__(self, step):
+        self.now, self.step = 0.0, step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def run_with_progress(progress, bars=3000):
+    template = make_template()
+    context = BacktestContext(make_strategy('novichok', template), template, 10000.0,
+                              {'BTCUSDT': make_ohlcv(bars, seed=2)}, config={'fee_rate': 0.0004},
+                              progress=progress)
+    engine = UniversalBacktestEngine(context)
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(engine.run())
+    return context
+
+
+def test_engine_publishes_throttled_progress():
+    redis = FakePubSubRedis()
+    # Часы идут на 0.4 с за проверку: публикуется каждая третья (порог 1 с)
+    progress = BacktestProgress('task-1', redis, every=100, clock=StepClock(0.4))
+    run_with_progress(progress)
+
+    assert [m['done'] for m in redis.published] == list(range(100, 3000, 300))
+    last = redis.published[-1]
+    assert last['total'] == 3000 and last['percent'] == round(last['done'] / 30, 2)
+    assert last['eta_seconds'] > 0 and last['equity'] > 0
+    assert json.loads(redis.values['backtest:progress:task-1']) == last
+
+
+def test_cancel_flag_stops_the_main_loop():
+    redis = FakePubSubRedis()
+    progress = BacktestProgress('task-2', redis, every=250)
+    original_update = progress.update
+
+    async def update(done, *args):
+        if done == 1000:
+            await request_cancel(redis, 'task-2')
+        await original_update(done, *args)
+
+    progress.update = update
+    with pytest.raises(BacktestCancelled):
+        run_with_progress(progress)
+    assert CANCEL_PREFIX + 'task-2' in redis.values
+
+    # Без прогресса движок работает как раньше
+    assert len(run_with_progress(None).equity_curve) == 3001
+
+
+def test_progress_events_replay_state_and_stop_on_terminal_status():
+    async def scenario():
+        redis = FakePubSubRedis()
+        progress = BacktestProgress('task-3', redis, min_interval=0.0)
+        await progress.update(10, 100)
+        events = progress_events(redis, 'task-3', keepalive_seconds=0.01)
+
+        received = [await events.__anext__()]
+        assert received[0].startswith('data: ') and json.loads(received[0][6:])['done'] == 10
+        assert await events.__anext__() == ": keepalive\n\n"
+        await progress.update(50, 100)
+        await progress.finish('completed', final_balance=1.0)
+        received += [event async for event in events]
+        return [json.loads(event[6:]) for event in received]
+
+    messages = asyncio.run(scenario())
+    assert [m['status'] for m in messages] == ['running', 'running', 'completed']
+    assert messages[1]['done'] == 50
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from benchmarks.suite import CASES, append_history, compare_runs, load_history, parse_size, run_suite
+from benchmarks.synthetic import make_correlated_pair, make_regime_ohlcv
+
+
+def test_synthetic_pair_is_seeded_and_correlated():
+    btc, eth = make_correlated_pair(50_000, seed=3, correlation=0.7)
+    again, _ = make_correlated_pair(50_000, seed=3, correlation=0.7)
+    assert btc.equals(again)
+    assert btc.index.equals(eth.index)
+
+    returns = np.diff(np.log(np.stack([btc['close'], eth['close']])), axis=1)
+    assert np.corrcoef(returns)[0, 1] == pytest.approx(0.7, abs=0.02)
+    # Волатильность ETH выше в vol_ratio раз
+    assert returns[1].std() / returns[0].std() == pytest.approx(1.3, abs=0.05)
+
+    for df in (btc, eth, make_regime_ohlcv(10_000, seed=4)):
+        assert (df['high'] >= df[['open', 'close']].max(axis=1)).all()
+        assert (df['low'] <= df[['open', 'close']].min(axis=1)).all()
+
+
+def test_compare_flags_only_slowdowns_beyond_threshold():
+    baseline = {'a[10]': 1.0, 'b[10]': 1.0, 'tiny[10]': 0.001, 'gone[10]': 1.0}
+    current = {'a[10]': 1.25, 'b[10]': 1.05, 'tiny[10]': 0.01, 'new[10]': 1.0}
+    rows = {row['case']: row for row in compare_runs(baseline, current, threshold=0.1, min_seconds=0.05)}
+
+    assert sorted(rows) == ['a[10]', 'b[10]', 'tiny[10]']
+    assert rows['a[10]']['change'] == pytest.approx(0.25)
+    assert [case for case, row in rows.items() if row['regression']] == ['a[10]']
+
+
+def test_suite_runs_every_case_and_appends_history(tmp_path):
+    assert [parse_size(s) for s in ('10k', '100K', '1m', '2500')] == [10_000, 100_000, 1_000_000, 2500]
+
+    results = run_suite([400], repeat=1, report=lambda line: None)
+    assert sorted(results) == sorted(f"{name}[400]" for name in CASES)
+    assert all(seconds > 0 for seconds in results.values())
+
+    limited = run_suite([200_000], cases=['dual_orchestrator'], repeat=1, report=lambda line: None)
+    assert limited == {}
+
+    path = tmp_path / 'history.json'
+    append_history(path, results, repeat=1)
+    append_history(path, {'statistics[400]': 1.0}, repeat=1)
+    history = load_history(path)
+    assert [entry['results'] for entry in history] == [results, {'statistics[400]': 1.0}]
+    with pytest.raises(ValueError, match='Unknown'):
+        run_suite([400], cases=['missing'])
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtest.candle_store import CandleStore, missing_ranges
+from services.backtest.universal_backtest_service import UniversalBacktestService
+
+MINUTE = 60_000
+
+
+class FixtureKlineFetcher:
+    """Отдаёт свечи из заранее сгенерированной таблицы вместо Binance и запоминает запросы"""
+
+    def __init__(self, start: str = '2024-01-01', minutes: int = 3 * 24 * 60):
+        first = pd.Timestamp(start).value // 1_000_000
+        open_time = first + np.arange(minutes) * MINUTE
+        close = 100.0 + np.arange(minutes) * 0.01
+        self.rows = np.column_stack([open_time, close, close + 1, close - 1, close + 0.5, np.ones(minutes)])
+        self.calls = []
+
+    def __call__(self, symbol, interval, start_ms, end_ms):
+        self.calls.append((symbol, interval, start_ms, end_ms))
+        mask = (self.rows[:, 0] >= start_ms) & (self.rows[:, 0] <= end_ms)
+        return self.rows[mask]
+
+
+def ms(value):
+    return pd.Timestamp(value).value // 1_000_000
+
+
+def test_missing_ranges():
+    coverage = [(10, 19), (30, 39), (20, 24)]
+    assert missing_ranges(coverage, 0, 50) == [(0, 9), (25, 29), (40, 50)]
+    assert missing_ranges(coverage, 12, 22) == []
+    assert missing_ranges([], 5, 6) == [(5, 6)]
+
+
+def test_fetches_only_missing_ranges_and_serves_slices(tmp_path):
+    fetcher = FixtureKlineFetcher()
+    store = CandleStore(tmp_path, fetcher)
+
+    day = store.load('btcusdt', '1m', '2024-01-02', '2024-01-03')
+    assert len(day) == 1440 and day.index[0] == pd.Timestamp('2024-01-02')
+    assert fetcher.calls == [('btcusdt', '1m', ms('2024-01-02'), ms('2024-01-03') - 1)]
+
+    # Повторный и вложенный запросы читаются с диска
+    again = store.load('BTCUSDT', '1m', '2024-01-02 06:00', '2024-01-02 07:00')
+    assert len(fetcher.calls) == 1
+    pd.testing.assert_frame_equal(again, day.loc['2024-01-02 06:00':'2024-01-02 06:59'], check_freq=False)
+    assert not again['close'].to_numpy().flags.writeable
+
+    # Расширение диапазона докачивает только края
+    wide = store.load('BTCUSDT', '1m', '2024-01-01 12:00', '2024-01-03 12:00')
+    assert fetcher.calls[1:] == [
+        ('BTCUSDT', '1m', ms('2024-01-01 12:00'), ms('2024-01-02') - 1),
+        ('BTCUSDT', '1m', ms('2024-01-03'), ms('2024-01-03 12:00') - 1),
+    ]
+    assert len(wide) == 2 * 1440 and wide.index.is_monotonic_increasing
+    np.testing.assert_array_equal(wide['close'].to_numpy(), fetcher.rows[720:720 + 2880, 4])
+    assert store.coverage('BTCUSDT', '1m') == [(ms('2024-01-01 12:00'), ms('2024-01-03 12:00') - 1)]
+
+
+def test_empty_ranges_are_remembered(tmp_path):
+    fetcher = FixtureKlineFetcher()
+    store = CandleStore(tmp_path, fetcher)
+
+    assert store.load('BTCUSDT', '1m', '2023-06-01', '2023-06-02').empty
+    assert store.load('BTCUSDT', '1m', '2023-06-01', '2023-06-02').empty
+    assert len(fetcher.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_service_downloads_through_candle_store(tmp_path):
+    fetcher = FixtureKlineFetcher()
+    service = UniversalBacktestService(candle_store=CandleStore(tmp_path, fetcher))
+
+    market_data = await service._load_market_data(
+        'download', ['BTCUSDT', 'ETHUSDT'], None, '2024-01-01', '2024-01-02', None
+    )
+    assert {symbol: len(df) for symbol, df in market_data.items()} == {'BTCUSDT': 2880, 'ETHUSDT': 2880}
+    await service._load_market_data('download', ['BTCUSDT'], None, '2024-01-01', '2024-01-01', None)
+    assert len(fetcher.calls) == 2
+
+    with pytest.raises(ValueError):
+        await service._load_market_data('download', ['BTCUSDT'], None, '2022-01-01', '2022-01-01', None)
+
+
+def test_higher_intervals_are_resampled_from_1m(tmp_path):
+    fetcher = FixtureKlineFetcher()
+    store = CandleStore(tmp_path, fetcher)
+
+    hourly = store.load('BTCUSDT', '1h', '2024-01-01 00:30', '2024-01-02')
+    base = store.load('BTCUSDT', '1m', '2024-01-01 01:00', '2024-01-02').copy()
+    expected = base.resample('1h').agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+    )
+    pd.testing.assert_frame_equal(hourly, expected, check_freq=False, check_names=False)
+    assert {call[1] for call in fetcher.calls} == {'1m'}
+
+    # Расширение базы пересобирает производный кэш; 15m берётся из той же базы без скачивания
+    daily = store.load('BTCUSDT', '1d', '2024-01-01', '2024-01-03')
+    calls = len(fetcher.calls)
+    quarter = store.load('BTCUSDT', '15m', '2024-01-01', '2024-01-03')
+    assert len(daily) == 2 and len(quarter) == 2 * 96 and len(fetcher.calls) == calls
+    assert daily['high'].iloc[0] == fetcher.rows[:1440, 2].max()
+    assert len(store.load('BTCUSDT', '1h', '2024-01-01', '2024-01-03')) == 48
+
+
+def test_partial_bars_at_coverage_edges_are_dropped(tmp_path):
+    store = CandleStore(tmp_path, FixtureKlineFetcher())
+    store.load('BTCUSDT', '1m', '2024-01-01 00:00', '2024-01-01 01:30')
+
+    hourly = store.load('BTCUSDT', '1h', '2024-01-01', '2024-01-01 01:00')
+    assert hourly.index.tolist() == [pd.Timestamp('2024-01-01 00:00')]
+    assert store.read('BTCUSDT', '1h', ms('2024-01-01'), ms('2024-01-02')).index.tolist() == \
+        [pd.Timestamp('2024-01-01 00:00')]
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtest.csv_ingest import read_ohlcv_csv
+from services.csv_loader_service import CSVLoaderService
+
+CSV = """timestamp,open,high,low,close,volume,trades
+1704067320000,3.0,3.5,2.5,3.25,30,7
+1704067200000,1.0,1.5,0.5,1.25,10,5
+1704067260000,2.0,,1.5,2.25,20,6
+1704067380000,4.0,4.5,x,4.25,40,8
+1704067440000,5.0,5.5,4.5,5.25,50,9
+"""
+
+
+def legacy_load(path):
+    df = pd.read_csv(path)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df.set_index('timestamp', inplace=True)
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df.dropna().sort_index()[['open', 'high', 'low', 'close', 'volume']].astype('float64')
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / 'candles.csv'
+    path.write_text(CSV)
+    return path
+
+
+def test_matches_legacy_path_and_caches(csv_file, tmp_path):
+    cache = tmp_path / 'cache'
+    first = read_ohlcv_csv(csv_file, cache_dir=cache)
+    second = read_ohlcv_csv(csv_file, cache_dir=cache)
+
+    pd.testing.assert_frame_equal(first, legacy_load(csv_file))
+    pd.testing.assert_frame_equal(second, first)
+    assert len(list(cache.glob('*-float64'))) == 1
+    assert not second['close'].to_numpy().flags.writeable
+
+    # Изменённое содержимое — новый ключ кэша
+    csv_file.write_text(CSV.replace('5.25', '16.25'))
+    assert read_ohlcv_csv(csv_file, cache_dir=cache)['close'].iloc[-1] == 16.25
+
+
+def test_float32_and_clean_file(tmp_path):
+    path = tmp_path / 'clean.csv'
+    times = 1704067200000 + np.arange(100) * 60_000
+    pd.DataFrame({'timestamp': times, 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5,
+                  'volume': np.arange(100.0)}).to_csv(path, index=False)
+
+    df = read_ohlcv_csv(path, dtype='float32', use_cache=False)
+    assert df.dtypes.unique().tolist() == [np.float32]
+    assert df.index[0] == pd.Timestamp('2024-01-01') and len(df) == 100
+    pd.testing.assert_frame_equal(df.astype('float64'), legacy_load(path))
+
+
+def test_loader_service_reports_errors(tmp_path, monkeypatch):
+    monkeypatch.setenv('CSV_CACHE_DIR', str(tmp_path / 'cache'))
+    path = tmp_path / 'bad.csv'
+    path.write_text("timestamp,open,high,low,close\n1704067200000,1,1,1,1\n")
+    with pytest.raises(ValueError, match='volume'):
+        CSVLoaderService().load_csv_data(str(path))
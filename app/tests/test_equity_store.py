@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from schemas.backtest import BacktestEquityPoint
+from services.backtest.equity_store import (
+    decode_equity_curve, encode_equity_curve, equity_window, lttb, pack_equity_curve,
+)
+
+MINUTE_NS = 60 * 1_000_000_000
+
+
+def reference_lttb(x, y, threshold):
+    """Построчная реализация LTTB по описанию Steinarsson (2013)"""
+    n = len(y)
+    every = (n - 2) / (threshold - 2)
+    kept, a = [0], 0
+    for i in range(threshold - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((i + 2) * every) + 1, n)
+        if i == threshold - 3:
+            hi, next_lo, next_hi = n - 1, n - 1, n
+        avg_x = sum(x[next_lo:next_hi]) / (next_hi - next_lo)
+        avg_y = sum(y[next_lo:next_hi]) / (next_hi - next_lo)
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    return kept + [n - 1]
+
+
+def make_curve(n, seed=1):
+    rng = np.random.default_rng(seed)
+    times = pd.Timestamp('2024-01-01').value + np.arange(n, dtype=np.int64) * MINUTE_NS
+    # Кривая стоит на месте без позиции и меняется, пока позиция открыта
+    in_position = rng.random(n) < 0.3
+    balances = 10000.0 + np.cumsum(np.where(in_position, rng.normal(0, 2.0, n), 0.0))
+    return times, balances
+
+
+def test_lttb_matches_reference_and_keeps_extremes():
+    times, balances = make_curve(5_003, seed=4)
+    x = (times - times[0]).astype(float)
+    kept = lttb(x, balances, 200)
+    assert kept.tolist() == reference_lttb(x.tolist(), balances.tolist(), 200)
+
+    spiky = balances.copy()
+    spiky[1234], spiky[3456] = 20000.0, 1.0
+    kept = lttb(x, spiky, 100)
+    assert {0, 1234, 3456, len(spiky) - 1} <= set(kept.tolist())
+    assert lttb(x[:50], balances[:50], 100).tolist() == list(range(50))
+
+
+def test_blob_roundtrip_is_exact_and_compact():
+    times, balances = make_curve(100_000)
+    blob = encode_equity_curve(times, balances)
+    decoded_times, decoded_balances = decode_equity_curve(blob)
+    assert np.array_equal(decoded_times, times)
+    assert np.array_equal(decoded_balances, balances)
+    assert len(blob) < 0.3 * (times.nbytes + balances.nbytes)
+
+    empty_times, empty_balances = decode_equity_curve(encode_equity_curve(np.empty(0), np.empty(0)))
+    assert len(empty_times) == len(empty_balances) == 0
+
+
+def test_pack_and_window():
+    times, balances = make_curve(50_000)
+    curve = [BacktestEquityPoint(timestamp=pd.Timestamp(t, tz='UTC'), balance=b)
+             for t, b in zip(times.tolist(), balances.tolist())]
+    blob, display = pack_equity_curve(curve, points=500)
+    assert len(display) == 500
+    assert display[0] == {'timestamp': '2024-01-01T00:00:00', 'balance': balances[0]}
+
+    full_times, full_balances = decode_equity_curve(blob)
+    window_times, window_balances, total = equity_window(full_times, full_balances, times[1000], times[1999], 300)
+    assert total == 1000 and len(window_times) == 300
+    assert window_times[0] == times[1000] and window_times[-1] == times[1999]
+    assert window_balances.max() == balances[1000:2000].max()
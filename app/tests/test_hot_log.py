@@ -0,0 +1,61 @@
+import io
+import logging
+import sys
+
+import pytest
+
+from utils import hot_log
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    monkeypatch.delenv(hot_log.ENV_LEVELS, raising=False)
+    out = io.StringIO()
+    hot_log.configure(stream=out)
+    yield out
+    hot_log.configure(stream=sys.stdout)
+
+
+def test_hot_categories_are_silent_by_default(stream):
+    trade_log = hot_log.get_logger('backtest.trade')
+    trade_log.debug("BT-OPEN %s", 'BTCUSDT')
+    trade_log.info("opened %s", 'BTCUSDT')
+    hot_log.get_logger('backtest').info("summary %d", 3)
+
+    assert not trade_log.is_enabled()
+    assert trade_log.is_enabled(logging.WARNING)
+    assert stream.getvalue() == "summary 3\n"
+
+
+def test_env_levels_cascade_to_children(stream, monkeypatch):
+    monkeypatch.setenv(hot_log.ENV_LEVELS, "strategy=DEBUG, strategy.params=ERROR")
+    hot_log.configure()
+    hot_log.get_logger('strategy.signal').debug("signal %s", 'long', price=101.5)
+    hot_log.get_logger('strategy.params').warning("params")
+
+    assert stream.getvalue() == "signal long price=101.5\n"
+
+
+def test_rate_limit_reports_suppressed_count(stream, monkeypatch):
+    clock = iter([0.0, 0.1, 0.2, 0.3, 1.5])
+    monkeypatch.setattr(hot_log.time, 'monotonic', lambda: next(clock))
+    hot_log.set_level('backtest.stops', logging.DEBUG)
+    stops_log = hot_log.get_logger('backtest.stops', max_per_second=2)
+    for i in range(5):
+        stops_log.debug("SL %d", i)
+
+    assert stream.getvalue().splitlines() == ["SL 0", "SL 1", "SL 4 suppressed=2"]
+
+
+def test_trade_executor_fills_go_through_trade_log(stream, capsys):
+    from services.backtest.backtest_trade_executor import BacktestTradeExecutor
+    from strategies.contracts import OrderIntent
+
+    executor = BacktestTradeExecutor(fee_rate=0.0004)
+    intent = OrderIntent(symbol='BTCUSDT', side='BUY', sizing='usd', size=100.0)
+    assert executor.execute(intent, 50000.0, None, 1000.0, 'BTCUSDT') is not None
+    assert stream.getvalue() == '' and capsys.readouterr().out == ''
+
+    hot_log.set_level('backtest.trade', logging.DEBUG)
+    executor.execute(intent, 50000.0, None, 1000.0, 'BTCUSDT')
+    assert stream.getvalue().startswith("📊 Backtest trade: BUY 0.002000 BTCUSDT")
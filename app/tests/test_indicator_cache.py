@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtest.indicator_cache import IndicatorCache
+from services.backtest.market_view import MarketDataCursor
+
+
+def make_df(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2024-01-01', periods=n, freq='1min')
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({
+        'open': close, 'high': close * 1.001, 'low': close * 0.999,
+        'close': close, 'volume': rng.uniform(1, 10, n)
+    }, index=index)
+
+
+@pytest.fixture
+def market_data():
+    # Одинаковые индексы у обоих символов: различать их можно только по данным
+    return {'BTCUSDT': make_df(300, 1), 'ETHUSDT': make_df(300, 2)}
+
+
+def test_cached_ema_matches_prefix_ewm_exactly(market_data):
+    cache = IndicatorCache(market_data)
+    cursor = MarketDataCursor(market_data)
+
+    for current_time in market_data['BTCUSDT'].index:
+        cursor.advance(current_time)
+        for symbol in market_data:
+            df = cursor.frame(symbol)
+            for span in (7, 21):
+                expected = df['close'].ewm(span=span).mean().iloc[-1]
+                assert cache.ema_last(df, span) == expected
+
+
+def test_foreign_frames_are_not_served_from_cache(market_data):
+    cache = IndicatorCache(market_data)
+    btc = market_data['BTCUSDT']
+
+    assert cache.ema_last(btc.iloc[-50:], 10) is None
+    assert cache.ema_last(btc.iloc[:100].copy(), 10) is None
+    assert cache.ema_last(btc.iloc[:0], 10) is None
+    assert cache.locate(market_data['ETHUSDT'].iloc[:10]) == ('ETHUSDT', 9)
+
+
+def test_series_computed_once_per_key(market_data):
+    cache = IndicatorCache(market_data)
+    first = cache.ema('BTCUSDT', 10)
+    assert cache.ema('BTCUSDT', 10) is first
+    assert cache.ema('BTCUSDT', 20) is not first
+    with pytest.raises(ValueError):
+        cache.get('BTCUSDT', 'rsi', period=14)
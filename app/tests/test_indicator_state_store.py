@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from services.indicator_state_store import IndicatorStateStore
+from services.trade_service import TradeService
+from strategies.novichok_adapter import NovichokAdapter
+from strategies.novichok_strategy import NovichokStrategy
+from services.strategy_parameters import StrategyParameters
+from tests.test_indicators import make_df
+
+
+class FakeRedis:
+    """Минимум команд Redis для IndicatorStateStore; переживает пересоздание сервиса"""
+
+    def __init__(self):
+        self.values = {}
+        self.ttl = {}
+
+    async def get(self, name):
+        return self.values.get(name)
+
+    async def set(self, name, value, ex=None):
+        self.values[name] = value
+        self.ttl[name] = ex
+
+    async def delete(self, name):
+        self.values.pop(name, None)
+
+    async def aclose(self):
+        pass
+
+
+PARAMS = {'ema_fast': 5, 'ema_slow': 15, 'streaming_indicators': True}
+TEMPLATE = SimpleNamespace(id=3, symbol='BTCUSDT', parameters=PARAMS)
+
+
+def make_service(redis):
+    return TradeService(*(AsyncMock() for _ in range(10)), indicator_states=IndicatorStateStore(redis))
+
+
+def cycle(redis, df):
+    """Один торговый цикл на свежем сервисе и свежей стратегии, как после рестарта воркера"""
+    legacy = NovichokStrategy(StrategyParameters(raw=PARAMS))
+    strategy = NovichokAdapter(legacy)
+    asyncio.run(make_service(redis)._decide_streaming(strategy, legacy, {'BTCUSDT': df}, TEMPLATE, {}, 'user-1'))
+    return legacy.indicators['ema_slow']
+
+
+def test_snapshot_survives_restarts_and_rewarms_after_a_gap():
+    redis = FakeRedis()
+    df = make_df(1200, seed=2)
+
+    cycle(redis, df.iloc[:500])
+    assert set(redis.values) == {'strategy:indicators:user-1:3'}
+    assert redis.ttl['strategy:indicators:user-1:3'] == 7 * 86_400
+
+    # Следующий цикл продолжает поток: новые свечи досчитываются к сохранённому состоянию
+    ema = cycle(redis, df.iloc[10:510])
+    assert ema.count == 510
+    assert ema.value == df['close'].iloc[:510].ewm(span=15).mean().iloc[-1]
+
+    # Бот пропустил свечи 510..599: прогрев по всему окну
+    ema = cycle(redis, df.iloc[600:1100])
+    assert ema.count == 500
+    assert ema.value == df['close'].iloc[600:1100].ewm(span=15).mean().iloc[-1]
+
+    asyncio.run(IndicatorStateStore(redis).delete('user-1', 3))
+    assert redis.values == {}
+
+
+def test_store_without_redis_is_empty():
+    store = IndicatorStateStore(None)
+    asyncio.run(store.save('user-1', 3, {'feed': {}}))
+    assert asyncio.run(store.load('user-1', 3)) is None
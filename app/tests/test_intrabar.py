@@ -0,0 +1,95 @@
+import asyncio
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+from services.backtest.intrabar import SubBarIndex
+from services.backtest.position_manager import PositionManager
+from services.backtest.universal_backtest_engine import UniversalBacktestEngine, BacktestContext
+from services.backtest.vectorized_backtest_engine import VectorizedBacktestEngine
+from strategies.strategy_factory import make_strategy
+from tests.test_vectorized_backtest_engine import make_ohlcv, make_template
+
+
+def resample(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+    return df.resample(rule).agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+
+
+@pytest.fixture
+def bars():
+    index = pd.date_range('2024-01-01', periods=120, freq='1min')
+    minutes = pd.DataFrame({'open': 100.0, 'high': 100.5, 'low': 99.5, 'close': 100.0, 'volume': 1.0}, index=index)
+    # Первый час: сначала TP лонга (минута 10), потом SL (минута 30); второй час — наоборот
+    minutes.iloc[10, minutes.columns.get_loc('high')] = 103.0
+    minutes.iloc[30, minutes.columns.get_loc('low')] = 97.0
+    minutes.iloc[70, minutes.columns.get_loc('low')] = 97.0
+    minutes.iloc[90, minutes.columns.get_loc('high')] = 103.0
+    return resample(minutes, '1h'), minutes
+
+
+def test_index_maps_parent_bars_to_sub_bar_ranges(bars):
+    hours, minutes = bars
+    index = SubBarIndex(hours.index, minutes)
+
+    assert index.starts.tolist() == [0, 60]
+    assert index.ends.tolist() == [60, 120]
+    assert index.bar_at(hours.index[1]) == 1
+    assert index.bar_at(pd.Timestamp('2024-01-01 00:30')) == -1
+
+
+def test_resolve_picks_the_first_level_reached(bars):
+    hours, minutes = bars
+    index = SubBarIndex(hours.index, minutes)
+
+    assert index.resolve(0, 'BUY', 98.0, 102.0) == 'take_profit'
+    assert index.resolve(1, 'BUY', 98.0, 102.0) == 'stop_loss'
+    assert index.resolve(0, 'SELL', 102.0, 98.0) == 'stop_loss'
+    # Обе цели в одной подсвече — решение остаётся за вызывающим
+    both = minutes.copy()
+    both.iloc[10, both.columns.get_loc('low')] = 97.0
+    assert SubBarIndex(hours.index, both).resolve(0, 'BUY', 98.0, 102.0) is None
+
+
+def test_position_manager_subbar_mode(bars):
+    hours, minutes = bars
+    position = {'symbol': 'BTCUSDT', 'side': 'BUY', 'entry_price': 100.0, 'stop_loss': 98.0, 'take_profit': 102.0}
+    ohlc = hours.iloc[0].to_dict()
+
+    manager = PositionManager(intrabar_mode='subbar', subbar_indexes={'BTCUSDT': SubBarIndex(hours.index, minutes)})
+    assert manager.check_close_conditions(position, ohlc, hours.index[0]) == (True, 'take_profit', 102.0)
+    assert manager.check_close_conditions(position, hours.iloc[1].to_dict(), hours.index[1]) == (True, 'stop_loss', 98.0)
+    # Без подсвечей — как stopfirst
+    assert PositionManager(intrabar_mode='subbar').check_close_conditions(position, ohlc, hours.index[0]) == \
+        (True, 'stop_loss', 98.0)
+
+
+def run_engine(engine_cls, df, sub_bars, intrabar_mode):
+    template = make_template(stop_loss_pct=0.004, take_profit_pct=0.004)
+    context = BacktestContext(
+        strategy=make_strategy('novichok', template),
+        template=template,
+        initial_balance=10000.0,
+        market_data={'BTCUSDT': df},
+        config={'fee_rate': 0.0004, 'intrabar_mode': intrabar_mode},
+        sub_bars=sub_bars,
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = asyncio.run(engine_cls(context).run())
+    return result.model_dump(mode='json')
+
+
+def test_engines_replay_sub_bars_for_ambiguous_candles():
+    minutes = make_ohlcv(30 * 24 * 15, seed=4, volatility=0.003)
+    quarters = resample(minutes, '15min')
+    sub_bars = {'BTCUSDT': minutes}
+
+    loop = run_engine(UniversalBacktestEngine, quarters, sub_bars, 'subbar')
+    assert run_engine(VectorizedBacktestEngine, quarters, sub_bars, 'subbar') == loop
+
+    stopfirst = run_engine(UniversalBacktestEngine, quarters, None, 'stopfirst')
+    assert run_engine(UniversalBacktestEngine, quarters, None, 'subbar') == stopfirst
+    reasons = [trade['reason'] for trade in loop['trades']]
+    assert 'take_profit' in reasons
+    assert loop['trades'] != stopfirst['trades']
@@ -0,0 +1,101 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.backtest.candle_store import CandleStore
+from services.backtest.kline_downloader import AsyncKlineDownloader, TokenBucket, page_windows
+from services.backtest.universal_backtest_service import UniversalBacktestService
+
+MINUTE = 60_000
+START = pd.Timestamp('2024-01-01').value // 1_000_000
+
+
+class StubBinance:
+    """Локальная заглушка /api/v3/klines: свечи из таблицы, счётчик одновременных запросов и один 429"""
+
+    def __init__(self, minutes: int = 4500, rate_limit_first: bool = False):
+        open_time = START + np.arange(minutes) * MINUTE
+        close = 100.0 + np.arange(minutes)
+        self.rows = np.column_stack([open_time, close, close + 1, close - 1, close + 0.5, np.ones(minutes)])
+        self.rate_limit_first = rate_limit_first
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def klines(self, request: web.Request) -> web.Response:
+        query = request.query
+        self.requests.append(query['symbol'])
+        if self.rate_limit_first:
+            self.rate_limit_first = False
+            return web.json_response({'code': -1003}, status=429, headers={'Retry-After': '0'})
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        first, last = int(query['startTime']), int(query['endTime'])
+        rows = self.rows[(self.rows[:, 0] >= first) & (self.rows[:, 0] <= last)][:int(query['limit'])]
+        return web.json_response([[int(r[0]), *map(str, r[1:]), int(r[0]) + MINUTE - 1] for r in rows.tolist()])
+
+
+@pytest_asyncio.fixture
+async def stub():
+    binance = StubBinance()
+    app = web.Application()
+    app.router.add_get('/api/v3/klines', binance.klines)
+    async with TestServer(app) as server:
+        binance.url = str(server.make_url(''))
+        yield binance
+
+
+def test_page_windows():
+    assert page_windows(0, 2500, 1000) == [(0, 999), (1000, 1999), (2000, 2500)]
+
+
+def test_token_bucket_reserves_in_order():
+    bucket = TokenBucket(capacity=4, rate=2)
+    assert [bucket.reserve(2), bucket.reserve(2)] == [0.0, 0.0]
+    assert bucket.reserve(2) == pytest.approx(1.0, abs=0.01)
+    assert bucket.reserve(2) == pytest.approx(2.0, abs=0.01)
+
+
+@pytest.mark.asyncio
+async def test_downloads_page_windows_concurrently(stub):
+    stub.rate_limit_first = True
+    progress = []
+    downloader = AsyncKlineDownloader(stub.url, concurrency=3, progress=lambda *args: progress.append(args))
+
+    rows = await downloader.fetch('BTCUSDT', '1m', START, START + 4500 * MINUTE - 1)
+
+    np.testing.assert_array_equal(rows, stub.rows)
+    assert len(stub.requests) == 5 + 1
+    assert 1 < stub.max_in_flight <= 3
+    assert progress[-1] == ('BTCUSDT', 5, 5)
+
+
+@pytest.mark.asyncio
+async def test_fetch_many_downloads_symbols_in_parallel(stub):
+    downloader = AsyncKlineDownloader(stub.url, concurrency=1, progress=lambda *args: None)
+    end = START + 1000 * MINUTE - 1
+
+    rows = await downloader.fetch_many([('BTCUSDT', '1m', START, end), ('ETHUSDT', '1m', START, end)])
+
+    assert {symbol: len(r) for symbol, r in rows.items()} == {'BTCUSDT': 1000, 'ETHUSDT': 1000}
+    assert stub.max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_service_fills_candle_store_from_stub(stub, tmp_path):
+    downloader = AsyncKlineDownloader(stub.url, progress=lambda *args: None)
+    service = UniversalBacktestService(candle_store=CandleStore(tmp_path, downloader))
+
+    market_data = await service._load_market_data(
+        'download', ['BTCUSDT', 'ETHUSDT'], None, '2024-01-01', '2024-01-01', None
+    )
+
+    assert [len(df) for df in market_data.values()] == [1440, 1440]
+    assert sorted(set(stub.requests)) == ['BTCUSDT', 'ETHUSDT'] and len(stub.requests) == 4
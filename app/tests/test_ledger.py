@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtest.ledger import EquityBuffer, Position, TradeLedger, as_position
+from services.backtest.position_manager import PositionManager
+from services.backtest.statistics_service import BacktestStatisticsService
+from schemas.backtest import BacktestEquityPoint
+
+
+def test_position_is_slotted_and_dict_compatible():
+    position = Position('BTCUSDT', 'BUY', 100.0, pd.Timestamp('2024-01-01'), 2.0, size_usd=200.0, leverage=3)
+    assert not hasattr(position, '__dict__')
+    with pytest.raises(AttributeError):
+        position.unknown = 1
+
+    assert position['entry_price'] == 100.0
+    assert position.get('max_price') == 100.0 and position.min_price == 100.0
+    assert 'stop_loss' not in position
+    assert position.get('stop_loss', 95.0) == 95.0
+    position['stop_loss'] = 98.0
+    assert position.stop_loss == 98.0 and 'stop_loss' in position
+    assert position['entry_size_usd'] == 200.0
+    with pytest.raises(KeyError):
+        position['unknown']
+
+
+def test_as_position_copies_mapping():
+    position = Position('BTCUSDT', 'SELL', 10.0, None, 1.0)
+    assert as_position(position) is position
+
+    converted = as_position({'entry_price': 10.0, 'side': 'SELL', 'size': 1.0, 'max_price': None,
+                             'min_price': 9.5, 'entry_size_usd': 10.0}, 'ETHUSDT')
+    assert converted.symbol == 'ETHUSDT'
+    assert converted.max_price == 10.0 and converted.min_price == 9.5
+    assert converted.size_usd == 10.0
+
+
+def test_ledger_grows_and_roundtrips_records():
+    times = pd.date_range('2024-01-01', periods=10, freq='1min', tz='UTC')
+    ledger = TradeLedger(capacity=2)
+    for i in range(5):
+        ledger.add('BTCUSDT', 'BUY', 100.0 + i, times[i], 1.0, size_usd=100.0, fee_open=0.04, status='opened')
+        ledger.add('BTCUSDT', 'long', 100.0 + i, times[i], 1.0, exit_price=101.0, exit_time=times[i + 1],
+                   leverage=1, pnl=1.0 - i, pnl_pct=0.01, fee_close=0.04, reason='take_profit', status='closed')
+
+    assert len(ledger) == 10 and ledger.capacity == 16
+    assert ledger.nbytes == ledger.capacity * TradeLedger.DTYPE.itemsize
+
+    closed = ledger.records(ledger.mask('status', 'closed'))
+    assert [t['pnl'] for t in closed] == [1.0, 0.0, -1.0, -2.0, -3.0]
+    assert closed[0]['exit_time'] == times[1] and closed[0]['exit_time'].tz is not None
+    # Отсутствующие поля не попадают в словарь, как в прежних trade-словарях
+    assert 'exit_price' not in ledger[0] and 'pnl' not in ledger[0]
+    assert ledger[-1] == closed[-1] == list(ledger)[-1]
+    assert not ledger.mask('status', 'unknown').any()
+
+
+def test_ledger_append_and_from_columns():
+    ledger = TradeLedger()
+    ledger.append({'symbol': 'ETHUSDT', 'side': 'short', 'entry_price': 10.0,
+                   'entry_time': pd.Timestamp('2024-01-01'), 'size': 1.0, 'reason': 'end_of_data'})
+    assert ledger[0]['entry_time'] == pd.Timestamp('2024-01-01')
+    with pytest.raises(KeyError):
+        ledger.append({'symbol': 'ETHUSDT', 'side': 'short', 'entry_price': 10.0, 'size': 1.0,
+                       'entry_time': None, 'foo': 1})
+
+    times = pd.date_range('2024-01-01', periods=3, freq='1h').asi8
+    built = TradeLedger.from_columns(
+        symbol=['BTCUSDT'] * 2, side=['long', 'short'], entry_price=[1.0, 2.0], size=[1.0, 1.0],
+        entry_time=times[:2], exit_time=times[1:], pnl=[0.5, -0.5],
+    )
+    assert np.array_equal(built.column('pnl'), [0.5, -0.5])
+    assert built[1]['side'] == 'short' and 'status' not in built[1]
+    assert built.times('exit_time')[1] == pd.Timestamp('2024-01-01 02:00')
+
+
+def test_position_manager_closes_position_into_ledger():
+    manager = PositionManager(fee_rate=0.001)
+    time = pd.Timestamp('2024-01-01 00:05')
+    position = Position('BTCUSDT', 'BUY', 100.0, pd.Timestamp('2024-01-01'), 2.0, leverage=1,
+                        stop_loss=95.0, take_profit=110.0)
+    market_data = {'BTCUSDT': pd.DataFrame({'open': [101.0], 'high': [111.0], 'low': [100.0], 'close': [109.0]},
+                                           index=[time])}
+    open_positions = {'BTCUSDT': position}
+    trades = TradeLedger()
+
+    balance = manager.check_and_close_positions_sync(open_positions, market_data, time, 1000.0, trades)
+
+    assert open_positions == {}
+    assert position.max_price == 111.0
+    trade = trades[0]
+    assert (trade['reason'], trade['exit_price'], trade['exit_time']) == ('take_profit', 110.0, time)
+    assert balance == pytest.approx(1000.0 + 20.0 - 110.0 * 2.0 * 0.001)
+
+    stats = BacktestStatisticsService().calculate_statistics(
+        list(trades), [BacktestEquityPoint(timestamp=time, balance=balance)], 1000.0
+    )
+    assert stats['winning_trades'] == 1 and stats['avg_win'] == trade['pnl']
+
+
+def test_equity_buffer_builds_points_at_the_end():
+    times = pd.date_range('2024-01-01', periods=5, freq='1min', tz='UTC')
+    buffer = EquityBuffer(capacity=2)
+    for i, ts in enumerate(times[:3]):
+        buffer.append(ts, 100.0 + i)
+    buffer.extend(times[3:].asi8, np.array([90.0, 95.0]))
+
+    assert len(buffer) == 5
+    assert np.array_equal(buffer.balances, [100.0, 101.0, 102.0, 90.0, 95.0])
+    points = buffer.to_points()
+    assert points[-1] == BacktestEquityPoint(timestamp=times[-1], balance=95.0)
+    assert [p.timestamp for p in points] == list(times)
+    with pytest.raises(ValueError):
+        buffer.extend(times[:2].asi8, np.array([1.0]))
@@ -0,0 +1,82 @@
+import asyncio
+import contextlib
+import io
+import sys
+
+import pandas as pd
+
+from schemas.backtest import BacktestEquityPoint
+from services.backtest.backtest_trade_executor import BacktestTradeExecutor
+from services.backtest.data_feed import DataFeed
+from services.backtest.decision_policy import build_open_state
+from services.backtest.orchestrator_dual import DualBacktestOrchestrator
+from services.backtest.orchestrator_single import SingleBacktestOrchestrator
+from services.backtest.position_manager import PositionManager
+from services.backtest.result_builder import ResultBuilder
+from services.backtest.statistics_service import BacktestStatisticsService
+from strategies.strategy_factory import make_strategy
+from tests.test_vectorized_backtest_engine import make_ohlcv, make_template
+from utils import hot_log
+
+
+def test_result_builder_sets_template_id():
+    start = pd.Timestamp('2024-01-01')
+    curve = [BacktestEquityPoint(timestamp=start, balance=100.0),
+             BacktestEquityPoint(timestamp=start + pd.Timedelta(days=1), balance=101.0)]
+    build = dict(strategy_name='novichok', symbol='BTCUSDT', start_date=start, end_date=curve[-1].timestamp,
+                 initial_balance=100.0, final_balance=101.0, trades=[], equity_curve=curve, parameters={})
+
+    # template_id обязателен в BacktestResult: раньше построение результата падало с ValidationError
+    assert ResultBuilder(BacktestStatisticsService()).build(**build, template_id=7).template_id == 7
+    assert ResultBuilder(BacktestStatisticsService()).build(**build).template_id == 0
+
+
+def run_orchestrator(orchestrator_cls, *data, strategy='novichok'):
+    template = make_template()
+    orchestrator = orchestrator_cls(
+        PositionManager(fee_rate=0.0004), BacktestTradeExecutor(fee_rate=0.0004),
+        BacktestStatisticsService(), DataFeed(),
+    )
+    symbols = ('BTCUSDT', 'ETHUSDT')[:len(data)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(orchestrator.execute(
+            *data, 10000.0, make_strategy(strategy, template), strategy, *symbols, template.parameters, template,
+        ))
+
+
+def test_open_state_has_the_engine_layout():
+    position = {'deal_id': 3, 'entry_price': 100.0, 'entry_time': None, 'side': 'BUY', 'size': 1.0}
+    state = build_open_state({'BTCUSDT': position})
+    assert state['BTCUSDT']['position'] is position
+    assert state['BTCUSDT']['side'] == 'BUY'
+
+
+def test_orchestrators_run_through_open_positions():
+    # Адаптеры читают open_state[symbol]['position']: раньше первая открытая позиция роняла прогон
+    btc = make_ohlcv(3000, seed=1, volatility=0.003)
+    eth = make_ohlcv(3000, seed=2, volatility=0.003, start_price=3000.0)
+
+    single = run_orchestrator(SingleBacktestOrchestrator, btc)
+    assert single.total_trades > 0
+    assert single.template_id == 1
+
+    dual = run_orchestrator(DualBacktestOrchestrator, btc, eth, strategy='compensation')
+    assert dual.total_trades > 0
+    assert len(dual.equity_curve) == len(btc) + 1
+
+
+def test_orchestrator_output_goes_through_category_loggers(monkeypatch):
+    monkeypatch.delenv(hot_log.ENV_LEVELS, raising=False)
+    btc = make_ohlcv(600, seed=1, volatility=0.003)
+    eth = make_ohlcv(600, seed=2, volatility=0.003, start_price=3000.0)
+    sink = io.StringIO()
+    try:
+        hot_log.configure(stream=sink)
+        run_orchestrator(DualBacktestOrchestrator, btc, eth, strategy='compensation')
+        assert sink.getvalue() == ''
+
+        hot_log.configure({'strategy.signal': 'DEBUG', 'backtest.trade': 'DEBUG'})
+        run_orchestrator(DualBacktestOrchestrator, btc, eth, strategy='compensation')
+        assert '🔍 Анализ стратегии на свече 0' in sink.getvalue()
+    finally:
+        hot_log.configure(stream=sys.stdout)
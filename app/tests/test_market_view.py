@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtest.market_view import MarketDataCursor, MarketDataView, build_timeline
+
+
+def make_df(index) -> pd.DataFrame:
+    n = len(index)
+    close = np.arange(n, dtype=float) + 100.0
+    return pd.DataFrame({
+        'open': close - 0.5, 'high': close + 1.0,
+        'low': close - 1.0, 'close': close,
+        'volume': np.full(n, 10.0)
+    }, index=index)
+
+
+@pytest.fixture
+def market_data():
+    full = pd.date_range('2024-01-01', periods=50, freq='1min')
+    # ETH с пропусками и более поздним стартом
+    gappy = full[5:].delete([10, 11, 12, 30])
+    return {'BTCUSDT': make_df(full), 'ETHUSDT': make_df(gappy)}
+
+
+def test_cursor_matches_mask_slicing(market_data):
+    timeline = sorted(set(market_data['BTCUSDT'].index) | set(market_data['ETHUSDT'].index))
+    cursor = MarketDataCursor(market_data)
+
+    for current_time in timeline:
+        cursor.advance(current_time)
+        view = cursor.view()
+        for symbol, df in market_data.items():
+            expected = df[df.index <= current_time]
+            pd.testing.assert_frame_equal(view[symbol], expected)
+            assert cursor.position(symbol) == len(expected)
+            if not expected.empty:
+                assert cursor.price(symbol) == expected['close'].iloc[-1]
+                assert cursor.ohlc(symbol)['high'] == expected['high'].iloc[-1]
+
+
+def test_slices_are_views_not_copies(market_data):
+    cursor = MarketDataCursor(market_data)
+    cursor.advance(market_data['BTCUSDT'].index[20])
+    frame = cursor.frame('BTCUSDT')
+    assert np.shares_memory(frame['close'].to_numpy(), market_data['BTCUSDT']['close'].to_numpy())
+    # Повторное обращение на том же шаге не пересоздаёт срез
+    assert cursor.frame('BTCUSDT') is frame
+
+
+def test_view_behaves_like_market_data_mapping(market_data):
+    cursor = MarketDataCursor(market_data)
+    cursor.advance(market_data['BTCUSDT'].index[2])
+    view = cursor.view()
+
+    assert isinstance(view, MarketDataView)
+    assert set(view) == {'BTCUSDT', 'ETHUSDT'}
+    assert 'ETHUSDT' in view and 'XRPUSDT' not in view
+    assert view.get('XRPUSDT') is None
+    assert view['ETHUSDT'].empty
+    assert not cursor.has_data('ETHUSDT')
+    with pytest.raises(IndexError):
+        cursor.price('ETHUSDT')
+
+
+def test_timeline_and_seek_match_set_union_and_advance(market_data):
+    timeline = build_timeline(market_data)
+    expected = sorted(set(market_data['BTCUSDT'].index) | set(market_data['ETHUSDT'].index))
+    assert timeline.tolist() == expected
+
+    stepped = MarketDataCursor(market_data)
+    seeking = MarketDataCursor(market_data, timeline)
+    for step, current_time in enumerate(timeline):
+        stepped.advance(current_time)
+        seeking.seek(step)
+        assert seeking.current_time == current_time
+        for symbol in market_data:
+            assert seeking.position(symbol) == stepped.position(symbol)
+
+
+def test_timeline_keeps_timezone_and_falls_back_for_other_indexes(market_data):
+    utc = {symbol: df.tz_localize('UTC') for symbol, df in market_data.items()}
+    assert build_timeline(utc).tz is not None
+    assert build_timeline(utc).equals(build_timeline(market_data).tz_localize('UTC'))
+
+    numbered = {'A': make_df(pd.Index([3, 1, 2]).sort_values()), 'B': make_df(pd.Index([2, 5]))}
+    assert build_timeline(numbered).tolist() == [1, 2, 3, 5]
+    assert build_timeline({'A': make_df(pd.DatetimeIndex([]))}).empty
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtest.ledger import TradeLedger
+from services.backtest.metrics import (
+    equity_metrics, exposure, per_symbol, periods_per_year, rolling_metrics, trade_metrics,
+)
+from services.backtest.statistics_service import BacktestStatisticsService
+from services.backtest.universal_backtest_engine import UniversalBacktestEngine
+from tests.test_vectorized_backtest_engine import make_ohlcv, make_template, run_engine
+
+MINUTE_NS = 60 * 1_000_000_000
+
+
+def test_equity_metrics_match_reference_formulas():
+    rng = np.random.default_rng(3)
+    balances = 1000.0 * np.exp(np.cumsum(rng.normal(0, 0.001, 5000)))
+    times = pd.date_range('2024-01-01', periods=len(balances), freq='1min').asi8
+
+    metrics = equity_metrics(balances, times)
+    returns = pd.Series(balances).pct_change().dropna()
+    assert periods_per_year(times) == 525_600
+    assert metrics['sharpe_ratio'] == pytest.approx(returns.mean() / returns.std(ddof=0) * np.sqrt(525_600))
+    downside = np.sqrt((returns.clip(upper=0) ** 2).mean())
+    assert metrics['sortino_ratio'] == pytest.approx(returns.mean() / downside * np.sqrt(525_600))
+
+    peaks = np.maximum.accumulate(balances)
+    assert metrics['max_drawdown'] == pytest.approx((peaks - balances).max())
+    assert metrics['max_drawdown_pct'] == pytest.approx(((peaks - balances) / peaks).max())
+    assert metrics['calmar_ratio'] == pytest.approx(metrics['annual_return'] / metrics['max_drawdown_pct'])
+
+
+def test_drawdown_duration_counts_points_below_the_peak():
+    balances = np.array([100, 110, 105, 100, 108, 111, 109, 110, 95.0])
+    times = np.arange(len(balances)) * MINUTE_NS
+
+    metrics = equity_metrics(balances, times)
+    # После пика 110: три точки ниже до 111; после 111 — три точки до конца без восстановления
+    assert metrics['max_drawdown_duration'] == 3
+    assert metrics['max_drawdown_duration_seconds'] == 4 * 60
+    assert equity_metrics(np.array([1.0, 2.0, 3.0]))['max_drawdown_duration'] == 0
+
+
+def test_trade_exposure_and_per_symbol():
+    pnl = np.array([5.0, -2.0, 3.0, -1.0])
+    stats = trade_metrics(pnl)
+    assert (stats['winning_trades'], stats['losing_trades'], stats['win_rate']) == (2, 2, 50.0)
+    assert (stats['avg_win'], stats['avg_loss'], stats['profit_factor']) == (4.0, 1.5, 8.0 / 3.0)
+
+    # Пересекающиеся позиции считаются один раз: [0, 4) и [2, 6) покрывают 6 из 10
+    assert exposure(np.array([0, 2, 8]), np.array([4, 6, 9]), 0, 10) == pytest.approx(0.7)
+    assert exposure(np.array([]), np.array([]), 0, 10) == 0.0
+
+    ledger = TradeLedger()
+    for symbol, value in zip(['BTCUSDT', 'ETHUSDT', 'BTCUSDT', 'ETHUSDT'], pnl):
+        ledger.add(symbol, 'long', 100.0, '2024-01-01', 1.0, pnl=value)
+    breakdown = per_symbol(ledger.column('symbol'), ledger.labels('symbol'), ledger.column('pnl'))
+    assert breakdown == {
+        'BTCUSDT': {'trades': 2, 'total_pnl': 8.0, 'winning_trades': 2, 'win_rate': 100.0},
+        'ETHUSDT': {'trades': 2, 'total_pnl': -3.0, 'winning_trades': 0, 'win_rate': 0.0},
+    }
+
+
+def test_rolling_metrics_match_pandas_rolling():
+    rng = np.random.default_rng(5)
+    balances = 1000.0 * np.exp(np.cumsum(rng.normal(0, 0.002, 3000)))
+    window = 60
+
+    rolling = rolling_metrics(balances, window, periods=525_600)
+    series = pd.Series(balances)
+    returns = series.pct_change()
+    expected = returns.rolling(window - 1).mean() / returns.rolling(window - 1).std(ddof=0) * np.sqrt(525_600)
+    np.testing.assert_allclose(rolling['sharpe_ratio'][window:], expected.to_numpy()[window:], rtol=1e-6)
+    np.testing.assert_allclose(rolling['return'][window - 1:], (series / series.shift(window - 1) - 1).to_numpy()[window - 1:])
+    peaks = series.rolling(window).max()
+    np.testing.assert_allclose(rolling['drawdown_pct'][window - 1:], ((peaks - series) / peaks).to_numpy()[window - 1:])
+    assert np.isnan(rolling['sharpe_ratio'][: window - 1]).all()
+
+
+def test_statistics_service_uses_timestamps_for_sharpe():
+    times = pd.date_range('2024-01-01', periods=4, freq='1h')
+    curve = [{'timestamp': t, 'balance': b} for t, b in zip(times, [100.0, 101.0, 100.5, 102.0])]
+    stats = BacktestStatisticsService().calculate_statistics([{'pnl': 2.0}], curve, 100.0)
+
+    per_point = equity_metrics(np.array([100.0, 101.0, 100.5, 102.0]))['sharpe_ratio']
+    assert stats['sharpe_ratio'] == pytest.approx(per_point * np.sqrt(365 * 24))
+    assert stats['metrics']['periods_per_year'] == 365 * 24
+
+
+def test_engine_result_carries_sharpe_and_extended_metrics():
+    df = make_ohlcv(3000, seed=2)
+    result = run_engine(UniversalBacktestEngine, df, make_template(), {'rolling_window': 100})
+
+    metrics = result['metrics']
+    assert result['total_trades'] > 0 and result['sharpe_ratio'] == metrics['sharpe_ratio'] != 0.0
+    assert 0.0 < metrics['exposure'] <= 1.0 and metrics['turnover'] > 0
+    assert metrics['per_symbol']['BTCUSDT']['trades'] == result['total_trades']
+    assert len(metrics['rolling']['sharpe_ratio']) == len(result['equity_curve'])
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from schemas.backtest import BacktestTrade
+from services.backtest.monte_carlo import MonteCarloAnalyzer
+from services.backtest.statistics_service import BacktestStatisticsService
+
+
+def test_shuffle_keeps_final_pnl_and_matches_loop_drawdown():
+    pnl = np.array([120.0, -300.0, 50.0, -80.0, 400.0, -10.0])
+    analyzer = MonteCarloAnalyzer(simulations=500, method='shuffle', seed=3, percentiles=(0, 50, 100))
+    analyzer.MAX_CELLS = 7 * len(pnl)
+    result = analyzer.analyze_pnl(pnl, 1000.0)
+
+    assert result.total_pnl_pct == pytest.approx([18.0, 18.0, 18.0])
+    assert result.probability_of_loss == 0.0
+
+    # Худший порядок — все убытки подряд от начального пика; он ограничивает распределение сверху
+    worst = 1000.0 + np.concatenate([[0.0], np.cumsum(np.sort(pnl))])
+    worst_dd = BacktestStatisticsService()._calculate_max_drawdown([{'balance': b} for b in worst])[1] * 100
+    assert 0.0 < result.max_drawdown_pct[0] <= result.max_drawdown_pct[2] <= worst_dd + 1e-9
+
+
+def test_bootstrap_bands_and_trade_input():
+    trades = [BacktestTrade(entry_time=datetime(2024, 1, 1), side='long', size=1.0, entry_price=1.0,
+                            reason='stop_loss', symbol='BTCUSDT', pnl=-100.0)] * 3
+    result = MonteCarloAnalyzer(simulations=200, seed=1).analyze_trades(trades + [{'pnl': None}], 10000.0)
+
+    assert result.trades == 3 and result.probability_of_loss == 1.0
+    assert result.total_pnl_pct == pytest.approx([-3.0] * 5)
+    assert result.max_drawdown_pct[2] == pytest.approx(3.0)
+    band = result.equity_bands[2]
+    assert band.steps == [0, 1, 2, 3] and band.balances == pytest.approx([10000.0, 9900.0, 9800.0, 9700.0])
+
+    again = MonteCarloAnalyzer(simulations=200, seed=1).analyze_trades(trades, 10000.0)
+    assert again == result.model_copy(update={'trades': 3})
+    with pytest.raises(ValueError):
+        MonteCarloAnalyzer(method='unknown')
@@ -0,0 +1,199 @@
+import asyncio
+import contextlib
+import io
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from schemas.backtest import BacktestSweepRow
+from services.backtest.batch_evaluator import BatchSignalEvaluator
+from services.backtest import vectorized_backtest_engine
+from services.backtest.parameter_sweep import (
+    SWEEP_METRICS, ParameterSweepRunner, SharedMarketData, expand_grid, rank_rows, template_with_parameters,
+)
+from services.backtest.universal_backtest_engine import UniversalBacktestEngine, BacktestContext
+from services.backtest.vectorized_backtest_engine import VectorizedBacktestEngine
+from services.backtest.walk_forward import WalkForwardRunner, slice_market_data, walk_forward_windows
+from strategies.strategy_factory import make_strategy
+
+
+def make_ohlcv(n: int, seed: int = 3, volatility: float = 0.002) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 50000.0 * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2, n)))
+    return pd.DataFrame(
+        {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': rng.uniform(1, 10, n)},
+        index=pd.date_range('2024-01-01', periods=n, freq='1min', tz='UTC', name='timestamp')
+    )
+
+
+def make_template():
+    return SimpleNamespace(id=7, template_name='sweep', leverage=3, interval='1m', symbol='BTCUSDT',
+                           parameters={'ema_fast': 10, 'ema_slow': 30, 'trend_threshold': 0.001,
+                                       'stop_loss_pct': 0.004, 'take_profit_pct': 0.006})
+
+
+def test_shared_market_data_roundtrip_is_a_readonly_view():
+    df = make_ohlcv(50)
+    with SharedMarketData({'BTCUSDT': df}) as shared:
+        attached, handles = SharedMarketData.attach(shared.specs)
+        view = attached['BTCUSDT']
+        pd.testing.assert_frame_equal(view, df, check_freq=False)
+        block = np.frombuffer(handles[0].buf, dtype=np.float64)
+        assert np.shares_memory(view['close'].to_numpy(), block)
+        with pytest.raises(ValueError):
+            view['close'].to_numpy()[0] = 0.0
+        del attached, view, block
+        for handle in handles:
+            handle.close()
+
+
+def test_expand_grid_and_rank_rows():
+    assert expand_grid({'a': [1, 2], 'b': ['x']}) == [{'a': 1, 'b': 'x'}, {'a': 2, 'b': 'x'}]
+    assert expand_grid({}) == [{}]
+    with pytest.raises(ValueError):
+        expand_grid({'a': []})
+
+    rows = [
+        BacktestSweepRow(parameters={'i': 0}, total_pnl=1.0, max_drawdown_pct=5.0),
+        BacktestSweepRow(parameters={'i': 1}, error='boom'),
+        BacktestSweepRow(parameters={'i': 2}, total_pnl=3.0, max_drawdown_pct=7.0),
+        BacktestSweepRow(parameters={'i': 3}, total_pnl=1.0, max_drawdown_pct=2.0),
+    ]
+    assert [r.parameters['i'] for r in rank_rows(rows, 'total_pnl')] == [2, 0, 3, 1]
+    assert [r.rank for r in rank_rows(rows, 'max_drawdown_pct')] == [1, 2, 3, 4]
+    assert [r.parameters['i'] for r in rank_rows(rows, 'max_drawdown_pct')] == [3, 0, 2, 1]
+
+
+def test_sweep_matches_individual_backtests():
+    df = make_ohlcv(1500)
+    template = make_template()
+    grid = {'ema_fast': [5, 10], 'stop_loss_pct': [0.003, 0.005]}
+    config = {'fee_rate': 0.0004}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sweep = ParameterSweepRunner(max_workers=2).run(
+            'novichok', template, grid, {'BTCUSDT': df}, config=config, leverage=3)
+
+    assert sweep.workers == 2 and sweep.template_id == 7
+    assert [row.rank for row in sweep.rows] == [1, 2, 3, 4]
+    pnls = [row.total_pnl for row in sweep.rows]
+    assert pnls == sorted(pnls, reverse=True)
+
+    for row in sweep.rows:
+        assert row.error is None
+        candidate = template_with_parameters(template, row.parameters)
+        context = BacktestContext(make_strategy('novichok', candidate), candidate, 10000.0,
+                                  {'BTCUSDT': df}, config=dict(config), leverage=3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = asyncio.run(UniversalBacktestEngine(context).run())
+        assert row.final_balance == expected.final_balance
+        assert row.total_trades == expected.total_trades
+
+
+@pytest.mark.parametrize('lockstep_columns', [1, 1000])
+def test_batch_evaluator_matches_vectorized_engine(monkeypatch, lockstep_columns):
+    # Оба способа пройти цепочки: шагами по массивам и скалярами
+    monkeypatch.setattr(vectorized_backtest_engine, 'LOCKSTEP_COLUMNS', lockstep_columns)
+    df = make_ohlcv(3000, seed=5)
+    template = make_template()
+    grid = {'ema_fast': [5, 10], 'ema_slow': [20, 30], 'trend_threshold': [0.0005, 0.001],
+            'take_profit_pct': [0.004, 0.006]}
+    config = {'fee_rate': 0.0004}
+
+    evaluator = BatchSignalEvaluator(df, template, config=config, leverage=3)
+    evaluator.MAX_CELLS = 3 * len(df)
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch = evaluator.evaluate(grid)
+
+    assert len(batch.rows) == 16 and [row.rank for row in batch.rows] == list(range(1, 17))
+    for row in batch.rows:
+        candidate = template_with_parameters(template, row.parameters)
+        context = BacktestContext(make_strategy('novichok', candidate), candidate, 10000.0,
+                                  {'BTCUSDT': df}, config=dict(config), leverage=3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = asyncio.run(VectorizedBacktestEngine(context).run())
+        # Строки в единицах BacktestResult, как у ParameterSweepRunner
+        assert {name: getattr(row, name) for name in SWEEP_METRICS} == {
+            name: getattr(expected, name) for name in SWEEP_METRICS
+        }
+
+
+def test_walk_forward_windows_roll_and_cut_at_end():
+    start = pd.Timestamp('2024-01-01')
+    windows = walk_forward_windows(start, start + pd.Timedelta('10D'), '4D', '2D')
+    assert [(a.day, b.day, c.day) for a, b, c in windows] == [(1, 5, 7), (3, 7, 9), (5, 9, 11)]
+    assert len(walk_forward_windows(start, start + pd.Timedelta('10D'), '4D', '2D', step='3D')) == 2
+    with pytest.raises(ValueError):
+        walk_forward_windows(start, start + pd.Timedelta('10D'), '0D', '2D')
+
+
+def test_walk_forward_picks_in_sample_best_and_scores_out_of_sample():
+    df = make_ohlcv(6 * 720, seed=11)
+    template = make_template()
+    grid = {'ema_fast': [5, 10], 'take_profit_pct': [0.004, 0.008]}
+    config = {'fee_rate': 0.0004}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = WalkForwardRunner(max_workers=2).run(
+            'novichok', template, grid, {'BTCUSDT': df}, in_sample='24h', out_of_sample='12h',
+            config=config, leverage=3)
+
+    assert result.workers == 2 and len(result.windows) == 4
+    assert result.out_of_sample_pnl == pytest.approx(sum(w.out_of_sample.total_pnl for w in result.windows))
+
+    def direct(parameters, start, end, trade_from=None):
+        part = slice_market_data({'BTCUSDT': df}, start, end)
+        candidate = template_with_parameters(template, parameters)
+        context = BacktestContext(make_strategy('novichok', candidate), candidate, 10000.0,
+                                  part, config=dict(config), leverage=3, trade_from=trade_from)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return asyncio.run(UniversalBacktestEngine(context).run())
+
+    window = result.windows[1]
+    assert window.error is None and window.in_sample.rank == 1
+    in_sample = [direct(p, window.in_sample_start, window.in_sample_end) for p in expand_grid(grid)]
+    assert window.in_sample.total_pnl == max(r.total_pnl for r in in_sample)
+    # Out-of-sample: in-sample свечи — прогрев, сделки и equity — только после split
+    scored = direct(window.parameters, window.in_sample_start, window.out_of_sample_end,
+                    trade_from=window.out_of_sample_start)
+    assert window.out_of_sample.final_balance == scored.final_balance
+    assert scored.equity_curve[0].timestamp == window.out_of_sample_start
+    assert all(trade.entry_time >= window.out_of_sample_start for trade in scored.trades)
+
+
+@pytest.mark.parametrize('engine', ['loop', 'vectorized'])
+def test_walk_forward_out_of_sample_trades_right_after_the_split(engine):
+    # Ровный рост: после прогрева EMA сигнал в лонг есть на каждой свече
+    n = 240
+    close = 50000.0 * np.exp(np.arange(n) * 0.001)
+    df = pd.DataFrame(
+        {'open': close, 'high': close * 1.0001, 'low': close * 0.9999, 'close': close, 'volume': 1.0},
+        index=pd.date_range('2024-01-01', periods=n, freq='1min', tz='UTC', name='timestamp')
+    )
+    template = make_template()
+    config = {'fee_rate': 0.0004, 'engine': engine}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = WalkForwardRunner(max_workers=1).run(
+            'novichok', template, {'ema_fast': [10]}, {'BTCUSDT': df}, in_sample='2h', out_of_sample='1h',
+            config=config, leverage=3)
+
+    window = result.windows[0]
+    assert window.error is None and window.out_of_sample.total_trades > 0
+
+    split = window.out_of_sample_start
+    context = BacktestContext(make_strategy('novichok', template), template, 10000.0,
+                              slice_market_data({'BTCUSDT': df}, window.in_sample_start, window.out_of_sample_end),
+                              config=dict(config), leverage=3, trade_from=split)
+    engine_class = VectorizedBacktestEngine if engine == 'vectorized' else UniversalBacktestEngine
+    with contextlib.redirect_stdout(io.StringIO()):
+        scored = asyncio.run(engine_class(context).run())
+    # Прогретые EMA дают сигнал уже на первой свече после split, а не через ema_slow свечей
+    assert scored.trades[0].entry_time == split
+    assert scored.start_date == split
+    assert window.out_of_sample.final_balance == scored.final_balance
@@ -0,0 +1,118 @@
+import asyncio
+import contextlib
+import io
+
+import pytest
+
+from services.backtest.portfolio_engine import PortfolioBacktestEngine, PortfolioStrategy
+from services.backtest.universal_backtest_engine import BacktestContext, UniversalBacktestEngine
+from strategies.novichok_adapter import NovichokAdapter
+from strategies.strategy_factory import make_strategy
+from tests.test_vectorized_backtest_engine import make_ohlcv, make_template
+
+CONFIG = {'fee_rate': 0.0004}
+
+
+def run_portfolio(market_data, **templates):
+    strategies = [PortfolioStrategy(name, make_strategy('novichok', template), template)
+                  for name, template in templates.items()]
+    engine = PortfolioBacktestEngine(strategies, 10000.0, market_data, config=CONFIG)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = asyncio.run(engine.run())
+    return engine, result
+
+
+def run_single(market_data, template):
+    context = BacktestContext(make_strategy('novichok', template), template, 10000.0, market_data, config=CONFIG)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(UniversalBacktestEngine(context).run())
+
+
+def test_single_strategy_portfolio_matches_the_loop_engine():
+    market_data = {'BTCUSDT': make_ohlcv(3000, seed=1)}
+    expected = run_single(market_data, make_template()).model_dump(mode='json')
+    _, result = run_portfolio(market_data, fast=make_template())
+
+    combined = result.combined.model_dump(mode='json')
+    assert expected['total_trades'] > 0
+    assert {k: v for k, v in combined.items() if k not in ('strategy_name', 'template_id', 'parameters')} == \
+        {k: v for k, v in expected.items() if k not in ('strategy_name', 'template_id', 'parameters')}
+
+    own = result.strategies['fast']
+    assert own.final_balance == pytest.approx(expected['final_balance'])
+    assert own.trades == result.combined.trades
+
+
+def test_strategies_share_one_pass_balance_and_indicators(monkeypatch):
+    market_data = {'BTCUSDT': make_ohlcv(3000, seed=2), 'ETHUSDT': make_ohlcv(3000, seed=3, start_price=3000.0)}
+    calls = []
+    original = NovichokAdapter.decide
+
+    async def decide(self, md, template, open_state=None):
+        calls.append(template.symbol)
+        return await original(self, md, template, open_state)
+
+    monkeypatch.setattr(NovichokAdapter, 'decide', decide)
+    eth = make_template(ema_fast=5)
+    eth.symbol = 'ETHUSDT'
+    engine, result = run_portfolio(
+        market_data,
+        btc=make_template(),
+        btc_wide=make_template(stop_loss_pct=0.01, take_profit_pct=0.02),
+        eth=eth,
+    )
+
+    # Одна свеча — по одному decide на стратегию
+    assert len(calls) == 3 * 3000
+    # btc и btc_wide читают одни и те же EMA 10/30 по BTC
+    assert sorted(key for key in engine.indicator_cache._series) == [
+        ('BTCUSDT', 'ema', (('column', 'close'), ('span', 10))),
+        ('BTCUSDT', 'ema', (('column', 'close'), ('span', 30))),
+        ('ETHUSDT', 'ema', (('column', 'close'), ('span', 5))),
+        ('ETHUSDT', 'ema', (('column', 'close'), ('span', 30))),
+    ]
+
+    pnl = {name: r.final_balance - 10000.0 for name, r in result.strategies.items()}
+    assert all(r.total_trades > 0 for r in result.strategies.values())
+    assert result.final_balance - 10000.0 == pytest.approx(sum(pnl.values()))
+    assert result.combined.total_trades == sum(r.total_trades for r in result.strategies.values())
+    assert result.combined.symbol == 'BTCUSDT, ETHUSDT'
+
+    # Общая кривая — сумма PnL-кривых стратегий
+    combined = [p.balance for p in result.combined.equity_curve]
+    parts = [[p.balance - 10000.0 for p in r.equity_curve] for r in result.strategies.values()]
+    assert combined == pytest.approx([10000.0 + sum(values) for values in zip(*parts)])
+
+
+def overlapping(result):
+    trades = sorted((t.entry_time, t.exit_time) for t in result.combined.trades)
+    return any(next_entry < exit_time for (_, exit_time), (next_entry, _) in zip(trades, trades[1:]))
+
+
+@pytest.mark.parametrize('deposit_prct,overlap', [(0.6, False), (0.4, True)])
+def test_shared_margin_limits_concurrent_positions(deposit_prct, overlap):
+    market_data = {'BTCUSDT': make_ohlcv(3000, seed=1)}
+    # Две одинаковые стратегии: по 60% баланса вторая позиция не помещается, пока открыта первая
+    template = make_template(stop_loss_pct=0.05, take_profit_pct=0.08)
+    template.deposit_prct = deposit_prct
+    _, result = run_portfolio(market_data, first=template, second=template)
+
+    assert result.combined.total_trades > 0
+    assert overlapping(result) is overlap
+
+
+def test_duplicate_strategy_names_are_rejected():
+    template = make_template()
+    with pytest.raises(ValueError, match='Duplicate'):
+        PortfolioBacktestEngine([PortfolioStrategy('a', None, template)] * 2, 10000.0, {})
+
+
+def test_service_rejects_mixed_intervals():
+    from services.backtest.universal_backtest_service import UniversalBacktestService
+
+    hourly = make_template()
+    hourly.interval = '1h'
+    strategies = [PortfolioStrategy('m1', make_strategy('novichok', make_template()), make_template()),
+                  PortfolioStrategy('h1', make_strategy('novichok', hourly), hourly)]
+    with pytest.raises(ValueError, match='different intervals'):
+        asyncio.run(UniversalBacktestService().run_portfolio_backtest(strategies))
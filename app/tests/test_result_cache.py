@@ -0,0 +1,90 @@
+import asyncio
+
+import pandas as pd
+
+from services.backtest import result_cache
+from services.backtest.result_cache import InFlightRuns, backtest_cache_key, data_version
+
+NOW = pd.Timestamp('2024-06-15 12:34:56', tz='UTC')
+
+
+def key(**overrides):
+    inputs = dict(
+        strategy_id='1:novichok', parameters={'ema_fast': 12, 'ema_slow': 26, 'stop_loss_pct': 0.02},
+        symbols=['BTCUSDT'], interval='1m', start_date='2024-01-01', end_date='2024-03-01',
+        initial_balance=10000.0, leverage=1, config={'fee_rate': 0.0004, 'slippage_bps': 0.0}, now=NOW,
+    )
+    inputs.update(overrides)
+    return backtest_cache_key(**inputs)
+
+
+class FakeRedis:
+    """Минимум команд Redis, которые использует InFlightRuns"""
+
+    def __init__(self):
+        self.values = {}
+
+    async def set(self, name, value, nx=False, ex=None):
+        if nx and name in self.values:
+            return None
+        self.values[name] = value
+        return True
+
+    async def get(self, name):
+        return self.values.get(name)
+
+    async def exists(self, name):
+        return int(name in self.values)
+
+    async def eval(self, script, numkeys, name, value):
+        if self.values.get(name) == value:
+            del self.values[name]
+            return 1
+        return 0
+
+
+def test_key_ignores_form_types_and_order_but_not_inputs():
+    base = key()
+    assert base == key(parameters={'stop_loss_pct': '0.02', 'ema_slow': '26', 'ema_fast': '12'})
+    assert base == key(symbols=['btcusdt'], initial_balance=10000, leverage=None)
+    assert base == key(now=NOW + pd.Timedelta(days=30))
+
+    changed = [
+        key(parameters={'ema_fast': 13, 'ema_slow': 26, 'stop_loss_pct': 0.02}),
+        key(end_date='2024-03-02'), key(interval='5m'), key(symbols=['ETHUSDT']),
+        key(config={'fee_rate': 0.001, 'slippage_bps': 0.0}), key(strategy_id='2:compensation'), key(leverage=3),
+    ]
+    assert len({base, *changed}) == len(changed) + 1
+
+
+def test_engine_version_invalidates_keys(monkeypatch):
+    base = key()
+    monkeypatch.setattr(result_cache, 'ENGINE_VERSION', result_cache.ENGINE_VERSION + 1)
+    assert key() != base
+
+
+def test_data_version_moves_only_while_range_is_open():
+    assert data_version('1m', '2024-01-01', '2024-03-01', NOW) == data_version('1m', '2024-01-01', '2024-03-01', NOW + pd.Timedelta(hours=5))
+
+    open_range = [data_version('1h', '2024-06-01', '2024-06-15', NOW + pd.Timedelta(minutes=m)) for m in (0, 20, 30)]
+    # 12:34 и 12:54 — одна закрытая часовая свеча, 13:04 — уже следующая
+    assert open_range[0] == open_range[1] != open_range[2]
+
+
+def test_in_flight_runs_collapse_identical_tasks():
+    async def scenario():
+        runs = InFlightRuns(FakeRedis(), poll_seconds=0.01)
+        assert await runs.claim('k', 'task-a') == 'task-a'
+        assert await runs.claim('k', 'task-b') == 'task-a'
+        assert not await runs.wait('k', timeout=0.03)
+
+        await runs.release('k', 'task-b')  # чужую блокировку не снимает
+        assert await runs.claim('k', 'task-c') == 'task-a'
+        waiter = asyncio.create_task(runs.wait('k', timeout=5))
+        await runs.release('k', 'task-a')
+        assert await waiter
+        assert await runs.claim('k', 'task-b') == 'task-b'
+
+        assert await InFlightRuns(None).claim('k', 'task-d') == 'task-d'
+
+    asyncio.run(scenario())
@@ -0,0 +1,117 @@
+import asyncio
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtest.tick_replay_engine import TickReplayEngine, replay_stops
+from services.backtest.trade_tape import TradeCursor, TradeTape, trades_to_candles
+from services.backtest.universal_backtest_engine import BacktestContext
+from strategies.strategy_factory import make_strategy
+from tests.test_vectorized_backtest_engine import make_template
+
+START_MS = pd.Timestamp('2024-01-01').value // 1_000_000
+
+
+def make_trades(n: int, seed: int = 1):
+    """Случайное блуждание сделок, в среднем ~20 сделок в минуту"""
+    rng = np.random.default_rng(seed)
+    timestamps = START_MS + np.cumsum(rng.integers(0, 6000, n))
+    price = 50000.0 * np.exp(np.cumsum(rng.normal(0, 0.0004, n)))
+    return timestamps, price, rng.uniform(0.001, 1.0, n)
+
+
+@pytest.fixture
+def tape(tmp_path):
+    tape = TradeTape(tmp_path)
+    timestamps, price, qty = make_trades(60_000)
+    # Два сегмента, как после двух импортов
+    tape.append('BTCUSDT', timestamps[:25_000], price[:25_000], qty[:25_000])
+    tape.append('BTCUSDT', timestamps[25_000:], price[25_000:], qty[25_000:])
+    return tape, timestamps, price, qty
+
+
+def test_chunks_cover_the_range_in_order(tape):
+    tape, timestamps, price, _ = tape
+    chunks = list(tape.iter_chunks('BTCUSDT', chunk_size=7_000))
+    assert max(len(c.price) for c in chunks) == 7_000
+    assert np.array_equal(np.concatenate([c.price for c in chunks]), price)
+
+    start, end = pd.Timestamp(int(timestamps[1000]), unit='ms'), pd.Timestamp(int(timestamps[40_000]), unit='ms')
+    window = np.concatenate([c.timestamp for c in tape.iter_chunks('BTCUSDT', start, end, chunk_size=3_000)])
+    expected = timestamps[(timestamps >= timestamps[1000]) & (timestamps < timestamps[40_000])] * 1_000_000
+    assert np.array_equal(window, expected)
+
+    with pytest.raises(ValueError):
+        tape.append('BTCUSDT', timestamps[:10], price[:10], price[:10])
+
+
+def test_candles_from_trades_match_pandas_resample(tape):
+    tape, timestamps, price, qty = tape
+    frame = pd.DataFrame({'price': price, 'qty': qty}, index=pd.to_datetime(timestamps, unit='ms'))
+    expected = frame['price'].resample('1min').ohlc().assign(volume=frame['qty'].resample('1min').sum()).dropna()
+
+    candles = trades_to_candles(tape.iter_chunks('BTCUSDT', chunk_size=4_999), 60_000)
+    assert candles.index.equals(expected.index.rename('timestamp'))
+    np.testing.assert_allclose(candles.to_numpy(), expected.to_numpy())
+
+
+def test_cursor_takes_trades_by_time_window(tape):
+    tape, timestamps, _, _ = tape
+    cursor = TradeCursor(tape.iter_chunks('BTCUSDT', chunk_size=1_000))
+    boundary = int(timestamps[2_500]) * 1_000_000
+    first, _ = cursor.take_until(boundary)
+    rest, _ = cursor.take_until(int(timestamps[-1]) * 1_000_000 + 1)
+    assert len(first) + len(rest) == len(timestamps)
+    assert first[-1] < boundary <= rest[0]
+
+
+def test_import_agg_trades_csv(tmp_path):
+    rows = '1,50000.5,0.1,1,1,1704067200000,true\n2,50001.0,0.2,2,3,1704067200500,false\n'
+    header = 'agg_trade_id,price,quantity,first_trade_id,last_trade_id,transact_time,is_buyer_maker\n'
+    for name, text in (('plain.csv', rows), ('header.csv', header + rows)):
+        (tmp_path / name).write_text(text)
+        tape = TradeTape(tmp_path / f'tape-{name}')
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert tape.import_agg_trades_csv(tmp_path / name, 'btcusdt') == 2
+        chunk = next(tape.iter_chunks('BTCUSDT'))
+        assert chunk.price.tolist() == [50000.5, 50001.0]
+        assert chunk.timestamp.tolist() == [1704067200000 * 1_000_000, 1704067200500 * 1_000_000]
+
+
+def test_replay_stops_trails_every_trade():
+    prices = np.array([100.0, 101.0, 102.0, 101.8, 101.6, 103.0])
+    # Трейлинг 0.3% от максимума 102 — стоп 101.694, его пробивает сделка по 101.6
+    result = replay_stops(prices, 'BUY', 99.0, 104.0, 0.003, extreme=100.0)
+    assert (result.index, result.reason, result.exit_price) == (4, 'stop_loss', 101.6)
+    assert result.stop_loss == pytest.approx(102.0 * 0.997)
+
+    result = replay_stops(prices, 'BUY', 99.0, 102.5, None, extreme=100.0)
+    assert (result.index, result.reason, result.exit_price) == (5, 'take_profit', 102.5)
+
+    result = replay_stops(np.array([100.0, 99.5, 99.4]), 'SELL', 103.0, 95.0, 0.003, extreme=100.0)
+    assert result.index == -1 and result.extreme == 99.4 and result.stop_loss == pytest.approx(99.4 * 1.003)
+
+
+def test_engine_replays_trades_through_strategy(tape):
+    tape, _, _, _ = tape
+    template = make_template(stop_loss_pct=0.004, take_profit_pct=0.006, trailing_stop_pct=0.003)
+
+    def run(trailing):
+        context = BacktestContext(make_strategy('novichok', template), template, 10000.0, {},
+                                  config={'fee_rate': 0.0004, 'trailing_stop_pct': trailing})
+        engine = TickReplayEngine(context, tape, '1m', chunk_size=5_000)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(engine.run())
+        return engine, result
+
+    engine, result = run(0.003)
+    assert len(result.equity_curve) == len(engine.timeline) + 1
+    assert result.total_trades > 0 and engine.trades_replayed > 0
+    # Выход по стопу — по цене сделки, время выхода — время этой сделки, а не открытие свечи
+    assert any(t.reason == 'stop_loss' and t.exit_time.second for t in result.trades)
+
+    _, fixed = run(0.0)
+    assert [t.exit_time for t in fixed.trades] != [t.exit_time for t in result.trades]
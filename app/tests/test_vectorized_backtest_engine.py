@@ -0,0 +1,136 @@
+import asyncio
+import contextlib
+import glob
+import io
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtest.universal_backtest_engine import UniversalBacktestEngine, BacktestContext
+from services.backtest.vectorized_backtest_engine import SignalBars, VectorizedBacktestEngine
+from services.backtest.universal_backtest_service import UniversalBacktestService
+from strategies.strategy_factory import make_strategy
+
+
+def make_ohlcv(n: int, seed: int, volatility: float = 0.002, start_price: float = 50000.0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2, n)))
+    return pd.DataFrame(
+        {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': rng.uniform(1, 10, n)},
+        index=pd.date_range('2024-01-01', periods=n, freq='1min')
+    )
+
+
+def make_template(**parameters):
+    params = {'ema_fast': 10, 'ema_slow': 30, 'trend_threshold': 0.001,
+              'stop_loss_pct': 0.004, 'take_profit_pct': 0.006}
+    leverage = parameters.pop('leverage', 3)
+    params.update(parameters)
+    return SimpleNamespace(id=1, template_name='parity', leverage=leverage, interval='1m',
+                           symbol='BTCUSDT', parameters=params)
+
+
+def run_engine(engine_cls, df, template, config=None):
+    context = BacktestContext(
+        strategy=make_strategy('novichok', template),
+        template=template,
+        initial_balance=10000.0,
+        market_data={'BTCUSDT': df},
+        config={'fee_rate': 0.0004, **(config or {})},
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = asyncio.run(engine_cls(context).run())
+    return result.model_dump(mode='json')
+
+
+def assert_parity(df, template, config=None):
+    expected = run_engine(UniversalBacktestEngine, df, template, config)
+    actual = run_engine(VectorizedBacktestEngine, df, template, config)
+    assert actual == expected
+    return actual
+
+
+@pytest.mark.parametrize('seed,volatility', [(1, 0.002), (2, 0.0005), (3, 0.004)])
+def test_parity_on_synthetic_data(seed, volatility):
+    result = assert_parity(make_ohlcv(3000, seed, volatility), make_template())
+    assert result['total_trades'] > 0
+
+
+@pytest.mark.parametrize('intrabar_mode', ['stopfirst', 'tpfirst', 'mid'])
+def test_parity_intrabar_modes_and_costs(intrabar_mode):
+    # Широкие свечи: SL и TP часто задеваются на одной свече
+    df = make_ohlcv(2000, 7, volatility=0.006)
+    config = {'intrabar_mode': intrabar_mode, 'slippage_bps': 0.5, 'spread_bps': 1.0}
+    assert_parity(df, make_template(leverage=5), config)
+
+
+def test_parity_long_holding_and_end_of_data():
+    # Далёкие SL/TP: сделки длиннее окна поиска, последняя закрывается по end_of_data
+    df = make_ohlcv(3000, 11, volatility=0.001)
+    template = make_template(stop_loss_pct=0.05, take_profit_pct=0.08, ema_fast=5, ema_slow=50)
+    result = assert_parity(df, template)
+    assert result['trades'][-1]['reason'] == 'end_of_data'
+
+
+def test_parity_without_signals():
+    assert_parity(make_ohlcv(500, 5), make_template(trend_threshold=1.0))
+
+
+def test_recorded_data_parity():
+    """Parity on recorded klines: CSV files (open_time,open,high,low,close,volume) in
+    BACKTEST_PARITY_DATA, e.g. written by the kline fixture fetcher."""
+    data_dir = os.environ.get('BACKTEST_PARITY_DATA')
+    files = sorted(glob.glob(os.path.join(data_dir, '*.csv'))) if data_dir else []
+    if not files:
+        pytest.skip('BACKTEST_PARITY_DATA with recorded kline CSVs is not set')
+    for path in files:
+        df = pd.read_csv(path)
+        df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+        df = df.set_index('open_time')[['open', 'high', 'low', 'close', 'volume']].astype(float)
+        assert_parity(df, make_template())
+
+
+def test_first_hits_match_bar_scan():
+    df = make_ohlcv(1500, 4)
+    df.iloc[700, df.columns.get_loc('high')] = np.nan
+    bars = SignalBars.from_frame(df)
+    rng = np.random.default_rng(0)
+    start = rng.integers(0, len(df), 400)
+    is_long = rng.random(400) < 0.5
+    close = bars.close[start]
+    stop_loss = np.where(is_long, close * 0.99, close * 1.01)
+    take_profit = np.where(is_long, close * 1.03, close * 0.97)
+
+    expected = []
+    for i, long_side, sl, tp in zip(start, is_long, stop_loss, take_profit):
+        high, low = bars.high[i:], bars.low[i:]
+        hit = (low <= sl) | (high >= tp) if long_side else (high >= sl) | (low <= tp)
+        expected.append(i + int(hit.argmax()) if hit.any() else -1)
+    assert bars.first_hits(start, is_long, stop_loss, take_profit).tolist() == expected
+
+
+def test_supports_only_novichok_on_single_timeline():
+    df = make_ohlcv(100, 1)
+    template = make_template()
+    novichok = BacktestContext(make_strategy('novichok', template), template, 1000.0, {'BTCUSDT': df})
+    assert VectorizedBacktestEngine.supports(novichok)
+
+    shifted = df.copy()
+    shifted.index = shifted.index + pd.Timedelta(seconds=30)
+    two_timelines = BacktestContext(make_strategy('novichok', template), template, 1000.0,
+                                    {'BTCUSDT': df, 'ETHUSDT': shifted})
+    assert not VectorizedBacktestEngine.supports(two_timelines)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        compensation = make_strategy('compensation', template)
+    context = BacktestContext(compensation, template, 1000.0, {'BTCUSDT': df, 'ETHUSDT': df})
+    assert not VectorizedBacktestEngine.supports(context)
+    context.config['engine'] = 'vectorized'
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert type(UniversalBacktestService()._create_engine(context)) is UniversalBacktestEngine
@@ -1,13 +1,23 @@
+import json
+from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import HTMLResponse
+
+import pandas as pd
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 
 from dependencies.user_dependencies import fastapi_users
 from dependencies.di_factories import get_backtest_result_service # Импортируем нашу зависимость
 from services.backtest_result_service import BacktestResultService
-from schemas.backtest import BacktestResult # Используем BacktestResult для отображения, если нужно
+from schemas.backtest import BacktestResult, EquityCurveWindow, MonteCarloResult # Используем BacktestResult для отображения, если нужно
 from schemas.backtest_result import BacktestResultRead # Схема для чтения из базы
+from services.backtest.monte_carlo import MonteCarloAnalyzer
+from services.backtest.equity_store import DISPLAY_POINTS, equity_window
+from services.backtest.progress import TERMINAL_STATUSES, progress_events, request_cancel
+from utils.redis_client import redis_from_env
+from celery_app import celery_app
 from services.user_strategy_template_service import UserStrategyTemplateService
 from repositories.user_repository import UserStrategyTemplateRepository
 from dependencies.db_dependencie import get_session
@@ -55,7 +65,7 @@ async def get_backtest_results(
         if template:
             template_name = template.template_name
 
-    if status == "failed" and results_data and "error" in results_data:
+    if status in ("failed", "cancelled") and results_data and "error" in results_data:
         error = results_data["error"]
 
     return templates.TemplateResponse(
@@ -69,7 +79,8 @@ async def get_backtest_results(
             "error": error,
             "created_at": backtest_record.created_at,
             "completed_at": backtest_record.completed_at,
-            "template_name": template_name
+            "template_name": template_name,
+            "terminal_statuses": list(TERMINAL_STATUSES)
         }
     )
 
@@ -84,3 +95,156 @@ async def get_backtest_results_api(
         raise HTTPException(status_code=404, detail="Результаты бэктеста не найдены или нет доступа")
     
     return backtest_record
+
+
+@router.get("/api/backtest/results/{task_id}/monte-carlo", response_model=MonteCarloResult)
+async def get_backtest_monte_carlo_api(
+    task_id: str,
+    simulations: int = Query(10000, ge=100, le=50000),
+    method: str = Query('bootstrap'),
+    seed: Optional[int] = None,
+    current_user=Depends(current_active_user),
+    backtest_result_service: BacktestResultService = Depends(get_backtest_result_service)
+):
+    """Monte Carlo по сделкам завершённого бэктеста (распределения доходности и просадки)"""
+    backtest_record = await backtest_result_service.get_result_by_task_id(task_id)
+    if not backtest_record or backtest_record.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Результаты бэктеста не найдены или нет доступа")
+    if backtest_record.status != "completed" or not backtest_record.results:
+        raise HTTPException(status_code=409, detail="Бэктест ещё не завершён")
+
+    try:
+        result = BacktestResult.model_validate(backtest_record.results)
+        analyzer = MonteCarloAnalyzer(simulations=simulations, method=method, seed=seed)
+        # Тысячи симуляций numpy — в пуле потоков, чтобы не держать event loop
+        return await run_in_threadpool(analyzer.analyze, result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/api/backtest/results/{task_id}/equity", response_model=EquityCurveWindow)
+async def get_backtest_equity_api(
+    task_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(DISPLAY_POINTS, ge=3, le=10000),
+    current_user=Depends(current_active_user),
+    backtest_result_service: BacktestResultService = Depends(get_backtest_result_service)
+):
+    """Участок полной кривой эквити [start, end], прореженный LTTB до points точек (для зума графика)"""
+    backtest_record = await backtest_result_service.get_result_by_task_id(task_id)
+    if not backtest_record or backtest_record.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Результаты бэктеста не найдены или нет доступа")
+
+    curve = await backtest_result_service.get_equity_curve(task_id)
+    if curve is None:
+        raise HTTPException(status_code=409, detail="Кривая эквити недоступна")
+
+    times_ns, balances = curve
+    start_ns = _naive_utc_ns(start) if start else None
+    end_ns = _naive_utc_ns(end) if end else None
+    window_times, window_balances, total = equity_window(times_ns, balances, start_ns, end_ns, points)
+    return EquityCurveWindow(
+        total_points=total,
+        timestamps=(window_times // 1_000_000).tolist(),
+        balances=window_balances.tolist(),
+    )
+
+
+@router.get("/api/backtest/results/{task_id}/progress")
+async def stream_backtest_progress(
+    task_id: str,
+    current_user=Depends(current_active_user),
+    backtest_result_service: BacktestResultService = Depends(get_backtest_result_service)
+):
+    """Прогресс выполняющегося бэктеста как server-sent events (до completed/failed/cancelled)"""
+    backtest_record = await backtest_result_service.get_result_by_task_id(task_id)
+    if not backtest_record or backtest_record.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Результаты бэктеста не найдены или нет доступа")
+
+    if backtest_record.status in TERMINAL_STATUSES:
+        final = json.dumps({'status': backtest_record.status})
+        return StreamingResponse(iter([f"data: {final}\n\n"]), media_type="text/event-stream")
+
+    redis = redis_from_env()
+    if redis is None:
+        # Без Redis прогресс не публикуется; 204 останавливает переподключения EventSource
+        return Response(status_code=204)
+
+    async def events():
+        try:
+            async for event in progress_events(redis, task_id):
+                yield event
+        finally:
+            await redis.aclose()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.post("/api/backtest/results/{task_id}/cancel")
+async def cancel_backtest_api(
+    task_id: str,
+    current_user=Depends(current_active_user),
+    backtest_result_service: BacktestResultService = Depends(get_backtest_result_service)
+):
+    """Отмена бэктеста: флаг для главного цикла движка и revoke для ещё не начатой задачи"""
+    backtest_record = await backtest_result_service.get_result_by_task_id(task_id)
+    if not backtest_record or backtest_record.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Результаты бэктеста не найдены или нет доступа")
+    if backtest_record.status in TERMINAL_STATUSES:
+        raise HTTPException(status_code=409, detail="Бэктест уже завершён")
+
+    redis = redis_from_env()
+    if redis is None:
+        raise HTTPException(status_code=503, detail="Отмена недоступна: Redis не настроен")
+    try:
+        await request_cancel(redis, task_id)
+    finally:
+        await redis.aclose()
+    celery_app.control.revoke(task_id)
+    return {"task_id": task_id, "status": "cancelling"}
+
+
+@router.post("/api/backtest/results/{task_id}/extend")
+async def extend_backtest_api(
+    task_id: str,
+    end_date: str = Query(..., description="Новая дата окончания (YYYY-MM-DD), позже исходной"),
+    current_user=Depends(current_active_user),
+    backtest_result_service: BacktestResultService = Depends(get_backtest_result_service)
+):
+    """Продление завершённого бэктеста до end_date: новая задача продолжает с его финального чекпойнта"""
+    backtest_record = await backtest_result_service.get_result_by_task_id(task_id)
+    if not backtest_record or backtest_record.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Результаты бэктеста не найдены или нет доступа")
+    if backtest_record.status != "completed" or not backtest_record.results:
+        raise HTTPException(status_code=409, detail="Бэктест ещё не завершён")
+    run_request = backtest_record.results.get('run_request')
+    if not run_request:
+        raise HTTPException(status_code=409, detail="Бэктест сохранён без параметров запуска, продлить его нельзя")
+
+    try:
+        extend_to = pd.Timestamp(end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Некорректная дата: {end_date}")
+    if extend_to <= pd.Timestamp(run_request['end_date']):
+        raise HTTPException(status_code=400, detail="Новая дата окончания должна быть позже исходной")
+
+    task = celery_app.send_task(
+        'app.tasks.backtest_tasks.run_backtest_task',
+        kwargs={
+            **run_request,
+            'user_id': str(current_user.id),
+            'template_id': backtest_record.template_id,
+            'end_date': extend_to.strftime('%Y-%m-%d'),
+            'extend_from': task_id,
+        },
+    )
+    return {"task_id": task.id, "extends": task_id}
+
+
+def _naive_utc_ns(value: datetime) -> int:
+    ts = pd.Timestamp(value)
+    if ts.tz is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return ts.value
@@ -0,0 +1,143 @@
+"""
+Категорийные логгеры для горячих путей бэктеста и live-цикла.
+
+Каждая категория ('backtest.trade', 'strategy.compensation', ...) — отдельный
+logging.Logger 'bot.<категория>' со своим уровнем. Сообщения передаются в %-стиле
+с аргументами, поэтому выключенное сообщение стоит одной проверки уровня, без
+форматирования строки и записи в stdout. Дополнительные поля (**fields)
+дописываются к строке как key=value.
+
+Уровни переопределяются переменной окружения BOT_LOG_LEVELS, например
+BOT_LOG_LEVELS="backtest.trade=DEBUG,strategy=INFO", или set_level().
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+ROOT = 'bot'
+ENV_LEVELS = 'BOT_LOG_LEVELS'
+
+# Горячие категории по умолчанию молчат: сообщения на каждую сделку, SL/TP и сигнал
+DEFAULT_LEVELS: Dict[str, int] = {
+    '': logging.INFO,
+    'backtest.trade': logging.WARNING,
+    'backtest.stops': logging.WARNING,
+    'strategy.signal': logging.WARNING,
+    'strategy.compensation': logging.WARNING,
+    'strategy.params': logging.WARNING,
+}
+
+_configured = False
+
+
+class _FieldsFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            message += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+
+def configure(levels: Optional[Dict[str, Any]] = None, stream=None) -> None:
+    """Настраивает уровни категорий и вывод в stdout (повторный вызов перенастраивает)"""
+    global _configured
+    root = logging.getLogger(ROOT)
+    if not _configured or stream is not None:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        handler = logging.StreamHandler(stream or sys.stdout)
+        handler.setFormatter(_FieldsFormatter('%(message)s'))
+        root.addHandler(handler)
+        # Celery и uvicorn настраивают корневой логгер сами — не дублируем строки
+        root.propagate = False
+        _configured = True
+
+    merged: Dict[str, Any] = dict(DEFAULT_LEVELS)
+    overrides = {**_env_levels(), **(levels or {})}
+    # Сначала общие категории: 'strategy=INFO' включает и 'strategy.signal' с его уровнем по умолчанию
+    for category in sorted(overrides, key=lambda name: name.count('.') if name else -1):
+        for known in list(merged):
+            if category == '' or known.startswith(category + '.'):
+                merged[known] = overrides[category]
+        merged[category] = overrides[category]
+    for category, level in merged.items():
+        set_level(category, level)
+
+
+def set_level(category: str, level) -> None:
+    logging.getLogger(_logger_name(category)).setLevel(
+        logging.getLevelName(level.upper()) if isinstance(level, str) else level
+    )
+
+
+def get_logger(category: str, max_per_second: float = 0.0) -> 'CategoryLogger':
+    """Логгер категории; max_per_second > 0 ограничивает частоту включённых сообщений"""
+    if not _configured:
+        configure()
+    return CategoryLogger(category, max_per_second)
+
+
+class CategoryLogger:
+    """Тонкая обёртка над logging.Logger: уровни, поля key=value и ограничение частоты"""
+
+    __slots__ = ('category', 'max_per_second', '_logger', '_window_start', '_window_count', '_suppressed')
+
+    def __init__(self, category: str, max_per_second: float = 0.0):
+        self.category = category
+        self.max_per_second = max_per_second
+        self._logger = logging.getLogger(_logger_name(category))
+        self._window_start = 0.0
+        self._window_count = 0
+        self._suppressed = 0
+
+    def is_enabled(self, level: int = logging.DEBUG) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def debug(self, msg: str, *args, **fields) -> None:
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._log(logging.DEBUG, msg, args, fields)
+
+    def info(self, msg: str, *args, **fields) -> None:
+        if self._logger.isEnabledFor(logging.INFO):
+            self._log(logging.INFO, msg, args, fields)
+
+    def warning(self, msg: str, *args, **fields) -> None:
+        if self._logger.isEnabledFor(logging.WARNING):
+            self._log(logging.WARNING, msg, args, fields)
+
+    def error(self, msg: str, *args, **fields) -> None:
+        if self._logger.isEnabledFor(logging.ERROR):
+            self._log(logging.ERROR, msg, args, fields)
+
+    def _log(self, level: int, msg: str, args: tuple, fields: Dict[str, Any]) -> None:
+        if self.max_per_second > 0:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_count = 0
+                if self._suppressed:
+                    fields = {**fields, 'suppressed': self._suppressed}
+                    self._suppressed = 0
+            if self._window_count >= self.max_per_second:
+                self._suppressed += 1
+                return
+            self._window_count += 1
+        self._logger.log(level, msg, *args, extra={'category': self.category, 'fields': fields})
+
+
+def _logger_name(category: str) -> str:
+    return f"{ROOT}.{category}" if category else ROOT
+
+
+def _env_levels() -> Dict[str, str]:
+    levels = {}
+    for item in os.environ.get(ENV_LEVELS, '').split(','):
+        category, _, level = item.partition('=')
+        if level.strip():
+            levels[category.strip()] = level.strip()
+    return levels
@@ -0,0 +1,13 @@
+"""
+Общий redis.asyncio клиент из окружения для прогресса бэктестов, блокировок и снимков индикаторов.
+"""
+import os
+
+
+def redis_from_env():
+    """redis.asyncio клиент по REDIS_URL (или брокеру Celery); None без Redis"""
+    url = os.environ.get('REDIS_URL') or os.environ.get('CELERY_BROKER_URL')
+    if not url or not url.startswith(('redis://', 'rediss://', 'unix://')):
+        return None
+    import redis.asyncio as aioredis
+    return aioredis.Redis.from_url(url, decode_responses=True)